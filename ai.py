@@ -1,17 +1,14 @@
 import argparse
 import json
 
-from utils.ai_service import (
-    captaincy_advice,
-    transfer_advice,
-    freehit_advice,
-    h2h_prediction
-)
-
-from utils.ai_printer import print_pretty_transfer, print_captaincy_output
+# Subcommand handlers import their dependencies (numpy, the model, openai)
+# on first use, so `ai.py --help` and argument errors return immediately.
 
 
 def run_captaincy(args):
+    from utils.ai_printer import print_captaincy_output
+    from utils.ai_service import captaincy_advice
+
     result = captaincy_advice(
         entry_id=args.team,
         gw=args.gw
@@ -23,34 +20,41 @@ def run_captaincy(args):
 
 
 def run_transfers(args):
+    from utils.ai_printer import print_pretty_transfer
+    from utils.ai_service import transfer_advice
+
     result = transfer_advice(
         entry_id=args.team,
         gw=args.gw,
         candidate_pool_size=args.pool,
         free_transfers=args.free_transfers,
-        allowed_extra=args.allowed_extra
+        allowed_extra=args.allowed_extra,
+        token_budget=args.token_budget,
+        explain=not args.no_explain,
     )
     print_pretty_transfer(result)
 
 
 def run_freehit(args):
+    from utils.ai_service import freehit_advice
+
     result = freehit_advice(
         gw=args.gw,
         budget=args.budget,
-        candidate_pool_size=args.pool
+        candidate_pool_size=args.pool,
+        token_budget=args.token_budget
     )
     print(json.dumps(result, indent=2, ensure_ascii=False))
 
 
 def run_h2h(args):
+    from utils.ai_service import h2h_prediction
+
     baseline = None
 
     if args.mc:
-        from utils.montecarlo_service import calc_expected_points
-        baseline = {
-            "team_a_expected": calc_expected_points(args.teamA, args.gw),
-            "team_b_expected": calc_expected_points(args.teamB, args.gw),
-        }
+        from utils.montecarlo_service import h2h_baseline
+        baseline = h2h_baseline(args.teamA, args.teamB, args.gw)
 
     result = h2h_prediction(
         entry_a=args.teamA,
@@ -62,8 +66,38 @@ def run_h2h(args):
     print(json.dumps(result, indent=2, ensure_ascii=False))
 
 
-def main():
+def run_batch(args):
+    from utils.ai_batch import load_entry_ids, run_batch as run_advice_batch
+
+    entry_ids = load_entry_ids(args.entries)
+    commands = [c.strip() for c in args.commands.split(",") if c.strip()]
+    summary = run_advice_batch(
+        entry_ids=entry_ids,
+        gw=args.gw,
+        out_path=args.out,
+        commands=commands,
+        workers=args.workers,
+        candidate_pool_size=args.pool,
+        free_transfers=args.free_transfers,
+        allowed_extra=args.allowed_extra,
+        retries=args.retries,
+    )
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="FPL AI Tools CLI")
+    parser.add_argument(
+        "--llm",
+        choices=["openai", "stub", "replay"],
+        default=None,
+        help="LLM backend (default: $FPL_LLM_BACKEND or openai)",
+    )
+    parser.add_argument(
+        "--llm-dir",
+        default=None,
+        help="stub: fixtures dir (<kind>.json), replay: cached responses, openai: record responses here",
+    )
     sub = parser.add_subparsers(dest="command", required=True)
 
     # CAPTAINCY
@@ -77,8 +111,10 @@ def main():
     p_trans.add_argument("--team", type=int, required=True)
     p_trans.add_argument("--gw", type=int, required=True)
     p_trans.add_argument("--pool", type=int, default=60)
-    p_trans.add_argument("--free_transfers", type=int, default=0)
+    p_trans.add_argument("--free_transfers", type=int, default=1)
     p_trans.add_argument("--allowed_extra", type=int, default=0)
+    p_trans.add_argument("--token-budget", type=int, default=None, help="Token cap for the candidate pool (0 = no cap)")
+    p_trans.add_argument("--no-explain", action="store_true", help="Skip the LLM explanation of the searched plan")
     p_trans.set_defaults(func=run_transfers)
 
     # FREEHIT
@@ -86,6 +122,7 @@ def main():
     fh.add_argument("--gw", type=int, required=True)
     fh.add_argument("--pool", type=int, default=150)
     fh.add_argument("--budget", type=float, default=100.0)
+    fh.add_argument("--token-budget", type=int, default=None, help="Token cap for the candidate pool (0 = no cap)")
     fh.set_defaults(func=run_freehit)
 
     #HWH
@@ -96,7 +133,26 @@ def main():
     h2h.add_argument("--mc", action="store_true", help="Include Monte Carlo baseline expected points")
     h2h.set_defaults(func=run_h2h)
 
-    args = parser.parse_args()
+    # BATCH
+    batch = sub.add_parser("batch", help="Captaincy/transfer advice for many entries (JSON lines)")
+    batch.add_argument("--entries", required=True, help="File with one entry ID per line")
+    batch.add_argument("--gw", type=int, required=True)
+    batch.add_argument("--commands", default="captaincy,transfers", help="Comma-separated: captaincy,transfers")
+    batch.add_argument("--out", default="analysis_reports/batch_results.jsonl")
+    batch.add_argument("--workers", type=int, default=8, help="Max concurrent entries")
+    batch.add_argument("--retries", type=int, default=3, help="Retries for transient LLM errors")
+    batch.add_argument("--pool", type=int, default=120)
+    batch.add_argument("--free_transfers", type=int, default=1)
+    batch.add_argument("--allowed_extra", type=int, default=0)
+    batch.set_defaults(func=run_batch)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    if args.llm or args.llm_dir:
+        from utils.llm_backends import backend_from_name, set_llm_backend
+        set_llm_backend(backend_from_name(args.llm or "openai", args.llm_dir))
     args.func(args)
 
 
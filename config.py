@@ -5,9 +5,21 @@ ROOT_DIR = Path(__file__).resolve().parent
 
 DB_PATH = ROOT_DIR / "fpl.db"
 
+# Memory-mappable column files written after every data update
+COLUMNAR_DIR = ROOT_DIR / "data" / "columnar"
+
 # Default Monte Carlo simulations
 DEFAULT_SIMS = 10000
 
+# Adaptive Monte Carlo (tol=...): stop once the standard errors of the mean and
+# quantiles are below MC_TOLERANCE points, at MC_MAX_SIMS or after MC_TIME_BUDGET s.
+MC_TOLERANCE = 0.1
+MC_MAX_SIMS = 200000
+MC_TIME_BUDGET = 2.0
+
 # Default number of history games to calculate variance
 DEFAULT_HISTORY_GW = 5
 
+
+# Token budget for the candidate pool block in transfer / Free Hit prompts
+PROMPT_POOL_TOKEN_BUDGET = 6000
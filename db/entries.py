@@ -0,0 +1,329 @@
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from db.sqlite import get_connection, init_entry_tables
+
+POS_MAP = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
+
+
+def _own(conn):
+    if conn is None:
+        return get_connection(), True
+    return conn, False
+
+
+# -------------------------------------------------
+# WRITE
+# -------------------------------------------------
+
+
+def save_team_stats(team_json: Dict[str, Any], conn=None) -> None:
+    """
+    Store a team_stats.json-shaped dict (see utils/team_stats.py) in
+    entries / entry_gw / entry_picks. Existing rows for the entry are replaced.
+    """
+    conn, own_conn = _own(conn)
+    cur = conn.cursor()
+    init_entry_tables(cur)
+
+    entry_id = int(team_json["entry_id"])
+    cur.execute(
+        """
+        INSERT OR REPLACE INTO entries (
+            entry_id, team_name, manager, total_points, current_overall_rank, chips, updated_at
+        ) VALUES (?,?,?,?,?,?,?)
+        """,
+        (
+            entry_id,
+            team_json.get("team_name"),
+            team_json.get("manager"),
+            team_json.get("total_points"),
+            team_json.get("current_overall_rank"),
+            json.dumps(team_json.get("chips") or {}),
+            datetime.now(timezone.utc).isoformat(),
+        ),
+    )
+
+    gw_rows = []
+    pick_rows = []
+    for g in team_json.get("gw_data", []):
+        team = g.get("team") or {}
+        gw_rows.append((
+            entry_id,
+            g["gw"],
+            g.get("points"),
+            g.get("overall_rank"),
+            g.get("gw_rank"),
+            g.get("transfers"),
+            g.get("transfer_cost"),
+            g.get("value"),
+            g.get("bank"),
+            g.get("chip"),
+            team.get("captain_id"),
+            team.get("vice_id"),
+            team.get("starting_total"),
+            team.get("bench_total"),
+        ))
+        for p in list(team.get("starting", [])) + list(team.get("bench", [])):
+            pick_rows.append((
+                entry_id,
+                g["gw"],
+                p.get("slot"),
+                p["id"],
+                p.get("multiplier"),
+                int(bool(p.get("is_captain"))),
+                int(bool(p.get("is_vice"))),
+                p.get("total_points"),
+                p.get("goals_scored"),
+                p.get("assists"),
+                p.get("clean_sheets"),
+                p.get("bonus_points"),
+            ))
+
+    cur.execute("DELETE FROM entry_gw WHERE entry_id = ?", (entry_id,))
+    cur.execute("DELETE FROM entry_picks WHERE entry_id = ?", (entry_id,))
+    cur.executemany("""
+        INSERT INTO entry_gw (
+            entry_id, gw, points, overall_rank, gw_rank, transfers, transfer_cost,
+            value, bank, chip, captain_id, vice_id, starting_total, bench_total
+        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+    """, gw_rows)
+    cur.executemany("""
+        INSERT INTO entry_picks (
+            entry_id, gw, slot, player_id, multiplier, is_captain, is_vice,
+            total_points, goals_scored, assists, clean_sheets, bonus_points
+        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+    """, pick_rows)
+
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+def save_league_entries(league_id: int, league_type: str, rows: Iterable[Dict[str, Any]], conn=None) -> None:
+    """rows: dicts with entry_id, rank, total (from league standings)."""
+    conn, own_conn = _own(conn)
+    cur = conn.cursor()
+    init_entry_tables(cur)
+    cur.execute("DELETE FROM league_entries WHERE league_id = ?", (league_id,))
+    cur.executemany(
+        "INSERT INTO league_entries (league_id, league_type, entry_id, rank, total) VALUES (?,?,?,?,?)",
+        [(league_id, league_type, r["entry_id"], r.get("rank"), r.get("total")) for r in rows],
+    )
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+# -------------------------------------------------
+# READ
+# -------------------------------------------------
+
+
+def _table_exists(cur, name: str) -> bool:
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cur.fetchone() is not None
+
+
+def _pick_dict(r) -> Dict[str, Any]:
+    first = r["first_name"] or ""
+    second = r["second_name"] or ""
+    name = f"{first} {second}".strip() or f"#{r['player_id']}"
+    return {
+        "id": r["player_id"],
+        "name": name,
+        "team": r["short_name"],
+        "pos": POS_MAP.get(r["element_type"]),
+        "total_points": r["total_points"],
+        "goals_scored": r["goals_scored"],
+        "assists": r["assists"],
+        "clean_sheets": r["clean_sheets"],
+        "bonus_points": r["bonus_points"],
+        "multiplier": r["multiplier"],
+        "is_captain": bool(r["is_captain"]),
+        "is_vice": bool(r["is_vice"]),
+        "slot": r["slot"],
+    }
+
+
+_PICKS_SQL = """
+    SELECT ep.*, p.first_name, p.second_name, p.element_type, t.short_name
+    FROM entry_picks ep
+    LEFT JOIN players p ON p.id = ep.player_id
+    LEFT JOIN teams t ON t.id = p.team_id
+"""
+
+
+def _gw_block(gw_row, picks: List[Any]) -> Dict[str, Any]:
+    starting = [_pick_dict(r) for r in picks if r["slot"] <= 11]
+    bench = [_pick_dict(r) for r in picks if r["slot"] > 11]
+    return {
+        "gw": gw_row["gw"],
+        "points": gw_row["points"],
+        "overall_rank": gw_row["overall_rank"],
+        "gw_rank": gw_row["gw_rank"],
+        "transfers": gw_row["transfers"],
+        "transfer_cost": gw_row["transfer_cost"],
+        "value": gw_row["value"],
+        "bank": gw_row["bank"],
+        "chip": gw_row["chip"],
+        "team": {
+            "starting": starting,
+            "bench": bench,
+            "captain_id": gw_row["captain_id"],
+            "vice_id": gw_row["vice_id"],
+            "starting_total": gw_row["starting_total"],
+            "bench_total": gw_row["bench_total"],
+        },
+    }
+
+
+def _entry_dict(entry) -> Dict[str, Any]:
+    return {
+        "entry_id": entry["entry_id"],
+        "team_name": entry["team_name"],
+        "manager": entry["manager"],
+        "total_points": entry["total_points"],
+        "current_overall_rank": entry["current_overall_rank"],
+        # Same shape as team_stats.json after a JSON round trip (GW keys as strings).
+        "chips": json.loads(entry["chips"] or "{}"),
+    }
+
+
+def load_entry(entry_id: int, conn=None) -> Optional[Dict[str, Any]]:
+    """Entry header (team name, manager, totals, chips) without gw_data."""
+    conn, own_conn = _own(conn)
+    try:
+        cur = conn.cursor()
+        if not _table_exists(cur, "entries"):
+            return None
+        cur.execute("SELECT * FROM entries WHERE entry_id = ?", (entry_id,))
+        entry = cur.fetchone()
+        return _entry_dict(entry) if entry is not None else None
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def load_team_stats(entry_id: int, conn=None) -> Optional[Dict[str, Any]]:
+    """
+    Rebuild the team_stats.json structure for an entry from the store.
+    Returns None if the entry has not been ingested.
+    """
+    conn, own_conn = _own(conn)
+    try:
+        cur = conn.cursor()
+        if not _table_exists(cur, "entries"):
+            return None
+        cur.execute("SELECT * FROM entries WHERE entry_id = ?", (entry_id,))
+        entry = cur.fetchone()
+        if entry is None:
+            return None
+
+        cur.execute("SELECT * FROM entry_gw WHERE entry_id = ? ORDER BY gw", (entry_id,))
+        gw_rows = cur.fetchall()
+        cur.execute(_PICKS_SQL + " WHERE ep.entry_id = ? ORDER BY ep.gw, ep.slot", (entry_id,))
+        picks_by_gw: Dict[int, List[Any]] = {}
+        for r in cur.fetchall():
+            picks_by_gw.setdefault(r["gw"], []).append(r)
+
+        out = _entry_dict(entry)
+        out["gw_data"] = [_gw_block(g, picks_by_gw.get(g["gw"], [])) for g in gw_rows]
+        return out
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def load_entry_gw_block(entry_id: int, before_gw: Optional[int] = None, conn=None) -> Optional[Dict[str, Any]]:
+    """
+    Single GW block (same shape as a gw_data item) for the latest GW < before_gw,
+    or the latest GW overall when before_gw is None. Uses the (entry_id, gw) keys
+    only, so cost does not depend on how many entries are stored.
+    """
+    conn, own_conn = _own(conn)
+    try:
+        cur = conn.cursor()
+        if not _table_exists(cur, "entry_gw"):
+            return None
+        if before_gw is None:
+            cur.execute(
+                "SELECT * FROM entry_gw WHERE entry_id = ? ORDER BY gw DESC LIMIT 1",
+                (entry_id,),
+            )
+        else:
+            cur.execute(
+                "SELECT * FROM entry_gw WHERE entry_id = ? AND gw < ? ORDER BY gw DESC LIMIT 1",
+                (entry_id, before_gw),
+            )
+        gw_row = cur.fetchone()
+        if gw_row is None:
+            return None
+        cur.execute(_PICKS_SQL + " WHERE ep.entry_id = ? AND ep.gw = ? ORDER BY ep.slot", (entry_id, gw_row["gw"]))
+        return _gw_block(gw_row, cur.fetchall())
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def list_entry_gws(entry_id: int, conn=None) -> List[int]:
+    conn, own_conn = _own(conn)
+    try:
+        cur = conn.cursor()
+        if not _table_exists(cur, "entry_gw"):
+            return []
+        cur.execute("SELECT gw FROM entry_gw WHERE entry_id = ? ORDER BY gw", (entry_id,))
+        return [r["gw"] for r in cur.fetchall()]
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def load_league_entry_ids(league_id: int, conn=None) -> List[int]:
+    conn, own_conn = _own(conn)
+    try:
+        cur = conn.cursor()
+        if not _table_exists(cur, "league_entries"):
+            return []
+        cur.execute(
+            "SELECT entry_id FROM league_entries WHERE league_id = ? ORDER BY rank, entry_id",
+            (league_id,),
+        )
+        return [r["entry_id"] for r in cur.fetchall()]
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def load_entry_totals(entry_ids: Iterable[int], before_gw: int, conn=None) -> Dict[int, int]:
+    """
+    Season totals (GW points minus transfer hits) over GWs < before_gw,
+    for many entries in one query. Entries without stored GWs get 0.
+    """
+    ids = sorted(set(int(e) for e in entry_ids))
+    out = {e: 0 for e in ids}
+    if not ids:
+        return out
+
+    conn, own_conn = _own(conn)
+    try:
+        cur = conn.cursor()
+        if not _table_exists(cur, "entry_gw"):
+            return out
+        placeholders = ",".join("?" * len(ids))
+        cur.execute(
+            f"""
+            SELECT entry_id, SUM(COALESCE(points, 0) - COALESCE(transfer_cost, 0)) AS total
+            FROM entry_gw
+            WHERE entry_id IN ({placeholders}) AND gw < ?
+            GROUP BY entry_id
+            """,
+            ids + [before_gw],
+        )
+        for r in cur.fetchall():
+            out[r["entry_id"]] = int(r["total"] or 0)
+        return out
+    finally:
+        if own_conn:
+            conn.close()
@@ -0,0 +1,246 @@
+import argparse
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from db.sqlite import get_connection, get_meta, init_snapshot_tables, set_meta
+
+# Columns kept in player_snapshot_intervals. Volatile columns (form,
+# selected_by_percent, transfers_*, ep_*) change on nearly every update and
+# are only available from the raw snapshots.
+STATE_COLUMNS = (
+    "status",
+    "chance_of_playing_next_round",
+    "chance_of_playing_this_round",
+    "now_cost",
+    "news",
+    "news_added",
+)
+
+COMPACTED_TO_KEY = "snapshot_compacted_to"
+
+Timestamp = Union[str, datetime]
+
+
+def _own(conn):
+    if conn is None:
+        return get_connection(), True
+    return conn, False
+
+
+def to_snapshot_time(ts: Timestamp) -> str:
+    """
+    Normalise a datetime / ISO string (incl. FPL's '...Z') to the UTC
+    isoformat used by player_gw_snapshot.snapshot_time, so plain string
+    comparison in SQL orders timestamps correctly.
+    """
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc).isoformat()
+
+
+def deadline_time(gw: int, conn=None) -> Optional[str]:
+    conn, own_conn = _own(conn)
+    try:
+        row = conn.execute("SELECT deadline_time FROM events WHERE id = ?", (gw,)).fetchone()
+    finally:
+        if own_conn:
+            conn.close()
+    return to_snapshot_time(row[0]) if row and row[0] else None
+
+
+# -------------------------------------------------
+# AS-OF QUERIES
+# -------------------------------------------------
+
+
+def snapshot_as_of(ts: Timestamp, conn=None) -> Dict[int, Dict[str, Any]]:
+    """
+    player_id -> full player_gw_snapshot row of the latest snapshot taken at
+    or before ts ({} if none). Every update snapshots all players, so this is
+    two primary-key lookups, not a per-player scan.
+    """
+    conn, own_conn = _own(conn)
+    try:
+        row = conn.execute(
+            "SELECT MAX(snapshot_time) FROM player_gw_snapshot WHERE snapshot_time <= ?",
+            (to_snapshot_time(ts),),
+        ).fetchone()
+        if not row or row[0] is None:
+            return {}
+        rows = conn.execute(
+            "SELECT * FROM player_gw_snapshot WHERE snapshot_time = ?", (row[0],)
+        ).fetchall()
+    finally:
+        if own_conn:
+            conn.close()
+    return {r["player_id"]: dict(r) for r in rows}
+
+
+def state_as_of(ts: Timestamp, conn=None) -> Dict[int, Dict[str, Any]]:
+    """
+    player_id -> STATE_COLUMNS (+ valid_from / valid_to) at time ts, from the
+    compacted intervals. Still works after old raw snapshots are pruned.
+    """
+    t = to_snapshot_time(ts)
+    conn, own_conn = _own(conn)
+    try:
+        rows = conn.execute(
+            f"""
+            SELECT player_id, valid_from, valid_to, {", ".join(STATE_COLUMNS)}
+            FROM player_snapshot_intervals
+            WHERE valid_from <= ? AND (valid_to IS NULL OR valid_to > ?)
+            """,
+            (t, t),
+        ).fetchall()
+    finally:
+        if own_conn:
+            conn.close()
+    return {r["player_id"]: dict(r) for r in rows}
+
+
+def snapshot_before_deadline(gw: int, conn=None) -> Dict[int, Dict[str, Any]]:
+    """Latest raw snapshot taken before the GW deadline ({} if the GW is unknown)."""
+    deadline = deadline_time(gw, conn=conn)
+    return snapshot_as_of(deadline, conn=conn) if deadline else {}
+
+
+def state_before_deadline(gw: int, conn=None) -> Dict[int, Dict[str, Any]]:
+    """Compacted player state at the GW deadline ({} if the GW is unknown)."""
+    deadline = deadline_time(gw, conn=conn)
+    return state_as_of(deadline, conn=conn) if deadline else {}
+
+
+# -------------------------------------------------
+# COMPACTION
+# -------------------------------------------------
+
+
+def compact_snapshots(conn=None) -> Dict[str, int]:
+    """
+    Fold raw snapshots newer than the last compaction into
+    player_snapshot_intervals. An unchanged player extends his open interval;
+    a change (or a player missing from a snapshot) closes it at that
+    snapshot_time and a change opens a new one. Incremental and idempotent:
+    the last folded snapshot_time is kept in meta.
+    """
+    conn, own_conn = _own(conn)
+    cur = conn.cursor()
+    init_snapshot_tables(cur)
+    cols = ", ".join(STATE_COLUMNS)
+
+    compacted_to = get_meta(COMPACTED_TO_KEY, conn=conn) or ""
+    times = [
+        r[0] for r in cur.execute(
+            "SELECT DISTINCT snapshot_time FROM player_gw_snapshot WHERE snapshot_time > ? ORDER BY snapshot_time",
+            (compacted_to,),
+        ).fetchall()
+    ]
+
+    open_rows: Dict[int, Tuple[str, Tuple[Any, ...]]] = {
+        r[0]: (r[1], tuple(r[2:]))
+        for r in cur.execute(
+            f"SELECT player_id, valid_from, {cols} FROM player_snapshot_intervals WHERE valid_to IS NULL"
+        ).fetchall()
+    }
+
+    opened = closed = 0
+    for t in times:
+        current = {
+            r[0]: tuple(r[1:])
+            for r in cur.execute(
+                f"SELECT player_id, {cols} FROM player_gw_snapshot WHERE snapshot_time = ?", (t,)
+            ).fetchall()
+        }
+        to_close: List[Tuple[str, int, str]] = []
+        to_open: List[Tuple[Any, ...]] = []
+        for pid, (valid_from, values) in list(open_rows.items()):
+            if current.get(pid) != values:
+                to_close.append((t, pid, valid_from))
+                del open_rows[pid]
+        for pid, values in current.items():
+            if pid not in open_rows:
+                to_open.append((pid, t) + values)
+                open_rows[pid] = (t, values)
+
+        cur.executemany(
+            "UPDATE player_snapshot_intervals SET valid_to = ? WHERE player_id = ? AND valid_from = ?",
+            to_close,
+        )
+        cur.executemany(
+            f"INSERT OR REPLACE INTO player_snapshot_intervals (player_id, valid_from, {cols}) "
+            f"VALUES (?, ?, {', '.join('?' for _ in STATE_COLUMNS)})",
+            to_open,
+        )
+        opened += len(to_open)
+        closed += len(to_close)
+
+    if times:
+        set_meta(COMPACTED_TO_KEY, times[-1], conn=conn)
+    if own_conn:
+        conn.commit()
+        conn.close()
+    return {"snapshots": len(times), "opened": opened, "closed": closed}
+
+
+def prune_snapshots(keep_days: float, conn=None) -> int:
+    """
+    Delete raw snapshots that are already compacted and older than keep_days
+    before the newest snapshot. Deadline snapshots (latest one before each
+    GW deadline) are kept. Returns the number of deleted rows.
+    """
+    conn, own_conn = _own(conn)
+    cur = conn.cursor()
+    compacted_to = get_meta(COMPACTED_TO_KEY, conn=conn)
+    newest = cur.execute("SELECT MAX(snapshot_time) FROM player_gw_snapshot").fetchone()[0]
+    deleted = 0
+    if compacted_to and newest:
+        cutoff = to_snapshot_time(datetime.fromisoformat(newest) - timedelta(days=keep_days))
+        cutoff = min(cutoff, compacted_to)
+        keep = set()
+        if _has_table(cur, "events"):
+            for (deadline,) in cur.execute("SELECT deadline_time FROM events WHERE deadline_time IS NOT NULL").fetchall():
+                row = cur.execute(
+                    "SELECT MAX(snapshot_time) FROM player_gw_snapshot WHERE snapshot_time <= ?",
+                    (to_snapshot_time(deadline),),
+                ).fetchone()
+                if row[0]:
+                    keep.add(row[0])
+        times = [
+            r[0] for r in cur.execute(
+                "SELECT DISTINCT snapshot_time FROM player_gw_snapshot WHERE snapshot_time < ?", (cutoff,)
+            ).fetchall()
+            if r[0] not in keep
+        ]
+        for t in times:
+            deleted += cur.execute("DELETE FROM player_gw_snapshot WHERE snapshot_time = ?", (t,)).rowcount
+    if own_conn:
+        conn.commit()
+        conn.close()
+    return deleted
+
+
+def _has_table(cur, name: str) -> bool:
+    return cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact / prune player_gw_snapshot.")
+    parser.add_argument("--prune-days", type=float, default=None,
+                        help="Also delete compacted raw snapshots older than this (deadline snapshots are kept)")
+    args = parser.parse_args()
+
+    stats = compact_snapshots()
+    print(f"Compacted {stats['snapshots']} snapshots: {stats['opened']} intervals opened, {stats['closed']} closed.")
+    if args.prune_days is not None:
+        print(f"Pruned {prune_snapshots(args.prune_days)} raw snapshot rows.")
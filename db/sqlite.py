@@ -16,6 +16,172 @@ def _ensure_columns(cur, table_name, columns):
             cur.execute(f"ALTER TABLE {table_name} ADD COLUMN {ddl}")
 
 
+def get_meta(key, conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    except sqlite3.OperationalError:
+        row = None  # DB created before the meta table
+    finally:
+        if own_conn:
+            conn.close()
+    return row[0] if row else None
+
+
+def set_meta(key, value, conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, value),
+    )
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+def get_data_version(conn=None):
+    """
+    Version of the data in fpl.db (snapshot time of the last update), or None.
+    Derived artefacts (columnar exports, caches) record it to detect staleness.
+    """
+    return get_meta("data_version", conn=conn)
+
+
+def set_data_version(version, conn=None):
+    set_meta("data_version", version, conn=conn)
+
+
+def init_entry_tables(cur):
+    """
+    Manager (entry) store: one row per entry, per entry GW, per pick.
+    Filled by utils/team_stats.py and utils/league_ingest.py.
+    """
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS entries (
+        entry_id             INTEGER PRIMARY KEY,
+        team_name            TEXT,
+        manager              TEXT,
+        total_points         INTEGER,
+        current_overall_rank INTEGER,
+        chips                TEXT,
+        updated_at           TEXT
+    );
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS entry_gw (
+        entry_id       INTEGER NOT NULL,
+        gw             INTEGER NOT NULL,
+        points         INTEGER,
+        overall_rank   INTEGER,
+        gw_rank        INTEGER,
+        transfers      INTEGER,
+        transfer_cost  INTEGER,
+        value          REAL,
+        bank           REAL,
+        chip           TEXT,
+        captain_id     INTEGER,
+        vice_id        INTEGER,
+        starting_total INTEGER,
+        bench_total    INTEGER,
+        PRIMARY KEY (entry_id, gw),
+        FOREIGN KEY (entry_id) REFERENCES entries(entry_id)
+    );
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS entry_picks (
+        entry_id      INTEGER NOT NULL,
+        gw            INTEGER NOT NULL,
+        slot          INTEGER NOT NULL,
+        player_id     INTEGER NOT NULL,
+        multiplier    INTEGER,
+        is_captain    INTEGER,
+        is_vice       INTEGER,
+        total_points  INTEGER,
+        goals_scored  INTEGER,
+        assists       INTEGER,
+        clean_sheets  INTEGER,
+        bonus_points  INTEGER,
+        PRIMARY KEY (entry_id, gw, slot),
+        FOREIGN KEY (entry_id) REFERENCES entries(entry_id)
+    );
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS league_entries (
+        league_id   INTEGER NOT NULL,
+        league_type TEXT NOT NULL,
+        entry_id    INTEGER NOT NULL,
+        rank        INTEGER,
+        total       INTEGER,
+        PRIMARY KEY (league_id, entry_id)
+    );
+    """)
+
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_entry_picks_player_gw ON entry_picks(player_id, gw)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_league_entries_entry ON league_entries(entry_id)")
+
+
+def init_snapshot_tables(cur):
+    """
+    Compacted player_gw_snapshot state (see db/snapshots.py): one row per
+    player and run of unchanged values, valid in [valid_from, valid_to).
+    valid_to is NULL while the interval is still current.
+    """
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS player_snapshot_intervals (
+        player_id INTEGER NOT NULL,
+        valid_from TEXT NOT NULL,
+        valid_to TEXT,
+        status TEXT,
+        chance_of_playing_next_round INTEGER,
+        chance_of_playing_this_round INTEGER,
+        now_cost REAL,
+        news TEXT,
+        news_added TEXT,
+        PRIMARY KEY (player_id, valid_from)
+    );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_player_snapshot_intervals_from ON player_snapshot_intervals(valid_from)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_player_snapshot_intervals_to ON player_snapshot_intervals(valid_to)")
+
+
+def init_team_ratings_table(cur):
+    """Team attack / defence ratings per GW (see models/team_ratings.py)."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS team_ratings (
+        gw INTEGER NOT NULL,
+        team_id INTEGER NOT NULL,
+        attack REAL,
+        defence REAL,
+        home_adv REAL,
+        intercept REAL,
+        rho REAL,
+        n_matches INTEGER,
+        PRIMARY KEY (gw, team_id)
+    );
+    """)
+
+
+def init_player_projections_table(cur):
+    """Projected points per player and upcoming GW (see models/projections.py)."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS player_projections (
+        player_id INTEGER NOT NULL,
+        gameweek INTEGER NOT NULL,
+        mean REAL,
+        std REAL,
+        fixtures INTEGER,
+        PRIMARY KEY (player_id, gameweek)
+    );
+    """)
+
+
 def init_db():
     conn = get_connection()
     cur = conn.cursor()
@@ -169,6 +335,7 @@ def init_db():
         transfers_out INTEGER,
         modified TEXT,
         kickoff_time TEXT,
+        saves INTEGER,
         FOREIGN KEY (player_id) REFERENCES players(id)
     );
     """)
@@ -311,6 +478,7 @@ def init_db():
         "value": "value INTEGER",
         "fixture": "fixture INTEGER",
         "modified": "modified TEXT",
+        "saves": "saves INTEGER",
     })
 
     cur.execute("""
@@ -320,6 +488,11 @@ def init_db():
     );
     """)
 
+    init_entry_tables(cur)
+    init_snapshot_tables(cur)
+    init_team_ratings_table(cur)
+    init_player_projections_table(cur)
+
     # Performance indexes for prediction/backtest queries.
     cur.execute("CREATE INDEX IF NOT EXISTS idx_players_team_id ON players(team_id)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_events_finished ON events(finished)")
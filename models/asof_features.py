@@ -0,0 +1,166 @@
+import sqlite3
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from config import DB_PATH
+from db.snapshots import snapshot_before_deadline, state_before_deadline
+
+# player_history columns accumulated per player and GW.
+CUM_COLUMNS = (
+    "total_points",
+    "minutes",
+    "starts",
+    "expected_goals",
+    "expected_assists",
+    "expected_goal_involvements",
+    "creativity",
+)
+
+# players columns that come from the nearest snapshot before the deadline.
+AVAILABILITY_COLUMNS = (
+    "status",
+    "chance_of_playing_next_round",
+    "chance_of_playing_this_round",
+    "now_cost",
+    "news",
+)
+
+# Used when no snapshot exists before the deadline (history predates
+# snapshotting): assume available instead of leaking today's status.
+NEUTRAL_AVAILABILITY = {
+    "status": "a",
+    "chance_of_playing_next_round": None,
+    "chance_of_playing_this_round": None,
+    "news": "",
+}
+
+
+class AsOfFeatureStore:
+    """
+    Point-in-time player features for backtests.
+
+    player_history is loaded once into dense (players x GW) cumulative-sum
+    arrays, so the season aggregates "before GW g" are one array lookup
+    per column instead of a re-aggregation. Availability comes from the
+    latest player_gw_snapshot state before the GW deadline (cached per GW).
+    """
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None):
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(DB_PATH)
+            conn.row_factory = sqlite3.Row
+        self._conn = conn
+        self._own_conn = own_conn
+
+        rows = conn.execute(
+            f"SELECT player_id, gameweek, {', '.join(CUM_COLUMNS)} FROM player_history "
+            "WHERE gameweek IS NOT NULL"
+        ).fetchall()
+        data = np.array(
+            [[np.nan if v is None else float(v) for v in r] for r in rows],
+            dtype=np.float64,
+        ).reshape(len(rows), 2 + len(CUM_COLUMNS))
+
+        ids = np.unique(data[:, 0]).astype(np.int64) if len(rows) else np.zeros(0, dtype=np.int64)
+        self._row: Dict[int, int] = {int(pid): i for i, pid in enumerate(ids)}
+        self.max_gw = int(data[:, 1].max()) if len(rows) else 0
+
+        # totals[c, p, g] = sum of column c for player p in GW g (DGWs add up);
+        # cum[c, p, g] = sum over GWs < g.
+        n_cols = len(CUM_COLUMNS) + 1  # + appearances (minutes > 0)
+        totals = np.zeros((n_cols, len(ids), self.max_gw + 1), dtype=np.float64)
+        if len(rows):
+            p_idx = np.searchsorted(ids, data[:, 0].astype(np.int64))
+            g_idx = data[:, 1].astype(np.int64)
+            values = np.nan_to_num(data[:, 2:], nan=0.0)
+            for c in range(len(CUM_COLUMNS)):
+                np.add.at(totals[c], (p_idx, g_idx), values[:, c])
+            minutes = values[:, CUM_COLUMNS.index("minutes")]
+            np.add.at(totals[-1], (p_idx, g_idx), (minutes > 0).astype(np.float64))
+        self._cum = np.concatenate(
+            [np.zeros(totals.shape[:2] + (1,)), np.cumsum(totals, axis=2)], axis=2
+        )
+        self._state_cache: Dict[int, Dict[int, Dict[str, Any]]] = {}
+
+    def close(self) -> None:
+        if self._own_conn:
+            self._conn.close()
+
+    def aggregates(self, player_id: int, gw: int) -> Dict[str, float]:
+        """Season sums over GWs < gw (all zero for unknown players)."""
+        out = {c: 0.0 for c in CUM_COLUMNS}
+        out["appearances"] = 0.0
+        row = self._row.get(int(player_id))
+        if row is None:
+            return out
+        g = min(max(int(gw), 0), self._cum.shape[2] - 1)
+        col = self._cum[:, row, g]
+        for i, c in enumerate(CUM_COLUMNS):
+            out[c] = float(col[i])
+        out["appearances"] = float(col[-1])
+        return out
+
+    def availability(self, gw: int) -> Dict[int, Dict[str, Any]]:
+        """player_id -> availability at the GW deadline (compacted state, else raw snapshot)."""
+        if gw not in self._state_cache:
+            state: Dict[int, Dict[str, Any]] = {}
+            for lookup in (state_before_deadline, snapshot_before_deadline):
+                try:
+                    state = lookup(gw, conn=self._conn)
+                except sqlite3.OperationalError:
+                    state = {}  # table not created yet (never compacted / no snapshots)
+                if state:
+                    break
+            self._state_cache[gw] = state
+        return self._state_cache[gw]
+
+    def player_row(self, player: Dict[str, Any], gw: int) -> Dict[str, Any]:
+        """
+        Copy of a players row with season aggregates and availability as they
+        were before GW gw. Static fields (team, position, name) are kept.
+        """
+        agg = self.aggregates(player["id"], gw)
+        minutes = agg["minutes"]
+        per90 = 90.0 / minutes if minutes > 0 else 0.0
+
+        row = dict(player)
+        row.update({
+            "total_points": int(agg["total_points"]),
+            "minutes": int(minutes),
+            "starts": int(agg["starts"]),
+            "expected_goals": agg["expected_goals"],
+            "expected_assists": agg["expected_assists"],
+            "expected_goal_involvements": agg["expected_goal_involvements"],
+            "creativity": agg["creativity"],
+            "points_per_game": agg["total_points"] / agg["appearances"] if agg["appearances"] else 0.0,
+            "expected_goals_per_90": agg["expected_goals"] * per90,
+            "expected_assists_per_90": agg["expected_assists"] * per90,
+            "expected_goal_involvements_per_90": agg["expected_goal_involvements"] * per90,
+        })
+
+        state = self.availability(gw).get(player["id"])
+        if state:
+            row.update({c: state.get(c) for c in AVAILABILITY_COLUMNS if c in state})
+        else:
+            row.update(NEUTRAL_AVAILABILITY)
+        return row
+
+
+_STORE: Optional[AsOfFeatureStore] = None
+
+
+def get_asof_store() -> AsOfFeatureStore:
+    """Process-wide store for fpl.db, built on first use."""
+    global _STORE
+    if _STORE is None:
+        _STORE = AsOfFeatureStore()
+    return _STORE
+
+
+def reset_asof_store() -> None:
+    global _STORE
+    if _STORE is not None:
+        _STORE.close()
+    _STORE = None
@@ -0,0 +1,184 @@
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import DB_PATH
+from models.match_sim import MATCH_HISTORY_N, POS_MAP, SUB_SHARE, slots_to_players
+
+# BPS for the events the match simulator produces (FPL rules).
+BPS_MINUTES = (3, 6)  # (1-59, 60+)
+BPS_GOAL = {"GK": 12, "DEF": 12, "MID": 18, "FWD": 24}
+BPS_ASSIST = 9
+BPS_CLEAN_SHEET = {"GK": 12, "DEF": 12}
+BPS_PER_TWO_CONCEDED = -4  # GK / DEF only
+
+# Everything else (passes, tackles, saves, cards, ...) is a per-player
+# residual per 60+ appearance, normal(mean, std), shrunk to a position prior
+# worth RESIDUAL_PRIOR_GAMES appearances.
+RESIDUAL_PRIOR = {"GK": (8.0, 6.0), "DEF": (6.0, 6.0), "MID": (6.0, 6.0), "FWD": (3.0, 6.0)}
+RESIDUAL_PRIOR_GAMES = 5.0
+
+BONUS_BY_RANK = (3, 2, 1)
+
+
+# -------------------------------------------------
+# INPUTS
+# -------------------------------------------------
+
+
+def fixture_squad_ids(
+    player_ids: Sequence[int],
+    gw: int,
+    conn: Optional[sqlite3.Connection] = None,
+) -> List[int]:
+    """
+    player_ids followed by every other player of the teams they face or play
+    with in gw who appeared in the last MATCH_HISTORY_N GWs: bonus is a rank
+    within the fixture, so everyone who can take it has to be simulated.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
+    ids = [int(p) for p in player_ids]
+    marks = ",".join("?" for _ in ids) or "NULL"
+    rows = conn.execute(
+        f"""
+        SELECT DISTINCT p.id FROM players p
+        JOIN fixtures f ON f.event = ? AND p.team_id IN (f.team_h, f.team_a)
+        WHERE EXISTS (
+            SELECT 1 FROM players q WHERE q.id IN ({marks}) AND q.team_id IN (f.team_h, f.team_a)
+        )
+        AND EXISTS (
+            SELECT 1 FROM player_history ph
+            WHERE ph.player_id = p.id AND ph.minutes > 0 AND ph.gameweek >= ? AND ph.gameweek < ?
+        )
+        ORDER BY p.id
+        """,
+        [gw] + ids + [gw - MATCH_HISTORY_N, gw],
+    ).fetchall()
+    if own_conn:
+        conn.close()
+    seen = set(ids)
+    return ids + [r[0] for r in rows if r[0] not in seen]
+
+
+def _event_bps(pos: str, minutes: float, goals: float, assists: float, clean_sheet: float, conceded: float) -> float:
+    bps = BPS_MINUTES[1] if minutes >= 60 else BPS_MINUTES[0]
+    bps += BPS_GOAL[pos] * goals + BPS_ASSIST * assists
+    if pos in BPS_CLEAN_SHEET and minutes >= 60:
+        bps += BPS_CLEAN_SHEET[pos] * clean_sheet + BPS_PER_TWO_CONCEDED * (conceded // 2)
+    return bps
+
+
+def add_bps_inputs(inputs: Dict[str, Any], conn: Optional[sqlite3.Connection] = None) -> Dict[str, Any]:
+    """
+    Add per-slot bps_mean / bps_std to load_match_inputs output: the part of
+    each 60+ appearance's player_history.bps not explained by minutes, goals,
+    assists, clean sheets and goals conceded.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
+    ids = inputs["player_ids"]
+    gw = inputs["gw"]
+    marks = ",".join("?" for _ in ids) or "NULL"
+    rows = conn.execute(
+        f"""
+        SELECT ph.player_id, p.element_type, ph.minutes, ph.goals_scored, ph.assists, ph.clean_sheets,
+               CASE WHEN ph.home THEN ph.away_score ELSE ph.home_score END, ph.bps
+        FROM player_history ph JOIN players p ON p.id = ph.player_id
+        WHERE ph.player_id IN ({marks}) AND ph.gameweek >= ? AND ph.gameweek < ?
+          AND ph.minutes >= 60 AND ph.bps IS NOT NULL
+        """,
+        ids + [gw - MATCH_HISTORY_N, gw],
+    ).fetchall()
+    if own_conn:
+        conn.close()
+
+    residuals: Dict[int, List[float]] = {}
+    for pid, et, minutes, goals, assists, cs, conceded, bps in rows:
+        pos = POS_MAP.get(et, "MID")
+        explained = _event_bps(pos, minutes, goals or 0, assists or 0, cs or 0, conceded or 0)
+        residuals.setdefault(pid, []).append(float(bps) - explained)
+
+    mean = np.zeros(len(ids), dtype=np.float64)
+    std = np.zeros(len(ids), dtype=np.float64)
+    k = RESIDUAL_PRIOR_GAMES
+    for i, pid in enumerate(ids):
+        prior_mean, prior_std = RESIDUAL_PRIOR[inputs["positions"][i]]
+        r = np.array(residuals.get(pid, []), dtype=np.float64)
+        n = len(r)
+        mean[i] = (r.sum() + k * prior_mean) / (n + k)
+        var = (((r - mean[i]) ** 2).sum() + k * prior_std ** 2) / (n + k)
+        std[i] = np.sqrt(var)
+
+    slot_player = inputs["slot_player"]
+    inputs["bps_mean"] = mean[slot_player]
+    inputs["bps_std"] = std[slot_player]
+    return inputs
+
+
+# -------------------------------------------------
+# SIMULATION
+# -------------------------------------------------
+
+
+def sample_bps(inputs: Dict[str, Any], events: Dict[str, np.ndarray], rng: np.random.Generator) -> np.ndarray:
+    """
+    (slots x sims) integer BPS from simulate_match_events output: event BPS
+    plus the normal residual (scaled to SUB_SHARE for cameos). -inf where
+    the player did not appear.
+    """
+    slot_pos = [inputs["positions"][p] for p in inputs["slot_player"]]
+    goal = np.array([BPS_GOAL[p] for p in slot_pos], dtype=np.float32)[:, None]
+    cs = np.array([BPS_CLEAN_SHEET.get(p, 0) for p in slot_pos], dtype=np.float32)[:, None]
+    gc = np.array([p in BPS_CLEAN_SHEET for p in slot_pos])[:, None]
+
+    played, sixty, conceded = events["played"], events["sixty"], events["conceded"]
+    bps = np.where(sixty, BPS_MINUTES[1], BPS_MINUTES[0]).astype(np.float32)
+    bps += goal * events["goals"] + BPS_ASSIST * events["assists"]
+    bps += cs * (sixty & (conceded == 0))
+    bps += BPS_PER_TWO_CONCEDED * ((gc & sixty) * (conceded // 2))
+
+    noise = rng.standard_normal(played.shape, dtype=np.float32)
+    noise *= inputs["bps_std"][:, None].astype(np.float32)
+    noise += inputs["bps_mean"][:, None].astype(np.float32)
+    bps += np.where(sixty, noise, SUB_SHARE * noise)
+    np.rint(bps, out=bps)
+    bps[~played] = -np.inf
+    return bps
+
+
+def assign_bonus(bps: np.ndarray, slot_fixture: np.ndarray) -> np.ndarray:
+    """
+    (slots x sims) bonus from BPS, per fixture and simulation.
+
+    The top three BPS values per column come from np.partition along the
+    player axis (the argpartition selection, without materialising
+    indices), then each player's bonus follows from where his BPS sits
+    against them. Ties follow FPL: tied players share the higher bonus and
+    the next player drops a rank (3-3-1, 3-2-2, 3-2-1-1).
+    """
+    bonus = np.zeros(bps.shape, dtype=np.int8)
+    for f in np.unique(slot_fixture):
+        rows = np.flatnonzero(slot_fixture == f)
+        block = bps[rows]
+        if len(rows) > 3:
+            top = np.partition(block, len(rows) - 3, axis=0)[-3:]
+        else:
+            top = np.vstack([np.full((3 - len(rows), block.shape[1]), -np.inf, dtype=block.dtype), block])
+        top.sort(axis=0)
+        v3, v2, v1 = top
+        finite = np.isfinite(block)
+        out = np.where(block == v1, BONUS_BY_RANK[0], 0)
+        out = np.where((block == v2) & (v2 < v1), BONUS_BY_RANK[1], out)
+        out = np.where((block == v3) & (v3 < v2), BONUS_BY_RANK[2], out)
+        bonus[rows] = np.where(finite, out, 0)
+    return bonus
+
+
+def sample_bonus(inputs: Dict[str, Any], events: Dict[str, np.ndarray], rng: np.random.Generator) -> np.ndarray:
+    """(players x sims) simulated bonus points; needs add_bps_inputs on inputs."""
+    bps = sample_bps(inputs, events, rng)
+    return slots_to_players(inputs, assign_bonus(bps, inputs["slot_fixture"]).astype(np.float32))
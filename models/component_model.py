@@ -0,0 +1,284 @@
+import sqlite3
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from config import DB_PATH
+from models.match_sim import (
+    ASSIST_POINTS,
+    AWAY_GOALS,
+    CS_POINTS,
+    GC_PENALTY_POS,
+    GOAL_POINTS,
+    HOME_GOALS,
+    MATCH_HISTORY_N,
+    SHARE_SHRINK_MIN,
+    SUB_SHARE,
+    load_match_inputs,
+    sample_fixture_goals,
+    slots_to_players,
+)
+
+# Per-90 rates estimated from player_history, with their position priors
+# (used for players with few minutes; shrinkage as in match_sim).
+RATE_COLUMNS = (
+    "expected_goals",
+    "expected_assists",
+    "yellow_cards",
+    "red_cards",
+    "saves",
+    "penalties_saved",
+    "penalties_missed",
+)
+RATE_PRIORS = {
+    "GK": {"expected_goals": 0.0, "expected_assists": 0.005, "yellow_cards": 0.04, "red_cards": 0.002,
+           "saves": 2.8, "penalties_saved": 0.02, "penalties_missed": 0.0},
+    "DEF": {"expected_goals": 0.05, "expected_assists": 0.06, "yellow_cards": 0.14, "red_cards": 0.005,
+            "saves": 0.0, "penalties_saved": 0.0, "penalties_missed": 0.0},
+    "MID": {"expected_goals": 0.13, "expected_assists": 0.12, "yellow_cards": 0.15, "red_cards": 0.004,
+            "saves": 0.0, "penalties_saved": 0.0, "penalties_missed": 0.005},
+    "FWD": {"expected_goals": 0.35, "expected_assists": 0.10, "yellow_cards": 0.12, "red_cards": 0.003,
+            "saves": 0.0, "penalties_saved": 0.0, "penalties_missed": 0.02},
+}
+
+# Defensive contribution: 2 points when a 60+ appearance reaches the
+# position's threshold (CBIT for defenders, CBIRT for midfielders / forwards).
+DC_THRESHOLD = {"DEF": 10, "MID": 12, "FWD": 12}
+DC_POINTS = 2
+DC_PRIOR = {"GK": 0.0, "DEF": 0.35, "MID": 0.15, "FWD": 0.05}
+DC_SHRINK_GAMES = 5.0
+
+SAVES_PER_POINT = 3
+PENALTY_SAVE_POINTS = 5
+PENALTY_MISS_POINTS = -2
+YELLOW_POINTS = -1
+RED_POINTS = -3
+
+AVG_GOALS = (HOME_GOALS + AWAY_GOALS) / 2.0
+
+# Poisson probability mass left out when sampling by CDF inversion.
+POISSON_TAIL = 1e-9
+
+
+# -------------------------------------------------
+# INPUTS
+# -------------------------------------------------
+
+
+def _has_column(cur, table: str, column: str) -> bool:
+    return any(r[1] == column for r in cur.execute(f"PRAGMA table_info({table})").fetchall())
+
+
+def load_component_inputs(
+    player_ids: Sequence[int],
+    gw: int,
+    conn: Optional[sqlite3.Connection] = None,
+) -> Dict[str, Any]:
+    """
+    load_match_inputs (slots, minutes, fixture goal rates, bonus) plus
+    per-slot per-90 rates for RATE_COLUMNS and P(defensive contribution
+    threshold reached in a 60+ appearance), from the last MATCH_HISTORY_N GWs.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
+    inputs = load_match_inputs(player_ids, gw, conn=conn)
+    ids = inputs["player_ids"]
+    marks = ",".join("?" for _ in ids) or "NULL"
+    cur = conn.cursor()
+
+    # Older DBs have no per-GW saves; players.saves_per_90 stands in.
+    has_saves = _has_column(cur, "player_history", "saves")
+    cols = [c if (c != "saves" or has_saves) else "NULL" for c in RATE_COLUMNS]
+    cur.execute(
+        f"""
+        SELECT player_id, SUM(minutes), {", ".join(f"SUM({c})" for c in cols)}
+        FROM player_history
+        WHERE player_id IN ({marks}) AND gameweek >= ? AND gameweek < ?
+        GROUP BY player_id
+        """,
+        ids + [gw - MATCH_HISTORY_N, gw],
+    )
+    sums = {r[0]: r[1:] for r in cur.fetchall()}
+    cur.execute(
+        f"""
+        SELECT ph.player_id, p.element_type, ph.defensive_contribution
+        FROM player_history ph JOIN players p ON p.id = ph.player_id
+        WHERE ph.player_id IN ({marks}) AND ph.gameweek >= ? AND ph.gameweek < ? AND ph.minutes >= 60
+        """,
+        ids + [gw - MATCH_HISTORY_N, gw],
+    )
+    dc_rows = cur.fetchall()
+    cur.execute(f"SELECT id, saves_per_90 FROM players WHERE id IN ({marks})", ids)
+    season_saves = {r[0]: r[1] for r in cur.fetchall()}
+    if own_conn:
+        conn.close()
+
+    dc_hits: Dict[int, list] = {}
+    for pid, et, dc in dc_rows:
+        threshold = DC_THRESHOLD.get({2: "DEF", 3: "MID", 4: "FWD"}.get(et, "GK"))
+        hit = threshold is not None and (dc or 0) >= threshold
+        dc_hits.setdefault(pid, []).append(hit)
+
+    rates = np.zeros((len(ids), len(RATE_COLUMNS)), dtype=np.float64)
+    dc_prob = np.zeros(len(ids), dtype=np.float64)
+    for i, pid in enumerate(ids):
+        pos = inputs["positions"][i]
+        row = sums.get(pid, (0,) + (None,) * len(RATE_COLUMNS))
+        minutes = float(row[0] or 0)
+        w = minutes / (minutes + SHARE_SHRINK_MIN)
+        for c, col in enumerate(RATE_COLUMNS):
+            prior = RATE_PRIORS[pos][col]
+            if col == "saves" and row[1 + c] is None and season_saves.get(pid) is not None:
+                prior, w_c = float(season_saves[pid]), 0.0
+            else:
+                w_c = w
+            raw = float(row[1 + c] or 0) / minutes * 90.0 if minutes > 0 else prior
+            rates[i, c] = w_c * raw + (1.0 - w_c) * prior
+        hits = dc_hits.get(pid, [])
+        dc_prob[i] = (sum(hits) + DC_PRIOR[pos] * DC_SHRINK_GAMES) / (len(hits) + DC_SHRINK_GAMES)
+
+    slot_player = inputs["slot_player"]
+    inputs["rates"] = rates[slot_player]
+    inputs["dc_prob"] = dc_prob[slot_player]
+    return inputs
+
+
+# -------------------------------------------------
+# SIMULATION
+# -------------------------------------------------
+
+
+def poisson_rows(lam: np.ndarray, n_sims: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    (rows x sims) Poisson counts with one rate per row, by inverting the CDF
+    against one uniform per draw. The rates here are small (cards, saves,
+    goals), so a handful of vectorized comparisons beats per-draw sampling.
+    """
+    lam = np.asarray(lam, dtype=np.float64)
+    counts = np.zeros((len(lam), n_sims), dtype=np.int16)
+    if not len(lam) or lam.max() <= 0:
+        return counts
+    u = rng.random((len(lam), n_sims))
+    pmf = np.exp(-lam)
+    cdf = pmf.copy()
+    k = 0
+    rows = np.flatnonzero(cdf < 1.0 - POISSON_TAIL)
+    while rows.size:
+        if rows.size == len(lam):
+            counts += u >= cdf[:, None]
+        else:
+            counts[rows] += u[rows] >= cdf[rows, None]
+        k += 1
+        pmf = pmf * lam / k
+        cdf = cdf + pmf
+        rows = np.flatnonzero(cdf < 1.0 - POISSON_TAIL)
+    return counts
+
+
+def _thin(counts: np.ndarray, played: np.ndarray, cameo: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Full-match counts -> counts for the time actually played (binomial thinning)."""
+    counts *= played
+    if cameo.any():
+        counts[cameo] = rng.binomial(counts[cameo], SUB_SHARE)
+    return counts
+
+
+def sample_components(
+    inputs: Dict[str, Any],
+    n_sims: int,
+    rng: np.random.Generator,
+) -> Dict[str, np.ndarray]:
+    """
+    (slots x sims) count arrays per component: minutes (nested played /
+    sixty), goals and assists ~ Poisson(rate x fixture attack factor), goals
+    conceded from one scoreline per fixture and sim (shared by a club's GK
+    and defenders, as in match_sim), cards / saves / penalties from their
+    per-90 rates, defensive contribution hits ~ Bernoulli. Cameos (under 60)
+    keep SUB_SHARE of a full match's events.
+    """
+    fixtures = inputs["fixtures"]
+    lam_h = np.array([f["lam_h"] for f in fixtures], dtype=np.float64)
+    lam_a = np.array([f["lam_a"] for f in fixtures], dtype=np.float64)
+    fx, home = inputs["slot_fixture"], inputs["slot_home"]
+    lam_for = np.where(home, lam_h[fx], lam_a[fx])
+    lam_against = np.where(home, lam_a[fx], lam_h[fx])
+    shape = (len(fx), n_sims)
+    home_goals, away_goals = sample_fixture_goals(lam_h, lam_a, n_sims, rng)
+    conceded = np.where(home[:, None], away_goals[fx], home_goals[fx])
+
+    u = rng.random(shape, dtype=np.float32)
+    played = u < inputs["p_play"][:, None]
+    sixty = u < inputs["p60"][:, None]
+    cameo = played & ~sixty
+
+    rates = inputs["rates"]
+    col = {c: i for i, c in enumerate(RATE_COLUMNS)}
+    scale = {
+        "expected_goals": lam_for / AVG_GOALS,
+        "expected_assists": lam_for / AVG_GOALS,
+        "saves": lam_against / AVG_GOALS,
+    }
+
+    def events(name: str) -> np.ndarray:
+        lam = rates[:, col[name]] * scale.get(name, 1.0)
+        return _thin(poisson_rows(lam, n_sims, rng), played, cameo, rng)
+
+    return {
+        "played": played,
+        "sixty": sixty,
+        "goals": events("expected_goals"),
+        "assists": events("expected_assists"),
+        "conceded": conceded,
+        "yellow": events("yellow_cards") > 0,
+        "red": events("red_cards") > 0,
+        "saves": events("saves"),
+        "pen_saved": events("penalties_saved"),
+        "pen_missed": events("penalties_missed"),
+        "dc": sixty & (rng.random(shape, dtype=np.float32) < inputs["dc_prob"][:, None]),
+    }
+
+
+def component_points(inputs: Dict[str, Any], comp: Dict[str, np.ndarray]) -> np.ndarray:
+    """(slots x sims) FPL points from sample_components, scored per position."""
+    slot_pos = [inputs["positions"][p] for p in inputs["slot_player"]]
+    goal_pts = np.array([GOAL_POINTS[p] for p in slot_pos], dtype=np.float32)[:, None]
+    cs_pts = np.array([CS_POINTS[p] for p in slot_pos], dtype=np.float32)[:, None]
+    gc_pen = np.array([p in GC_PENALTY_POS for p in slot_pos])[:, None]
+
+    played, sixty = comp["played"], comp["sixty"]
+    pts = played.astype(np.float32) + sixty
+    pts += goal_pts * comp["goals"]
+    pts += ASSIST_POINTS * comp["assists"]
+    pts += cs_pts * (sixty & (comp["conceded"] == 0))
+    pts -= (gc_pen & sixty) * (comp["conceded"] // 2)
+    pts += comp["saves"] // SAVES_PER_POINT
+    pts += PENALTY_SAVE_POINTS * comp["pen_saved"]
+    pts += PENALTY_MISS_POINTS * comp["pen_missed"]
+    # A red card replaces a yellow in the same match.
+    pts += np.where(comp["red"], RED_POINTS, YELLOW_POINTS * comp["yellow"])
+    pts += DC_POINTS * comp["dc"]
+    pts += (inputs["bonus"][:, None] * played).astype(np.float32)
+    return pts
+
+
+def sample_component_points(
+    player_ids: Sequence[int],
+    gw: int,
+    n_sims: int,
+    rng: Optional[np.random.Generator] = None,
+    inputs: Optional[Dict[str, Any]] = None,
+    return_played: bool = False,
+):
+    """
+    (players x sims) points for player_ids in gw from the component model.
+    DGW players sum their fixtures; blank players score 0. With
+    return_played, also a (players x sims) bool "appeared in any fixture".
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    inputs = inputs if inputs is not None else load_component_inputs(player_ids, gw)
+    comp = sample_components(inputs, n_sims, rng)
+    points = slots_to_players(inputs, component_points(inputs, comp))
+    if not return_played:
+        return points
+    return points, slots_to_players(inputs, comp["played"].astype(np.float32)) > 0
@@ -0,0 +1,305 @@
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from db.sqlite import get_connection, get_data_version
+from models.match_sim import POS_MAP
+from models.sampling import DEFAULT_POS_CORR, POS_CORR_WEIGHT, POSITIONS
+
+# Appearances (minutes > 0) in the last COV_HISTORY_N GWs feed the estimate;
+# players with fewer than COV_MIN_APPEARANCES contribute nothing.
+COV_HISTORY_N = 38
+COV_MIN_APPEARANCES = 4
+
+# Pooled class correlations (teammate / opponent / elsewhere, per position
+# pair) are shrunk to the old position-factor model with this many products,
+# and pair correlations to their class with COV_SHRINK_APPEARANCES joint games.
+CLASS_PRIOR_WEIGHT = 200.0
+COV_SHRINK_APPEARANCES = 20.0
+MAX_CORR = 0.9
+
+# Up to this many players the factor is a full Cholesky; above it, the top
+# COV_RANK eigenvectors plus an idiosyncratic diagonal.
+COV_FULL_RANK_MAX = 300
+COV_RANK = 64
+MIN_EIGEN = 1e-6
+
+TEAMMATE, OPPONENT, ELSEWHERE = 0, 1, 2
+
+
+@dataclass
+class PlayerCovariance:
+    """
+    Standardised points-residual co-movement before GW gw.
+
+    team_sum / team_n: sum of z_i * z_j and joint appearances as teammates
+    (same fixture, same side); opp_sum / opp_n the same as opponents.
+    class_corr: (3 x 4 x 4) pooled correlation per relation and position pair.
+    """
+
+    gw: int
+    index: Dict[int, int]
+    team_sum: np.ndarray
+    team_n: np.ndarray
+    opp_sum: np.ndarray
+    opp_n: np.ndarray
+    class_corr: np.ndarray
+    n_appearances: int = 0
+
+
+# -------------------------------------------------
+# ESTIMATION
+# -------------------------------------------------
+
+
+def _default_class_corr() -> np.ndarray:
+    """Old position-factor model: corr = w_a * w_b for the same position, else 0."""
+    w = np.array([POS_CORR_WEIGHT.get(p, DEFAULT_POS_CORR) for p in POSITIONS])
+    return np.broadcast_to(np.diag(w * w), (3, len(POSITIONS), len(POSITIONS))).copy()
+
+
+def load_residuals(gw: int, conn=None) -> Tuple[List[int], List[int], List[Tuple]]:
+    """
+    (player_ids, position rows, appearances) before gw. Appearances are
+    (player, gameweek, fixture, home, z) with z = points standardised by
+    the player's own mean and std over the window.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    rows = conn.execute(
+        """
+        SELECT ph.player_id, p.element_type, ph.gameweek, ph.fixture, ph.home, ph.total_points
+        FROM player_history ph JOIN players p ON p.id = ph.player_id
+        WHERE ph.gameweek >= ? AND ph.gameweek < ? AND ph.minutes > 0 AND ph.fixture IS NOT NULL
+        ORDER BY ph.player_id
+        """,
+        (gw - COV_HISTORY_N, gw),
+    ).fetchall()
+    if own_conn:
+        conn.close()
+
+    by_player: Dict[int, List[Tuple]] = {}
+    pos_of: Dict[int, int] = {}
+    for pid, et, g, fixture, home, pts in rows:
+        by_player.setdefault(pid, []).append((g, fixture, bool(home), float(pts or 0)))
+        pos_of[pid] = POSITIONS.index(POS_MAP.get(et, "MID"))
+
+    ids: List[int] = []
+    appearances: List[Tuple] = []
+    for pid, apps in by_player.items():
+        pts = np.array([a[3] for a in apps])
+        std = pts.std()
+        if len(apps) < COV_MIN_APPEARANCES or std <= 0:
+            continue
+        ids.append(pid)
+        for (g, fixture, home, _), z in zip(apps, (pts - pts.mean()) / std):
+            appearances.append((pid, g, fixture, home, float(z)))
+    return ids, [pos_of[pid] for pid in ids], appearances
+
+
+def estimate_covariance(gw: int, conn=None) -> PlayerCovariance:
+    """
+    Pairwise and pooled residual correlations from player_history before gw,
+    as a handful of (players x fixtures) matmuls.
+    """
+    ids, pos_rows, appearances = load_residuals(gw, conn=conn)
+    index = {pid: i for i, pid in enumerate(ids)}
+    n = len(ids)
+    fixtures = sorted({a[2] for a in appearances})
+    gws = sorted({a[1] for a in appearances})
+    f_index = {f: i for i, f in enumerate(fixtures)}
+    g_index = {g: i for i, g in enumerate(gws)}
+
+    z_home = np.zeros((n, len(fixtures)))
+    z_away = np.zeros((n, len(fixtures)))
+    z_gw = np.zeros((n, len(gws)))
+    m_home = np.zeros((n, len(fixtures)))
+    m_away = np.zeros((n, len(fixtures)))
+    m_gw = np.zeros((n, len(gws)))
+    for pid, g, fixture, home, z in appearances:
+        i, f = index[pid], f_index[fixture]
+        if home:
+            z_home[i, f], m_home[i, f] = z, 1.0
+        else:
+            z_away[i, f], m_away[i, f] = z, 1.0
+        z_gw[i, g_index[g]] += z
+        m_gw[i, g_index[g]] = 1.0
+
+    team_sum = z_home @ z_home.T + z_away @ z_away.T
+    team_n = m_home @ m_home.T + m_away @ m_away.T
+    opp_sum = z_home @ z_away.T + z_away @ z_home.T
+    opp_n = m_home @ m_away.T + m_away @ m_home.T
+    # Same GW, different fixture: everything in the GW minus the fixture itself.
+    else_sum = z_gw @ z_gw.T - team_sum - opp_sum
+    else_n = np.maximum(m_gw @ m_gw.T - team_n - opp_n, 0.0)
+    for mat in (team_sum, team_n, else_sum, else_n):
+        np.fill_diagonal(mat, 0.0)
+
+    onehot = np.zeros((n, len(POSITIONS)))
+    onehot[np.arange(n), pos_rows] = 1.0
+    default = _default_class_corr()
+    class_corr = np.empty_like(default)
+    for c, (s, m) in enumerate(((team_sum, team_n), (opp_sum, opp_n), (else_sum, else_n))):
+        pooled_sum = onehot.T @ s @ onehot
+        pooled_n = onehot.T @ m @ onehot
+        class_corr[c] = (pooled_sum + CLASS_PRIOR_WEIGHT * default[c]) / (pooled_n + CLASS_PRIOR_WEIGHT)
+
+    return PlayerCovariance(
+        gw=gw,
+        index=index,
+        team_sum=team_sum,
+        team_n=team_n,
+        opp_sum=opp_sum,
+        opp_n=opp_n,
+        class_corr=np.clip(class_corr, -MAX_CORR, MAX_CORR),
+        n_appearances=len(appearances),
+    )
+
+
+_COV_CACHE: Dict[Tuple[Optional[str], int], PlayerCovariance] = {}
+
+
+def cached_covariance(gw: int, conn=None) -> PlayerCovariance:
+    """estimate_covariance, cached per (data_version, gw)."""
+    key = (get_data_version(conn=conn), gw)
+    if key not in _COV_CACHE:
+        _COV_CACHE[key] = estimate_covariance(gw, conn=conn)
+    return _COV_CACHE[key]
+
+
+def reset_covariance_cache() -> None:
+    _COV_CACHE.clear()
+
+
+# -------------------------------------------------
+# CORRELATION AND FACTOR FOR A PLAYER SET
+# -------------------------------------------------
+
+
+def player_relations(player_ids: Sequence[int], gw: int, conn=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (position rows, relation matrix) for player_ids in gw: TEAMMATE for the
+    same club, OPPONENT when the clubs meet in gw, ELSEWHERE otherwise.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    ids = [int(p) for p in player_ids]
+    marks = ",".join("?" for _ in ids) or "NULL"
+    info = {r[0]: (r[1], r[2]) for r in conn.execute(
+        f"SELECT id, team_id, element_type FROM players WHERE id IN ({marks})", ids
+    ).fetchall()}
+    meetings = conn.execute("SELECT team_h, team_a FROM fixtures WHERE event = ?", (gw,)).fetchall()
+    if own_conn:
+        conn.close()
+
+    teams = np.array([info.get(pid, (None, None))[0] or -1 for pid in ids], dtype=np.int64)
+    pos_rows = np.array(
+        [POSITIONS.index(POS_MAP.get(info.get(pid, (None, None))[1], "MID")) for pid in ids], dtype=np.int64
+    )
+
+    relation = np.full((len(ids), len(ids)), ELSEWHERE, dtype=np.int64)
+    for h, a in meetings:
+        relation[np.ix_(teams == h, teams == a)] = OPPONENT
+        relation[np.ix_(teams == a, teams == h)] = OPPONENT
+    same = (teams[:, None] == teams[None, :]) & (teams[:, None] >= 0)
+    relation[same] = TEAMMATE
+    return pos_rows, relation
+
+
+def correlation_matrix(
+    player_ids: Sequence[int],
+    gw: int,
+    cov: Optional[PlayerCovariance] = None,
+    conn=None,
+) -> np.ndarray:
+    """
+    Positive definite points correlation for player_ids in gw: each pair's
+    class correlation (relation x position pair), moved toward the pair's
+    own history as teammates / opponents by its joint appearances.
+    """
+    if cov is None:
+        cov = cached_covariance(gw, conn=conn)
+    pos_rows, relation = player_relations(player_ids, gw, conn=conn)
+    corr = cov.class_corr[relation, pos_rows[:, None], pos_rows[None, :]]
+
+    rows = np.array([cov.index.get(int(p), -1) for p in player_ids], dtype=np.int64)
+    known = np.flatnonzero(rows >= 0)
+    if len(known):
+        sub = np.ix_(known, known)
+        cols = np.ix_(rows[known], rows[known])
+        for rel, s, m in ((TEAMMATE, cov.team_sum, cov.team_n), (OPPONENT, cov.opp_sum, cov.opp_n)):
+            mask = relation[sub] == rel
+            block = corr[sub]
+            k = COV_SHRINK_APPEARANCES
+            shrunk = (s[cols] + k * block) / (m[cols] + k)
+            corr[sub] = np.where(mask, shrunk, block)
+
+    corr = np.clip(corr, -MAX_CORR, MAX_CORR)
+    np.fill_diagonal(corr, 1.0)
+    return nearest_correlation(corr)
+
+
+def nearest_correlation(corr: np.ndarray) -> np.ndarray:
+    """Clip eigenvalues at MIN_EIGEN and rescale back to a unit diagonal."""
+    if len(corr) == 0:
+        return corr
+    vals, vecs = np.linalg.eigh((corr + corr.T) / 2)
+    if vals[0] >= MIN_EIGEN:
+        return corr
+    fixed = (vecs * np.maximum(vals, MIN_EIGEN)) @ vecs.T
+    d = np.sqrt(np.diag(fixed))
+    return fixed / d[:, None] / d[None, :]
+
+
+def correlation_factor(
+    corr: np.ndarray,
+    rank: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (loadings, idio) with corr ~= loadings @ loadings.T + diag(idio ** 2).
+    Full Cholesky (idio = 0) up to COV_FULL_RANK_MAX players, otherwise the
+    top `rank` (default COV_RANK) eigenvectors.
+    """
+    n = len(corr)
+    if rank is None:
+        rank = n if n <= COV_FULL_RANK_MAX else COV_RANK
+    if rank >= n:
+        return np.linalg.cholesky(corr + MIN_EIGEN * np.eye(n)), np.zeros(n)
+    vals, vecs = np.linalg.eigh(corr)
+    top = np.argsort(vals)[::-1][:rank]
+    loadings = vecs[:, top] * np.sqrt(np.maximum(vals[top], 0.0))
+    idio = np.sqrt(np.maximum(1.0 - (loadings * loadings).sum(axis=1), 0.0))
+    return loadings, idio
+
+
+def player_factor(player_ids: Sequence[int], gw: int, conn=None) -> Tuple[np.ndarray, np.ndarray]:
+    """correlation_factor(correlation_matrix(player_ids, gw)), for sample_player_matrix(factor=...)."""
+    return correlation_factor(correlation_matrix(player_ids, gw, conn=conn))
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pooled player points correlations before a GW.")
+    parser.add_argument("--gw", type=int, required=True)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    cov = estimate_covariance(args.gw)
+    print(f"{len(cov.index)} players, {cov.n_appearances} appearances in {time.perf_counter() - started:.2f}s")
+    for c, name in ((TEAMMATE, "teammate"), (OPPONENT, "opponent"), (ELSEWHERE, "elsewhere")):
+        print(f"\n{name:>9}  " + "  ".join(f"{p:>6}" for p in POSITIONS))
+        for a, pos in enumerate(POSITIONS):
+            print(f"{pos:>9}  " + "  ".join(f"{cov.class_corr[c, a, b]:+.3f}" for b in range(len(POSITIONS))))
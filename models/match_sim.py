@@ -0,0 +1,421 @@
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import DB_PATH
+from models.team_ratings import load_ratings
+
+POS_MAP = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
+
+# League-average goals per match for the home / away side.
+HOME_GOALS = 1.55
+AWAY_GOALS = 1.25
+# Elasticity of expected goals to FPL team strength ratios (attack vs defence).
+STRENGTH_EXP = 3.0
+# Fallback when strengths are missing: goals scale by exp(slope * (3 - difficulty)).
+FDR_SLOPE = 0.18
+# Fitted team_ratings are used once they rest on this many results.
+MIN_RATING_MATCHES = 30
+
+# Share of goals that have an assist credited.
+ASSIST_RATE = 0.75
+# Goal / assist share of a player who plays less than 60 minutes, relative to 60+.
+SUB_SHARE = 0.3
+# Max share of his team's goals / assists a single player can take.
+MAX_SHARE = 0.6
+
+MATCH_HISTORY_N = 10
+SHARE_SHRINK_MIN = 450.0
+GOAL_SHARE_PRIOR = {"GK": 0.0, "DEF": 0.03, "MID": 0.08, "FWD": 0.16}
+ASSIST_SHARE_PRIOR = {"GK": 0.01, "DEF": 0.05, "MID": 0.10, "FWD": 0.08}
+DEFAULT_PLAY = (0.75, 0.65)  # (P(plays), P(60+ min)) without history
+
+# Simulations per block; fixtures x all their players can be a few hundred slots.
+MATCH_CHUNK = 20000
+
+UNAVAILABLE = ("i", "s", "u", "n")
+
+# FPL scoring (per position) for the events simulated here.
+GOAL_POINTS = {"GK": 10, "DEF": 6, "MID": 5, "FWD": 4}
+CS_POINTS = {"GK": 4, "DEF": 4, "MID": 1, "FWD": 0}
+ASSIST_POINTS = 3
+GC_PENALTY_POS = ("GK", "DEF")  # -1 per 2 goals conceded
+
+
+# -------------------------------------------------
+# INPUTS
+# -------------------------------------------------
+
+
+def _team_strengths(cur) -> Dict[int, Dict[str, float]]:
+    cur.execute(
+        "SELECT id, strength_attack_home, strength_attack_away, strength_defence_home, strength_defence_away FROM teams"
+    )
+    return {
+        r[0]: {"att_h": r[1], "att_a": r[2], "def_h": r[3], "def_a": r[4]}
+        for r in cur.fetchall()
+    }
+
+
+def fixture_goal_rates(gw: int, conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
+    """
+    Fixtures of gw with expected goals per side, from the first source
+    available: fitted team_ratings (models/team_ratings.py), FPL attack /
+    defence strengths (home and away), the FPL difficulty integers.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT id, team_h, team_a, difficulty_home, difficulty_away FROM fixtures WHERE event = ? ORDER BY id",
+        (gw,),
+    )
+    fixtures = cur.fetchall()
+    strengths = _team_strengths(cur)
+    ratings = load_ratings(gw, conn=conn)
+    if own_conn:
+        conn.close()
+    if ratings is not None and ratings.n_matches < MIN_RATING_MATCHES:
+        ratings = None
+
+    att = [v for s in strengths.values() for v in (s["att_h"], s["att_a"]) if v]
+    dfn = [v for s in strengths.values() for v in (s["def_h"], s["def_a"]) if v]
+    avg_att = float(np.mean(att)) if att else None
+    avg_def = float(np.mean(dfn)) if dfn else None
+
+    out = []
+    for fid, th, ta, d_h, d_a in fixtures:
+        sh, sa = strengths.get(th, {}), strengths.get(ta, {})
+        if ratings is not None:
+            lam_h, lam_a = ratings.expected_goals(th, ta)
+        elif avg_att and avg_def and all((sh.get("att_h"), sh.get("def_h"), sa.get("att_a"), sa.get("def_a"))):
+            lam_h = HOME_GOALS * (sh["att_h"] / avg_att * avg_def / sa["def_a"]) ** STRENGTH_EXP
+            lam_a = AWAY_GOALS * (sa["att_a"] / avg_att * avg_def / sh["def_h"]) ** STRENGTH_EXP
+        else:
+            lam_h = HOME_GOALS * float(np.exp(FDR_SLOPE * (3 - (d_h or 3))))
+            lam_a = AWAY_GOALS * float(np.exp(FDR_SLOPE * (3 - (d_a or 3))))
+        out.append({"fixture_id": fid, "team_h": th, "team_a": ta, "lam_h": lam_h, "lam_a": lam_a})
+    return out
+
+
+def _shrunk_share(value: float, minutes: float, team_per_game: float, prior: float) -> float:
+    if minutes <= 0 or team_per_game <= 0:
+        return prior
+    raw = (value / minutes * 90.0) / team_per_game
+    w = minutes / (minutes + SHARE_SHRINK_MIN)
+    return float(min(MAX_SHARE, max(0.0, w * raw + (1.0 - w) * prior)))
+
+
+def load_match_inputs(
+    player_ids: Sequence[int],
+    gw: int,
+    conn: Optional[sqlite3.Connection] = None,
+) -> Dict[str, Any]:
+    """
+    Everything simulate_match_events needs for player_ids in gw.
+
+    Per player (from the last MATCH_HISTORY_N GWs of player_history):
+      goal / assist share of his team's goals when he plays 60+ (xG / xA
+      per 90 over team xG / xA per game, shrunk to a position prior),
+      P(plays) and P(60+) from appearances (0 if injured / suspended,
+      scaled by chance_of_playing_next_round), bonus per appearance.
+    Every (player, fixture) pair is one slot; DGW players get two, blanks none.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    fixtures = fixture_goal_rates(gw, conn=conn)
+    ids = [int(p) for p in player_ids]
+    marks = ",".join("?" for _ in ids) or "NULL"
+    gw_from = gw - MATCH_HISTORY_N
+
+    cur.execute(
+        f"SELECT id, team_id, element_type, status, chance_of_playing_next_round FROM players WHERE id IN ({marks})",
+        ids,
+    )
+    players = {r[0]: r for r in cur.fetchall()}
+
+    cur.execute(
+        f"""
+        SELECT player_id,
+               SUM(minutes), SUM(CASE WHEN minutes > 0 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN minutes >= 60 THEN 1 ELSE 0 END),
+               SUM(expected_goals), SUM(expected_assists), SUM(bonus_points)
+        FROM player_history
+        WHERE player_id IN ({marks}) AND gameweek >= ? AND gameweek < ?
+        GROUP BY player_id
+        """,
+        ids + [gw_from, gw],
+    )
+    hist = {r[0]: r[1:] for r in cur.fetchall()}
+
+    cur.execute(
+        """
+        SELECT p.team_id, SUM(ph.expected_goals), SUM(ph.expected_assists)
+        FROM player_history ph JOIN players p ON p.id = ph.player_id
+        WHERE ph.gameweek >= ? AND ph.gameweek < ?
+        GROUP BY p.team_id
+        """,
+        (gw_from, gw),
+    )
+    team_x = {r[0]: (r[1] or 0.0, r[2] or 0.0) for r in cur.fetchall()}
+    cur.execute(
+        """
+        SELECT team, COUNT(*) FROM (
+            SELECT team_h AS team FROM fixtures WHERE finished = 1 AND event >= ? AND event < ?
+            UNION ALL
+            SELECT team_a AS team FROM fixtures WHERE finished = 1 AND event >= ? AND event < ?
+        ) GROUP BY team
+        """,
+        (gw_from, gw, gw_from, gw),
+    )
+    team_games = {r[0]: r[1] for r in cur.fetchall()}
+    if own_conn:
+        conn.close()
+
+    positions: List[str] = []
+    slot_player: List[int] = []
+    slot_fixture: List[int] = []
+    slot_home: List[bool] = []
+    specs: Dict[str, List[float]] = {k: [] for k in ("goal_share", "assist_share", "p_play", "p60", "bonus")}
+
+    for i, pid in enumerate(ids):
+        row = players.get(pid)
+        pos = POS_MAP.get(row[2], "MID") if row else "MID"
+        positions.append(pos)
+        if row is None:
+            continue
+        team_id, status, chance = row[1], row[3], row[4]
+        minutes, apps, n60, xg, xa, bonus = [float(v or 0) for v in hist.get(pid, (0,) * 6)]
+        games = float(team_games.get(team_id, 0))
+        txg, txa = team_x.get(team_id, (0.0, 0.0))
+
+        if games > 0:
+            p_play, p60 = min(1.0, apps / games), min(1.0, n60 / games)
+        else:
+            p_play, p60 = DEFAULT_PLAY
+        if status in UNAVAILABLE:
+            p_play = p60 = 0.0
+        elif chance is not None:
+            p_play *= float(chance) / 100.0
+            p60 *= float(chance) / 100.0
+
+        goal_share = _shrunk_share(xg, minutes, txg / games if games else 0.0, GOAL_SHARE_PRIOR[pos])
+        assist_share = _shrunk_share(xa, minutes, txa / games if games else 0.0, ASSIST_SHARE_PRIOR[pos])
+        bonus_per_app = bonus / apps if apps else 0.0
+
+        for f_idx, fx in enumerate(fixtures):
+            if team_id not in (fx["team_h"], fx["team_a"]):
+                continue
+            slot_player.append(i)
+            slot_fixture.append(f_idx)
+            slot_home.append(team_id == fx["team_h"])
+            specs["goal_share"].append(goal_share)
+            specs["assist_share"].append(assist_share)
+            specs["p_play"].append(p_play)
+            specs["p60"].append(min(p60, p_play))
+            specs["bonus"].append(bonus_per_app)
+
+    return {
+        "gw": gw,
+        "player_ids": ids,
+        "positions": positions,
+        "fixtures": fixtures,
+        "slot_player": np.array(slot_player, dtype=np.int64),
+        "slot_fixture": np.array(slot_fixture, dtype=np.int64),
+        "slot_home": np.array(slot_home, dtype=bool),
+        **{k: np.array(v, dtype=np.float64) for k, v in specs.items()},
+    }
+
+
+# -------------------------------------------------
+# SIMULATION
+# -------------------------------------------------
+
+
+def sample_fixture_goals(
+    lam_home: np.ndarray,
+    lam_away: np.ndarray,
+    n_sims: int,
+    rng: np.random.Generator,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(fixtures x sims) Poisson goals for the home and away side."""
+    lam_home = np.asarray(lam_home, dtype=np.float64)[:, None]
+    lam_away = np.asarray(lam_away, dtype=np.float64)[:, None]
+    home = rng.poisson(lam_home, size=(lam_home.shape[0], n_sims)).astype(np.int16)
+    away = rng.poisson(lam_away, size=(lam_away.shape[0], n_sims)).astype(np.int16)
+    return home, away
+
+
+def _allocate(
+    team_events: np.ndarray,
+    weights: np.ndarray,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Split one side's events (sims,) among its tracked players: weights
+    (players x sims) is each player's share in that sim, 0 off the pitch.
+    Only a sim whose weights exceed 0.98 is scaled down; the rest goes to
+    untracked team-mates. One multinomial per sim, drawn as a chain of
+    conditional binomials. Returns (players x sims).
+    """
+    weights = np.clip(weights, 0.0, None)
+    total = weights.sum(axis=0)
+    weights = weights * np.minimum(1.0, 0.98 / np.maximum(total, 0.98))
+    out = np.zeros(weights.shape, dtype=np.int16)
+    remaining = np.asarray(team_events, dtype=np.int64)
+    left = np.ones(weights.shape[1], dtype=np.float64)
+    for k in range(weights.shape[0]):
+        draw = rng.binomial(remaining, np.clip(weights[k] / left, 0.0, 1.0))
+        out[k] = draw
+        remaining = remaining - draw
+        left -= weights[k]
+    return out
+
+
+def simulate_match_events(
+    inputs: Dict[str, Any],
+    n_sims: int,
+    rng: np.random.Generator,
+) -> Dict[str, np.ndarray]:
+    """
+    One draw of every fixture, shared by all slots in it.
+
+    Returns (slots x sims) arrays: played, sixty (bool), goals, assists,
+    conceded (goals of the other side), plus fixture-level home / away goals.
+    """
+    fixtures = inputs["fixtures"]
+    n_slots = len(inputs["slot_player"])
+    lam_h = np.array([f["lam_h"] for f in fixtures], dtype=np.float64)
+    lam_a = np.array([f["lam_a"] for f in fixtures], dtype=np.float64)
+    home_goals, away_goals = sample_fixture_goals(lam_h, lam_a, n_sims, rng)
+
+    fx = inputs["slot_fixture"]
+    is_home = inputs["slot_home"]
+    scored = np.where(is_home[:, None], home_goals[fx], away_goals[fx])
+    conceded = np.where(is_home[:, None], away_goals[fx], home_goals[fx])
+
+    # Nested minutes: one uniform per slot and sim, 60+ is a subset of played.
+    u = rng.random((n_slots, n_sims), dtype=np.float32)
+    played = u < inputs["p_play"][:, None]
+    sixty = u < inputs["p60"][:, None]
+
+    # Shares are per 60+ appearance: cameos take SUB_SHARE of theirs,
+    # absentees none, so a squad is only scaled down in the sims where the
+    # players on the pitch claim more than the team's events.
+    on_pitch = np.where(sixty, 1.0, np.where(played, SUB_SHARE, 0.0))
+
+    goals = np.zeros((n_slots, n_sims), dtype=np.int16)
+    assists = np.zeros((n_slots, n_sims), dtype=np.int16)
+    for f_idx in range(len(fixtures)):
+        for home in (True, False):
+            rows = np.flatnonzero((fx == f_idx) & (is_home == home))
+            if rows.size == 0:
+                continue
+            team_goals = home_goals[f_idx] if home else away_goals[f_idx]
+            goals[rows] = _allocate(team_goals, inputs["goal_share"][rows, None] * on_pitch[rows], rng)
+            assisted = rng.binomial(team_goals, ASSIST_RATE)
+            assists[rows] = _allocate(assisted, inputs["assist_share"][rows, None] * on_pitch[rows], rng)
+
+    return {
+        "played": played,
+        "sixty": sixty,
+        "goals": goals,
+        "assists": assists,
+        "scored": scored,
+        "conceded": conceded,
+        "home_goals": home_goals,
+        "away_goals": away_goals,
+    }
+
+
+def event_points(
+    inputs: Dict[str, Any],
+    events: Dict[str, np.ndarray],
+    mean_bonus: bool = True,
+) -> np.ndarray:
+    """
+    (slots x sims) FPL points from appearance, goals, assists, clean sheets,
+    goals conceded, plus (mean_bonus) the player's mean bonus per appearance.
+    """
+    slot_pos = [inputs["positions"][p] for p in inputs["slot_player"]]
+    goal_pts = np.array([GOAL_POINTS[p] for p in slot_pos], dtype=np.float32)[:, None]
+    cs_pts = np.array([CS_POINTS[p] for p in slot_pos], dtype=np.float32)[:, None]
+    gc_pen = np.array([p in GC_PENALTY_POS for p in slot_pos])[:, None]
+
+    played, sixty = events["played"], events["sixty"]
+    conceded = events["conceded"]
+    pts = played.astype(np.float32) + sixty.astype(np.float32)
+    pts += goal_pts * events["goals"]
+    pts += ASSIST_POINTS * events["assists"]
+    pts += cs_pts * (sixty & (conceded == 0))
+    pts -= (gc_pen & sixty) * (conceded // 2)
+    if mean_bonus:
+        pts += (inputs["bonus"][:, None] * played).astype(np.float32)
+    return pts
+
+
+def slots_to_players(inputs: Dict[str, Any], slot_values: np.ndarray) -> np.ndarray:
+    """Sum (slots x sims) into (players x sims); blank players stay 0, DGWs add up."""
+    out = np.zeros((len(inputs["player_ids"]), slot_values.shape[1]), dtype=np.float32)
+    slot_player = inputs["slot_player"]
+    if len(np.unique(slot_player)) == len(slot_player):
+        out[slot_player] = slot_values
+    else:
+        np.add.at(out, slot_player, slot_values)
+    return out
+
+
+def sample_match_points(
+    player_ids: Sequence[int],
+    gw: int,
+    n_sims: int,
+    rng: Optional[np.random.Generator] = None,
+    inputs: Optional[Dict[str, Any]] = None,
+    return_played: bool = False,
+    bonus: str = "mean",
+):
+    """
+    (players x sims) points for player_ids in gw from one shared draw of
+    every fixture: team-mates share goals, defenders share clean sheets.
+    With return_played, also a (players x sims) bool "appeared in any fixture".
+
+    bonus: "mean" adds each player's average bonus per appearance; "bps"
+    simulates BPS for everyone in the fixtures (models.bonus_model) and
+    awards 3/2/1 by rank. Simulations run in blocks of MATCH_CHUNK.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    if bonus not in ("mean", "bps"):
+        raise ValueError(f"Unknown bonus mode: {bonus}")
+    n_players = len(player_ids)
+    if inputs is None:
+        if bonus == "bps":
+            from models.bonus_model import add_bps_inputs, fixture_squad_ids
+
+            inputs = add_bps_inputs(load_match_inputs(fixture_squad_ids(player_ids, gw), gw))
+        else:
+            inputs = load_match_inputs(player_ids, gw)
+    if not n_players:
+        n_players = len(inputs["player_ids"])
+
+    points_blocks, played_blocks = [], []
+    for start in range(0, n_sims, MATCH_CHUNK):
+        size = min(MATCH_CHUNK, n_sims - start)
+        events = simulate_match_events(inputs, size, rng)
+        points = slots_to_players(inputs, event_points(inputs, events, mean_bonus=bonus == "mean"))
+        if bonus == "bps":
+            from models.bonus_model import sample_bonus
+
+            points += sample_bonus(inputs, events, rng)
+        points_blocks.append(points[:n_players])
+        if return_played:
+            played_blocks.append(slots_to_players(inputs, events["played"].astype(np.float32))[:n_players] > 0)
+
+    points = np.concatenate(points_blocks, axis=1) if points_blocks else np.zeros((n_players, 0), dtype=np.float32)
+    if not return_played:
+        return points
+    played = np.concatenate(played_blocks, axis=1) if played_blocks else np.zeros((n_players, 0), dtype=bool)
+    return points, played
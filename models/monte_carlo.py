@@ -1,5 +1,18 @@
+import time
+from functools import partial
+
 import numpy as np
 from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from config import MC_MAX_SIMS, MC_TIME_BUDGET, MC_TOLERANCE
+
+# Adaptive runs start with (and never add fewer than) MC_BATCH sims.
+MC_BATCH = 500
+ADAPTIVE_QUANTILES = (0.25, 0.5, 0.75, 0.9)
+# Half-width (in probability) of the band used to estimate the density at a quantile.
+QUANTILE_BAND = 0.05
+
 
 @dataclass
 class PredictionDistribution:
@@ -9,22 +22,137 @@ class PredictionDistribution:
     p25: float
     p75: float
     p90: float
+    n_sims: int = 0
+    se: Optional[Dict[str, float]] = None
+    converged: Optional[bool] = None
+
+    @classmethod
+    def from_samples(
+        cls,
+        samples: np.ndarray,
+        precision: Optional[Dict] = None,
+    ) -> "PredictionDistribution":
+        """Summary statistics of samples; precision is run_adaptive's report."""
+        precision = precision or {}
+        return cls(
+            samples=samples,
+            expected=float(np.mean(samples)),
+            median=float(np.percentile(samples, 50)),
+            p25=float(np.percentile(samples, 25)),
+            p75=float(np.percentile(samples, 75)),
+            p90=float(np.percentile(samples, 90)),
+            n_sims=len(samples),
+            se=precision.get("se"),
+            converged=precision.get("converged"),
+        )
 
     def summary(self) -> dict:
-        return {
+        out = {
             "expected": self.expected,
             "median": self.median,
             "p25": self.p25,
             "p75": self.p75,
             "p90": self.p90,
         }
+        if self.se is not None:
+            out.update(n_sims=self.n_sims, se=self.se, converged=self.converged)
+        return out
+
+
+# -------------------------------------------------
+# ADAPTIVE SIMULATION
+# -------------------------------------------------
+
+
+def _quantile_key(q: float) -> str:
+    return "median" if q == 0.5 else f"p{int(round(q * 100))}"
+
+
+def standard_errors(samples: np.ndarray, quantiles: Sequence[float] = ADAPTIVE_QUANTILES) -> Dict[str, float]:
+    """
+    Standard errors of the mean and of each quantile (the worst row for 2-D
+    samples). A quantile's SE is sqrt(q(1-q)/n) / density, with the density
+    taken from the spread of the quantiles QUANTILE_BAND either side; a
+    quantile sitting on a point mass (whole FPL points) gets 0.
+    """
+    samples = np.atleast_2d(samples)
+    n = samples.shape[1]
+    se = {"expected": float(samples.std(axis=1, ddof=1).max() / np.sqrt(n))}
+    for q in quantiles:
+        lo, hi = max(q - QUANTILE_BAND, 0.0), min(q + QUANTILE_BAND, 1.0)
+        q_lo, q_hi = np.quantile(samples, [lo, hi], axis=1)
+        se[_quantile_key(q)] = float(((q_hi - q_lo) / (hi - lo)).max() * np.sqrt(q * (1 - q) / n))
+    return se
+
+
+def run_adaptive(
+    draw: Callable[[int], np.ndarray],
+    tol: float = MC_TOLERANCE,
+    quantiles: Sequence[float] = ADAPTIVE_QUANTILES,
+    max_sims: int = MC_MAX_SIMS,
+    time_budget: float = MC_TIME_BUDGET,
+    batch: int = MC_BATCH,
+    stop: Optional[Callable[[np.ndarray], bool]] = None,
+) -> Tuple[np.ndarray, Dict]:
+    """
+    Call draw(k) -> (k,) or (rows x k) samples in batches until every SE of
+    standard_errors is <= tol (or stop(samples) says the answer is settled),
+    max_sims are drawn or time_budget seconds have passed.
+
+    Each new batch aims at the sims the current SE implies are needed, at
+    most doubling the total. Returns (samples, precision) with precision =
+    {"n_sims", "se", "converged", "elapsed"}.
+    """
+    started = time.perf_counter()
+    blocks = [draw(min(batch, max_sims))]
+    n = blocks[0].shape[-1]
+    while True:
+        samples = np.concatenate(blocks, axis=-1) if len(blocks) > 1 else blocks[0]
+        blocks = [samples]
+        se = standard_errors(samples, quantiles)
+        worst = max(se.values())
+        converged = worst <= tol or (stop is not None and stop(samples))
+        if converged or n >= max_sims or time.perf_counter() - started >= time_budget:
+            break
+        needed = int(n * (worst / tol) ** 2 * 1.1) - n
+        k = min(max(needed, batch), n, max_sims - n)
+        blocks.append(draw(k))
+        n += k
+    return samples, {
+        "n_sims": n,
+        "se": se,
+        "converged": bool(converged),
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def _clipped_normal(k: int, rng: np.random.Generator, mean: float, std: float) -> np.ndarray:
+    # Clip negative values to 0
+    return np.clip(rng.normal(loc=mean, scale=std, size=k), 0, None)
 
 
 class MonteCarlo:
-    def __init__(self, n_sims: int = 10000, random_seed: int | None = None):
+    def __init__(
+        self,
+        n_sims: int = 10000,
+        random_seed: int | None = None,
+        tol: float | None = None,
+        time_budget: float = MC_TIME_BUDGET,
+        n_workers: int = 1,
+    ):
+        """
+        random_seed seeds this instance's own Generator (never the global
+        numpy state), so instances are safe to use side by side.
+        tol: adaptive mode; simulate() stops once the mean and quantile
+        standard errors are below tol points, with n_sims as the cap.
+        n_workers > 1: fixed-count runs are split across processes
+        (models.parallel), reproducible for a given seed and worker count.
+        """
         self.n_sims = n_sims
-        if random_seed is not None:
-            np.random.seed(random_seed)
+        self.tol = tol
+        self.time_budget = time_budget
+        self.n_workers = n_workers
+        self.rng = np.random.default_rng(random_seed)
 
     def simulate(self, mean: float, std: float) -> PredictionDistribution:
         """
@@ -32,19 +160,22 @@ class MonteCarlo:
         Negative values are clipped to zero (FPL can't score negative
         except cards, but we handle that later).
         """
+        if self.tol is None and self.n_workers > 1:
+            from models.parallel import parallel_samples
 
-        # Generate samples
-        samples = np.random.normal(loc=mean, scale=std, size=self.n_sims)
+            draw = partial(_clipped_normal, mean=mean, std=std)
+            # Per-call root seed from the instance stream: repeated calls differ,
+            # the whole sequence is fixed by (random_seed, n_workers).
+            seed = int(self.rng.integers(2 ** 63))
+            samples = parallel_samples(draw, 1, self.n_sims, seed=seed, n_workers=self.n_workers,
+                                       dtype=np.float64)[0]
+            return PredictionDistribution.from_samples(samples)
 
-        # Clip negative values to 0
-        samples = np.clip(samples, 0, None)
+        def draw(k: int) -> np.ndarray:
+            return _clipped_normal(k, self.rng, mean, std)
 
-        # Round to nearest 0.1 or integer? -> For now keep float for precision
-        return PredictionDistribution(
-            samples=samples,
-            expected=float(np.mean(samples)),
-            median=float(np.percentile(samples, 50)),
-            p25=float(np.percentile(samples, 25)),
-            p75=float(np.percentile(samples, 75)),
-            p90=float(np.percentile(samples, 90)),
-        )
+        if self.tol is None:
+            return PredictionDistribution.from_samples(draw(self.n_sims))
+
+        samples, precision = run_adaptive(draw, tol=self.tol, max_sims=self.n_sims, time_budget=self.time_budget)
+        return PredictionDistribution.from_samples(samples, precision)
@@ -0,0 +1,108 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Workers used when n_workers is None (capped by the CPU count).
+DEFAULT_WORKERS = 4
+
+
+def default_workers() -> int:
+    return max(1, min(DEFAULT_WORKERS, os.cpu_count() or 1))
+
+
+def split_sims(n_sims: int, n_workers: int) -> List[int]:
+    """n_sims split into n_workers near-equal shares (earlier workers take the remainder)."""
+    base, extra = divmod(int(n_sims), int(n_workers))
+    return [base + (1 if i < extra else 0) for i in range(n_workers)]
+
+
+def spawn_seeds(seed: Optional[int], n_workers: int) -> List[np.random.SeedSequence]:
+    """One independent child stream per worker; fixed by (seed, n_workers)."""
+    return np.random.SeedSequence(seed).spawn(n_workers)
+
+
+def run_parallel(
+    worker: Callable[..., Any],
+    n_sims: int,
+    seed: Optional[int] = None,
+    n_workers: Optional[int] = None,
+    args: Sequence[Any] = (),
+) -> List[Any]:
+    """
+    worker(n, seed_seq, offset, *args) for each share of n_sims, in a process
+    pool, with results in worker order. worker must be a module-level
+    function and build its Generator from seed_seq; offset is where its sims
+    start. The same seed and n_workers give bit-identical results, whether the
+    shares run in processes or (n_workers == 1) inline.
+    """
+    n_workers = n_workers or default_workers()
+    shares = split_sims(n_sims, n_workers)
+    offsets = np.concatenate([[0], np.cumsum(shares)[:-1]]).astype(int)
+    seeds = spawn_seeds(seed, n_workers)
+    tasks = [(n, s, int(o)) for n, s, o in zip(shares, seeds, offsets) if n > 0]
+    if len(tasks) == 1:
+        return [worker(*tasks[0], *args)]
+    with ProcessPoolExecutor(max_workers=len(tasks)) as pool:
+        futures = [pool.submit(worker, *task, *args) for task in tasks]
+        return [f.result() for f in futures]
+
+
+def merge_sums(results: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add up mergeable summaries (dicts of counts / sums), in worker order."""
+    merged = dict(results[0])
+    for r in results[1:]:
+        for key, value in r.items():
+            merged[key] = merged[key] + value
+    return merged
+
+
+# -------------------------------------------------
+# SHARED-MEMORY SAMPLE MATRICES
+# -------------------------------------------------
+
+
+def _fill_block(
+    n: int,
+    seed: np.random.SeedSequence,
+    offset: int,
+    draw: Callable[[int, np.random.Generator], np.ndarray],
+    shm_name: str,
+    shape: tuple,
+    dtype: str,
+) -> int:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        out[:, offset:offset + n] = draw(n, np.random.default_rng(seed))
+        del out
+    finally:
+        shm.close()
+    return n
+
+
+def parallel_samples(
+    draw: Callable[[int, np.random.Generator], np.ndarray],
+    n_rows: int,
+    n_sims: int,
+    seed: Optional[int] = None,
+    n_workers: Optional[int] = None,
+    dtype=np.float32,
+) -> np.ndarray:
+    """
+    (n_rows x n_sims) matrix with each worker writing its columns, drawn by
+    draw(k, rng) -> (n_rows x k), straight into one shared-memory block.
+    draw must be picklable (a module-level function or functools.partial).
+    """
+    dtype = np.dtype(dtype)
+    shape = (int(n_rows), int(n_sims))
+    shm = shared_memory.SharedMemory(create=True, size=max(1, shape[0] * shape[1] * dtype.itemsize))
+    try:
+        run_parallel(_fill_block, n_sims, seed=seed, n_workers=n_workers,
+                     args=(draw, shm.name, shape, dtype.str))
+        return np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
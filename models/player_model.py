@@ -6,6 +6,7 @@ from typing import Tuple, List, Dict, Optional
 import numpy as np
 
 from config import DB_PATH
+from models.team_ratings import rating_difficulties, reset_ratings_cache
 
 PARAMS_PATH = Path(__file__).resolve().parent / "player_model_params.json"
 
@@ -58,8 +59,45 @@ DEFAULT_MODEL_PARAMS: Dict[str, float] = {
     "dgw_minutes_factor": 0.82,
     "std_floor": 0.50,
     "std_fallback_mult": 0.35,
+    # 1.0: continuous difficulties from fitted team_ratings instead of FPL FDR.
+    "fixture_use_ratings": 0.0,
 }
 
+# Position shapes and (param key, default) pairs shared by the model
+# (_base_expectation, _fixture_expectation) and its bound
+# (_expectation_bound): change them here so the bound follows.
+POS_PRIOR = {"GK": 3.4, "DEF": 3.8, "MID": 4.9, "FWD": 5.2}
+POS_STD_MULT = {"GK": 0.75, "DEF": 0.85, "MID": 1.0, "FWD": 1.1}
+XGI_WEIGHT = {
+    "GK": ("xgi_weight_gk", 0.00),
+    "DEF": ("xgi_weight_def", 0.02),
+    "MID": ("xgi_weight_mid", 0.05),
+    "FWD": ("xgi_weight_fwd", 0.08),
+}
+FIXTURE_WEIGHT = {
+    "GK": ("fixture_w_gk", 0.12),
+    "DEF": ("fixture_w_def", 0.16),
+    "MID": ("fixture_w_mid", 0.20),
+    "FWD": ("fixture_w_fwd", 0.24),
+}
+# Each market signal moves the expectation by at most its cap.
+MARKET_CAPS = (
+    ("transfer_balance_cap", 0.08),
+    ("selected_trend_cap", 0.08),
+    ("value_delta_cap", 0.10),
+)
+UNAVAILABLE_STATUS = ("i", "o", "s")
+# Expected minutes: median of recent minutes (NO_HISTORY_MINUTES without),
+# times START_MULT[0] + START_MULT[1] * recent start rate; regular starters
+# keep MINUTES_FLOOR.
+NO_HISTORY_MINUTES = 80.0
+START_MULT = (0.75, 0.35)
+MINUTES_FLOOR = 75.0
+MINUTES_FLOOR_STARTS = 10
+MINUTES_FLOOR_CHANCE = 75.0
+MINUTES_FLOOR_GAMES = 3
+HIGH_MINUTES = 70
+
 _PARAMS_CACHE: Optional[Dict[str, float]] = None
 _MAX_HISTORY_GW_CACHE: Optional[int] = None
 
@@ -82,6 +120,13 @@ def _get_model_params() -> Dict[str, float]:
     _PARAMS_CACHE = params
     return params
 
+def reset_model_caches() -> None:
+    """Drop data-derived module caches (call after fpl.db is updated in-process)."""
+    global _MAX_HISTORY_GW_CACHE
+    _MAX_HISTORY_GW_CACHE = None
+    reset_ratings_cache()
+
+
 def get_player_data(player_id: int) -> dict:
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
@@ -147,22 +192,23 @@ def get_player_history(
 
     rows = c.fetchall()
     conn.close()
-    return [
-        {
-            "gw": r["gameweek"],
-            "points": r["total_points"],
-            "minutes": r["minutes"],
-            "goals": r["goals_scored"],
-            "assists": r["assists"],
-            "clean_sheets": r["clean_sheets"],
-            "bonus": r["bonus_points"],
-            "starts": r["starts"],
-            "selected": r["selected"],
-            "transfers_balance": r["transfers_balance"],
-            "value": r["value"],
-        }
-        for r in rows
-    ]
+    return [_history_row(r) for r in rows]
+
+
+def _history_row(r) -> Dict:
+    return {
+        "gw": r["gameweek"],
+        "points": r["total_points"],
+        "minutes": r["minutes"],
+        "goals": r["goals_scored"],
+        "assists": r["assists"],
+        "clean_sheets": r["clean_sheets"],
+        "bonus": r["bonus_points"],
+        "starts": r["starts"],
+        "selected": r["selected"],
+        "transfers_balance": r["transfers_balance"],
+        "value": r["value"],
+    }
 
 
 def get_player_fixtures_in_gw(player_id: int, gw: int) -> List[int]:
@@ -216,7 +262,7 @@ def get_fixture_difficulty(player_id: int, gw: int) -> int:
 
 def _estimate_expected_minutes(player: dict, history: List[Dict], cfg: Dict[str, float]) -> float:
     status = player.get("status")
-    if status in ("i", "o", "s"):
+    if status in UNAVAILABLE_STATUS:
         return 0.0
 
     recent_minutes = [h["minutes"] for h in history if h.get("minutes") is not None]
@@ -224,7 +270,7 @@ def _estimate_expected_minutes(player: dict, history: List[Dict], cfg: Dict[str,
         # Robust center: median is less sensitive to cameo outliers.
         base_minutes = float(np.median(recent_minutes))
     else:
-        base_minutes = 80.0 if (player.get("starts") or 0) >= 3 else 60.0
+        base_minutes = NO_HISTORY_MINUTES if (player.get("starts") or 0) >= 3 else 60.0
 
     chance = player.get("chance_of_playing_next_round")
     if chance is not None:
@@ -233,24 +279,27 @@ def _estimate_expected_minutes(player: dict, history: List[Dict], cfg: Dict[str,
     # Keep a reasonable floor for consistently starting players.
     starts = int(player.get("starts") or 0)
     chance_pct = 100.0 if chance is None else max(0.0, min(float(chance), 100.0))
-    if starts >= 10 and chance_pct >= 75:
-        high_minutes_games = [m for m in recent_minutes if m >= 70]
-        if len(high_minutes_games) >= 3:
-            base_minutes = max(base_minutes, 75.0)
+    if starts >= MINUTES_FLOOR_STARTS and chance_pct >= MINUTES_FLOOR_CHANCE:
+        high_minutes_games = [m for m in recent_minutes if m >= HIGH_MINUTES]
+        if len(high_minutes_games) >= MINUTES_FLOOR_GAMES:
+            base_minutes = max(base_minutes, MINUTES_FLOOR)
 
     starts_recent = [h["starts"] for h in history if h.get("starts") is not None]
     if starts_recent:
         start_rate = float(np.mean([1.0 if s else 0.0 for s in starts_recent]))
-        start_mult = _clamp(
-            0.75 + 0.35 * start_rate,
-            float(cfg.get("start_rate_minutes_floor", 0.65)),
-            float(cfg.get("start_rate_minutes_cap", 1.08)),
-        )
-        base_minutes *= start_mult
+        base_minutes *= _start_mult(start_rate, cfg)
 
     return min(base_minutes, 90.0)
 
 
+def _start_mult(start_rate: float, cfg: Dict[str, float]) -> float:
+    return _clamp(
+        START_MULT[0] + START_MULT[1] * start_rate,
+        float(cfg.get("start_rate_minutes_floor", 0.65)),
+        float(cfg.get("start_rate_minutes_cap", 1.08)),
+    )
+
+
 def _weighted_mean(values: List[float], decay: float = 0.85) -> float:
     if not values:
         return 0.0
@@ -323,18 +372,138 @@ def predict_player_points(
     player_id: int,
     gw: int,
     params: Optional[Dict[str, float]] = None,
+    as_of: bool = False,
 ) -> Tuple[float, float]:
     """
     Returns (mean, std) points expectation for player in a given GW.
+
+    as_of=True replaces the current season aggregates and availability of
+    the players row with their values before GW gw (models/asof_features.py),
+    so backtests do not see the future.
     """
     cfg = params or _get_model_params()
     p = get_player_data(player_id)
+    if as_of:
+        from models.asof_features import get_asof_store
+
+        p = get_asof_store().player_row(p, gw)
     # Time-sliced history: for GW X, use only data up to GW X-1.
     history_all = get_player_history(
         player_id,
         last_n=int(cfg.get("history_long_n", 60)),
         up_to_gw=gw,
     )
+    base = _base_expectation(p, history_all, gw, cfg)
+
+    # Fixture adjustment (supports DGW)
+    difficulties = get_player_fixtures_in_gw(player_id, gw)
+    if not difficulties:
+        return 0.0, 0.0
+    if float(cfg.get("fixture_use_ratings", 0.0)) >= 0.5:
+        difficulties = rating_difficulties(p["team_id"], gw) or difficulties
+
+    return _fixture_expectation(base, difficulties, cfg)
+
+
+def _shrink_to_prior(raw_ep: float, pos: str, n_games: int, cfg: Dict[str, float]) -> float:
+    """Bayesian-style shrinkage toward the position prior for stability."""
+    shrink_k = max(1e-6, float(cfg.get("shrink_k", 10.0)))
+    shrink = n_games / (n_games + shrink_k)
+    return shrink * raw_ep + (1.0 - shrink) * POS_PRIOR.get(pos, 4.5)
+
+
+def _xgi_term(xgi90: float, pos: str, n_games: int, cfg: Dict[str, float]) -> float:
+    xgi_trust = min(1.0, n_games / 8.0)
+    return xgi90 * float(cfg.get(*XGI_WEIGHT[pos])) * xgi_trust
+
+
+def _ep_next_blend(base_ep: float, p: dict, cfg: Dict[str, float]) -> float:
+    """Blend in the official ep_next (true future GWs only)."""
+    ep_next = _safe_float(p.get("ep_next"), 0.0)
+    if ep_next <= 0:
+        return base_ep
+    w_ep = _clamp(float(cfg.get("ep_next_weight_future", 0.08)), 0.0, 0.5)
+    return (1.0 - w_ep) * base_ep + w_ep * ep_next
+
+
+def _elite_trust(p: dict, n_games: int, cfg: Dict[str, float]) -> float:
+    starts = _safe_float(p.get("starts"), 0.0)
+    sample_trust = min(1.0, n_games / max(1e-6, float(cfg.get("elite_n_games_ref", 10.0))))
+    start_trust = min(1.0, starts / max(1e-6, float(cfg.get("elite_starts_ref", 12.0))))
+    return sample_trust * start_trust
+
+
+def _role_gains(p: dict, pos: str, xgi90: float, anchor_ppg: float, cfg: Dict[str, float]) -> Tuple[float, float]:
+    """
+    (elite, creator) uplift of a player at full trust: premium MID / FWD
+    attackers by xGI and points per game, set-piece MIDs by xA and creativity.
+    """
+    elite_gain = 0.0
+    if pos in ("MID", "FWD"):
+        xgi_ref = float(cfg.get("elite_xgi_ref_mid" if pos == "MID" else "elite_xgi_ref_fwd", 0.70 if pos == "MID" else 0.90))
+        ppg_ref = float(cfg.get("elite_ppg_ref_mid" if pos == "MID" else "elite_ppg_ref_fwd", 6.0 if pos == "MID" else 7.0))
+        elite_max = float(cfg.get("elite_uplift_mid_max" if pos == "MID" else "elite_uplift_fwd_max", 0.20 if pos == "MID" else 0.18))
+        xgi_floor = float(cfg.get("elite_xgi_floor_mid" if pos == "MID" else "elite_xgi_floor_fwd", 0.18 if pos == "MID" else 0.30))
+        xgi_score = 0.0
+        if xgi90 > xgi_floor:
+            xgi_score = min(1.0, (xgi90 - xgi_floor) / max(1e-6, (xgi_ref - xgi_floor)))
+        ppg_score = min(1.0, anchor_ppg / max(1e-6, ppg_ref))
+        elite_score = 0.70 * xgi_score + 0.30 * ppg_score
+        elite_gain = elite_max * elite_score
+
+    creator_gain = 0.0
+    if pos == "MID" and _safe_float(p.get("starts"), 0.0) >= float(cfg.get("set_piece_min_starts", 8.0)):
+        minutes_total = max(1.0, _safe_float(p.get("minutes"), 0.0))
+        xa90 = _safe_float(p.get("expected_assists_per_90"), 0.0)
+        creativity_total = _safe_float(p.get("creativity"), 0.0)
+        creativity90 = creativity_total / minutes_total * 90.0
+        xa_floor = float(cfg.get("set_piece_xa90_floor", 0.12))
+        crea_floor = float(cfg.get("set_piece_crea90_floor", 16.0))
+        xa_score = 0.0
+        if xa90 > xa_floor:
+            xa_score = min(1.0, (xa90 - xa_floor) / max(1e-6, float(cfg.get("set_piece_xa90_ref", 0.25)) - xa_floor))
+        crea_score = 0.0
+        if creativity90 > crea_floor:
+            crea_score = min(1.0, (creativity90 - crea_floor) / max(1e-6, float(cfg.get("set_piece_crea90_ref", 35.0)) - crea_floor))
+        creator_score = 0.65 * xa_score + 0.35 * crea_score
+        creator_gain = float(cfg.get("set_piece_uplift_mid_max", 0.12)) * creator_score
+    return elite_gain, creator_gain
+
+
+def _fixture_weight(pos: str, xgi90: float, cfg: Dict[str, float]) -> float:
+    """Per-difficulty-step weight of a fixture for this position and xGI profile."""
+    # Stronger fixture impact so opponent quality matters more.
+    fixture_weight = float(cfg.get(*FIXTURE_WEIGHT[pos]))
+
+    # MID/FWD fixture sensitivity should depend on attacking profile.
+    # This avoids overrating low-xGI midfielders just because they have an easy fixture.
+    if pos in ("MID", "FWD"):
+        role_floor = float(
+            cfg.get(
+                "fixture_role_floor_mid" if pos == "MID" else "fixture_role_floor_fwd",
+                0.55 if pos == "MID" else 0.70,
+            )
+        )
+        role_ref = max(
+            1e-6,
+            float(
+                cfg.get(
+                    "fixture_role_ref_mid" if pos == "MID" else "fixture_role_ref_fwd",
+                    0.70 if pos == "MID" else 0.85,
+                )
+            ),
+        )
+        role_cap = max(1.0, float(cfg.get("fixture_role_cap", 1.15)))
+        role_mult = role_floor + (1.0 - role_floor) * min(1.0, max(0.0, xgi90) / role_ref)
+        fixture_weight *= min(role_mult, role_cap)
+    return fixture_weight
+
+
+def _base_expectation(p: dict, history_all: List[Dict], gw: int, cfg: Dict[str, float]) -> Dict:
+    """
+    Fixture-independent part of predict_player_points: per-match expected
+    points from the players row p and its history before GW gw (newest first).
+    """
     history_recent = history_all[:int(cfg.get("history_recent_n", 6))]
 
     # Expected minutes for upcoming GW
@@ -363,22 +532,12 @@ def predict_player_points(
 
     # Bayesian-style shrinkage toward position prior for stability.
     pos = _position(p)
-    pos_prior = {"GK": 3.4, "DEF": 3.8, "MID": 4.9, "FWD": 5.2}
     n_games = len(season_points)
-    shrink_k = max(1e-6, float(cfg.get("shrink_k", 10.0)))
-    shrink = n_games / (n_games + shrink_k)
-    base_ep = shrink * raw_ep + (1.0 - shrink) * pos_prior.get(pos, 4.5)
+    base_ep = _shrink_to_prior(raw_ep, pos, n_games, cfg)
 
     # xGI bonus scaled by position
     xgi90 = _xgi_per90(p)
-    xgi_weight = {
-        "GK": float(cfg.get("xgi_weight_gk", 0.00)),
-        "DEF": float(cfg.get("xgi_weight_def", 0.02)),
-        "MID": float(cfg.get("xgi_weight_mid", 0.05)),
-        "FWD": float(cfg.get("xgi_weight_fwd", 0.08)),
-    }
-    xgi_trust = min(1.0, n_games / 8.0)
-    base_ep += xgi90 * xgi_weight.get(pos, 0.05) * xgi_trust
+    base_ep += _xgi_term(xgi90, pos, n_games, cfg)
 
     # Market and price signals (time-sliced from historical GW rows).
     transfer_ratios = []
@@ -396,78 +555,128 @@ def predict_player_points(
             transfer_ratios,
             decay=float(cfg.get("recent_decay", 0.83)),
         )
+        transfer_cap = float(cfg.get(*MARKET_CAPS[0]))
         transfer_adj = _clamp(
             transfer_signal * float(cfg.get("transfer_balance_scale", 4.0)),
-            -float(cfg.get("transfer_balance_cap", 0.08)),
-            float(cfg.get("transfer_balance_cap", 0.08)),
+            -transfer_cap,
+            transfer_cap,
         )
         base_ep *= 1.0 + transfer_adj
 
     selected_series = [h.get("selected") for h in history_recent if h.get("selected") is not None]
     if len(selected_series) >= 3 and float(selected_series[-1]) > 0:
         selected_trend = (float(selected_series[0]) - float(selected_series[-1])) / float(selected_series[-1])
+        selected_cap = float(cfg.get(*MARKET_CAPS[1]))
         selected_adj = _clamp(
             selected_trend * float(cfg.get("selected_trend_scale", 0.25)),
-            -float(cfg.get("selected_trend_cap", 0.08)),
-            float(cfg.get("selected_trend_cap", 0.08)),
+            -selected_cap,
+            selected_cap,
         )
         base_ep *= 1.0 + selected_adj
 
     value_series = [h.get("value") for h in history_recent if h.get("value") is not None]
     if len(value_series) >= 3:
         value_delta = float(value_series[0]) - float(value_series[-1])
+        value_cap = float(cfg.get(*MARKET_CAPS[2]))
         value_adj = _clamp(
             value_delta * float(cfg.get("value_delta_scale", 0.015)),
-            -float(cfg.get("value_delta_cap", 0.10)),
-            float(cfg.get("value_delta_cap", 0.10)),
+            -value_cap,
+            value_cap,
         )
         base_ep *= 1.0 + value_adj
 
     # Use official ep_next only for true future GWs to avoid historical leakage.
     if gw > _get_max_history_gw():
-        ep_next = _safe_float(p.get("ep_next"), 0.0)
-        if ep_next > 0:
-            w_ep = _clamp(float(cfg.get("ep_next_weight_future", 0.08)), 0.0, 0.5)
-            base_ep = (1.0 - w_ep) * base_ep + w_ep * ep_next
-
-    # Expand premium attacker ceiling without inflating low-sample outliers.
-    starts = _safe_float(p.get("starts"), 0.0)
-    sample_trust = min(1.0, n_games / max(1e-6, float(cfg.get("elite_n_games_ref", 10.0))))
-    start_trust = min(1.0, starts / max(1e-6, float(cfg.get("elite_starts_ref", 12.0))))
-    elite_trust = sample_trust * start_trust
-    if pos in ("MID", "FWD") and elite_trust > 0:
-        xgi_ref = float(cfg.get("elite_xgi_ref_mid" if pos == "MID" else "elite_xgi_ref_fwd", 0.70 if pos == "MID" else 0.90))
-        ppg_ref = float(cfg.get("elite_ppg_ref_mid" if pos == "MID" else "elite_ppg_ref_fwd", 6.0 if pos == "MID" else 7.0))
-        elite_max = float(cfg.get("elite_uplift_mid_max" if pos == "MID" else "elite_uplift_fwd_max", 0.20 if pos == "MID" else 0.18))
-        xgi_floor = float(cfg.get("elite_xgi_floor_mid" if pos == "MID" else "elite_xgi_floor_fwd", 0.18 if pos == "MID" else 0.30))
-        xgi_score = 0.0
-        if xgi90 > xgi_floor:
-            xgi_score = min(1.0, (xgi90 - xgi_floor) / max(1e-6, (xgi_ref - xgi_floor)))
-        ppg_score = min(1.0, anchor_ppg / max(1e-6, ppg_ref))
-        elite_score = 0.70 * xgi_score + 0.30 * ppg_score
-        base_ep *= 1.0 + elite_max * elite_score * elite_trust
+        base_ep = _ep_next_blend(base_ep, p, cfg)
+
+    # Expand premium attacker ceiling without inflating low-sample outliers,
+    # plus a creator/set-piece proxy for attacking mids.
+    elite_gain, creator_gain = _role_gains(p, pos, xgi90, anchor_ppg, cfg)
+    elite_trust = _elite_trust(p, n_games, cfg)
+    base_ep *= 1.0 + elite_gain * elite_trust
+    base_ep *= 1.0 + creator_gain * elite_trust
+
+    return {
+        "base_ep": base_ep,
+        "exp_minutes": exp_minutes,
+        "pos": pos,
+        "xgi90": xgi90,
+        "history_recent": history_recent,
+    }
 
-    # Creator/set-piece proxy for attacking mids.
-    if pos == "MID" and starts >= float(cfg.get("set_piece_min_starts", 8.0)):
-        minutes_total = max(1.0, _safe_float(p.get("minutes"), 0.0))
-        xa90 = _safe_float(p.get("expected_assists_per_90"), 0.0)
-        creativity_total = _safe_float(p.get("creativity"), 0.0)
-        creativity90 = creativity_total / minutes_total * 90.0
-        xa_floor = float(cfg.get("set_piece_xa90_floor", 0.12))
-        crea_floor = float(cfg.get("set_piece_crea90_floor", 16.0))
-        xa_score = 0.0
-        if xa90 > xa_floor:
-            xa_score = min(1.0, (xa90 - xa_floor) / max(1e-6, float(cfg.get("set_piece_xa90_ref", 0.25)) - xa_floor))
-        crea_score = 0.0
-        if creativity90 > crea_floor:
-            crea_score = min(1.0, (creativity90 - crea_floor) / max(1e-6, float(cfg.get("set_piece_crea90_ref", 35.0)) - crea_floor))
-        creator_score = 0.65 * xa_score + 0.35 * crea_score
-        base_ep *= 1.0 + float(cfg.get("set_piece_uplift_mid_max", 0.12)) * creator_score * elite_trust
 
-    # Fixture adjustment (supports DGW)
-    difficulties = get_player_fixtures_in_gw(player_id, gw)
-    if not difficulties:
+def _expectation_bound(p: dict, window: Optional[Dict], cfg: Dict[str, float]) -> Tuple[float, float]:
+    """
+    Upper bounds for _base_expectation from the players row p and bounds on
+    its history windows before the GW (None = no history): season_ppg (mean
+    points), recent_points (best recent points), minutes (bound on the median
+    of recent minutes), high_minutes (recent GWs of 70+), any_start (0 if no
+    recent start) and n_games (most GWs in the long window).
+
+    Returns (base_ep times minutes factor, fixture weight); a GW's mean is at
+    most the first times sum(1 + max(0, 3 - d) * weight) over its fixtures.
+    Every step that depends on the number of games is taken at its larger
+    end, 0 or n_games.
+    """
+    if p.get("status") in UNAVAILABLE_STATUS:
         return 0.0, 0.0
+    pos = _position(p)
+    n_games = 0 if window is None else int(window["n_games"])
+
+    # Same steps as _estimate_expected_minutes, each at its largest.
+    chance = p.get("chance_of_playing_next_round")
+    chance_pct = 100.0 if chance is None else max(0.0, min(float(chance), 100.0))
+    if window is None:
+        minutes = NO_HISTORY_MINUTES * chance_pct / 100.0
+    else:
+        minutes = max(float(window["minutes"]), 0.0) * chance_pct / 100.0
+        if (
+            int(p.get("starts") or 0) >= MINUTES_FLOOR_STARTS
+            and chance_pct >= MINUTES_FLOOR_CHANCE
+            and window["high_minutes"] >= MINUTES_FLOOR_GAMES
+        ):
+            minutes = max(minutes, MINUTES_FLOOR)
+        # No recent start pins the start rate at 0; otherwise it is at most 1
+        # (or the multiplier is skipped for missing starts).
+        if window["any_start"]:
+            minutes *= max(1.0, _start_mult(0.0, cfg), _start_mult(1.0, cfg))
+        else:
+            minutes *= _start_mult(0.0, cfg)
+    minutes = min(minutes, 90.0) * max(1.0, float(cfg.get("dgw_minutes_factor", 0.82)))
+    minutes_factor = min(minutes, 90.0) / 90.0
+
+    # A weighted mean of recent points is at most their best.
+    season = _safe_float(p.get("points_per_game"), 0.0)
+    if window is not None and window["season_ppg"] is not None:
+        season = float(window["season_ppg"])
+    recent = season
+    if window is not None and window["recent_points"] is not None:
+        recent = float(window["recent_points"])
+    anchor = float(p.get("points_per_game") or season)
+    raw_ep = (
+        max(float(cfg.get("w_season", 0.55)), 0.0) * season
+        + max(float(cfg.get("w_recent", 0.30)), 0.0) * recent
+        + max(float(cfg.get("w_anchor", 0.15)), 0.0) * anchor
+    )
+    base_ep = max(_shrink_to_prior(raw_ep, pos, 0, cfg), _shrink_to_prior(raw_ep, pos, n_games, cfg))
+    xgi90 = _xgi_per90(p)
+    base_ep += max(_xgi_term(xgi90, pos, 0, cfg), _xgi_term(xgi90, pos, n_games, cfg))
+    base_ep = max(base_ep, 0.0)
+
+    for cap in MARKET_CAPS:
+        base_ep *= 1.0 + max(float(cfg.get(*cap)), 0.0)
+    base_ep = max(base_ep, _ep_next_blend(base_ep, p, cfg))
+    elite_trust = _elite_trust(p, n_games, cfg)
+    for gain in _role_gains(p, pos, xgi90, anchor, cfg):
+        base_ep *= max(1.0, 1.0 + gain * elite_trust)
+
+    return base_ep * minutes_factor, _fixture_weight(pos, xgi90, cfg)
+
+
+def _fixture_expectation(base: Dict, difficulties: List[float], cfg: Dict[str, float]) -> Tuple[float, float]:
+    """(mean, std) for one GW from _base_expectation and its fixture difficulties."""
+    base_ep, exp_minutes = base["base_ep"], base["exp_minutes"]
+    pos, xgi90, history_recent = base["pos"], base["xgi90"], base["history_recent"]
 
     minutes_per_fixture = exp_minutes
     if len(difficulties) > 1:
@@ -475,37 +684,7 @@ def predict_player_points(
     minutes_factor = min(minutes_per_fixture, 90.0) / 90.0
 
     ep_total = 0.0
-    # Stronger fixture impact so opponent quality matters more.
-    fixture_weight_by_pos = {
-        "GK": float(cfg.get("fixture_w_gk", 0.12)),
-        "DEF": float(cfg.get("fixture_w_def", 0.16)),
-        "MID": float(cfg.get("fixture_w_mid", 0.20)),
-        "FWD": float(cfg.get("fixture_w_fwd", 0.24)),
-    }
-    fixture_weight = fixture_weight_by_pos.get(pos, 0.18)
-
-    # MID/FWD fixture sensitivity should depend on attacking profile.
-    # This avoids overrating low-xGI midfielders just because they have an easy fixture.
-    if pos in ("MID", "FWD"):
-        role_floor = float(
-            cfg.get(
-                "fixture_role_floor_mid" if pos == "MID" else "fixture_role_floor_fwd",
-                0.55 if pos == "MID" else 0.70,
-            )
-        )
-        role_ref = max(
-            1e-6,
-            float(
-                cfg.get(
-                    "fixture_role_ref_mid" if pos == "MID" else "fixture_role_ref_fwd",
-                    0.70 if pos == "MID" else 0.85,
-                )
-            ),
-        )
-        role_cap = max(1.0, float(cfg.get("fixture_role_cap", 1.15)))
-        role_mult = role_floor + (1.0 - role_floor) * min(1.0, max(0.0, xgi90) / role_ref)
-        fixture_weight *= min(role_mult, role_cap)
-
+    fixture_weight = _fixture_weight(pos, xgi90, cfg)
     for difficulty in difficulties:
         adj = 1 + (3 - difficulty) * fixture_weight
         ep_total += base_ep * minutes_factor * adj
@@ -518,7 +697,6 @@ def predict_player_points(
         std = ep_total * float(cfg.get("std_fallback_mult", 0.35))  # fallback variance
 
     # Position-based variance adjustment
-    pos_std_mult = {"GK": 0.75, "DEF": 0.85, "MID": 1.0, "FWD": 1.1}
-    std *= pos_std_mult.get(pos, 1.0)
+    std *= POS_STD_MULT.get(pos, 1.0)
 
     return max(ep_total, 0.0), max(std, float(cfg.get("std_floor", 0.5)))
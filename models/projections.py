@@ -0,0 +1,390 @@
+import heapq
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from db.sqlite import get_connection, get_data_version, init_player_projections_table
+from models.player_model import (
+    HIGH_MINUTES,
+    MINUTES_FLOOR_GAMES,
+    _base_expectation,
+    _expectation_bound,
+    _fixture_expectation,
+    _get_max_history_gw,
+    _get_model_params,
+    _history_row,
+)
+from models.team_ratings import rating_difficulties
+
+
+@dataclass
+class ProjectionMatrix:
+    """
+    predict_player_points for every player over a GW range: mean / std /
+    fixtures are (players x gws), column j is GW gws[j] (blank GW = 0 fixtures).
+    """
+
+    player_ids: np.ndarray
+    gws: List[int]
+    mean: np.ndarray
+    std: np.ndarray
+    fixtures: np.ndarray
+    index: Dict[int, int]
+
+    def rows(self, player_ids: Sequence[int]) -> np.ndarray:
+        """Row of each id (KeyError for a player not in the players table)."""
+        return np.array([self.index[int(pid)] for pid in player_ids], dtype=np.int64)
+
+    def horizon(self, discount: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-player (total, std) over the range with GW k of it weighted by
+        discount ** k; the std treats GWs as independent.
+        """
+        weights = float(discount) ** np.arange(len(self.gws), dtype=np.float64)
+        return self.mean @ weights, np.sqrt((self.std ** 2) @ (weights ** 2))
+
+
+# -------------------------------------------------
+# BATCHED PROJECTION
+# -------------------------------------------------
+
+
+def _team_fixtures(
+    gws: Sequence[int],
+    conn,
+    cfg: Dict[str, float],
+) -> Tuple[Dict[Tuple[int, int], List[float]], Dict[Tuple[int, int], int]]:
+    """
+    (team_id, gw) -> difficulty of each fixture as predict_player_points sees
+    it (FPL FDR, or team_ratings with fixture_use_ratings), and -> fixture count.
+    """
+    fdr: Dict[Tuple[int, int], List[float]] = {}
+    if gws:
+        rows = conn.execute(
+            f"""
+            SELECT event, team_h, team_a, difficulty_home, difficulty_away
+            FROM fixtures
+            WHERE event IN ({",".join("?" * len(gws))})
+            ORDER BY id
+            """,
+            list(gws),
+        ).fetchall()
+        for r in rows:
+            fdr.setdefault((r["team_h"], r["event"]), []).append(r["difficulty_home"])
+            fdr.setdefault((r["team_a"], r["event"]), []).append(r["difficulty_away"])
+    counts = {key: len(d) for key, d in fdr.items()}
+    if float(cfg.get("fixture_use_ratings", 0.0)) >= 0.5:
+        fdr = {key: rating_difficulties(key[0], key[1]) or d for key, d in fdr.items()}
+    return fdr, counts
+
+
+def compute_projections(
+    gws: Sequence[int],
+    conn=None,
+    params: Optional[Dict[str, float]] = None,
+    player_ids: Optional[Sequence[int]] = None,
+) -> ProjectionMatrix:
+    """
+    One pass over players, history and fixtures (three queries) instead of
+    a predict_player_points call per player and GW. Same numbers: the
+    fixture-free part is computed once per player and history cut-off, and
+    every GW after the last played one shares a cut-off.
+
+    player_ids: only these players (default: the whole players table).
+    """
+    own = conn is None
+    conn = conn or get_connection()
+    cfg = params or _get_model_params()
+    gws = [int(g) for g in gws]
+    long_n = int(cfg.get("history_long_n", 60))
+    last_played = _get_max_history_gw()
+
+    ids = [] if player_ids is None else [int(pid) for pid in player_ids]
+    only = f" IN ({','.join('?' * len(ids))})" if player_ids is not None else ""
+    players_sql = f"SELECT * FROM players WHERE id{only} ORDER BY id" if only else "SELECT * FROM players ORDER BY id"
+    players = [dict(r) for r in conn.execute(players_sql, ids)]
+    history: Dict[int, List[Dict]] = {}
+    for r in conn.execute(
+        f"""
+        SELECT player_id, gameweek, total_points, minutes, goals_scored, assists, clean_sheets, bonus_points,
+               starts, selected, transfers_balance, value
+        FROM player_history
+        WHERE gameweek < ?{' AND player_id' + only if only else ''}
+        ORDER BY player_id, gameweek DESC
+        """,
+        [max(gws, default=0)] + ids,
+    ):
+        history.setdefault(r["player_id"], []).append(_history_row(r))
+    fixtures, fixture_counts = _team_fixtures(gws, conn, cfg)
+    if own:
+        conn.close()
+
+    mean = np.zeros((len(players), len(gws)), dtype=np.float64)
+    std = np.zeros_like(mean)
+    counts = np.zeros(mean.shape, dtype=np.int64)
+    for i, p in enumerate(players):
+        bases: Dict[int, Dict] = {}
+        for j, gw in enumerate(gws):
+            difficulties = fixtures.get((p["team_id"], gw))
+            if not difficulties:
+                continue
+            counts[i, j] = fixture_counts[(p["team_id"], gw)]
+            cut = min(gw, last_played + 1)
+            if cut not in bases:
+                past = [h for h in history.get(p["id"], []) if h["gw"] < cut][:long_n]
+                bases[cut] = _base_expectation(p, past, cut, cfg)
+            mean[i, j], std[i, j] = _fixture_expectation(bases[cut], difficulties, cfg)
+
+    ids = np.array([p["id"] for p in players], dtype=np.int64)
+    return ProjectionMatrix(
+        player_ids=ids,
+        gws=gws,
+        mean=mean,
+        std=std,
+        fixtures=counts,
+        index={int(pid): i for i, pid in enumerate(ids)},
+    )
+
+
+_PROJECTION_CACHE: Dict[Tuple[Optional[str], Tuple[int, ...]], ProjectionMatrix] = {}
+
+
+def projection_matrix(gw_from: int, gw_to: int, conn=None) -> ProjectionMatrix:
+    """compute_projections for GWs gw_from..gw_to, cached per (data_version, range)."""
+    gws = tuple(range(int(gw_from), int(gw_to) + 1))
+    key = (get_data_version(conn=conn), gws)
+    if key not in _PROJECTION_CACHE:
+        _PROJECTION_CACHE[key] = compute_projections(gws, conn=conn)
+    return _PROJECTION_CACHE[key]
+
+
+def reset_projection_cache() -> None:
+    _PROJECTION_CACHE.clear()
+
+
+def update_player_projections(
+    conn=None,
+    gw_from: Optional[int] = None,
+    gw_to: Optional[int] = None,
+) -> ProjectionMatrix:
+    """
+    Replace the player_projections table with compute_projections for GWs
+    gw_from..gw_to (default: the GW after the last played one to the last
+    scheduled GW). Blank GWs are stored with 0 fixtures.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cur = conn.cursor()
+    init_player_projections_table(cur)
+    if gw_from is None:
+        gw_from = _get_max_history_gw() + 1
+    if gw_to is None:
+        gw_to = int(cur.execute("SELECT MAX(event) FROM fixtures").fetchone()[0] or 0)
+    proj = compute_projections(range(int(gw_from), int(gw_to) + 1), conn=conn)
+    cur.execute("DELETE FROM player_projections")
+    cur.executemany(
+        "INSERT INTO player_projections (player_id, gameweek, mean, std, fixtures) VALUES (?,?,?,?,?)",
+        [
+            (int(pid), gw, float(proj.mean[i, j]), float(proj.std[i, j]), int(proj.fixtures[i, j]))
+            for i, pid in enumerate(proj.player_ids)
+            for j, gw in enumerate(proj.gws)
+        ],
+    )
+    if own_conn:
+        conn.commit()
+        conn.close()
+    return proj
+
+
+# -------------------------------------------------
+# TOP-N WITH BOUND PRUNING
+# -------------------------------------------------
+
+# Exact projections are computed RANK_CHUNK x top_n players at a time, in
+# descending bound order.
+RANK_CHUNK = 2
+# Once more than this share of the players table would be projected one
+# chunk at a time, the whole (cached) projection_matrix is computed instead.
+PROJECT_ALL_SHARE = 0.5
+# Slack on the bounds so float rounding never prunes a tie.
+BOUND_SLACK = 1e-9
+
+
+def projection_bounds(
+    player_ids: Sequence[int],
+    gws: Sequence[int],
+    discount: float = 1.0,
+    conn=None,
+    params: Optional[Dict[str, float]] = None,
+) -> np.ndarray:
+    """
+    Upper bound on each player's (discounted) projected total over gws from
+    one aggregate query: points and minutes windows, fixture counts and
+    difficulties and the per-position caps of the player model
+    (player_model._expectation_bound).
+    """
+    own = conn is None
+    conn = conn or get_connection()
+    cfg = params or _get_model_params()
+    gws = [int(g) for g in gws]
+    ids = [int(pid) for pid in player_ids]
+    long_n = int(cfg.get("history_long_n", 60))
+    last_played = _get_max_history_gw()
+    marks = ",".join("?" * len(ids))
+    players = {r["id"]: dict(r) for r in conn.execute(f"SELECT * FROM players WHERE id IN ({marks})", ids)}
+    # Window bounds as in predict_player_points for GWs after the last
+    # played one. RANK keeps every row of a double GW at the recent-window
+    # edge, so each bound holds over a superset; null minutes / starts count
+    # as 90 / a start. The median of the recent minutes is at most their
+    # ceil(n / 2)-th largest. Earlier GWs see a shorter history and fall
+    # back to its overall best.
+    stats = {
+        r["player_id"]: r
+        for r in conn.execute(
+            f"""
+            WITH ranked AS (
+                SELECT player_id, total_points, COALESCE(minutes, 90) AS minutes, COALESCE(starts, 1) AS starts,
+                       RANK() OVER (PARTITION BY player_id ORDER BY gameweek DESC) AS rnk,
+                       COUNT(*) OVER (PARTITION BY player_id) AS n_rows
+                FROM player_history
+                WHERE gameweek < :before AND player_id IN ({','.join(f':p{i}' for i in range(len(ids)))})
+            ),
+            ordered AS (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY player_id, rnk <= :recent ORDER BY minutes DESC) AS by_minutes
+                FROM ranked
+            )
+            SELECT player_id,
+                   MAX(n_rows) AS n_rows,
+                   AVG(total_points) AS season_ppg,
+                   MAX(CASE WHEN rnk <= :recent THEN total_points END) AS recent_points,
+                   MAX(CASE WHEN rnk <= :recent AND by_minutes = (MIN(n_rows, :recent) + 1) / 2
+                            THEN minutes END) AS median_minutes,
+                   SUM(CASE WHEN rnk <= :recent AND minutes >= :high THEN 1 ELSE 0 END) AS high_minutes,
+                   MAX(CASE WHEN rnk <= :recent THEN starts END) AS any_start,
+                   MAX(total_points) AS max_points,
+                   MAX(minutes) AS max_minutes
+            FROM ordered
+            GROUP BY player_id
+            """,
+            {"before": max(gws, default=0), "recent": int(cfg.get("history_recent_n", 6)), "high": HIGH_MINUTES,
+             **{f"p{i}": pid for i, pid in enumerate(ids)}},
+        )
+    }
+    fixtures, _ = _team_fixtures(gws, conn, cfg)
+    if own:
+        conn.close()
+
+    weights = float(discount) ** np.arange(len(gws), dtype=np.float64)
+    bounds = np.zeros(len(ids), dtype=np.float64)
+    for i, pid in enumerate(ids):
+        p = players.get(pid)
+        if p is None:
+            continue
+        r = stats.get(pid)
+        if r is None:
+            future = past = _expectation_bound(p, None, cfg)
+        else:
+            n_games = min(r["n_rows"], long_n)
+            past = _expectation_bound(p, {
+                "season_ppg": r["max_points"],
+                "recent_points": r["max_points"],
+                "minutes": r["max_minutes"],
+                "high_minutes": MINUTES_FLOOR_GAMES,
+                "any_start": 1,
+                "n_games": n_games,
+            }, cfg)
+            future = _expectation_bound(p, {
+                "season_ppg": r["season_ppg"] if r["n_rows"] <= long_n else r["max_points"],
+                "recent_points": r["recent_points"],
+                "minutes": r["median_minutes"],
+                "high_minutes": r["high_minutes"],
+                "any_start": r["any_start"],
+                "n_games": n_games,
+            }, cfg)
+        for w, gw in zip(weights, gws):
+            per_match, fixture_weight = future if gw > last_played else past
+            difficulties = fixtures.get((p["team_id"], gw), [])
+            bounds[i] += w * per_match * sum(1.0 + max(0.0, (3 - d) * fixture_weight) for d in difficulties)
+    return bounds * (1.0 + BOUND_SLACK) + BOUND_SLACK
+
+
+def _count_players(conn=None) -> int:
+    own = conn is None
+    conn = conn or get_connection()
+    n = int(conn.execute("SELECT COUNT(*) FROM players").fetchone()[0])
+    if own:
+        conn.close()
+    return n
+
+
+def top_projected(
+    player_ids: Sequence[int],
+    gw_from: int,
+    gw_to: int,
+    top_n: int = 10,
+    discount: float = 1.0,
+    conn=None,
+) -> Dict:
+    """
+    The top_n of player_ids by (discounted) projected total over GW
+    gw_from..gw_to, ties by id: {"ranked": [{"id", "total", "per_gw"}],
+    "n_exact": players projected exactly}.
+
+    A cached projection_matrix for the range is used as is. Otherwise
+    players are projected in descending projection_bounds order while a
+    min-heap holds the current top_n, stopping once the next bound cannot
+    beat its smallest total. When the bounds leave more than
+    PROJECT_ALL_SHARE of the players table to project, projection_matrix
+    for the range is computed (and cached) instead.
+    """
+    gws = list(range(int(gw_from), int(gw_to) + 1))
+    ids = [int(pid) for pid in player_ids]
+    weights = float(discount) ** np.arange(len(gws), dtype=np.float64)
+    if top_n <= 0 or not ids:
+        return {"ranked": [], "n_exact": 0}
+
+    heap: List[Tuple[float, int, List[float]]] = []
+
+    def offer(pid: int, per_gw: np.ndarray) -> None:
+        item = (float(per_gw @ weights), -pid, per_gw.tolist())
+        if len(heap) < top_n:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+
+    def offer_all(matrix: ProjectionMatrix) -> None:
+        heap.clear()
+        for pid, row in zip(ids, matrix.rows(ids)):
+            offer(pid, matrix.mean[row])
+
+    n_exact = 0
+    cached = _PROJECTION_CACHE.get((get_data_version(conn=conn), tuple(gws)))
+    if cached is not None:
+        offer_all(cached)
+    else:
+        bounds = projection_bounds(ids, gws, discount=discount, conn=conn)
+        order = np.argsort(-bounds, kind="stable")
+        chunk = max(1, RANK_CHUNK * top_n)
+        for start in range(0, len(order), chunk):
+            if len(heap) == top_n:
+                if bounds[order[start]] < heap[0][0]:
+                    break
+                left = int((bounds[order[start:]] >= heap[0][0]).sum())
+                if n_exact + left > PROJECT_ALL_SHARE * _count_players(conn):
+                    matrix = projection_matrix(gw_from, gw_to, conn=conn)
+                    n_exact += len(matrix.player_ids)
+                    offer_all(matrix)
+                    break
+            batch = [ids[k] for k in order[start:start + chunk]]
+            proj = compute_projections(gws, conn=conn, player_ids=batch)
+            n_exact += len(batch)
+            for pid, row in zip(batch, proj.rows(batch)):
+                offer(pid, proj.mean[row])
+
+    ranked = sorted(heap, key=lambda item: (-item[0], -item[1]))
+    return {
+        "ranked": [{"id": -neg_id, "total": total, "per_gw": per_gw} for total, neg_id, per_gw in ranked],
+        "n_exact": n_exact,
+    }
@@ -0,0 +1,107 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.player_model import get_player_position, predict_player_points
+
+# Share of a player's std that comes from a per-position common factor
+# (same weights as predictions/team_advanced.py).
+POS_CORR_WEIGHT = {"GK": 0.15, "DEF": 0.12, "MID": 0.08, "FWD": 0.08}
+DEFAULT_POS_CORR = 0.08
+POSITIONS = ("GK", "DEF", "MID", "FWD")
+
+# Simulations drawn per block; keeps (players x sims) float32 blocks small.
+DEFAULT_CHUNK = 20000
+
+
+def player_point_params(
+    player_ids: Sequence[int],
+    gw: int,
+) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    (means, stds, positions) for player_ids in gw, from predict_player_points.
+    """
+    means = np.zeros(len(player_ids), dtype=np.float64)
+    stds = np.zeros(len(player_ids), dtype=np.float64)
+    positions: List[str] = []
+    for i, pid in enumerate(player_ids):
+        mean, std = predict_player_points(int(pid), gw)
+        means[i] = mean
+        stds[i] = std
+        positions.append(get_player_position(int(pid)))
+    return means, stds, positions
+
+
+def sample_player_matrix(
+    means: np.ndarray,
+    stds: np.ndarray,
+    positions: Sequence[str],
+    n_sims: int,
+    rng: np.random.Generator,
+    pos_corr_weight: Dict[str, float] = POS_CORR_WEIGHT,
+    dtype=np.float32,
+    factor: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> np.ndarray:
+    """
+    Draw a (players x n_sims) matrix of correlated player points.
+
+    Same model as predict_team_points_advanced: each player is normal around
+    his mean, with a share of his std coming from one common factor per
+    position; negative draws are clipped to 0 and players with mean <= 0
+    always score 0. Every caller that simulates several squads should
+    use ONE matrix so shared players get identical draws.
+
+    factor: (loadings, idio) from models.covariance.player_factor; replaces
+    the position factor with the empirical correlation, drawn as one
+    (players x rank) @ (rank x n_sims) matmul.
+    """
+    means = np.asarray(means, dtype=np.float64)
+    stds = np.asarray(stds, dtype=np.float64)
+    n_players = len(means)
+
+    if factor is not None:
+        loadings, idio = factor
+        out = loadings.astype(np.float32) @ rng.standard_normal((loadings.shape[1], n_sims), dtype=np.float32)
+        if np.any(idio > 0):
+            out += idio[:, None].astype(np.float32) * rng.standard_normal((n_players, n_sims), dtype=np.float32)
+        out *= stds[:, None].astype(np.float32)
+        out += means[:, None].astype(np.float32)
+        np.clip(out, 0, None, out=out)
+        out[means <= 0] = 0.0
+        return out.astype(dtype, copy=False)
+
+    corr_w = np.array([pos_corr_weight.get(pos, DEFAULT_POS_CORR) for pos in positions])
+    shared_std = stds * corr_w
+    idio_std = np.sqrt(np.maximum(stds * stds - shared_std * shared_std, 0.0))
+
+    pos_index = {pos: i for i, pos in enumerate(POSITIONS)}
+    pos_rows = np.array([pos_index.get(pos, pos_index["MID"]) for pos in positions], dtype=np.int64)
+    shared_noise = rng.standard_normal((len(POSITIONS), n_sims), dtype=np.float32)
+
+    out = rng.standard_normal((n_players, n_sims), dtype=np.float32)
+    out *= idio_std[:, None].astype(np.float32)
+    out += means[:, None].astype(np.float32)
+    if n_players:
+        out += shared_noise[pos_rows] * shared_std[:, None].astype(np.float32)
+    np.clip(out, 0, None, out=out)
+    out[means <= 0] = 0.0
+    return out.astype(dtype, copy=False)
+
+
+def iter_sample_chunks(
+    means: np.ndarray,
+    stds: np.ndarray,
+    positions: Sequence[str],
+    n_sims: int,
+    rng: np.random.Generator,
+    chunk: int = DEFAULT_CHUNK,
+    factor: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> Iterator[np.ndarray]:
+    """
+    Yield (players x k) sample blocks adding up to n_sims columns.
+    """
+    done = 0
+    while done < n_sims:
+        k = min(chunk, n_sims - done)
+        yield sample_player_matrix(means, stds, positions, k, rng, factor=factor)
+        done += k
@@ -0,0 +1,425 @@
+import argparse
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from db.sqlite import get_connection, init_team_ratings_table
+
+# Dixon–Coles time decay per GW (xi = 0.0065/day ~ 0.045/week).
+RATINGS_DECAY = 0.045
+# L2 penalty on attack / defence: pins the scale and keeps early-season
+# ratings close to average while there are few results.
+RIDGE = 0.5
+RHO_BOUNDS = (-0.2, 0.2)
+MAX_ITER = 500
+DEFAULT_GOALS = 1.35
+DEFAULT_HOME_ADV = 0.2
+TOL = 1e-10
+
+# Continuous difficulty: 3 + scale * log(xG against / xG for), clipped to 1..5.
+DIFFICULTY_SCALE = 1.4
+
+
+@dataclass
+class TeamRatings:
+    """Attack / defence (log scale) per team, fitted on results before GW gw."""
+
+    gw: int
+    team_ids: List[int]
+    attack: np.ndarray
+    defence: np.ndarray
+    home: float
+    intercept: float
+    rho: float
+    n_matches: int = 0
+    iterations: int = 0
+
+    def _idx(self, team_id: int) -> Optional[int]:
+        try:
+            return self.team_ids.index(int(team_id))
+        except ValueError:
+            return None
+
+    def expected_goals(self, team_h: int, team_a: int) -> Tuple[float, float]:
+        """(home, away) expected goals; unknown teams count as average."""
+        h, a = self._idx(team_h), self._idx(team_a)
+        att_h = self.attack[h] if h is not None else 0.0
+        def_h = self.defence[h] if h is not None else 0.0
+        att_a = self.attack[a] if a is not None else 0.0
+        def_a = self.defence[a] if a is not None else 0.0
+        lam_h = float(np.exp(self.intercept + self.home + att_h - def_a))
+        lam_a = float(np.exp(self.intercept + att_a - def_h))
+        return lam_h, lam_a
+
+    def difficulty(self, team_id: int, opp_id: int, is_home: bool) -> float:
+        """Continuous 1..5 difficulty for team_id against opp_id (same direction as FPL FDR)."""
+        if is_home:
+            xg_for, xg_against = self.expected_goals(team_id, opp_id)
+        else:
+            xg_against, xg_for = self.expected_goals(opp_id, team_id)
+        return float(np.clip(3.0 + DIFFICULTY_SCALE * np.log(xg_against / xg_for), 1.0, 5.0))
+
+    def theta(self) -> np.ndarray:
+        return np.concatenate([self.attack, self.defence, [self.home, self.intercept, self.rho]])
+
+
+# -------------------------------------------------
+# LIKELIHOOD
+# -------------------------------------------------
+
+
+def _unpack(theta: np.ndarray, n: int):
+    return theta[:n], theta[n:2 * n], theta[2 * n], theta[2 * n + 1], theta[2 * n + 2]
+
+
+def _terms(theta: np.ndarray, data: Dict[str, np.ndarray], n: int):
+    att, dfn, home, intercept, rho = _unpack(theta, n)
+    hi, ai, hg, ag = data["home_idx"], data["away_idx"], data["home_goals"], data["away_goals"]
+    eta_h = intercept + home + att[hi] - dfn[ai]
+    eta_a = intercept + att[ai] - dfn[hi]
+    lam, mu = np.exp(eta_h), np.exp(eta_a)
+
+    # Dixon–Coles low-score correction tau(x, y) and its partials.
+    tau = np.ones_like(lam)
+    d_lam = np.zeros_like(lam)
+    d_mu = np.zeros_like(lam)
+    d_rho = np.zeros_like(lam)
+    m00 = (hg == 0) & (ag == 0)
+    m01 = (hg == 0) & (ag == 1)
+    m10 = (hg == 1) & (ag == 0)
+    m11 = (hg == 1) & (ag == 1)
+    tau[m00] = 1.0 - lam[m00] * mu[m00] * rho
+    tau[m01] = 1.0 + lam[m01] * rho
+    tau[m10] = 1.0 + mu[m10] * rho
+    tau[m11] = 1.0 - rho
+    d_lam[m00] = -mu[m00] * rho / tau[m00]
+    d_mu[m00] = -lam[m00] * rho / tau[m00]
+    d_rho[m00] = -lam[m00] * mu[m00] / tau[m00]
+    d_lam[m01] = rho / tau[m01]
+    d_rho[m01] = lam[m01] / tau[m01]
+    d_mu[m10] = rho / tau[m10]
+    d_rho[m10] = mu[m10] / tau[m10]
+    d_rho[m11] = -1.0 / tau[m11]
+    return eta_h, eta_a, lam, mu, tau, d_lam, d_mu, d_rho, (m00, m01, m10, m11)
+
+
+def log_likelihood(
+    theta: np.ndarray,
+    data: Dict[str, np.ndarray],
+    n_teams: int,
+    ridge: float = RIDGE,
+) -> float:
+    """Time-weighted Dixon–Coles log-likelihood (constants dropped) minus the ridge penalty."""
+    eta_h, eta_a, lam, mu, tau, *_ = _terms(theta, data, n_teams)
+    if (tau <= 0).any():
+        return -np.inf
+    w = data["weights"]
+    ll = w * (np.log(tau) + data["home_goals"] * eta_h - lam + data["away_goals"] * eta_a - mu)
+    att, dfn = theta[:n_teams], theta[n_teams:2 * n_teams]
+    return float(ll.sum() - 0.5 * ridge * (att @ att + dfn @ dfn))
+
+
+def gradient(
+    theta: np.ndarray,
+    data: Dict[str, np.ndarray],
+    n_teams: int,
+    ridge: float = RIDGE,
+    with_curvature: bool = False,
+):
+    """
+    d log_likelihood / d theta. With with_curvature, also a positive
+    diagonal approximation of the negative Hessian (Fisher information)
+    used to precondition the ascent steps.
+    """
+    n = n_teams
+    _, _, lam, mu, _, d_lam, d_mu, d_rho, masks = _terms(theta, data, n)
+    w = data["weights"]
+    hi, ai = data["home_idx"], data["away_idx"]
+    g_h = w * (data["home_goals"] - lam + lam * d_lam)
+    g_a = w * (data["away_goals"] - mu + mu * d_mu)
+
+    grad = np.empty_like(theta)
+    grad[:n] = np.bincount(hi, g_h, n) + np.bincount(ai, g_a, n) - ridge * theta[:n]
+    grad[n:2 * n] = -np.bincount(ai, g_h, n) - np.bincount(hi, g_a, n) - ridge * theta[n:2 * n]
+    grad[2 * n] = g_h.sum()
+    grad[2 * n + 1] = g_h.sum() + g_a.sum()
+    grad[2 * n + 2] = (w * d_rho).sum()
+    if not with_curvature:
+        return grad
+
+    m00, m01, m10, m11 = masks
+    wl, wm = w * lam, w * mu
+    curv = np.empty_like(theta)
+    curv[:n] = np.bincount(hi, wl, n) + np.bincount(ai, wm, n) + ridge
+    curv[n:2 * n] = np.bincount(ai, wl, n) + np.bincount(hi, wm, n) + ridge
+    curv[2 * n] = wl.sum()
+    curv[2 * n + 1] = wl.sum() + wm.sum()
+    curv[2 * n + 2] = (w * (m00 * (lam * mu) ** 2 + m01 * lam ** 2 + m10 * mu ** 2 + m11)).sum()
+    curv = np.maximum(curv, 1e-6)
+    return grad, curv
+
+
+def _center(theta: np.ndarray, n: int) -> np.ndarray:
+    """Shift mean attack / defence into the intercept (same rates, lower penalty)."""
+    theta = theta.copy()
+    ma, md = theta[:n].mean(), theta[n:2 * n].mean()
+    theta[:n] -= ma
+    theta[n:2 * n] -= md
+    theta[2 * n + 1] += ma - md
+    return theta
+
+
+def fit_theta(
+    data: Dict[str, np.ndarray],
+    n_teams: int,
+    init: Optional[np.ndarray] = None,
+    ridge: float = RIDGE,
+    max_iter: int = MAX_ITER,
+) -> Tuple[np.ndarray, int]:
+    """
+    Maximise log_likelihood by preconditioned gradient ascent with
+    backtracking (rho kept inside RHO_BOUNDS). Returns (theta, iterations).
+    """
+    n = n_teams
+    if init is None:
+        # Without results the ratings stay at this league-average start.
+        init = np.zeros(2 * n + 3)
+        matches = len(data["home_goals"])
+        goals = data["home_goals"].sum() + data["away_goals"].sum()
+        init[2 * n + 1] = np.log(max(goals / (2.0 * matches), 0.1)) if matches else np.log(DEFAULT_GOALS)
+        init[2 * n] = DEFAULT_HOME_ADV
+    theta = _center(np.asarray(init, dtype=np.float64), n)
+    theta[2 * n + 2] = np.clip(theta[2 * n + 2], *RHO_BOUNDS)
+    ll = log_likelihood(theta, data, n, ridge)
+
+    it = 0
+    for it in range(1, max_iter + 1):
+        grad, curv = gradient(theta, data, n, ridge, with_curvature=True)
+        direction = grad / curv
+        step = 1.0
+        while step > 1e-6:
+            candidate = theta + step * direction
+            candidate[2 * n + 2] = np.clip(candidate[2 * n + 2], *RHO_BOUNDS)
+            candidate = _center(candidate, n)
+            cand_ll = log_likelihood(candidate, data, n, ridge)
+            if cand_ll >= ll:
+                break
+            step *= 0.5
+        else:
+            break
+        improved = cand_ll - ll
+        theta, ll = candidate, cand_ll
+        if improved <= TOL * (1.0 + abs(ll)):
+            break
+    return theta, it
+
+
+# -------------------------------------------------
+# DATA
+# -------------------------------------------------
+
+
+def load_results(before_gw: int, conn=None) -> Tuple[List[int], Dict[str, np.ndarray]]:
+    """
+    (team_ids, arrays) of finished fixtures with event < before_gw, weighted
+    by exp(-RATINGS_DECAY * GWs ago) relative to before_gw.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    team_ids = [r[0] for r in conn.execute("SELECT id FROM teams ORDER BY id").fetchall()]
+    rows = conn.execute(
+        """
+        SELECT team_h, team_a, team_h_score, team_a_score, event FROM fixtures
+        WHERE finished = 1 AND event < ? AND team_h_score IS NOT NULL AND team_a_score IS NOT NULL
+        """,
+        (before_gw,),
+    ).fetchall()
+    if own_conn:
+        conn.close()
+
+    index = {tid: i for i, tid in enumerate(team_ids)}
+    rows = [tuple(r) for r in rows if r[0] in index and r[1] in index]
+    arr = np.array(rows, dtype=np.int64).reshape(len(rows), 5)
+    data = {
+        "home_idx": np.array([index[t] for t in arr[:, 0]], dtype=np.int64),
+        "away_idx": np.array([index[t] for t in arr[:, 1]], dtype=np.int64),
+        "home_goals": arr[:, 2].astype(np.float64),
+        "away_goals": arr[:, 3].astype(np.float64),
+        "weights": np.exp(-RATINGS_DECAY * (before_gw - arr[:, 4]).astype(np.float64)),
+    }
+    return team_ids, data
+
+
+def fit_team_ratings(gw: int, conn=None, previous: Optional[TeamRatings] = None) -> TeamRatings:
+    """Ratings for predicting GW gw (results before gw), warm-started from previous."""
+    team_ids, data = load_results(gw, conn=conn)
+    n = len(team_ids)
+    init = None
+    if previous is not None and previous.team_ids == team_ids:
+        init = previous.theta()
+    theta, iterations = fit_theta(data, n, init=init)
+    att, dfn, home, intercept, rho = _unpack(theta, n)
+    return TeamRatings(
+        gw=gw,
+        team_ids=team_ids,
+        attack=att.copy(),
+        defence=dfn.copy(),
+        home=float(home),
+        intercept=float(intercept),
+        rho=float(rho),
+        n_matches=len(data["home_goals"]),
+        iterations=iterations,
+    )
+
+
+# -------------------------------------------------
+# STORAGE
+# -------------------------------------------------
+
+
+def save_ratings(ratings: TeamRatings, conn=None) -> None:
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cur = conn.cursor()
+    init_team_ratings_table(cur)
+    cur.execute("DELETE FROM team_ratings WHERE gw = ?", (ratings.gw,))
+    cur.executemany(
+        """
+        INSERT INTO team_ratings (gw, team_id, attack, defence, home_adv, intercept, rho, n_matches)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (ratings.gw, tid, float(ratings.attack[i]), float(ratings.defence[i]),
+             ratings.home, ratings.intercept, ratings.rho, ratings.n_matches)
+            for i, tid in enumerate(ratings.team_ids)
+        ],
+    )
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+def load_ratings(gw: int, conn=None) -> Optional[TeamRatings]:
+    """Latest stored ratings usable for GW gw (fitted for gw or earlier), else None."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        row = conn.execute("SELECT MAX(gw) FROM team_ratings WHERE gw <= ?", (gw,)).fetchone()
+        if not row or row[0] is None:
+            return None
+        rows = conn.execute(
+            "SELECT team_id, attack, defence, home_adv, intercept, rho, n_matches, gw "
+            "FROM team_ratings WHERE gw = ? ORDER BY team_id",
+            (row[0],),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return None  # table not created yet
+    finally:
+        if own_conn:
+            conn.close()
+    return TeamRatings(
+        gw=rows[0][7],
+        team_ids=[r[0] for r in rows],
+        attack=np.array([r[1] for r in rows], dtype=np.float64),
+        defence=np.array([r[2] for r in rows], dtype=np.float64),
+        home=float(rows[0][3]),
+        intercept=float(rows[0][4]),
+        rho=float(rows[0][5]),
+        n_matches=int(rows[0][6]),
+    )
+
+
+def update_team_ratings(conn=None, through_gw: Optional[int] = None, rebuild: bool = False) -> List[TeamRatings]:
+    """
+    Fit and store ratings for every GW from the last stored one up to
+    through_gw (default: the GW after the last finished fixture). Each fit
+    is warm-started from the previous GW's ratings.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cur = conn.cursor()
+    init_team_ratings_table(cur)
+    if rebuild:
+        cur.execute("DELETE FROM team_ratings")
+    if through_gw is None:
+        last = cur.execute("SELECT MAX(event) FROM fixtures WHERE finished = 1").fetchone()[0]
+        through_gw = int(last or 0) + 1
+    # The last stored GW is refitted too: it may have been fitted while
+    # fixtures of the GW before it were still being played.
+    stored = cur.execute("SELECT MAX(gw) FROM team_ratings").fetchone()[0]
+    start = int(stored) if stored is not None else 1
+    previous = load_ratings(start - 1, conn=conn)
+
+    fitted = []
+    for gw in range(start, through_gw + 1):
+        previous = fit_team_ratings(gw, conn=conn, previous=previous)
+        save_ratings(previous, conn=conn)
+        fitted.append(previous)
+    if own_conn:
+        conn.commit()
+        conn.close()
+    return fitted
+
+
+_RATINGS_CACHE: Dict[int, Optional[TeamRatings]] = {}
+
+
+def cached_ratings(gw: int) -> Optional[TeamRatings]:
+    if gw not in _RATINGS_CACHE:
+        _RATINGS_CACHE[gw] = load_ratings(gw)
+    return _RATINGS_CACHE[gw]
+
+
+def reset_ratings_cache() -> None:
+    _RATINGS_CACHE.clear()
+
+
+def rating_difficulties(team_id: int, gw: int) -> List[float]:
+    """Continuous difficulty of each of team_id's fixtures in gw ([] if no ratings / blank)."""
+    ratings = cached_ratings(gw)
+    if ratings is None:
+        return []
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT team_h, team_a FROM fixtures WHERE event = ? AND (team_h = ? OR team_a = ?) ORDER BY id",
+        (gw, team_id, team_id),
+    ).fetchall()
+    conn.close()
+    return [
+        ratings.difficulty(team_id, r[1] if r[0] == team_id else r[0], r[0] == team_id)
+        for r in rows
+    ]
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit team attack/defence ratings from fixture results.")
+    parser.add_argument("--rebuild", action="store_true", help="Drop stored ratings and refit every GW")
+    parser.add_argument("--gw", type=int, default=None, help="Fit up to this GW (default: next GW)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    fitted = update_team_ratings(through_gw=args.gw, rebuild=args.rebuild)
+    elapsed = time.perf_counter() - started
+    print(f"Fitted {len(fitted)} GWs in {elapsed:.2f}s.")
+    if fitted:
+        r = fitted[-1]
+        print(f"GW{r.gw}: {r.n_matches} results, home {r.home:+.2f}, rho {r.rho:+.3f}")
+        order = np.argsort(-(r.attack + r.defence))
+        for i in order:
+            print(f"  team {r.team_ids[i]:>3}  attack {r.attack[i]:+.2f}  defence {r.defence[i]:+.2f}")
@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from config import COLUMNAR_DIR
+from db.sqlite import get_connection, get_data_version
+
+MANIFEST_NAME = "manifest.json"
+SCHEMA_VERSION = 1
+
+# Exported tables and their row order (None = insertion order).
+# Tables missing from fpl.db are skipped.
+EXPORT_TABLES: Dict[str, Optional[str]] = {
+    "player_history": "player_id, gameweek, id",
+    "player_fixtures": "player_id, event, fixture_id",
+    "player_gw_snapshot": "snapshot_time, player_id",
+    "player_projections": "player_id, gameweek",
+}
+
+# NULL encoding per column kind: ints get a sentinel, floats NaN, text "".
+INT_NULL = int(np.iinfo(np.int64).min)
+
+
+def _column_kind(decl_type: str) -> str:
+    """int / float / text from the declared SQLite type (SQLite affinity rules)."""
+    t = (decl_type or "").upper()
+    if "INT" in t or "BOOL" in t:
+        return "int"
+    if "CHAR" in t or "CLOB" in t or "TEXT" in t:
+        return "text"
+    return "float"
+
+
+def _table_columns(conn, table: str) -> List[Dict[str, str]]:
+    rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    return [{"name": r[1], "sqlite_type": r[2] or "", "kind": _column_kind(r[2])} for r in rows]
+
+
+def _to_array(values: List[Any], kind: str) -> np.ndarray:
+    if kind == "int":
+        return np.array([INT_NULL if v is None else int(v) for v in values], dtype=np.int64)
+    if kind == "float":
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+    texts = ["" if v is None else str(v) for v in values]
+    width = max((len(t) for t in texts), default=0)
+    return np.array(texts, dtype=f"<U{max(width, 1)}")
+
+
+def _read_table(conn, table: str, order_by: Optional[str]) -> Dict[str, np.ndarray]:
+    columns = _table_columns(conn, table)
+    names = ", ".join(c["name"] for c in columns)
+    sql = f"SELECT {names} FROM {table}"
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    rows = conn.execute(sql).fetchall()
+    return {
+        c["name"]: _to_array([r[i] for r in rows], c["kind"])
+        for i, c in enumerate(columns)
+    }
+
+
+# -------------------------------------------------
+# WRITERS
+# -------------------------------------------------
+
+
+def _write_npy(table_dir: Path, arrays: Dict[str, np.ndarray]) -> Dict[str, str]:
+    files = {}
+    for name, arr in arrays.items():
+        fname = f"{name}.npy"
+        np.save(table_dir / fname, arr, allow_pickle=False)
+        files[name] = fname
+    return files
+
+
+def _write_arrow(table_dir: Path, arrays: Dict[str, np.ndarray]) -> Dict[str, str]:
+    import pyarrow as pa
+
+    # Uncompressed IPC file: memory-mapped reads are zero-copy.
+    tbl = pa.table({name: pa.array(arr) for name, arr in arrays.items()})
+    with pa.OSFile(str(table_dir / "table.arrow"), "wb") as sink:
+        with pa.ipc.new_file(sink, tbl.schema) as writer:
+            writer.write_table(tbl)
+    return {name: "table.arrow" for name in arrays}
+
+
+def _arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _read_manifest(out_dir: Path) -> Optional[Dict[str, Any]]:
+    path = out_dir / MANIFEST_NAME
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _table_dirs(manifest: Optional[Dict[str, Any]]) -> set:
+    if manifest is None:
+        return set()
+    return {meta.get("dir", table) for table, meta in manifest["tables"].items()}
+
+
+def export_columnar(
+    out_dir: Path = COLUMNAR_DIR,
+    tables: Optional[Sequence[str]] = None,
+    fmt: str = "npy",
+    conn=None,
+) -> Dict[str, Any]:
+    """
+    Export tables to one directory per table plus manifest.json.
+
+    fmt "npy" writes one .npy per column; "arrow" writes one Arrow IPC file
+    per table (needs pyarrow, falls back to npy without it).
+    Column dtypes come from the declared SQLite types, not from the data:
+    INTEGER/BOOLEAN -> int64 (NULL = INT_NULL), REAL -> float64 (NULL = NaN),
+    TEXT -> fixed-width unicode (NULL = ""), so no file holds Python objects.
+
+    tables: export only these and keep the other tables of an existing
+    export (which must have the same format). The top-level data_version is
+    set only while every table comes from the same one.
+
+    Every export of a table goes to a new directory named in the manifest;
+    the manifest is replaced atomically and the directories it no longer
+    names are removed after it. A reader that loads the manifest sees
+    either the old or the new export, as long as it opens the files before
+    the next export removes them.
+    Returns the manifest.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    if fmt == "arrow" and not _arrow_available():
+        print("[export_columnar] pyarrow not installed, writing .npy files.")
+        fmt = "npy"
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    previous = _read_manifest(out_dir)
+    if tables is not None and previous is not None and previous.get("format") != fmt:
+        if own_conn:
+            conn.close()
+        raise ValueError(
+            f"Existing export in {out_dir} is {previous.get('format')!r}; "
+            f"re-export all tables to switch it to {fmt!r}."
+        )
+    existing = {
+        r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    }
+    wanted = list(tables) if tables is not None else list(EXPORT_TABLES)
+    data_version = get_data_version(conn=conn)
+    exported_at = datetime.now(timezone.utc)
+    stamp = exported_at.strftime("%Y%m%dT%H%M%S%f")
+
+    manifest: Dict[str, Any] = {
+        "schema_version": SCHEMA_VERSION,
+        "format": fmt,
+        "data_version": data_version,
+        "exported_at": exported_at.isoformat(),
+        "int_null": INT_NULL,
+        "tables": dict(previous["tables"]) if tables is not None and previous is not None else {},
+    }
+    try:
+        for table in wanted:
+            if table not in existing:
+                continue
+            columns = _table_columns(conn, table)
+            arrays = _read_table(conn, table, EXPORT_TABLES.get(table))
+
+            dir_name = f"{table}.{stamp}"
+            tmp_dir = out_dir / f".{dir_name}.tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            tmp_dir.mkdir()
+            files = _write_arrow(tmp_dir, arrays) if fmt == "arrow" else _write_npy(tmp_dir, arrays)
+            tmp_dir.rename(out_dir / dir_name)
+
+            n_rows = len(next(iter(arrays.values()))) if arrays else 0
+            manifest["tables"][table] = {
+                "dir": dir_name,
+                "rows": n_rows,
+                "order_by": EXPORT_TABLES.get(table),
+                "data_version": data_version,
+                "columns": {
+                    c["name"]: {
+                        "dtype": arrays[c["name"]].dtype.str,
+                        "sqlite_type": c["sqlite_type"],
+                        "file": files[c["name"]],
+                    }
+                    for c in columns
+                },
+            }
+    finally:
+        if own_conn:
+            conn.close()
+
+    # Tables kept from an older export may carry another data_version
+    # (exports before per-table versions only have the top-level one).
+    old_version = previous.get("data_version") if previous is not None else None
+    if any(meta.get("data_version", old_version) != data_version for meta in manifest["tables"].values()):
+        manifest["data_version"] = None
+
+    tmp_manifest = out_dir / f".{MANIFEST_NAME}.tmp"
+    tmp_manifest.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp_manifest, out_dir / MANIFEST_NAME)
+    for stale in _table_dirs(previous) - _table_dirs(manifest):
+        shutil.rmtree(out_dir / stale, ignore_errors=True)
+    return manifest
+
+
+# -------------------------------------------------
+# LOADER
+# -------------------------------------------------
+
+
+def load_manifest(out_dir: Path = COLUMNAR_DIR) -> Dict[str, Any]:
+    path = Path(out_dir) / MANIFEST_NAME
+    if not path.exists():
+        raise FileNotFoundError(f"No columnar export at {out_dir}; run pipeline/export_columnar.py first.")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def load_columnar(
+    table: str,
+    columns: Optional[Sequence[str]] = None,
+    out_dir: Path = COLUMNAR_DIR,
+    manifest: Optional[Dict[str, Any]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Column name -> read-only array for an exported table.
+
+    .npy exports are memory-mapped (np.load(mmap_mode="r")): nothing is read
+    until a column is touched. Arrow exports are memory-mapped through
+    pyarrow; numeric columns are zero-copy, text columns are materialised.
+    Works with pd.DataFrame(load_columnar(...)) directly.
+    """
+    out_dir = Path(out_dir)
+    manifest = manifest or load_manifest(out_dir)
+    meta = manifest["tables"].get(table)
+    if meta is None:
+        raise KeyError(f"Table {table!r} not in columnar export (have: {sorted(manifest['tables'])}).")
+    names = list(columns) if columns is not None else list(meta["columns"])
+    missing = [c for c in names if c not in meta["columns"]]
+    if missing:
+        raise KeyError(f"Columns {missing} not in exported {table}.")
+    table_dir = meta.get("dir", table)
+
+    if manifest.get("format") == "arrow":
+        import pyarrow as pa
+
+        source = pa.memory_map(str(out_dir / table_dir / "table.arrow"), "r")
+        tbl = pa.ipc.open_file(source).read_all()
+        return {c: tbl.column(c).to_numpy() for c in names}
+
+    return {
+        c: np.load(out_dir / table_dir / meta["columns"][c]["file"], mmap_mode="r", allow_pickle=False)
+        for c in names
+    }
+
+
+def columnar_is_current(out_dir: Path = COLUMNAR_DIR, conn=None) -> bool:
+    """True if the export exists and all of it matches the data_version of fpl.db."""
+    try:
+        manifest = load_manifest(out_dir)
+    except FileNotFoundError:
+        return False
+    return manifest.get("data_version") == get_data_version(conn=conn)
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export fpl.db tables to memory-mappable column files.")
+    parser.add_argument("--out", type=Path, default=COLUMNAR_DIR)
+    parser.add_argument("--tables", nargs="*", default=None, help=f"Default: {', '.join(EXPORT_TABLES)}")
+    parser.add_argument("--format", choices=("npy", "arrow"), default="npy")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    out = export_columnar(args.out, tables=args.tables, fmt=args.format)
+    for name, meta in out["tables"].items():
+        print(f"{name}: {meta['rows']:,} rows, {len(meta['columns'])} columns")
+    print(f"Exported to {args.out} (data_version {out['data_version']}) in {time.perf_counter() - started:.2f}s")
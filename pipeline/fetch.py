@@ -63,12 +63,17 @@ def fetch_fixtures() -> List[Dict[str, Any]]:
     return data
 
 
-def fetch_player_summary(player_id: int, session: requests.Session | None = None) -> Dict[str, Any]:
+def fetch_player_summary(
+    player_id: int,
+    session: requests.Session | None = None,
+    write: bool = True,
+) -> Dict[str, Any]:
     ensure_dirs()
     url = PLAYER_SUMMARY_URL.format(player_id=player_id)
     sess = session or _requests_session()
     resp = sess.get(url, timeout=DEFAULT_TIMEOUT)
     resp.raise_for_status()
     data = resp.json()
-    (PLAYERS_DIR / f"{player_id}.json").write_text(json.dumps(data, indent=2), encoding="utf-8")
+    if write:
+        (PLAYERS_DIR / f"{player_id}.json").write_text(json.dumps(data, indent=2), encoding="utf-8")
     return data
@@ -99,8 +99,8 @@ def replace_player_history(rows: Iterable[Tuple], conn=None):
             penalties_missed, penalties_saved, yellow_cards, red_cards,
             selected, transfers_balance, value, fixture,
             opponent_team, home_score, away_score, home, bonus_points,
-            expected_goals, expected_assists, transfers_in, transfers_out, modified, kickoff_time
-        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+            expected_goals, expected_assists, transfers_in, transfers_out, modified, kickoff_time, saves
+        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
     """, rows)
     if own_conn:
         conn.commit()
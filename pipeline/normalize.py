@@ -174,6 +174,7 @@ def normalize_player_history(player_id: int, player_summary: Dict[str, Any]) ->
             gw.get("transfers_out", 0),
             gw.get("modified"),
             gw.get("kickoff_time"),
+            gw.get("saves", 0),
         ))
     return rows
 
@@ -0,0 +1,234 @@
+import argparse
+import gzip
+import json
+import os
+import struct
+import sys
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from pipeline.fetch import RAW_DIR
+
+ARCHIVE_DIR = RAW_DIR / "archive"
+PACK_SUFFIX = ".pack"
+
+# Pack layout:
+#   HEADER_MAGIC
+#   record 0 .. record n-1     each one independently compressed JSON payload
+#   index                      zlib JSON {"codec", "run_id", "entries": {key: [offset, length]}}
+#   footer                     <index offset u64><index length u64> FOOTER_MAGIC
+# A record is read with one seek + one decompress, no matter how big the pack is.
+HEADER_MAGIC = b"FPLPACK1"
+FOOTER_MAGIC = b"FPLPEND1"
+FOOTER = struct.Struct("<QQ8s")
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def default_codec() -> str:
+    return "zstd" if _zstd() is not None else "gzip"
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return _zstd().ZstdCompressor(level=10).compress(data)
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        zstd = _zstd()
+        if zstd is None:
+            raise RuntimeError("Pack is zstd-compressed; pip install zstandard to read it.")
+        return zstd.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+def run_id_from_time(snapshot_time: str) -> str:
+    """'2025-08-20T10:00:00.123+00:00' -> '20250820T100000Z' (sortable file name)."""
+    return datetime.fromisoformat(snapshot_time).strftime("%Y%m%dT%H%M%SZ")
+
+
+def player_key(player_id: int) -> str:
+    return f"element-summary/{int(player_id)}"
+
+
+# -------------------------------------------------
+# WRITER
+# -------------------------------------------------
+
+
+class RawPackWriter:
+    """
+    Append-only writer for one update run.
+
+    Payloads go to <run_id>.pack.tmp and the file is renamed to <run_id>.pack
+    on close(), so a crashed run never leaves a half-written pack behind.
+    Use as a context manager; an exception discards the pack.
+    """
+
+    def __init__(self, run_id: str, archive_dir: Path = ARCHIVE_DIR, codec: Optional[str] = None):
+        self.run_id = run_id
+        self.codec = codec or default_codec()
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.archive_dir / f"{run_id}{PACK_SUFFIX}"
+        if self.path.exists():
+            raise FileExistsError(f"Raw pack {self.path} already exists; packs are never overwritten.")
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._fh = open(self._tmp_path, "wb")
+        self._fh.write(HEADER_MAGIC)
+        self._entries: Dict[str, Tuple[int, int]] = {}
+
+    def add(self, key: str, payload: Any) -> None:
+        if key in self._entries:
+            raise KeyError(f"Duplicate key {key!r} in raw pack {self.run_id}.")
+        data = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        blob = _compress(self.codec, data)
+        offset = self._fh.tell()
+        self._fh.write(blob)
+        self._entries[key] = (offset, len(blob))
+
+    def close(self) -> Path:
+        index = zlib.compress(json.dumps({
+            "codec": self.codec,
+            "run_id": self.run_id,
+            "entries": self._entries,
+        }).encode("utf-8"))
+        index_offset = self._fh.tell()
+        self._fh.write(index)
+        self._fh.write(FOOTER.pack(index_offset, len(index), FOOTER_MAGIC))
+        self._fh.close()
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        self._fh.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "RawPackWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+# -------------------------------------------------
+# READER
+# -------------------------------------------------
+
+
+class RawPackReader:
+    """Random access to one pack: only the index and the requested record are read."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as fh:
+            if fh.read(len(HEADER_MAGIC)) != HEADER_MAGIC:
+                raise ValueError(f"{self.path} is not a raw pack.")
+            fh.seek(-FOOTER.size, os.SEEK_END)
+            index_offset, index_len, magic = FOOTER.unpack(fh.read(FOOTER.size))
+            if magic != FOOTER_MAGIC:
+                raise ValueError(f"{self.path} has no index (incomplete pack).")
+            fh.seek(index_offset)
+            index = json.loads(zlib.decompress(fh.read(index_len)))
+        self.codec: str = index["codec"]
+        self.run_id: str = index["run_id"]
+        self._entries: Dict[str, List[int]] = index["entries"]
+
+    def keys(self) -> List[str]:
+        return list(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Any:
+        if key not in self._entries:
+            raise KeyError(f"{key!r} not in raw pack {self.run_id}.")
+        offset, length = self._entries[key]
+        with open(self.path, "rb") as fh:
+            fh.seek(offset)
+            blob = fh.read(length)
+        return json.loads(_decompress(self.codec, blob))
+
+    def iter_prefix(self, prefix: str) -> Iterator[Tuple[str, Any]]:
+        """(key, payload) for every key starting with prefix, in file order, one open file."""
+        keys = sorted((k for k in self._entries if k.startswith(prefix)), key=lambda k: self._entries[k][0])
+        with open(self.path, "rb") as fh:
+            for key in keys:
+                offset, length = self._entries[key]
+                fh.seek(offset)
+                yield key, json.loads(_decompress(self.codec, fh.read(length)))
+
+    def iter_player_summaries(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """(player_id, element-summary payload), e.g. to re-run normalize_player_history on an old run."""
+        for key, payload in self.iter_prefix("element-summary/"):
+            yield int(key.rsplit("/", 1)[1]), payload
+
+
+# -------------------------------------------------
+# RUNS
+# -------------------------------------------------
+
+
+def list_runs(archive_dir: Path = ARCHIVE_DIR) -> List[str]:
+    """Run IDs of complete packs, oldest first."""
+    archive_dir = Path(archive_dir)
+    if not archive_dir.exists():
+        return []
+    return sorted(p.name[: -len(PACK_SUFFIX)] for p in archive_dir.glob(f"*{PACK_SUFFIX}"))
+
+
+def open_run(run_id: Optional[str] = None, archive_dir: Path = ARCHIVE_DIR) -> RawPackReader:
+    """Reader for run_id, or for the latest run."""
+    runs = list_runs(archive_dir)
+    if not runs:
+        raise FileNotFoundError(f"No raw packs in {archive_dir}.")
+    run_id = run_id or runs[-1]
+    if run_id not in runs:
+        raise FileNotFoundError(f"Raw pack {run_id} not found in {archive_dir}.")
+    return RawPackReader(Path(archive_dir) / f"{run_id}{PACK_SUFFIX}")
+
+
+def load_raw(key: str, run_id: Optional[str] = None, archive_dir: Path = ARCHIVE_DIR) -> Any:
+    return open_run(run_id, archive_dir).get(key)
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect raw FPL payload packs.")
+    parser.add_argument("--run", default=None, help="Run ID (default: latest)")
+    parser.add_argument("--key", default=None, help="e.g. bootstrap_static, fixtures, element-summary/414")
+    parser.add_argument("--list", action="store_true", help="List runs")
+    args = parser.parse_args()
+
+    if args.list:
+        for run in list_runs():
+            path = ARCHIVE_DIR / f"{run}{PACK_SUFFIX}"
+            print(f"{run}  {path.stat().st_size / 1e6:.1f} MB")
+    elif args.key:
+        print(json.dumps(load_raw(args.key, args.run), indent=2))
+    else:
+        reader = open_run(args.run)
+        print(f"{reader.run_id} ({reader.codec}): {len(reader.keys())} payloads")
@@ -3,7 +3,11 @@ import json
 import time
 from datetime import datetime, timezone
 
-from db.sqlite import init_db, get_connection
+from db.snapshots import compact_snapshots
+from db.sqlite import init_db, get_connection, set_data_version
+from models.projections import update_player_projections
+from models.team_ratings import update_team_ratings
+from pipeline.export_columnar import export_columnar
 from pipeline.fetch import (
     fetch_bootstrap_static,
     fetch_fixtures,
@@ -30,6 +34,7 @@ from pipeline.load_to_sqlite import (
     replace_player_history_past,
     append_player_gw_snapshot,
 )
+from pipeline.raw_archive import RawPackWriter, player_key, run_id_from_time
 from pipeline.schema_checker import check_schema_change
 
 RAW_DIR = Path(__file__).resolve().parent.parent / "data" / "raw"
@@ -58,6 +63,11 @@ def update_fpl_data():
     snapshot_time = datetime.now(timezone.utc).isoformat()
     snapshot_rows = normalize_player_gw_snapshot(bootstrap, snapshot_time=snapshot_time)
 
+    # Raw payloads of this run go to one compressed pack (data/raw/archive/).
+    pack = RawPackWriter(run_id_from_time(snapshot_time))
+    pack.add("bootstrap_static", bootstrap)
+    pack.add("fixtures", fixtures_raw)
+
     conn = get_connection()
     try:
         conn.execute("BEGIN")
@@ -72,9 +82,12 @@ def update_fpl_data():
 
         print("Writing fixtures...")
         replace_fixtures(fixtures_rows, conn=conn)
+        print("Refitting team ratings...")
+        update_team_ratings(conn=conn)
 
         print("Writing player GW snapshot...")
         append_player_gw_snapshot(snapshot_rows, conn=conn)
+        compact_snapshots(conn=conn)
 
         print("Fetching player history (this might take a while)...")
         all_history_rows = []
@@ -83,7 +96,8 @@ def update_fpl_data():
         session = create_session()
         for p in bootstrap["elements"]:
             pid = p["id"]
-            summary = fetch_player_summary(pid, session=session)
+            summary = fetch_player_summary(pid, session=session, write=False)
+            pack.add(player_key(pid), summary)
             all_history_rows.extend(normalize_player_history(pid, summary))
             all_player_fixtures_rows.extend(normalize_player_fixtures(pid, summary))
             all_history_past_rows.extend(normalize_player_history_past(pid, summary))
@@ -96,8 +110,25 @@ def update_fpl_data():
         print("Writing player history past...")
         replace_player_history_past(all_history_past_rows, conn=conn)
 
+        pack.close()
+        pack = None
         conn.commit()
+
+        # After the commit: the player model reads the new history through
+        # its own connections.
+        print("Refreshing player projections...")
+        update_player_projections(conn=conn)
+
+        # Stamped last, in the same commit as the projections: a new
+        # data_version means everything derived from this run is written.
+        set_data_version(snapshot_time, conn=conn)
+        conn.commit()
+
+        print("Exporting columnar files...")
+        export_columnar(conn=conn)
     finally:
+        if pack is not None:
+            pack.abort()
         conn.close()
 
     print("Done. fpl.db is updated.")
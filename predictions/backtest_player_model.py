@@ -4,8 +4,6 @@ from pathlib import Path
 from typing import Dict, Any, List, Tuple
 
 import numpy as np
-from rich.console import Console
-from rich.table import Table
 
 if __package__ is None or __package__ == "":
     sys.path.append(str(Path(__file__).resolve().parents[1]))
@@ -71,14 +69,14 @@ def _metrics(rows: List[Tuple[float, float]]) -> Dict[str, float]:
     }
 
 
-def run_backtest(gw_from: int, gw_to: int) -> Dict[str, Any]:
+def run_backtest(gw_from: int, gw_to: int, as_of: bool = False) -> Dict[str, Any]:
     eval_rows = _load_eval_rows(gw_from, gw_to)
     overall_pairs: List[Tuple[float, float]] = []
     by_pos_pairs: Dict[str, List[Tuple[float, float]]] = {"GK": [], "DEF": [], "MID": [], "FWD": []}
     misses: List[Dict[str, Any]] = []
 
     for row in eval_rows:
-        pred, _ = predict_player_points(row["player_id"], row["gw"])
+        pred, _ = predict_player_points(row["player_id"], row["gw"], as_of=as_of)
         actual = row["actual"]
         overall_pairs.append((pred, actual))
         by_pos_pairs.setdefault(row["pos"], []).append((pred, actual))
@@ -105,6 +103,9 @@ def run_backtest(gw_from: int, gw_to: int) -> Dict[str, Any]:
 
 
 def render(result: Dict[str, Any], gw_from: int, gw_to: int):
+    from rich.console import Console
+    from rich.table import Table
+
     console = Console()
     title = f"Player Model Backtest GW{gw_from}-GW{gw_to} (n={result['n']})"
 
@@ -147,12 +148,13 @@ def main():
     parser = argparse.ArgumentParser(description="Backtest player predicted points vs actual points.")
     parser.add_argument("--gw-from", type=int, required=True)
     parser.add_argument("--gw-to", type=int, required=True)
+    parser.add_argument("--as-of", action="store_true", help="Point-in-time player features (no end-of-season leakage)")
     args = parser.parse_args()
 
     if args.gw_to < args.gw_from:
         parser.error("--gw-to must be >= --gw-from")
 
-    result = run_backtest(args.gw_from, args.gw_to)
+    result = run_backtest(args.gw_from, args.gw_to, as_of=args.as_of)
     render(result, args.gw_from, args.gw_to)
 
 
@@ -0,0 +1,105 @@
+import argparse
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from db.sqlite import get_connection
+from models.bonus_model import add_bps_inputs, fixture_squad_ids, sample_bonus
+from models.match_sim import MATCH_HISTORY_N, load_match_inputs, simulate_match_events, slots_to_players
+
+
+def _history_bonus_per_fixture(gw: int) -> float:
+    """Bonus points handed out per finished fixture in the last MATCH_HISTORY_N GWs."""
+    conn = get_connection()
+    bonus = conn.execute(
+        "SELECT SUM(bonus_points) FROM player_history WHERE gameweek >= ? AND gameweek < ?",
+        (gw - MATCH_HISTORY_N, gw),
+    ).fetchone()[0]
+    fixtures = conn.execute(
+        "SELECT COUNT(*) FROM fixtures WHERE finished = 1 AND event >= ? AND event < ?",
+        (gw - MATCH_HISTORY_N, gw),
+    ).fetchone()[0]
+    conn.close()
+    return float(bonus or 0) / fixtures if fixtures else 0.0
+
+
+def run_calibration(player_ids: List[int], gw: int, n_sims: int = 20000, seed: int = 0) -> Dict[str, Any]:
+    """
+    Simulated BPS bonus (models.bonus_model) against each player's bonus per
+    appearance in player_history, plus bonus per fixture on both sides.
+    """
+    inputs = add_bps_inputs(load_match_inputs(fixture_squad_ids(player_ids, gw), gw))
+    rng = np.random.default_rng(seed)
+    events = simulate_match_events(inputs, n_sims, rng)
+    bonus = sample_bonus(inputs, events, rng)
+    played = slots_to_players(inputs, events["played"].astype(np.float32)) > 0
+
+    history = np.zeros(len(inputs["player_ids"]))
+    history[inputs["slot_player"]] = inputs["bonus"]
+    rows = []
+    for i, pid in enumerate(player_ids):
+        appeared = played[i]
+        simulated = float(bonus[i][appeared].mean()) if appeared.any() else 0.0
+        rows.append({
+            "id": pid,
+            "pos": inputs["positions"][i],
+            "p_play": float(appeared.mean()),
+            "history": float(history[i]),
+            "simulated": simulated,
+            "gap": simulated - float(history[i]),
+        })
+    n_fixtures = len(np.unique(inputs["slot_fixture"]))
+    return {
+        "rows": rows,
+        "sim_per_fixture": float(bonus.sum(axis=0).mean()) / n_fixtures if n_fixtures else 0.0,
+        "history_per_fixture": _history_bonus_per_fixture(gw),
+    }
+
+
+def render(result: Dict[str, Any], gw: int):
+    from rich.console import Console
+    from rich.table import Table
+
+    console = Console()
+    t = Table(title=f"Bonus per appearance GW{gw}: simulated BPS vs history")
+    t.add_column("Player", justify="right")
+    t.add_column("Pos", justify="center")
+    t.add_column("P(play)", justify="right")
+    t.add_column("History", justify="right")
+    t.add_column("Simulated", justify="right")
+    t.add_column("Gap", justify="right")
+    for row in result["rows"]:
+        t.add_row(
+            str(row["id"]),
+            row["pos"],
+            f"{row['p_play']:.2f}",
+            f"{row['history']:.2f}",
+            f"{row['simulated']:.2f}",
+            f"{row['gap']:+.2f}",
+        )
+    console.print(t)
+    console.print(
+        f"Bonus per fixture: simulated {result['sim_per_fixture']:.1f}, "
+        f"history {result['history_per_fixture']:.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare simulated BPS bonus with bonus per appearance in history.")
+    parser.add_argument("--team", required=True, help="Comma-separated player IDs")
+    parser.add_argument("--gw", type=int, required=True)
+    parser.add_argument("--sims", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ids = [int(x.strip()) for x in args.team.split(",") if x.strip()]
+    render(run_calibration(ids, args.gw, n_sims=args.sims, seed=args.seed), args.gw)
+
+
+if __name__ == "__main__":
+    main()
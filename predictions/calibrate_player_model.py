@@ -6,8 +6,6 @@ from pathlib import Path
 from typing import Dict, Any, List, Tuple
 
 import numpy as np
-from rich.console import Console
-from rich.table import Table
 
 if __package__ is None or __package__ == "":
     sys.path.append(str(Path(__file__).resolve().parents[1]))
@@ -42,10 +40,10 @@ def _load_eval_rows(gw_from: int, gw_to: int) -> List[Dict[str, Any]]:
     ]
 
 
-def _mae(params: Dict[str, float], rows: List[Dict[str, Any]]) -> float:
+def _mae(params: Dict[str, float], rows: List[Dict[str, Any]], as_of: bool = False) -> float:
     errs = []
     for row in rows:
-        pred, _ = predict_player_points(row["player_id"], row["gw"], params=params)
+        pred, _ = predict_player_points(row["player_id"], row["gw"], params=params, as_of=as_of)
         errs.append(abs(pred - row["actual"]))
     return float(np.mean(errs)) if errs else 0.0
 
@@ -59,18 +57,20 @@ def _build_grid() -> List[Dict[str, float]]:
             for shrink_k in [8.0, 12.0]:
                 for fixture_scale in [0.90, 1.10]:
                     for dgw_factor in [0.78, 0.84]:
-                        p = dict(DEFAULT_MODEL_PARAMS)
-                        p["recent_decay"] = recent_decay
-                        p["w_recent"] = w_recent
-                        p["w_anchor"] = w_anchor
-                        p["w_season"] = w_season
-                        p["shrink_k"] = shrink_k
-                        p["dgw_minutes_factor"] = dgw_factor
-                        p["fixture_w_gk"] *= fixture_scale
-                        p["fixture_w_def"] *= fixture_scale
-                        p["fixture_w_mid"] *= fixture_scale
-                        p["fixture_w_fwd"] *= fixture_scale
-                        grid.append(p)
+                        for use_ratings in [0.0, 1.0]:
+                            p = dict(DEFAULT_MODEL_PARAMS)
+                            p["recent_decay"] = recent_decay
+                            p["w_recent"] = w_recent
+                            p["w_anchor"] = w_anchor
+                            p["w_season"] = w_season
+                            p["shrink_k"] = shrink_k
+                            p["dgw_minutes_factor"] = dgw_factor
+                            p["fixture_use_ratings"] = use_ratings
+                            p["fixture_w_gk"] *= fixture_scale
+                            p["fixture_w_def"] *= fixture_scale
+                            p["fixture_w_mid"] *= fixture_scale
+                            p["fixture_w_fwd"] *= fixture_scale
+                            grid.append(p)
     return grid
 
 
@@ -79,6 +79,7 @@ def calibrate(
     gw_to: int,
     sample_size: int,
     seed: int,
+    as_of: bool = False,
 ) -> Dict[str, Any]:
     rows = _load_eval_rows(gw_from, gw_to)
     rng = random.Random(seed)
@@ -86,12 +87,12 @@ def calibrate(
         rows = rng.sample(rows, sample_size)
 
     baseline_params = dict(DEFAULT_MODEL_PARAMS)
-    baseline_mae = _mae(baseline_params, rows)
+    baseline_mae = _mae(baseline_params, rows, as_of=as_of)
 
     grid = _build_grid()
     scored: List[Tuple[float, Dict[str, float]]] = []
     for params in grid:
-        score = _mae(params, rows)
+        score = _mae(params, rows, as_of=as_of)
         scored.append((score, params))
     scored.sort(key=lambda x: x[0])
 
@@ -107,10 +108,14 @@ def calibrate(
         "gw_to": gw_to,
         "sample_size": sample_size,
         "seed": seed,
+        "as_of": as_of,
     }
 
 
 def render(result: Dict[str, Any]) -> None:
+    from rich.console import Console
+    from rich.table import Table
+
     console = Console()
     t = Table(title="Player Model Calibration")
     t.add_column("Metric")
@@ -131,6 +136,7 @@ def render(result: Dict[str, Any]) -> None:
     top.add_column("shrink_k", justify="right")
     top.add_column("fix_mid", justify="right")
     top.add_column("dgw", justify="right")
+    top.add_column("ratings", justify="right")
     for i, (mae, params) in enumerate(result["top5"], start=1):
         top.add_row(
             str(i),
@@ -141,6 +147,7 @@ def render(result: Dict[str, Any]) -> None:
             f"{params['shrink_k']:.1f}",
             f"{params['fixture_w_mid']:.3f}",
             f"{params['dgw_minutes_factor']:.2f}",
+            "yes" if params.get("fixture_use_ratings", 0.0) >= 0.5 else "no",
         )
     console.print(top)
 
@@ -152,6 +159,7 @@ def main():
     parser.add_argument("--sample-size", type=int, default=1200)
     parser.add_argument("--seed", type=int, default=42)
     parser.add_argument("--write", action="store_true", help="Write best params to models/player_model_params.json")
+    parser.add_argument("--as-of", action="store_true", help="Point-in-time player features (no end-of-season leakage)")
     args = parser.parse_args()
 
     if args.gw_to < args.gw_from:
@@ -162,10 +170,13 @@ def main():
         gw_to=args.gw_to,
         sample_size=args.sample_size,
         seed=args.seed,
+        as_of=args.as_of,
     )
     render(result)
 
     if args.write:
+        from rich.console import Console
+
         PARAMS_PATH.write_text(
             json.dumps(result["best_params"], indent=2, ensure_ascii=False),
             encoding="utf-8",
@@ -0,0 +1,467 @@
+import argparse
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from db.sqlite import get_connection
+from models.match_sim import POS_MAP
+from models.projections import projection_matrix
+from models.sampling import sample_player_matrix
+from utils.ai_transfer_validator import MAX_PER_CLUB
+from utils.transfer_search import XI_BOUNDS
+
+CHIPS = ("WC", "FH", "BB", "TC")
+SQUAD_SHAPE = {"GK": 2, "DEF": 5, "MID": 5, "FWD": 3}
+# GWs a Wildcard squad is picked for and credited over: beyond that, free
+# transfers are assumed to keep the held squad level with it.
+WC_HORIZON = 6
+# Free Hit / Wildcard squads are picked from the current squad plus the best
+# available players per position by season points.
+CANDIDATES_PER_POS = 30
+GAIN_SIMS = 2000
+GAIN_QUANTILES = (10, 50, 90)
+UNAVAILABLE = ("i", "s", "u", "o")
+
+
+# -------------------------------------------------
+# INPUTS
+# -------------------------------------------------
+
+
+def load_planner_pool(squad_ids: Sequence[int], conn=None) -> Dict[str, Any]:
+    """
+    squad_ids first, then the top CANDIDATES_PER_POS available players per
+    position by total_points: ids, positions, teams, prices.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    ids = [int(p) for p in squad_ids]
+    marks = ",".join("?" for _ in ids) or "NULL"
+    status_marks = ",".join("?" for _ in UNAVAILABLE)
+    rows = conn.execute(
+        f"""
+        SELECT id, team_id, element_type, now_cost FROM players WHERE id IN ({marks})
+        UNION ALL
+        SELECT id, team_id, element_type, now_cost FROM (
+            SELECT id, team_id, element_type, now_cost,
+                   ROW_NUMBER() OVER (PARTITION BY element_type ORDER BY total_points DESC, id) AS rn
+            FROM players
+            WHERE status NOT IN ({status_marks}) AND id NOT IN ({marks})
+        ) WHERE rn <= ?
+        """,
+        ids + list(UNAVAILABLE) + ids + [CANDIDATES_PER_POS],
+    ).fetchall()
+    if own_conn:
+        conn.close()
+
+    by_id = {r[0]: r for r in rows}
+    order = [pid for pid in ids if pid in by_id] + [r[0] for r in rows if r[0] not in set(ids)]
+    return {
+        "player_ids": order,
+        "positions": [POS_MAP.get(by_id[pid][2], "MID") for pid in order],
+        "teams": np.array([by_id[pid][1] or -1 for pid in order], dtype=np.int64),
+        "prices": np.array([float(by_id[pid][3] or 0.0) for pid in order]),
+    }
+
+
+def gw_structure(gws: Sequence[int], conn=None) -> List[Dict[str, Any]]:
+    """Blank and double teams per GW from fixtures."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    marks = ",".join("?" for _ in gws) or "NULL"
+    rows = conn.execute(
+        f"""
+        SELECT event, team, COUNT(*) FROM (
+            SELECT event, team_h AS team FROM fixtures WHERE event IN ({marks})
+            UNION ALL
+            SELECT event, team_a FROM fixtures WHERE event IN ({marks})
+        ) GROUP BY event, team
+        """,
+        list(gws) + list(gws),
+    ).fetchall()
+    teams = [r[0] for r in conn.execute("SELECT id FROM teams ORDER BY id").fetchall()]
+    if own_conn:
+        conn.close()
+
+    counts = {(g, t): n for g, t, n in rows}
+    return [
+        {
+            "gw": g,
+            "blank": [t for t in teams if counts.get((g, t), 0) == 0],
+            "double": [t for t in teams if counts.get((g, t), 0) >= 2],
+        }
+        for g in gws
+    ]
+
+
+def season_matrix(player_ids: Sequence[int], gws: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """(players x gws) means and stds from the player model (blank GW = 0, double = both fixtures)."""
+    if not gws:
+        return np.zeros((len(player_ids), 0)), np.zeros((len(player_ids), 0))
+    proj = projection_matrix(min(gws), max(gws))
+    rows = proj.rows(player_ids)
+    cols = [g - proj.gws[0] for g in gws]
+    return proj.mean[np.ix_(rows, cols)], proj.std[np.ix_(rows, cols)]
+
+
+# -------------------------------------------------
+# SQUADS
+# -------------------------------------------------
+
+
+def pick_xi(rows: Sequence[int], positions: Sequence[str], scores: np.ndarray) -> Tuple[List[int], int]:
+    """
+    (XI rows, captain row) of a squad by score, with the same formation rule
+    as utils.transfer_search.best_xi_points.
+    """
+    order = sorted(rows, key=lambda r: (-scores[r], r))
+    xi: List[int] = []
+    rest: List[int] = []
+    for pos, (lo, hi) in XI_BOUNDS.items():
+        at_pos = [r for r in order if positions[r] == pos]
+        xi.extend(at_pos[:lo])
+        rest.extend(at_pos[lo:hi])
+    rest.sort(key=lambda r: (-scores[r], r))
+    xi.extend(rest[: max(0, 11 - len(xi))])
+    captain = max(xi, key=lambda r: (scores[r], -r)) if xi else -1
+    return xi, captain
+
+
+def select_squad(
+    scores: np.ndarray,
+    prices: np.ndarray,
+    positions: Sequence[str],
+    teams: np.ndarray,
+    budget: float,
+) -> Tuple[int, ...]:
+    """
+    15-man squad (SQUAD_SHAPE, MAX_PER_CLUB) for the given scores within budget:
+    greedy by score, then the cheapest-per-point downgrades until it fits,
+    bench players cut to the cheapest options and the money put back into
+    the XI. A heuristic, not an exact knapsack.
+    """
+    n = len(scores)
+    chosen: List[int] = []
+    need = dict(SQUAD_SHAPE)
+    clubs: Dict[int, int] = {}
+    for r in sorted(range(n), key=lambda r: (-scores[r], prices[r], r)):
+        if need.get(positions[r], 0) > 0 and clubs.get(teams[r], 0) < MAX_PER_CLUB:
+            chosen.append(r)
+            need[positions[r]] -= 1
+            clubs[teams[r]] = clubs.get(teams[r], 0) + 1
+
+    def swaps(out_rows: Sequence[int]):
+        taken = set(chosen)
+        for i in out_rows:
+            for j in range(n):
+                if j in taken or positions[j] != positions[i]:
+                    continue
+                if teams[j] != teams[i] and clubs.get(teams[j], 0) >= MAX_PER_CLUB:
+                    continue
+                yield i, j
+
+    def apply(i: int, j: int) -> None:
+        chosen[chosen.index(i)] = j
+        clubs[teams[i]] -= 1
+        clubs[teams[j]] = clubs.get(teams[j], 0) + 1
+
+    # Downgrade until the squad fits the budget.
+    while prices[chosen].sum() > budget + 1e-9:
+        best = None
+        for i, j in swaps(chosen):
+            saved = prices[i] - prices[j]
+            if saved > 0:
+                cost = (scores[i] - scores[j]) / saved
+                if best is None or cost < best[0]:
+                    best = (cost, i, j)
+        if best is None:
+            break
+        apply(best[1], best[2])
+
+    # Cheapest bench, then upgrade the XI with what is left.
+    xi, _ = pick_xi(chosen, positions, scores)
+    for i in [r for r in list(chosen) if r not in xi]:
+        options = [(prices[j], -scores[j], j) for _, j in swaps([i]) if prices[j] < prices[i]]
+        if options:
+            apply(i, min(options)[2])
+    for _ in range(len(chosen)):
+        xi, _ = pick_xi(chosen, positions, scores)
+        spare = budget - prices[chosen].sum()
+        best = None
+        for i, j in swaps(xi):
+            gain = scores[j] - scores[i]
+            if gain > 1e-9 and prices[j] - prices[i] <= spare + 1e-9 and (best is None or gain > best[0]):
+                best = (gain, i, j)
+        if best is None:
+            break
+        apply(best[1], best[2])
+    return tuple(sorted(chosen))
+
+
+# -------------------------------------------------
+# DYNAMIC PROGRAMME OVER GAMEWEEKS
+# -------------------------------------------------
+
+
+def plan_chips(
+    means: np.ndarray,
+    positions: Sequence[str],
+    teams: np.ndarray,
+    prices: np.ndarray,
+    squad_rows: Sequence[int],
+    budget: float,
+    gws: Sequence[int],
+    chips: Sequence[str] = CHIPS,
+    wc_horizon: int = WC_HORIZON,
+) -> Dict[str, Any]:
+    """
+    Best placement of the available chips (one per GW) over gws by dynamic
+    programming on (GW, chips left, squad). The squad is the current one,
+    held without transfers, except for the wc_horizon GWs after a Wildcard
+    (its squad picked for them) and the GW of a Free Hit. Squad values per
+    (squad, GW) are memoised.
+
+    Returns the plan (chip, gw, points gained; for WC over its horizon),
+    its expected total,
+    the no-chip baseline and the squads used.
+    """
+    n_gws = len(gws)
+    squads: Dict[Any, Tuple[int, ...]] = {"hold": tuple(sorted(squad_rows))}
+
+    def squad(key: Any) -> Tuple[int, ...]:
+        if key not in squads:
+            chip, t = key
+            scores = means[:, t] if chip == "FH" else means[:, t:t + wc_horizon].sum(axis=1)
+            squads[key] = select_squad(scores, prices, positions, teams, budget)
+        return squads[key]
+
+    @lru_cache(maxsize=None)
+    def value(key: Any, t: int) -> Tuple[float, float, float]:
+        """(XI + captain, bench, captain) expected points of squad key in GW t."""
+        rows = squad(key)
+        xi, cap = pick_xi(rows, positions, means[:, t])
+        xi_pts = float(means[xi, t].sum())
+        cap_pts = float(means[cap, t]) if cap >= 0 else 0.0
+        bench_pts = float(means[[r for r in rows if r not in xi], t].sum())
+        return xi_pts + cap_pts, bench_pts, cap_pts
+
+    @lru_cache(maxsize=None)
+    def best(t: int, left: FrozenSet[str], key: Any) -> Tuple[float, Tuple[Tuple[str, int, float], ...]]:
+        if t == n_gws:
+            return 0.0, ()
+        if isinstance(key, tuple) and t >= key[1] + wc_horizon:
+            key = "hold"
+        base, bench, cap = value(key, t)
+        options = [(None, base, key)]
+        if "BB" in left:
+            options.append(("BB", base + bench, key))
+        if "TC" in left:
+            options.append(("TC", base + cap, key))
+        if "FH" in left:
+            options.append(("FH", value(("FH", t), t)[0], key))
+        if "WC" in left:
+            options.append(("WC", value(("WC", t), t)[0], ("WC", t)))
+
+        top = None
+        for chip, reward, next_key in options:
+            rest, steps = best(t + 1, left - {chip} if chip else left, next_key)
+            total = reward + rest
+            if top is None or total > top[0] + 1e-9:
+                gain = reward - base
+                if chip == "WC":
+                    horizon = range(t + 1, min(t + wc_horizon, n_gws))
+                    gain += sum(value(next_key, u)[0] - value(key, u)[0] for u in horizon)
+                step = ((chip, gws[t], gain),) if chip else ()
+                top = (total, step + steps)
+        return top
+
+    total, steps = best(0, frozenset(c for c in chips if c in CHIPS), "hold")
+    baseline, _ = best(0, frozenset(), "hold")
+    return {
+        "expected_total": total,
+        "baseline": baseline,
+        "expected_gain": total - baseline,
+        "plan": [{"chip": c, "gw": g, "gain": gain} for c, g, gain in steps],
+        "squads": squads,
+        "squad": squad,
+    }
+
+
+# -------------------------------------------------
+# GAIN DISTRIBUTIONS
+# -------------------------------------------------
+
+
+def chip_gain_distributions(
+    means: np.ndarray,
+    stds: np.ndarray,
+    positions: Sequence[str],
+    squad_rows: Sequence[int],
+    squad_for,
+    gws: Sequence[int],
+    chips: Sequence[str] = CHIPS,
+    n_sims: int = GAIN_SIMS,
+    seed: Optional[int] = None,
+    wc_horizon: int = WC_HORIZON,
+) -> Dict[str, List[Dict[str, float]]]:
+    """
+    Per chip and GW, the simulated gain of playing it there (everything
+    else held): BB the bench, TC the captain again, FH the Free Hit XI
+    minus the current XI, WC the Wildcard XI minus the current XI over
+    wc_horizon GWs. XIs and captains are picked on the means; one sample matrix
+    per GW is shared by every chip. squad_for is plan_chips(...)["squad"].
+    """
+    rng = np.random.default_rng(seed)
+    samples = [sample_player_matrix(means[:, t], stds[:, t], positions, n_sims, rng) for t in range(len(gws))]
+    hold = tuple(sorted(squad_rows))
+
+    def xi_points(rows: Tuple[int, ...], t: int) -> np.ndarray:
+        xi, cap = pick_xi(rows, positions, means[:, t])
+        pts = samples[t][xi].sum(axis=0, dtype=np.float64)
+        return pts + samples[t][cap] if cap >= 0 else pts
+
+    def summary(gain: np.ndarray, g: int) -> Dict[str, float]:
+        out = {"gw": g, "mean": float(gain.mean())}
+        for q, v in zip(GAIN_QUANTILES, np.percentile(gain, GAIN_QUANTILES)):
+            out[f"p{q}"] = float(v)
+        return out
+
+    hold_xi = [xi_points(hold, t) for t in range(len(gws))]
+    table: Dict[str, List[Dict[str, float]]] = {c: [] for c in chips}
+    for t, g in enumerate(gws):
+        xi, cap = pick_xi(hold, positions, means[:, t])
+        if "BB" in table:
+            bench = [r for r in hold if r not in xi]
+            table["BB"].append(summary(samples[t][bench].sum(axis=0, dtype=np.float64), g))
+        if "TC" in table:
+            table["TC"].append(summary(samples[t][cap].astype(np.float64), g))
+        if "FH" in table:
+            table["FH"].append(summary(xi_points(squad_for(("FH", t)), t) - hold_xi[t], g))
+        if "WC" in table:
+            wc = squad_for(("WC", t))
+            gain = sum(xi_points(wc, u) - hold_xi[u] for u in range(t, min(t + wc_horizon, len(gws))))
+            table["WC"].append(summary(gain, g))
+    return table
+
+
+# -------------------------------------------------
+# ENTRY POINT
+# -------------------------------------------------
+
+
+def plan_season(
+    squad_ids: Sequence[int],
+    gw: int,
+    last_gw: Optional[int] = None,
+    chips: Sequence[str] = CHIPS,
+    bank: float = 0.0,
+    n_sims: int = GAIN_SIMS,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Chip plan for a 15-man squad over gw .. last_gw (default: the last GW
+    with fixtures). Budget for Free Hit / Wildcard squads is the squad's
+    current price plus bank (sell-on profit rules are ignored).
+    """
+    conn = get_connection()
+    if last_gw is None:
+        last_gw = int(conn.execute("SELECT MAX(event) FROM fixtures").fetchone()[0] or gw)
+    gws = list(range(gw, last_gw + 1))
+    pool = load_planner_pool(squad_ids, conn=conn)
+    structure = gw_structure(gws, conn=conn)
+    conn.close()
+
+    squad_rows = [i for i, pid in enumerate(pool["player_ids"]) if pid in set(int(p) for p in squad_ids)]
+    budget = float(pool["prices"][squad_rows].sum()) + float(bank or 0.0)
+    means, stds = season_matrix(pool["player_ids"], gws)
+
+    plan = plan_chips(means, pool["positions"], pool["teams"], pool["prices"], squad_rows, budget, gws, chips)
+    gains = chip_gain_distributions(
+        means, stds, pool["positions"], squad_rows, plan["squad"], gws, chips, n_sims=n_sims, seed=seed
+    )
+    ids = pool["player_ids"]
+    return {
+        "gws": gws,
+        "structure": structure,
+        "plan": plan["plan"],
+        "expected_gain": plan["expected_gain"],
+        "baseline": plan["baseline"],
+        "gains": gains,
+        "squads": {
+            f"{k[0]} GW{gws[k[1]]}" if isinstance(k, tuple) else k: [ids[r] for r in rows]
+            for k, rows in plan["squads"].items()
+            if k == "hold" or any(s["chip"] == k[0] and s["gw"] == gws[k[1]] for s in plan["plan"])
+        },
+    }
+
+
+def plan_entry(entry_id: int, gw: int, last_gw: Optional[int] = None, **kwargs) -> Dict[str, Any]:
+    """plan_season for an entry's last squad before gw, with the chips it has not played."""
+    from db.entries import load_entry
+    from utils.ai_data_builder import load_gw_block
+
+    block = load_gw_block(entry_id, before_gw=gw)
+    if block is None:
+        raise ValueError(f"No squad before GW{gw} for entry {entry_id}.")
+    squad_ids = [p["id"] for p in block["team"]["starting"] + block["team"]["bench"]]
+    used = set((load_entry(entry_id) or {}).get("chips", {}).values())
+    kwargs.setdefault("chips", [c for c in CHIPS if c not in used])
+    return plan_season(squad_ids, gw, last_gw=last_gw, bank=block.get("bank") or 0.0, **kwargs)
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+
+if __name__ == "__main__":
+    from rich.console import Console
+    from rich.table import Table
+
+    parser = argparse.ArgumentParser(description="Season chip timing (WC / FH / BB / TC) by dynamic programming.")
+    parser.add_argument("--entry", type=int, required=True)
+    parser.add_argument("--gw", type=int, required=True, help="First GW to plan")
+    parser.add_argument("--last-gw", type=int, default=None)
+    parser.add_argument("--chips", default=None, help="Comma-separated chips to place (default: unused chips)")
+    parser.add_argument("--sims", type=int, default=GAIN_SIMS)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    extra: Dict[str, Any] = {"n_sims": args.sims, "seed": args.seed}
+    if args.chips:
+        extra["chips"] = [c.strip().upper() for c in args.chips.split(",") if c.strip()]
+
+    started = time.perf_counter()
+    out = plan_entry(args.entry, args.gw, last_gw=args.last_gw, **extra)
+    elapsed = time.perf_counter() - started
+
+    console = Console()
+    console.print(
+        f"Entry {args.entry}, GW{out['gws'][0]}-{out['gws'][-1]} ({elapsed:.1f}s): "
+        f"+{out['expected_gain']:.1f} expected points over holding the squad without chips."
+    )
+    for step in out["plan"]:
+        console.print(f"  {step['chip']} in GW{step['gw']}: +{step['gain']:.1f}")
+
+    table = Table(title="Expected gain per chip and GW (p10 / p90)")
+    table.add_column("GW", justify="right")
+    table.add_column("BGW / DGW")
+    for chip in out["gains"]:
+        table.add_column(chip, justify="right")
+    for t, g in enumerate(out["gws"]):
+        s = out["structure"][t]
+        marks = f"{len(s['blank'])} blank / {len(s['double'])} double" if s["blank"] or s["double"] else ""
+        cells = [
+            f"{out['gains'][c][t]['mean']:.1f} ({out['gains'][c][t]['p10']:.0f} / {out['gains'][c][t]['p90']:.0f})"
+            for c in out["gains"]
+        ]
+        table.add_row(str(g), marks, *cells)
+    console.print(table)
@@ -0,0 +1,257 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from config import DEFAULT_SIMS
+from models.covariance import player_factor
+from models.sampling import DEFAULT_CHUNK, player_point_params, sample_player_matrix
+from predictions.league_sim import build_entry_weights, entry_scores, squad_from_gw_block
+
+# |margin| below this counts as a draw (FPL scores are whole points).
+DRAW_BAND = 0.5
+MARGIN_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+MARGIN_HIST_LIMIT = 60
+
+
+def _effective_captain(samples: np.ndarray, cap: int, vc: int) -> np.ndarray:
+    """Per-sim column of the player whose points get the captain bonus."""
+    if cap < 0:
+        return np.full(samples.shape[1], -1, dtype=np.int64)
+    if vc < 0:
+        return np.full(samples.shape[1], cap, dtype=np.int64)
+    return np.where(samples[cap] == 0, vc, cap).astype(np.int64)
+
+
+def _contributions(
+    samples: np.ndarray,
+    mapping: Dict[str, Any],
+    a: int,
+    b: int,
+) -> np.ndarray:
+    """
+    (players x sims) per-player share of the margin (entry a minus entry b).
+    Shared players with equal weights contribute exactly 0; rows sum to the margin.
+    """
+    diff = mapping["weights"][a] - mapping["weights"][b]
+    contrib = diff[:, None] * samples
+    cols = np.arange(samples.shape[1])
+    for e, sign in ((a, 1.0), (b, -1.0)):
+        eff = _effective_captain(samples, int(mapping["cap_idx"][e]), int(mapping["vc_idx"][e]))
+        if eff[0] < 0:
+            continue
+        # One (eff, col) pair per sim, so plain fancy-index += is safe.
+        contrib[eff, cols] += sign * mapping["cap_extra"][e] * samples[eff, cols]
+    return contrib
+
+
+# -------------------------------------------------
+# SINGLE MATCH
+# -------------------------------------------------
+
+
+def simulate_h2h(
+    squad_a: Dict[str, Any],
+    squad_b: Dict[str, Any],
+    means: np.ndarray,
+    stds: np.ndarray,
+    positions: Sequence[str],
+    n_sims: int = DEFAULT_SIMS,
+    seed: Optional[int] = None,
+    chunk: int = DEFAULT_CHUNK,
+    factor: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> Dict[str, Any]:
+    """
+    Simulate one H2H match from a single shared sample matrix.
+
+    means / stds / positions follow build_entry_weights([squad_a, squad_b])["player_ids"];
+    factor (models.covariance.player_factor) correlates them, else the position factor.
+
+    Returns P(win/draw/loss) for A, expected points, margin quantiles and a
+    histogram of whole-point margins, and per-player swing:
+      expected:   mean contribution to the margin (A minus B)
+      swing:      mean contribution in A's wins minus in A's losses
+                  (large |swing| = the player decides the match)
+    Players owned (and captained) the same way by both sides never appear.
+    """
+    mapping = build_entry_weights([squad_a, squad_b])
+    player_ids = mapping["player_ids"]
+    rng = np.random.default_rng(seed)
+
+    n_win = n_draw = 0
+    points_sum = np.zeros(2)
+    margins: List[np.ndarray] = []
+    contrib_sum = np.zeros(len(player_ids))
+    contrib_win = np.zeros(len(player_ids))
+    contrib_loss = np.zeros(len(player_ids))
+    n_loss = 0
+
+    done = 0
+    while done < n_sims:
+        k = min(chunk, n_sims - done)
+        samples = sample_player_matrix(means, stds, positions, k, rng, factor=factor)
+        scores = entry_scores(samples, mapping)
+        margin = scores[0] - scores[1]
+
+        win = margin >= DRAW_BAND
+        loss = margin <= -DRAW_BAND
+        n_win += int(win.sum())
+        n_loss += int(loss.sum())
+        n_draw += int(k - win.sum() - loss.sum())
+        points_sum += scores.sum(axis=1, dtype=np.float64)
+        margins.append(margin)
+
+        contrib = _contributions(samples, mapping, 0, 1)
+        contrib_sum += contrib.sum(axis=1, dtype=np.float64)
+        contrib_win += contrib[:, win].sum(axis=1, dtype=np.float64)
+        contrib_loss += contrib[:, loss].sum(axis=1, dtype=np.float64)
+        done += k
+
+    margin_all = np.concatenate(margins)
+    rounded = np.clip(np.rint(margin_all), -MARGIN_HIST_LIMIT, MARGIN_HIST_LIMIT).astype(np.int64)
+    hist = np.bincount(rounded + MARGIN_HIST_LIMIT, minlength=2 * MARGIN_HIST_LIMIT + 1)
+
+    swing = []
+    for j, pid in enumerate(player_ids):
+        if contrib_sum[j] == 0 and contrib_win[j] == 0 and contrib_loss[j] == 0:
+            continue
+        swing.append({
+            "player_id": pid,
+            "side": "A" if contrib_sum[j] >= 0 else "B",
+            "expected": float(contrib_sum[j] / n_sims),
+            "swing": float(
+                (contrib_win[j] / n_win if n_win else 0.0)
+                - (contrib_loss[j] / n_loss if n_loss else 0.0)
+            ),
+        })
+    swing.sort(key=lambda r: -abs(r["swing"]))
+
+    return {
+        "n_sims": n_sims,
+        "p_win": n_win / n_sims,
+        "p_draw": n_draw / n_sims,
+        "p_loss": n_loss / n_sims,
+        "expected_a": float(points_sum[0] / n_sims),
+        "expected_b": float(points_sum[1] / n_sims),
+        "margin_mean": float(margin_all.mean()),
+        "margin_quantiles": {
+            f"p{int(q * 100)}": float(v) for q, v in zip(MARGIN_QUANTILES, np.quantile(margin_all, MARGIN_QUANTILES))
+        },
+        "margin_hist": {
+            int(m - MARGIN_HIST_LIMIT): float(c / n_sims) for m, c in enumerate(hist) if c
+        },
+        "swing_players": swing,
+    }
+
+
+# -------------------------------------------------
+# WHOLE H2H LEAGUE GAMEWEEK
+# -------------------------------------------------
+
+
+def simulate_h2h_fixtures(
+    squads: Sequence[Dict[str, Any]],
+    fixtures: Sequence[Tuple[int, int]],
+    means: np.ndarray,
+    stds: np.ndarray,
+    positions: Sequence[str],
+    n_sims: int = DEFAULT_SIMS,
+    seed: Optional[int] = None,
+    chunk: int = DEFAULT_CHUNK,
+    factor: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    All fixtures of a GW from one sample matrix over every involved squad.
+    fixtures are (entry_id_a, entry_id_b) pairs; means/stds/positions follow
+    build_entry_weights(squads)["player_ids"].
+    """
+    mapping = build_entry_weights(squads)
+    row = {s["entry_id"]: i for i, s in enumerate(squads)}
+    ia = np.array([row[a] for a, _ in fixtures], dtype=np.int64)
+    ib = np.array([row[b] for _, b in fixtures], dtype=np.int64)
+    rng = np.random.default_rng(seed)
+
+    wins = np.zeros(len(fixtures))
+    losses = np.zeros(len(fixtures))
+    margin_sum = np.zeros(len(fixtures))
+
+    done = 0
+    while done < n_sims:
+        k = min(chunk, n_sims - done)
+        scores = entry_scores(sample_player_matrix(means, stds, positions, k, rng, factor=factor), mapping)
+        margin = scores[ia] - scores[ib]
+        wins += (margin >= DRAW_BAND).sum(axis=1)
+        losses += (margin <= -DRAW_BAND).sum(axis=1)
+        margin_sum += margin.sum(axis=1, dtype=np.float64)
+        done += k
+
+    return [
+        {
+            "entry_a": a,
+            "entry_b": b,
+            "p_win": float(wins[i] / n_sims),
+            "p_draw": float(1.0 - (wins[i] + losses[i]) / n_sims),
+            "p_loss": float(losses[i] / n_sims),
+            "margin_mean": float(margin_sum[i] / n_sims),
+        }
+        for i, (a, b) in enumerate(fixtures)
+    ]
+
+
+# -------------------------------------------------
+# STORED ENTRIES
+# -------------------------------------------------
+
+
+def h2h_from_store(
+    entry_a: int,
+    entry_b: int,
+    gw: int,
+    n_sims: int = DEFAULT_SIMS,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    simulate_h2h for two entries using their last squads before gw
+    (entry store or team_stats.json) and model projections for gw.
+    """
+    from utils.ai_data_builder import load_gw_block
+
+    squads = []
+    for entry_id in (entry_a, entry_b):
+        block = load_gw_block(entry_id, before_gw=gw)
+        if block is None:
+            raise ValueError(f"No squad before GW{gw} for entry {entry_id}.")
+        squads.append(squad_from_gw_block(entry_id, block))
+
+    player_ids = build_entry_weights(squads)["player_ids"]
+    means, stds, positions = player_point_params(player_ids, gw)
+    factor = player_factor(player_ids, gw)
+    return simulate_h2h(squads[0], squads[1], means, stds, positions, n_sims=n_sims, seed=seed, factor=factor)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="H2H win probability by Monte Carlo.")
+    parser.add_argument("--teamA", type=int, required=True)
+    parser.add_argument("--teamB", type=int, required=True)
+    parser.add_argument("--gw", type=int, required=True)
+    parser.add_argument("--sims", type=int, default=DEFAULT_SIMS)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    out = h2h_from_store(args.teamA, args.teamB, args.gw, n_sims=args.sims, seed=args.seed)
+    print(
+        f"GW{args.gw} {args.teamA} vs {args.teamB} ({args.sims:,} sims, {time.perf_counter() - started:.2f}s)\n"
+        f"  xPts A {out['expected_a']:.1f} | B {out['expected_b']:.1f}\n"
+        f"  P(A win) {out['p_win']:.1%} | draw {out['p_draw']:.1%} | P(B win) {out['p_loss']:.1%}\n"
+        f"  margin p25/p50/p75: {out['margin_quantiles']['p25']:.1f} / "
+        f"{out['margin_quantiles']['p50']:.1f} / {out['margin_quantiles']['p75']:.1f}"
+    )
+    for r in out["swing_players"][:8]:
+        print(f"  {r['player_id']:>5} ({r['side']}): expected {r['expected']:+.2f}, swing {r['swing']:+.2f}")
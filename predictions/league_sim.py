@@ -0,0 +1,298 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from config import DEFAULT_SIMS
+from db.entries import load_entry, load_entry_gw_block, load_entry_totals, load_league_entry_ids
+from models.covariance import player_factor
+from models.parallel import merge_sums, run_parallel
+from models.sampling import DEFAULT_CHUNK, player_point_params, sample_player_matrix
+
+
+# -------------------------------------------------
+# SQUADS -> WEIGHTS
+# -------------------------------------------------
+
+
+def squad_from_gw_block(entry_id: int, gw_block: Dict[str, Any], chip: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Squad spec used by the simulators from a stored gw_data block.
+    chip: None, "BB" (bench counts) or "TC" (captain x3) for the simulated GW.
+    """
+    team = gw_block["team"]
+    return {
+        "entry_id": entry_id,
+        "starting": [p["id"] for p in team["starting"]],
+        "bench": [p["id"] for p in team["bench"]],
+        "captain_id": team.get("captain_id"),
+        "vice_id": team.get("vice_id"),
+        "chip": chip,
+    }
+
+
+def build_entry_weights(squads: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Map squads onto the union of their players.
+
+    Returns:
+      player_ids: union of owned players (columns of the sample matrix)
+      weights:    (entries x players) float32, 1 per counted player
+      cap_idx / vc_idx: column of captain / vice (-1 if none)
+      cap_extra:  extra captain multiplier (1, or 2 with TC)
+    """
+    player_ids: List[int] = []
+    col: Dict[int, int] = {}
+    for s in squads:
+        for pid in list(s["starting"]) + list(s.get("bench") or []):
+            if pid not in col:
+                col[pid] = len(player_ids)
+                player_ids.append(pid)
+
+    n_entries = len(squads)
+    weights = np.zeros((n_entries, len(player_ids)), dtype=np.float32)
+    cap_idx = np.full(n_entries, -1, dtype=np.int64)
+    vc_idx = np.full(n_entries, -1, dtype=np.int64)
+    cap_extra = np.zeros(n_entries, dtype=np.float32)
+
+    for e, s in enumerate(squads):
+        counted = list(s["starting"])
+        if s.get("chip") == "BB":
+            counted += list(s.get("bench") or [])
+        for pid in counted:
+            weights[e, col[pid]] = 1.0
+        if s.get("captain_id") in col:
+            cap_idx[e] = col[s["captain_id"]]
+            cap_extra[e] = 2.0 if s.get("chip") == "TC" else 1.0
+        if s.get("vice_id") in col:
+            vc_idx[e] = col[s["vice_id"]]
+
+    return {
+        "player_ids": player_ids,
+        "weights": weights,
+        "cap_idx": cap_idx,
+        "vc_idx": vc_idx,
+        "cap_extra": cap_extra,
+    }
+
+
+def entry_scores(samples: np.ndarray, mapping: Dict[str, Any]) -> np.ndarray:
+    """
+    (entries x sims) GW scores from one (players x sims) sample block.
+
+    Starters (and bench with BB) come from one matrix product; the captain
+    adds cap_extra x his points, or the vice's when the captain scores 0
+    (same rule as predict_team_points_advanced).
+    """
+    scores = mapping["weights"] @ samples
+
+    cap_idx = mapping["cap_idx"]
+    has_cap = cap_idx >= 0
+    if has_cap.any():
+        cap = samples[cap_idx[has_cap]]
+        vc_idx = mapping["vc_idx"][has_cap]
+        has_vc = vc_idx >= 0
+        if has_vc.any():
+            vc = samples[np.where(has_vc, vc_idx, 0)]
+            cap = np.where((cap == 0) & has_vc[:, None], vc, cap)
+        scores[has_cap] += mapping["cap_extra"][has_cap, None] * cap
+
+    return scores
+
+
+# -------------------------------------------------
+# LEAGUE SIMULATION
+# -------------------------------------------------
+
+
+def _league_counts(
+    n_sims: int,
+    seed: Any,
+    offset: int,
+    mapping: Dict[str, Any],
+    means: np.ndarray,
+    stds: np.ndarray,
+    positions: Sequence[str],
+    base: np.ndarray,
+    chunk: int,
+    factors: Optional[Sequence[Tuple[np.ndarray, np.ndarray]]],
+) -> Dict[str, np.ndarray]:
+    """Mergeable league summary (position counts, points sums) of n_sims from seed."""
+    n_entries = len(base)
+    rng = np.random.default_rng(seed)
+
+    counts = np.zeros((n_entries, n_entries), dtype=np.int64)
+    points_sum = np.zeros(n_entries, dtype=np.float64)
+    rank_rows = np.arange(n_entries)[:, None]
+
+    done = 0
+    while done < n_sims:
+        k = min(chunk, n_sims - done)
+        totals = np.repeat(base[:, None], k, axis=1)
+        for g in range(means.shape[0]):
+            factor = factors[g] if factors is not None else None
+            samples = sample_player_matrix(means[g], stds[g], positions, k, rng, factor=factor)
+            gw_scores = entry_scores(samples, mapping)
+            points_sum += gw_scores.sum(axis=1, dtype=np.float64)
+            totals += gw_scores
+
+        # Position of every entry in every simulation (0 = top).
+        order = np.argsort(-totals, axis=0, kind="stable")
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.broadcast_to(rank_rows, order.shape), axis=0)
+        for e in range(n_entries):
+            counts[e] += np.bincount(ranks[e], minlength=n_entries)
+        done += k
+    return {"counts": counts, "points_sum": points_sum}
+
+
+def simulate_league(
+    squads: Sequence[Dict[str, Any]],
+    means: np.ndarray,
+    stds: np.ndarray,
+    positions: Sequence[str],
+    base_totals: Optional[Sequence[float]] = None,
+    n_sims: int = DEFAULT_SIMS,
+    seed: Optional[int] = None,
+    chunk: int = DEFAULT_CHUNK,
+    factors: Optional[Sequence[Tuple[np.ndarray, np.ndarray]]] = None,
+    n_workers: int = 1,
+) -> Dict[str, Any]:
+    """
+    Simulate a mini-league over one or more GWs with one shared sample matrix.
+
+    means / stds: (gws x players) or (players,) in the column order of
+    build_entry_weights(squads)["player_ids"].
+    base_totals: league points before the simulated GWs (default 0).
+    factors: one models.covariance.player_factor per GW (default: position factor).
+    n_workers > 1: sims are split across processes (models.parallel), each
+    with its own SeedSequence child; same seed and n_workers, same result.
+
+    Returns:
+      position_probs: (entries x entries), [e, k] = P(entry e finishes k+1-th)
+      expected_points: mean simulated points per entry (all GWs)
+      expected_position: 1-based mean league position
+    """
+    mapping = build_entry_weights(squads)
+    means = np.atleast_2d(np.asarray(means, dtype=np.float64))
+    stds = np.atleast_2d(np.asarray(stds, dtype=np.float64))
+
+    n_entries = len(squads)
+    base = np.zeros(n_entries) if base_totals is None else np.asarray(base_totals, dtype=np.float64)
+    args = (mapping, means, stds, positions, base, chunk, factors)
+    if n_workers > 1:
+        summary = merge_sums(run_parallel(_league_counts, n_sims, seed=seed, n_workers=n_workers, args=args))
+    else:
+        summary = _league_counts(n_sims, seed, 0, *args)
+
+    probs = summary["counts"] / float(n_sims)
+    return {
+        "player_ids": mapping["player_ids"],
+        "position_probs": probs,
+        "expected_points": summary["points_sum"] / float(n_sims),
+        "expected_position": probs @ np.arange(1, n_entries + 1),
+        "n_sims": n_sims,
+    }
+
+
+def league_rank_distribution(
+    entry_ids: Sequence[int],
+    gw: int,
+    n_gws: int = 1,
+    n_sims: int = DEFAULT_SIMS,
+    seed: Optional[int] = None,
+    n_workers: int = 1,
+) -> Dict[str, Any]:
+    """
+    League position distributions for stored entries (see utils/league_ingest.py),
+    simulating GWs gw .. gw + n_gws - 1 with each entry's last squad before gw.
+    """
+    squads = []
+    for entry_id in entry_ids:
+        block = load_entry_gw_block(entry_id, before_gw=gw)
+        if block is None:
+            print(f"[league_sim] Entry {entry_id} has no stored squad before GW{gw}, skipped.")
+            continue
+        squads.append(squad_from_gw_block(entry_id, block))
+    if not squads:
+        raise ValueError("No entries with stored squads; run utils/league_ingest.py first.")
+
+    player_ids = build_entry_weights(squads)["player_ids"]
+    params = [player_point_params(player_ids, g) for g in range(gw, gw + n_gws)]
+    means = np.stack([p[0] for p in params])
+    stds = np.stack([p[1] for p in params])
+    positions = params[0][2]
+    factors = [player_factor(player_ids, g) for g in range(gw, gw + n_gws)]
+
+    totals = load_entry_totals([s["entry_id"] for s in squads], before_gw=gw)
+    base = [totals[s["entry_id"]] for s in squads]
+
+    result = simulate_league(
+        squads, means, stds, positions, base_totals=base, n_sims=n_sims, seed=seed, factors=factors,
+        n_workers=n_workers,
+    )
+
+    rows = []
+    for e, s in enumerate(squads):
+        entry = load_entry(s["entry_id"]) or {}
+        probs = result["position_probs"][e]
+        rows.append({
+            "entry_id": s["entry_id"],
+            "team_name": entry.get("team_name"),
+            "current_total": base[e],
+            "expected_points": float(result["expected_points"][e]),
+            "expected_position": float(result["expected_position"][e]),
+            "p_first": float(probs[0]),
+            "p_top3": float(probs[:3].sum()),
+            "position_probs": [float(p) for p in probs],
+        })
+    rows.sort(key=lambda r: r["expected_position"])
+    return {"gw": gw, "n_gws": n_gws, "n_sims": n_sims, "entries": rows}
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+
+if __name__ == "__main__":
+    from rich.console import Console
+    from rich.table import Table
+
+    parser = argparse.ArgumentParser(description="Mini-league position distribution by Monte Carlo.")
+    parser.add_argument("--league", type=int, required=True, help="League ID (ingested with utils/league_ingest.py)")
+    parser.add_argument("--gw", type=int, required=True, help="First simulated GW")
+    parser.add_argument("--gws", type=int, default=1, help="Number of GWs to simulate")
+    parser.add_argument("--sims", type=int, default=DEFAULT_SIMS)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=1, help="Processes to split the sims across")
+    args = parser.parse_args()
+
+    entry_ids = load_league_entry_ids(args.league)
+    if not entry_ids:
+        raise SystemExit(f"League {args.league} not in the store; run utils/league_ingest.py first.")
+
+    started = time.perf_counter()
+    out = league_rank_distribution(entry_ids, args.gw, n_gws=args.gws, n_sims=args.sims, seed=args.seed,
+                                   n_workers=args.workers)
+    elapsed = time.perf_counter() - started
+
+    table = Table(title=f"League {args.league} after GW{args.gw + args.gws - 1} ({args.sims:,} sims, {elapsed:.1f}s)")
+    for col in ("Entry", "Team", "Now", "xPts", "xPos", "P(1st)", "P(top 3)"):
+        table.add_column(col, justify="right" if col not in ("Team",) else "left")
+    for r in out["entries"]:
+        table.add_row(
+            str(r["entry_id"]),
+            r["team_name"] or "",
+            str(r["current_total"]),
+            f"{r['expected_points']:.1f}",
+            f"{r['expected_position']:.2f}",
+            f"{r['p_first']:.1%}",
+            f"{r['p_top3']:.1%}",
+        )
+    Console().print(table)
@@ -1,16 +1,15 @@
 import argparse
 import sys
 from pathlib import Path
-from typing import Any, Dict, List
-
-from rich.console import Console
-from rich.table import Table
+from typing import Any, Dict, List, Optional, Sequence
 
 if __package__ is None or __package__ == "":
     sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from db.sqlite import get_connection
-from models.player_model import predict_player_points
+from models.projections import top_projected
+
+POSITION_TYPES = {"GK": 1, "DEF": 2, "MID": 3, "FWD": 4}
 
 
 def _position_label(element_type: int | None) -> str:
@@ -49,7 +48,14 @@ def _opponents_map(gw: int) -> Dict[int, List[str]]:
     return out
 
 
-def _player_pool(include_unavailable: bool, pool_size: int) -> List[Any]:
+def _player_pool(
+    include_unavailable: bool,
+    positions: Optional[Sequence[str]] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    teams: Optional[Sequence[str]] = None,
+) -> List[Any]:
+    """Players passing the filters (positions as GK/DEF/MID/FWD, teams as short names)."""
     conn = get_connection()
     cur = conn.cursor()
 
@@ -65,11 +71,27 @@ def _player_pool(include_unavailable: bool, pool_size: int) -> List[Any]:
         FROM players p
         LEFT JOIN teams t ON p.team_id = t.id
     """
+    where: List[str] = []
+    args: List[Any] = []
     if not include_unavailable:
-        query += " WHERE p.status NOT IN ('i', 's', 'u', 'o')"
-    query += " ORDER BY p.total_points DESC LIMIT ?"
-
-    cur.execute(query, (pool_size,))
+        where.append("p.status NOT IN ('i', 's', 'u', 'o')")
+    if positions:
+        types = [POSITION_TYPES[pos.upper()] for pos in positions]
+        where.append(f"p.element_type IN ({','.join('?' * len(types))})")
+        args.extend(types)
+    if min_price is not None:
+        where.append("p.now_cost >= ?")
+        args.append(min_price)
+    if max_price is not None:
+        where.append("p.now_cost <= ?")
+        args.append(max_price)
+    if teams:
+        where.append(f"UPPER(t.short_name) IN ({','.join('?' * len(teams))})")
+        args.extend(team.upper() for team in teams)
+    if where:
+        query += " WHERE " + " AND ".join(where)
+
+    cur.execute(query, args)
     rows = cur.fetchall()
     conn.close()
     return rows
@@ -80,28 +102,39 @@ def top_players_by_prediction_range(
     gw_to: int,
     top_n: int = 10,
     include_unavailable: bool = False,
-    pool_size: int = 250,
+    discount: float = 1.0,
+    positions: Optional[Sequence[str]] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    teams: Optional[Sequence[str]] = None,
 ) -> List[Dict[str, Any]]:
+    """
+    Players passing the filters ranked by projected points over GW
+    gw_from..gw_to (GW k of the range weighted by discount ** k). Only
+    players whose upper bound can reach the top_n are projected exactly,
+    or the cached projection_matrix when most would be
+    (models.projections.top_projected).
+    """
     gws = list(range(gw_from, gw_to + 1))
-    opponents_by_gw = {gw: _opponents_map(gw) for gw in gws}
-    players = _player_pool(include_unavailable=include_unavailable, pool_size=pool_size)
+    players = {
+        p["id"]: p
+        for p in _player_pool(include_unavailable, positions=positions, min_price=min_price,
+                              max_price=max_price, teams=teams)
+    }
+    ranked = top_projected(list(players), gw_from, gw_to, top_n=top_n, discount=discount)["ranked"]
 
+    opponents_by_gw = {gw: _opponents_map(gw) for gw in gws}
     out: List[Dict[str, Any]] = []
-    for row in players:
-        per_gw: List[Dict[str, Any]] = []
-        total = 0.0
-        for gw in gws:
-            mean, _ = predict_player_points(row["id"], gw)
-            opps = opponents_by_gw[gw].get(row["team_id"], ["BLANK"])
-            per_gw.append(
-                {
-                    "gw": gw,
-                    "points": float(mean),
-                    "opponents": opps,
-                }
-            )
-            total += float(mean)
-
+    for item in ranked:
+        row = players[item["id"]]
+        per_gw = [
+            {
+                "gw": gw,
+                "points": points,
+                "opponents": opponents_by_gw[gw].get(row["team_id"], ["BLANK"]),
+            }
+            for gw, points in zip(gws, item["per_gw"])
+        ]
         out.append(
             {
                 "id": row["id"],
@@ -109,16 +142,17 @@ def top_players_by_prediction_range(
                 "team": row["team"],
                 "pos": _position_label(row["element_type"]),
                 "status": row["status"],
-                "predicted_total": total,
+                "predicted_total": item["total"],
                 "per_gw": per_gw,
             }
         )
-
-    ranked = sorted(out, key=lambda x: x["predicted_total"], reverse=True)
-    return ranked[:top_n]
+    return out
 
 
 def render_dashboard(rows: List[Dict[str, Any]], gw_from: int, gw_to: int) -> None:
+    from rich.console import Console
+    from rich.table import Table
+
     gws = list(range(gw_from, gw_to + 1))
     console = Console()
     title = f"Top Predicted Players GW{gw_from}" if gw_from == gw_to else f"Top Predicted Players GW{gw_from}-GW{gw_to}"
@@ -157,7 +191,16 @@ def main():
     parser.add_argument("--gw-from", type=int, help="Start GW for range")
     parser.add_argument("--gw-to", type=int, help="End GW for range")
     parser.add_argument("--top", type=int, default=10, help="Number of players to show")
-    parser.add_argument("--pool", type=int, default=250, help="Player pool size to rank from")
+    parser.add_argument(
+        "--discount",
+        type=float,
+        default=1.0,
+        help="Weight GW k of the range by discount**k in the total (1.0 = plain sum)",
+    )
+    parser.add_argument("--pos", default=None, help="Comma-separated positions, e.g. MID or DEF,FWD")
+    parser.add_argument("--min-price", type=float, default=None, help="Minimum price (e.g. 4.5)")
+    parser.add_argument("--max-price", type=float, default=None, help="Maximum price (e.g. 7.0)")
+    parser.add_argument("--team", default=None, help="Comma-separated team short names, e.g. ARS,LIV")
     parser.add_argument(
         "--include-unavailable",
         action="store_true",
@@ -182,7 +225,11 @@ def main():
         gw_to=gw_to,
         top_n=args.top,
         include_unavailable=args.include_unavailable,
-        pool_size=args.pool,
+        discount=args.discount,
+        positions=args.pos.split(",") if args.pos else None,
+        min_price=args.min_price,
+        max_price=args.max_price,
+        teams=args.team.split(",") if args.team else None,
     )
     render_dashboard(rows=rows, gw_from=gw_from, gw_to=gw_to)
 
@@ -1,6 +1,7 @@
 import argparse
 from typing import List, Optional
 
+from config import MC_MAX_SIMS
 from predictions.team_basic import predict_team_points
 from predictions.team_advanced import predict_team_points_advanced
 
@@ -19,13 +20,24 @@ def predict_team(
     triple_captain: bool = False,
     bench_boost: bool = False,
     n_sims: Optional[int] = None,
+    engine: str = "normal",
+    tol: Optional[float] = None,
+    seed: Optional[int] = None,
+    bonus: str = "mean",
 ):
     """
     Single entrypoint for team prediction.
     mode: "basic" | "advanced"
+    engine (advanced only): "normal" | "match" | "components"
+    tol: adaptive sim count, stopping once standard errors are below tol points
+    (n_sims is then the cap)
+    seed: reproducible samples
+    bonus (match engine only): "mean" | "bps" (simulated 3/2/1 by BPS rank)
     """
     if mode == "basic":
-        return predict_team_points(starting, gw, n_sims=n_sims or 10000)
+        if tol is not None:
+            return predict_team_points(starting, gw, n_sims=n_sims or MC_MAX_SIMS, tol=tol, seed=seed)
+        return predict_team_points(starting, gw, n_sims=n_sims or 10000, seed=seed)
 
     return predict_team_points_advanced(
         starting=starting,
@@ -36,6 +48,10 @@ def predict_team(
         triple_captain=triple_captain,
         bench_boost=bench_boost,
         n_sims=n_sims,
+        engine=engine,
+        tol=tol,
+        seed=seed,
+        bonus=bonus,
     )
 
 
@@ -44,12 +60,19 @@ def main():
     parser.add_argument("--team", required=True, help="Comma-separated 11 player IDs")
     parser.add_argument("--gw", type=int, required=True)
     parser.add_argument("--mode", choices=["basic", "advanced"], default="advanced")
+    parser.add_argument("--engine", choices=["normal", "match", "components"], default="normal",
+                        help="advanced mode: per-player normals, fixture-level match simulation or point components")
     parser.add_argument("--bench", default="", help="Comma-separated 4 bench player IDs")
     parser.add_argument("--captain", type=int, default=None)
     parser.add_argument("--vice", type=int, default=None)
     parser.add_argument("--triple-captain", action="store_true")
     parser.add_argument("--bench-boost", action="store_true")
     parser.add_argument("--sims", type=int, default=None)
+    parser.add_argument("--tol", type=float, default=None,
+                        help="Adaptive: simulate until standard errors are below this many points")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible samples")
+    parser.add_argument("--bonus", choices=["mean", "bps"], default="mean",
+                        help="match engine: mean bonus per appearance or bonus from simulated BPS ranks")
 
     args = parser.parse_args()
 
@@ -66,6 +89,10 @@ def main():
         triple_captain=args.triple_captain,
         bench_boost=args.bench_boost,
         n_sims=args.sims,
+        engine=args.engine,
+        tol=args.tol,
+        seed=args.seed,
+        bonus=args.bonus,
     )
 
     print(dist.summary())
@@ -1,30 +1,63 @@
-from typing import List, Dict
+from typing import Any, Callable, List, Dict, Optional, Sequence, Tuple
 
 import numpy as np
 
-from config import DEFAULT_SIMS
-from models.monte_carlo import PredictionDistribution
-from models.player_model import predict_player_points, get_player_position
+from config import DEFAULT_SIMS, MC_MAX_SIMS, MC_TIME_BUDGET, MC_TOLERANCE
+from models.component_model import load_component_inputs, sample_component_points
+from models.covariance import player_factor
+from models.match_sim import load_match_inputs, sample_match_points
+from models.monte_carlo import PredictionDistribution, run_adaptive
+from models.sampling import player_point_params, sample_player_matrix
 
+# rank_captains stops once the leader's lead is this many standard errors.
+CAPTAIN_LEAD_Z = 3.0
 
-def _simulate_with_position_correlation(
-    mean: float,
-    std: float,
-    pos: str,
-    n_sims: int,
-    shared_noise: Dict[str, np.ndarray],
-    pos_corr_weight: Dict[str, float],
-) -> np.ndarray:
-    if mean <= 0:
-        return np.zeros(n_sims)
+PlayerDraw = Callable[[int], Tuple[np.ndarray, Optional[np.ndarray]]]
 
-    corr_w = pos_corr_weight.get(pos, 0.08)
-    shared_std = std * corr_w
-    idio_std = float(np.sqrt(max(std * std - shared_std * shared_std, 0.0)))
 
-    idio = np.random.normal(loc=mean, scale=idio_std, size=n_sims)
-    corr = shared_noise[pos] * shared_std
-    return np.clip(idio + corr, 0, None)
+def player_sampler(
+    ids: Sequence[int],
+    gw: int,
+    engine: str = "normal",
+    seed: Optional[int] = None,
+    bonus: str = "mean",
+) -> PlayerDraw:
+    """
+    draw(k) -> ((players x k) points, (players x k) appeared or None) for ids
+    in gw. Inputs are loaded once, so batches of an adaptive run are cheap.
+    seed fixes the draw sequence (None: fresh entropy).
+
+    bonus (match engine only): "mean" bonus per appearance, or "bps" to
+    add the simulated 3/2/1 bonus matrix of models.bonus_model (not yet
+    calibrated against history, see predictions/bonus_calibration.py).
+    """
+    if bonus not in ("mean", "bps"):
+        raise ValueError(f"Unknown bonus mode: {bonus}")
+    if bonus == "bps" and engine != "match":
+        raise ValueError('bonus="bps" needs engine="match"')
+    ids = list(ids)
+    rng = np.random.default_rng(seed)
+    if engine == "match":
+        if bonus == "bps":
+            from models.bonus_model import add_bps_inputs, fixture_squad_ids
+
+            inputs = add_bps_inputs(load_match_inputs(fixture_squad_ids(ids, gw), gw))
+        else:
+            inputs = load_match_inputs(ids, gw)
+        return lambda k: sample_match_points(
+            ids, gw, k, rng=rng, inputs=inputs, return_played=True, bonus=bonus
+        )
+    if engine == "components":
+        inputs = load_component_inputs(ids, gw)
+        return lambda k: sample_component_points(ids, gw, k, rng=rng, inputs=inputs, return_played=True)
+    if engine == "normal":
+        means, stds, positions = player_point_params(ids, gw)
+        factor = player_factor(ids, gw)
+        return lambda k: (
+            sample_player_matrix(means, stds, positions, k, rng, dtype=np.float64, factor=factor),
+            None,
+        )
+    raise ValueError(f"Unknown engine: {engine}")
 
 
 def predict_team_points_advanced(
@@ -36,6 +69,11 @@ def predict_team_points_advanced(
     triple_captain: bool = False,
     bench_boost: bool = False,
     n_sims: int | None = None,
+    engine: str = "normal",
+    tol: float | None = None,
+    time_budget: float = MC_TIME_BUDGET,
+    seed: int | None = None,
+    bonus: str = "mean",
 ) -> PredictionDistribution:
     """
     Advanced team simulation (v1):
@@ -47,71 +85,110 @@ def predict_team_points_advanced(
     - Captain → x2 multiplier
     - Triple captain → x3 multiplier
     - Vice captain replaces captain ONLY if captain has zero points in that simulation
-    """
 
-    if n_sims is None:
-        n_sims = DEFAULT_SIMS
+    engine:
+    - "normal": per-player normals around the model mean, correlated through the empirical
+      covariance of models.covariance (teammates, fixture opponents, same position)
+    - "match": models.match_sim — one Poisson scoreline per fixture and sim, shared by
+      every player in it (team-mates share goals, a defence shares its clean sheet),
+      mean bonus per appearance, or with bonus="bps" bonus from simulated BPS ranks of
+      everyone in the fixture; the vice captain steps in when the captain did not play
+    - "components": models.component_model — goals, assists, clean sheets, cards, saves,
+      penalties and defensive contributions sampled as counts and scored per position
+
+    tol: simulate in batches until the standard errors of the mean and quantiles
+    are below tol points (models.monte_carlo.run_adaptive); n_sims is then the
+    cap (default MC_MAX_SIMS) and the result reports n_sims / se.
+
+    seed: same seed, same inputs -> same samples (fixed-count runs; adaptive
+    runs also depend on the time budget).
+    """
 
     # Build the list of all players that contribute points
     all_players = list(starting)
     if bench_boost and bench:
         all_players += list(bench)
 
-    # Precompute shared noise for position-based correlation
-    pos_corr_weight = {"GK": 0.15, "DEF": 0.12, "MID": 0.08, "FWD": 0.08}
-    shared_noise = {
-        "GK": np.random.normal(0, 1, n_sims),
-        "DEF": np.random.normal(0, 1, n_sims),
-        "MID": np.random.normal(0, 1, n_sims),
-        "FWD": np.random.normal(0, 1, n_sims),
-    }
-
-    # Simulate every player once
-    player_samples: Dict[int, np.ndarray] = {}
-    for pid in all_players:
-        mean, std = predict_player_points(pid, gw)
-        pos = get_player_position(pid)
-        samples = _simulate_with_position_correlation(
-            mean=mean,
-            std=std,
-            pos=pos,
-            n_sims=n_sims,
-            shared_noise=shared_noise,
-            pos_corr_weight=pos_corr_weight,
-        )
-        player_samples[pid] = samples
+    ids = list(dict.fromkeys(all_players))
+    row = {pid: i for i, pid in enumerate(ids)}
+    draw_players = player_sampler(ids, gw, engine, seed=seed, bonus=bonus)
 
-    # Base sum (all starting players; bench counted only if BB)
-    team_samples = np.zeros(n_sims)
-    for pid in all_players:
-        team_samples += player_samples[pid]
+    def draw(k: int) -> np.ndarray:
+        points, played = draw_players(k)
+        points = points.astype(np.float64, copy=False)
 
-    # Captain / VC logic
-    if captain_id is not None and captain_id in player_samples:
-        cap_samples = player_samples[captain_id]
+        # Base sum (all starting players; bench counted only if BB)
+        team_samples = np.zeros(k)
+        for pid in all_players:
+            team_samples += points[row[pid]]
 
-        # Default case: captain points
-        effective_cap = cap_samples
+        # Captain / VC logic
+        if captain_id is not None and captain_id in row:
+            cap_samples = points[row[captain_id]]
 
-        if vice_captain_id and vice_captain_id in player_samples:
-            vc_samples = player_samples[vice_captain_id]
+            # Default case: captain points
+            effective_cap = cap_samples
 
-            # VC replaces captain only if captain has 0 points (means he did not play)
-            effective_cap = np.where(cap_samples == 0, vc_samples, cap_samples)
+            if vice_captain_id and vice_captain_id in row:
+                vc_samples = points[row[vice_captain_id]]
 
-        # Determine multiplier (2x or 3x)
-        mult = 3 if triple_captain else 2
+                # VC replaces captain only if captain has 0 points (means he did not play)
+                absent = ~played[row[captain_id]] if played is not None else cap_samples == 0
+                effective_cap = np.where(absent, vc_samples, cap_samples)
 
-        # We already counted cap points once in team_samples,
-        # so we add (mult - 1) * effective_cap.
-        team_samples += (mult - 1) * effective_cap
+            # Determine multiplier (2x or 3x)
+            mult = 3 if triple_captain else 2
+
+            # We already counted cap points once in team_samples,
+            # so we add (mult - 1) * effective_cap.
+            team_samples += (mult - 1) * effective_cap
+        return team_samples
 
     # Build distribution result
-    return PredictionDistribution(
-        samples=team_samples,
-        expected=float(np.mean(team_samples)),
-        median=float(np.percentile(team_samples, 50)),
-        p25=float(np.percentile(team_samples, 25)),
-        p75=float(np.percentile(team_samples, 75)),
-        p90=float(np.percentile(team_samples, 90)),
+    if tol is None:
+        return PredictionDistribution.from_samples(draw(n_sims or DEFAULT_SIMS))
+    samples, precision = run_adaptive(draw, tol=tol, max_sims=n_sims or MC_MAX_SIMS, time_budget=time_budget)
+    return PredictionDistribution.from_samples(samples, precision)
+
+
+def rank_captains(
+    candidates: Sequence[int],
+    gw: int,
+    engine: str = "normal",
+    tol: float = MC_TOLERANCE,
+    max_sims: int = MC_MAX_SIMS,
+    time_budget: float = MC_TIME_BUDGET,
+    seed: Optional[int] = None,
+    bonus: str = "mean",
+) -> Dict[str, Any]:
+    """
+    Captain candidates by simulated points from one shared draw, with
+    P(highest score). Sims stop once the leader's lead over the runner-up is
+    CAPTAIN_LEAD_Z standard errors (or every mean SE is below tol), so a
+    clear pick takes a few hundred sims and a close call gets many more.
+    seed makes the draws reproducible; bonus as in player_sampler.
+    """
+    ids = list(dict.fromkeys(int(c) for c in candidates))
+    draw_players = player_sampler(ids, gw, engine, seed=seed, bonus=bonus)
+
+    def draw(k: int) -> np.ndarray:
+        return draw_players(k)[0].astype(np.float64, copy=False)
+
+    def settled(samples: np.ndarray) -> bool:
+        if len(ids) < 2:
+            return True
+        first, second = np.argsort(-samples.mean(axis=1))[:2]
+        gap = samples[first] - samples[second]
+        return gap.mean() >= CAPTAIN_LEAD_Z * gap.std(ddof=1) / np.sqrt(len(gap))
+
+    samples, precision = run_adaptive(
+        draw, tol=tol, quantiles=(), max_sims=max_sims, time_budget=time_budget, stop=settled
     )
+    best = samples.argmax(axis=0)
+    p_best = np.bincount(best, minlength=len(ids)) / samples.shape[1]
+    ranking = [
+        {"player_id": pid, "mean": float(samples[i].mean()), "p_best": float(p_best[i])}
+        for i, pid in enumerate(ids)
+    ]
+    ranking.sort(key=lambda r: -r["mean"])
+    return {"ranking": ranking, "n_sims": precision["n_sims"], "converged": precision["converged"]}
@@ -1,11 +1,19 @@
 import numpy as np
-from typing import List
+from typing import List, Optional
 
+from config import MC_TIME_BUDGET
 from models.player_model import predict_player_points
-from models.monte_carlo import MonteCarlo, PredictionDistribution
+from models.monte_carlo import PredictionDistribution, run_adaptive
 
 
-def predict_team_points(player_ids: List[int], gw: int, n_sims: int = 10000) -> PredictionDistribution:
+def predict_team_points(
+    player_ids: List[int],
+    gw: int,
+    n_sims: int = 10000,
+    tol: Optional[float] = None,
+    time_budget: float = MC_TIME_BUDGET,
+    seed: Optional[int] = None,
+) -> PredictionDistribution:
     """
     Basic team prediction:
     - No captain multiplier
@@ -13,25 +21,21 @@ def predict_team_points(player_ids: List[int], gw: int, n_sims: int = 10000) ->
     - No bench logic
     - Just sum player distributions
 
+    tol: adaptive sim count (see models.monte_carlo.run_adaptive), n_sims is the cap.
+
     Returns full PredictionDistribution for the TEAM.
     """
 
-    mc = MonteCarlo(n_sims=n_sims)
-
-    # Collect samples for all players
-    team_samples = np.zeros(n_sims)
-
-    for pid in player_ids:
-        mean, std = predict_player_points(pid, gw)
-        dist = mc.simulate(mean, std)
-        team_samples += dist.samples  # elementwise summation
-
-    # Now compute team distribution summary
-    return PredictionDistribution(
-        samples=team_samples,
-        expected=float(np.mean(team_samples)),
-        median=float(np.percentile(team_samples, 50)),
-        p25=float(np.percentile(team_samples, 25)),
-        p75=float(np.percentile(team_samples, 75)),
-        p90=float(np.percentile(team_samples, 90)),
-    )
+    params = np.array([predict_player_points(pid, gw) for pid in player_ids], dtype=np.float64).reshape(-1, 2)
+    means, stds = params[:, :1], params[:, 1:]
+    rng = np.random.default_rng(seed)
+
+    def draw(k: int) -> np.ndarray:
+        # Each player clipped at 0, then summed into the team score
+        return np.clip(rng.normal(means, stds, size=(len(means), k)), 0, None).sum(axis=0)
+
+    if tol is None:
+        return PredictionDistribution.from_samples(draw(n_sims))
+
+    samples, precision = run_adaptive(draw, tol=tol, max_sims=n_sims, time_budget=time_budget)
+    return PredictionDistribution.from_samples(samples, precision)
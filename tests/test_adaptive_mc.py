@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import predictions.team_advanced as team_advanced
+from models.monte_carlo import MonteCarlo, run_adaptive, standard_errors
+
+
+def _normal(mean, std, seed=0):
+    rng = np.random.default_rng(seed)
+    return lambda k: rng.normal(mean, std, k)
+
+
+def test_standard_errors_match_normal_theory():
+    samples = np.random.default_rng(1).normal(0, 2, 400000)
+    se = standard_errors(samples)
+    n = len(samples)
+    assert se["expected"] == pytest.approx(2 / np.sqrt(n), rel=0.02)
+    # Median of a normal: sqrt(pi / 2) * sigma / sqrt(n).
+    assert se["median"] == pytest.approx(np.sqrt(np.pi / 2) * 2 / np.sqrt(n), rel=0.05)
+
+
+def test_run_adaptive_spends_sims_where_precision_needs_them():
+    _, quick = run_adaptive(_normal(5, 1), tol=0.1)
+    _, tight = run_adaptive(_normal(5, 1), tol=0.02)
+    assert quick["converged"] and tight["converged"]
+    assert quick["n_sims"] <= 1000
+    assert tight["n_sims"] > 4 * quick["n_sims"]
+    assert max(tight["se"].values()) <= 0.02
+
+    samples, capped = run_adaptive(_normal(5, 10), tol=0.001, max_sims=5000)
+    assert not capped["converged"]
+    assert capped["n_sims"] == len(samples) == 5000
+
+
+def test_monte_carlo_adaptive_reports_precision():
+    dist = MonteCarlo(n_sims=50000, random_seed=3, tol=0.05).simulate(6.0, 2.0)
+    summary = dist.summary()
+    assert summary["converged"]
+    assert summary["n_sims"] == len(dist.samples) < 50000
+    assert max(summary["se"].values()) <= 0.05
+    # Fixed-count runs keep the old summary.
+    assert "se" not in MonteCarlo(n_sims=100).simulate(6.0, 2.0).summary()
+
+
+def test_close_captaincy_calls_get_more_sims(monkeypatch):
+    def sampler(gap):
+        rng = np.random.default_rng(0)
+        return lambda k: (rng.normal([[6.0 + gap], [6.0]], 3.0, (2, k)), None)
+
+    monkeypatch.setattr(team_advanced, "player_sampler", lambda ids, gw, engine, seed=None, bonus="mean": sampler(gaps[-1]))
+    gaps = [3.0]
+    clear = team_advanced.rank_captains([1, 2], 5, tol=0.05)
+    gaps.append(0.0)
+    close = team_advanced.rank_captains([1, 2], 5, tol=0.05)
+    assert clear["ranking"][0]["player_id"] == 1 and clear["ranking"][0]["p_best"] > 0.7
+    assert clear["n_sims"] == 500
+    # A coin flip only stops when the means themselves are within tol.
+    assert close["n_sims"] >= (3.0 / 0.05) ** 2
+    assert abs(close["ranking"][0]["p_best"] - 0.5) < 0.05
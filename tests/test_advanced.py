@@ -1,4 +1,8 @@
-from predictions.team_advanced import predict_team_points_advanced
+import numpy as np
+import pytest
+
+from models import bonus_model
+from predictions.team_advanced import player_sampler, predict_team_points_advanced
 
 
 def test_team_advanced_prediction(db_available, team_ids, bench_ids, gw, captain_id, vice_id):
@@ -16,3 +20,80 @@ def test_team_advanced_prediction(db_available, team_ids, bench_ids, gw, captain
     summary = dist.summary()
     assert summary["expected"] >= 0
     assert summary["p25"] <= summary["p75"]
+
+
+def test_team_advanced_match_engine(db_available, team_ids, gw, captain_id, vice_id):
+    dist = predict_team_points_advanced(
+        starting=team_ids,
+        gw=gw,
+        captain_id=captain_id,
+        vice_captain_id=vice_id,
+        n_sims=2000,
+        engine="match",
+    )
+
+    summary = dist.summary()
+    assert summary["expected"] >= 0
+    assert summary["p25"] <= summary["p75"]
+
+
+def test_team_advanced_component_engine(db_available, team_ids, gw, captain_id, vice_id):
+    dist = predict_team_points_advanced(
+        starting=team_ids,
+        gw=gw,
+        captain_id=captain_id,
+        vice_captain_id=vice_id,
+        n_sims=2000,
+        engine="components",
+    )
+
+    summary = dist.summary()
+    assert summary["expected"] >= 0
+    assert summary["p25"] <= summary["p75"]
+
+
+def test_team_advanced_seed_reproduces_samples(db_available, team_ids, gw, captain_id, vice_id):
+    runs = [
+        predict_team_points_advanced(
+            starting=team_ids, gw=gw, captain_id=captain_id, vice_captain_id=vice_id, n_sims=500, seed=seed
+        ).samples
+        for seed in (4, 4, 5)
+    ]
+    assert (runs[0] == runs[1]).all()
+    assert not (runs[0] == runs[2]).all()
+
+
+def test_team_advanced_match_engine_bps_bonus(db_available, team_ids, gw, captain_id, vice_id, monkeypatch):
+    awarded = []
+    assign_bonus = bonus_model.assign_bonus
+
+    def recording(bps, slot_fixture):
+        out = assign_bonus(bps, slot_fixture)
+        awarded.append((out, slot_fixture))
+        return out
+
+    monkeypatch.setattr(bonus_model, "assign_bonus", recording)
+    dist = predict_team_points_advanced(
+        starting=team_ids,
+        gw=gw,
+        captain_id=captain_id,
+        vice_captain_id=vice_id,
+        n_sims=2000,
+        engine="match",
+        seed=3,
+        bonus="bps",
+    )
+    assert dist.summary()["expected"] >= 0
+
+    assert awarded
+    for bonus, slot_fixture in awarded:
+        assert set(np.unique(bonus)) <= {0, 1, 2, 3}
+        for f in np.unique(slot_fixture):
+            assert (bonus[slot_fixture == f].sum(axis=0) >= 6).all()
+
+
+def test_bps_bonus_needs_the_match_engine(gw):
+    with pytest.raises(ValueError):
+        player_sampler([1], gw, engine="normal", bonus="bps")
+    with pytest.raises(ValueError):
+        player_sampler([1], gw, engine="match", bonus="median")
@@ -0,0 +1,52 @@
+from utils import ai_batch
+from utils.ai_batch import call_with_retry, load_entry_ids
+
+
+def test_load_entry_ids_skips_comments_blanks_and_duplicates(tmp_path):
+    path = tmp_path / "entries.txt"
+    path.write_text("# league 123\n2709841\n\n3277875\n2709841\n", encoding="utf-8")
+
+    assert load_entry_ids(path) == [2709841, 3277875]
+
+
+def test_call_with_retry_retries_only_transient_llm_errors():
+    responses = [
+        {"error": "LLM request error: timeout", "raw": None},
+        {"error": "LLM request error: 502", "raw": None},
+        {"json": {"ok": True}, "error": None},
+    ]
+    delays = []
+
+    out = call_with_retry(lambda: responses.pop(0), retries=3, backoff=0.1, sleep=delays.append)
+
+    assert out["attempts"] == 3
+    assert out["result"]["error"] is None
+    assert len(delays) == 2 and delays[1] > delays[0]
+
+
+def test_call_with_retry_does_not_retry_validation_errors():
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return {"error": "Invalid transfer #1: budget", "raw": None}
+
+    out = call_with_retry(fn, retries=3, backoff=0.1, sleep=lambda _: None)
+
+    assert out["attempts"] == 1
+    assert len(calls) == 1
+
+
+def test_failed_transfer_explanation_is_retried_and_reported(monkeypatch):
+    responses = [
+        {"json": {}, "error": None, "explain_error": "LLM request error: timeout"},
+        {"json": {}, "error": None, "explain_error": "LLM request error: 502"},
+    ]
+    monkeypatch.setattr(ai_batch, "transfer_advice", lambda **kwargs: responses.pop(0))
+    shared = {"pool_full": [], "projections": {}, "fdr_map": {}}
+
+    record = ai_batch.run_entry(1, 25, ["transfers"], shared, retries=1, backoff=0.0)
+
+    assert record["results"]["transfers"]["attempts"] == 2
+    assert record["results"]["transfers"]["error"] == "Explanation failed: LLM request error: 502"
+    assert record["ok"] is False
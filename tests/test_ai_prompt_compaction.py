@@ -0,0 +1,55 @@
+from utils.ai_prompt_compaction import (
+    TRANSFER_POOL_COLUMNS,
+    compact_candidate_pool,
+)
+
+
+def _player(pid, pos, fxp):
+    return {
+        "id": pid,
+        "name": f"Player {pid}",
+        "team": "ARS",
+        "pos": pos,
+        "price": 6.04,
+        "status": "a",
+        "predicted_points_gw": fxp - 0.3,
+        "fixture_adjusted_points": fxp,
+        "expected_minutes": 90,
+        "form_last3": 5.333333,
+        "rotation_risk": "low",
+        "fdr_next5": {"avg_fdr": 2.6, "fixtures": [{"gw": 20, "opp": 3, "home": True}] * 5, "raw_values": [2, 3, 2, 3, 3]},
+        "recent_history": [{"gw": g, "points": 5, "minutes": 90} for g in range(14, 20)],
+    }
+
+
+def test_compaction_drops_unreferenced_fields_and_rounds():
+    pool = [_player(1, "MID", 6.0)]
+
+    compact = compact_candidate_pool(pool, TRANSFER_POOL_COLUMNS)
+    cols = compact["table"]["cols"]
+    row = dict(zip(cols, compact["table"]["rows"][0]))
+
+    assert "recent_history" not in cols
+    assert row["fdr"] == 2.6
+    assert row["pr"] == 6
+    assert row["f3"] == 5.3
+    assert compact["tokens_after"] < compact["tokens_before"]
+
+
+def test_token_budget_prunes_lowest_ranked_but_keeps_position_floor():
+    pool = [_player(i, "MID", float(i)) for i in range(1, 21)] + [_player(100, "GK", 0.5)]
+    full = compact_candidate_pool(pool, TRANSFER_POOL_COLUMNS)
+
+    compact = compact_candidate_pool(
+        pool,
+        TRANSFER_POOL_COLUMNS,
+        token_budget=full["tokens_after"] // 2,
+        min_per_pos={"GK": 1},
+    )
+    kept = {p["id"] for p in compact["pool"]}
+
+    assert compact["tokens_after"] <= full["tokens_after"] // 2
+    assert 100 in kept
+    assert 20 in kept
+    assert 1 not in kept
+    assert set(compact["dropped_ids"]) == {p["id"] for p in pool} - kept
@@ -140,3 +140,28 @@ def test_sanitize_allows_non_improving_transfer_for_forced_sell():
 
     result = sanitize_llm_transfer_output(llm_json, state, _pool())
     assert result["error"] is None
+
+
+def test_transfers_cli_defaults_allow_a_transfer(monkeypatch):
+    import ai
+    from utils import ai_printer, ai_service
+
+    def squad_state(entry_id, gw, free_transfers, allowed_extra, **kwargs):
+        state = _base_state()
+        state.update(free_transfers=free_transfers, allowed_extra=allowed_extra)
+        return state
+
+    printed = []
+    monkeypatch.setattr(ai_service, "build_team_json", lambda *args, **kwargs: {})
+    monkeypatch.setattr(ai_service, "build_squad_state", squad_state)
+    monkeypatch.setattr(ai_service, "build_candidate_pool", lambda **kwargs: _pool())
+    monkeypatch.setattr(ai_service, "reduce_candidate_pool_for_transfers", lambda state, pool: pool)
+    monkeypatch.setattr(ai_printer, "print_pretty_transfer", printed.append)
+
+    parser = ai.build_parser()
+    args = parser.parse_args(["transfers", "--team", "7", "--gw", "5", "--no-explain"])
+    args.func(args)
+    assert [(t["out_id"], t["in_id"]) for t in printed[0]["json"]["suggested_transfers"]] == [(1, 101)]
+    # The batch subcommand assumes the same free transfer.
+    batch = parser.parse_args(["batch", "--entries", "entries.txt", "--gw", "5"])
+    assert batch.free_transfers == args.free_transfers
@@ -0,0 +1,71 @@
+import time
+
+from tests.test_ai_transfer_helpers import _base_state, _pool
+from utils.ai_transfer_validator import (
+    SquadState,
+    apply_transfer_suggestion,
+    index_pool,
+    validate_transfer_suggestion,
+)
+
+
+def test_squad_state_check_matches_dict_validator():
+    pool = _pool()
+    state = SquadState.from_dict(_base_state())
+    for out_id in (1, 2, 3, 99):
+        for in_id in (101, 102, 103, 1, None):
+            suggestion = {"out_id": out_id, "in_id": in_id}
+            assert state.check(out_id, in_id, index_pool(pool)) == validate_transfer_suggestion(
+                _base_state(), suggestion, pool
+            )
+
+
+def test_apply_and_undo_restore_state():
+    base = _base_state()
+    state = SquadState.from_dict(base)
+    pool = index_pool(_pool())
+
+    state.apply(1, pool[101])
+    assert state.owns(101) and not state.owns(1)
+    assert state.club_count("ARS") == 1
+    assert state.club_count("MCI") == 1
+    assert abs(state.bank - 0.3) < 1e-9
+    assert [p["id"] for p in state.squad] == [101, 2, 3]
+    assert 101 in state.by_pos["MID"]
+
+    state.undo()
+    assert state.to_dict() == base
+    assert state.by_pos["MID"] == {1}
+    # The caller's dict is untouched by apply/undo.
+    assert [p["id"] for p in base["squad"]] == [1, 2, 3]
+
+
+def test_apply_matches_dict_apply():
+    pool = _pool()
+    as_dict = _base_state()
+    apply_transfer_suggestion(as_dict, {"out_id": 2, "in_id": 102}, pool)
+
+    state = SquadState.from_dict(_base_state())
+    apply_transfer_suggestion(state, {"out_id": 2, "in_id": 102}, pool)
+
+    out = state.to_dict()
+    assert out["squad"] == as_dict["squad"]
+    assert abs(out["bank"] - as_dict["bank"]) < 1e-9
+    assert out["club_counts"] == {k: v for k, v in as_dict["club_counts"].items() if v}
+
+
+def test_check_apply_undo_throughput():
+    state = SquadState.from_dict(_base_state())
+    pool = index_pool(_pool())
+    n = 0
+    started = time.perf_counter()
+    for _ in range(2000):
+        for out_id, in_id in ((1, 101), (2, 102)):
+            ok, _ = state.check(out_id, in_id, pool)
+            if ok:
+                state.apply(out_id, pool[in_id])
+                n += 1
+        while state._undo:
+            state.undo()
+    assert n == 4000
+    assert time.perf_counter() - started < 1.0
@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+
+from models.asof_features import AsOfFeatureStore
+
+
+def _conn(with_snapshots=True):
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        "CREATE TABLE player_history (player_id INTEGER, gameweek INTEGER, total_points INTEGER, minutes INTEGER, "
+        "starts INTEGER, expected_goals REAL, expected_assists REAL, expected_goal_involvements REAL, creativity REAL)"
+    )
+    conn.executemany(
+        "INSERT INTO player_history VALUES (?,?,?,?,?,?,?,?,?)",
+        [
+            (10, 1, 6, 90, 1, 0.5, 0.1, 0.6, 20.0),
+            (10, 2, 0, 0, 0, 0.0, 0.0, 0.0, 0.0),
+            (10, 3, 2, 45, 0, 0.1, None, 0.1, 5.0),
+            (10, 3, 8, 90, 1, 0.8, 0.2, 1.0, 30.0),  # DGW
+            (11, 2, 1, 30, 0, 0.0, 0.0, 0.0, 1.0),
+        ],
+    )
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, deadline_time TEXT)")
+    conn.executemany("INSERT INTO events VALUES (?, ?)", [(2, "2025-08-22T17:30:00Z"), (3, "2025-08-29T17:30:00Z")])
+    conn.execute(
+        "CREATE TABLE player_gw_snapshot (snapshot_time TEXT, player_id INTEGER, status TEXT, "
+        "chance_of_playing_next_round INTEGER, chance_of_playing_this_round INTEGER, now_cost REAL, news TEXT, "
+        "news_added TEXT)"
+    )
+    if with_snapshots:
+        conn.execute(
+            "INSERT INTO player_gw_snapshot VALUES ('2025-08-27T09:00:00+00:00', 10, 'd', 25, 25, 7.5, 'Knock', NULL)"
+        )
+    return conn
+
+
+def test_aggregates_are_strictly_before_gw():
+    store = AsOfFeatureStore(_conn())
+    assert store.aggregates(10, 1)["total_points"] == 0
+    assert store.aggregates(10, 2)["total_points"] == 6
+    agg = store.aggregates(10, 4)
+    assert agg["total_points"] == 16
+    assert agg["minutes"] == 225
+    assert agg["appearances"] == 3
+    assert agg["expected_assists"] == pytest.approx(0.3)
+    # Past the last stored GW the full season counts; unknown players are empty.
+    assert store.aggregates(10, 38)["total_points"] == 16
+    assert store.aggregates(99, 5)["minutes"] == 0
+
+
+def test_player_row_replaces_leaky_fields():
+    store = AsOfFeatureStore(_conn())
+    current = {
+        "id": 10, "team_id": 1, "element_type": 3, "status": "a", "chance_of_playing_next_round": None,
+        "starts": 30, "minutes": 2700, "points_per_game": 7.1, "expected_goal_involvements_per_90": 0.9,
+        "creativity": 900.0,
+    }
+    row = store.player_row(current, 3)
+    assert row["team_id"] == 1 and row["element_type"] == 3
+    assert row["starts"] == 1 and row["minutes"] == 90
+    assert row["points_per_game"] == pytest.approx(6.0)  # GW2 blank does not count as a game
+    assert row["expected_goal_involvements_per_90"] == pytest.approx(0.6)
+    assert row["status"] == "d" and row["chance_of_playing_next_round"] == 25
+
+    # GW2 deadline predates every snapshot: neutral availability, not today's.
+    row = store.player_row(dict(current, status="i"), 2)
+    assert row["status"] == "a" and row["chance_of_playing_next_round"] is None
@@ -0,0 +1,105 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from models.bonus_model import add_bps_inputs, assign_bonus, fixture_squad_ids, sample_bonus
+from models.match_sim import simulate_match_events
+
+
+def _bonus(column):
+    bps = np.array(column, dtype=np.float32)[:, None]
+    return list(assign_bonus(bps, np.zeros(len(column), dtype=np.int64))[:, 0])
+
+
+def test_assign_bonus_follows_fpl_tie_rules():
+    assert _bonus([30, 20, 10, 5]) == [3, 2, 1, 0]
+    assert _bonus([30, 30, 10, 5]) == [3, 3, 1, 0]
+    assert _bonus([30, 20, 20, 5]) == [3, 2, 2, 0]
+    assert _bonus([30, 20, 10, 10, 5]) == [3, 2, 1, 1, 0]
+    assert _bonus([30, 30, 30, 5]) == [3, 3, 3, 0]
+    # Players who did not appear never get bonus, even in a two-man fixture.
+    assert _bonus([12, -np.inf, 9]) == [3, 0, 2]
+
+
+def test_assign_bonus_is_per_fixture_and_sim():
+    bps = np.array([[10, 1], [5, 9], [7, 3], [1, 2]], dtype=np.float32)
+    bonus = assign_bonus(bps, np.array([0, 0, 1, 1]))
+    assert bonus.tolist() == [[3, 2], [2, 3], [3, 3], [2, 2]]
+
+
+def _inputs(n_per_side=6):
+    n = 2 * n_per_side
+    positions = (["GK", "DEF", "DEF", "MID", "MID", "FWD"] * 4)[:n]
+    return {
+        "gw": 5,
+        "player_ids": list(range(1, n + 1)),
+        "positions": positions,
+        "fixtures": [{"fixture_id": 1, "team_h": 1, "team_a": 2, "lam_h": 1.5, "lam_a": 1.2}],
+        "slot_player": np.arange(n),
+        "slot_fixture": np.zeros(n, dtype=np.int64),
+        "slot_home": np.arange(n) < n_per_side,
+        "goal_share": np.array([0.0, 0.03, 0.03, 0.1, 0.1, 0.3] * 2),
+        "assist_share": np.array([0.01, 0.05, 0.05, 0.12, 0.12, 0.08] * 2),
+        "p_play": np.full(n, 0.95),
+        "p60": np.full(n, 0.85),
+        "bonus": np.zeros(n),
+        "bps_mean": np.full(n, 6.0),
+        "bps_std": np.full(n, 5.0),
+    }
+
+
+def test_sample_bonus_hands_out_at_least_six_per_fixture():
+    inputs = _inputs()
+    rng = np.random.default_rng(0)
+    events = simulate_match_events(inputs, 5000, rng)
+    bonus = sample_bonus(inputs, events, rng)
+    assert bonus.shape == (12, 5000)
+    per_sim = bonus.sum(axis=0)
+    assert (per_sim >= 6).all()
+    assert (bonus[~events["played"]] == 0).all()
+    # Goals drive BPS: the strikers take more bonus than the keepers.
+    assert bonus[5].mean() > bonus[0].mean()
+
+
+def _conn():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE fixtures (id INTEGER PRIMARY KEY, event INTEGER, team_h INTEGER, team_a INTEGER);
+        CREATE TABLE players (id INTEGER PRIMARY KEY, team_id INTEGER, element_type INTEGER);
+        CREATE TABLE player_history (player_id INTEGER, gameweek INTEGER, minutes INTEGER, goals_scored INTEGER,
+                                     assists INTEGER, clean_sheets INTEGER, home INTEGER, home_score INTEGER,
+                                     away_score INTEGER, bps INTEGER);
+        """
+    )
+    conn.executemany("INSERT INTO fixtures VALUES (?,?,?,?)", [(1, 3, 1, 2), (2, 3, 3, 4)])
+    conn.executemany("INSERT INTO players VALUES (?,?,?)", [(10, 1, 4), (11, 1, 2), (12, 2, 3), (13, 2, 3), (14, 3, 3)])
+    conn.executemany(
+        "INSERT INTO player_history VALUES (?,?,?,?,?,?,?,?,?,?)",
+        [
+            (10, 1, 90, 1, 0, 0, 1, 1, 1, 40),  # 6 + 24 goal -> residual 10
+            (10, 2, 90, 0, 0, 0, 0, 2, 0, 8),   # residual 2
+            (11, 1, 90, 0, 0, 1, 1, 0, 0, 30),  # 6 + 12 CS -> residual 12
+            (12, 2, 90, 0, 0, 0, 1, 0, 0, 10),
+            (14, 2, 90, 0, 0, 0, 1, 0, 0, 10),
+            # 13 did not play recently: not simulated.
+        ],
+    )
+    return conn
+
+
+def test_fixture_squad_ids_and_residuals():
+    conn = _conn()
+    ids = fixture_squad_ids([11], 3, conn=conn)
+    assert ids == [11, 10, 12]
+
+    inputs = {
+        "gw": 3, "player_ids": [10, 11], "positions": ["FWD", "DEF"], "slot_player": np.array([0, 1]),
+    }
+    add_bps_inputs(inputs, conn=conn)
+    # Two residuals (10, 2) shrunk toward the FWD prior of 3 with weight 5.
+    assert inputs["bps_mean"][0] == pytest.approx((12 + 5 * 3.0) / 7)
+    assert inputs["bps_mean"][1] == pytest.approx((12 + 5 * 6.0) / 6)
+    assert (inputs["bps_std"] > 0).all()
+
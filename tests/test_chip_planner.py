@@ -0,0 +1,101 @@
+import time
+
+import numpy as np
+
+from predictions.chip_planner import (
+    SQUAD_SHAPE,
+    chip_gain_distributions,
+    pick_xi,
+    plan_chips,
+    select_squad,
+)
+
+POSITIONS = ["GK"] * 4 + ["DEF"] * 10 + ["MID"] * 10 + ["FWD"] * 6
+N = len(POSITIONS)
+
+
+def _pool(seed=0):
+    rng = np.random.default_rng(seed)
+    teams = np.arange(N) % 10
+    prices = np.round(rng.uniform(4.0, 12.0, N), 1)
+    return teams, prices
+
+
+def _squad_rows():
+    # First 2 GK, 5 DEF, 5 MID, 3 FWD of the pool.
+    return [0, 1] + list(range(4, 9)) + list(range(14, 19)) + list(range(24, 27))
+
+
+def test_pick_xi_keeps_formation_and_captain():
+    scores = np.arange(N, dtype=float)
+    xi, cap = pick_xi(_squad_rows(), POSITIONS, scores)
+    assert len(xi) == 11
+    assert sum(POSITIONS[r] == "GK" for r in xi) == 1
+    assert sum(POSITIONS[r] == "DEF" for r in xi) >= 3
+    assert cap == 26  # best-scoring forward
+
+
+def test_select_squad_respects_shape_clubs_and_budget():
+    teams, prices = _pool()
+    scores = np.random.default_rng(1).uniform(0, 10, N)
+    squad = select_squad(scores, prices, POSITIONS, teams, budget=100.0)
+    assert len(squad) == 15
+    for pos, n in SQUAD_SHAPE.items():
+        assert sum(POSITIONS[r] == pos for r in squad) == n
+    assert np.bincount(teams[list(squad)]).max() <= 3
+    assert prices[list(squad)].sum() <= 100.0 + 1e-9
+    # A looser budget never gives a worse XI.
+    rich = select_squad(scores, prices, POSITIONS, teams, budget=200.0)
+    xi_tight, _ = pick_xi(squad, POSITIONS, scores)
+    xi_rich, _ = pick_xi(rich, POSITIONS, scores)
+    assert scores[xi_rich].sum() >= scores[xi_tight].sum() - 1e-9
+
+
+def _season(n_gws=38):
+    means = np.full((N, n_gws), 2.0)
+    squad = _squad_rows()
+    bench = [1, 7, 8, 26]  # GK2 and the lowest scorers below
+    means[bench, :] = 1.0
+    means[squad, 10] = 8.0   # double GW for the whole squad
+    if n_gws > 20:
+        means[24, 20] = 15.0  # captain spike
+    return means, squad
+
+
+def test_plan_places_chips_on_their_best_gameweeks_quickly():
+    teams, prices = _pool()
+    means, squad = _season()
+    budget = float(prices[squad].sum())
+    gws = list(range(1, 39))
+
+    started = time.perf_counter()
+    out = plan_chips(means, POSITIONS, teams, prices, squad, budget, gws, chips=["BB", "TC"])
+    assert time.perf_counter() - started < 2.0
+
+    by_chip = {s["chip"]: s for s in out["plan"]}
+    assert by_chip["BB"]["gw"] == 11
+    assert by_chip["TC"]["gw"] == 21
+    assert by_chip["TC"]["gain"] == 15.0
+    assert np.isclose(out["expected_gain"], by_chip["BB"]["gain"] + by_chip["TC"]["gain"])
+
+    # Every chip, with Free Hit / Wildcard squad picks, still plans in seconds.
+    started = time.perf_counter()
+    full = plan_chips(means, POSITIONS, teams, prices, squad, budget, gws)
+    assert time.perf_counter() - started < 5.0
+    assert {s["chip"] for s in full["plan"]} <= {"BB", "FH", "TC", "WC"}
+    assert full["expected_total"] >= out["expected_total"] - 1e-9
+
+
+def test_gain_distributions_per_chip_and_gameweek():
+    teams, prices = _pool()
+    means, squad = _season(n_gws=12)
+    stds = np.full_like(means, 0.5)
+    gws = list(range(1, 13))
+    budget = float(prices[squad].sum())
+    plan = plan_chips(means, POSITIONS, teams, prices, squad, budget, gws, chips=["BB", "FH"])
+    table = chip_gain_distributions(means, stds, POSITIONS, squad, plan["squad"], gws, chips=["BB", "FH"],
+                                    n_sims=4000, seed=0)
+    assert [r["gw"] for r in table["BB"]] == gws
+    assert table["BB"][10]["mean"] > 25 > table["BB"][0]["mean"]
+    assert table["BB"][10]["p10"] <= table["BB"][10]["p50"] <= table["BB"][10]["p90"]
+    assert len(table["FH"]) == len(gws)
@@ -0,0 +1,137 @@
+import sqlite3
+import time
+
+import numpy as np
+import pytest
+
+from models.component_model import (
+    RATE_COLUMNS,
+    component_points,
+    load_component_inputs,
+    poisson_rows,
+    sample_component_points,
+    sample_components,
+)
+
+
+def _inputs(n_players=4):
+    positions = (["GK", "DEF", "MID", "FWD"] * 4)[:n_players]
+    rates = np.array([[0.0, 0.01, 0.05, 0.002, 3.0, 0.02, 0.0],
+                      [0.05, 0.06, 0.15, 0.005, 0.0, 0.0, 0.0],
+                      [0.20, 0.20, 0.15, 0.004, 0.0, 0.0, 0.01],
+                      [0.45, 0.10, 0.10, 0.003, 0.0, 0.0, 0.02]])
+    return {
+        "player_ids": list(range(1, n_players + 1)),
+        "positions": positions,
+        "fixtures": [{"fixture_id": 1, "team_h": 1, "team_a": 2, "lam_h": 1.6, "lam_a": 1.1}],
+        "slot_player": np.arange(n_players),
+        "slot_fixture": np.zeros(n_players, dtype=np.int64),
+        "slot_home": np.arange(n_players) % 2 == 0,
+        "p_play": np.full(n_players, 0.9),
+        "p60": np.full(n_players, 0.8),
+        "bonus": np.full(n_players, 0.5),
+        "rates": rates[np.arange(n_players) % 4],
+        "dc_prob": np.array([0.0, 0.4, 0.2, 0.05])[np.arange(n_players) % 4],
+    }
+
+
+def test_poisson_rows_matches_rates():
+    counts = poisson_rows(np.array([0.0, 0.15, 3.0]), 200000, np.random.default_rng(0))
+    assert (counts[0] == 0).all()
+    assert counts[1].mean() == pytest.approx(0.15, abs=0.01)
+    assert counts[2].mean() == pytest.approx(3.0, abs=0.03)
+    assert counts[2].var() == pytest.approx(3.0, abs=0.1)
+
+
+def test_component_points_scoring():
+    inputs = _inputs()
+    ones = np.ones((4, 1), dtype=bool)
+    zeros = np.zeros((4, 1), dtype=np.int16)
+    comp = {
+        "played": ones, "sixty": ones,
+        "goals": np.array([[0], [1], [1], [2]], dtype=np.int16),
+        "assists": np.array([[0], [0], [1], [0]], dtype=np.int16),
+        "conceded": np.array([[0], [3], [0], [1]], dtype=np.int16),
+        "yellow": np.array([[False], [True], [False], [True]]),
+        "red": np.array([[False], [True], [False], [False]]),
+        "saves": np.array([[7], [0], [0], [0]], dtype=np.int16),
+        "pen_saved": np.array([[1], [0], [0], [0]], dtype=np.int16),
+        "pen_missed": zeros,
+        "dc": np.array([[False], [True], [True], [False]]),
+    }
+    inputs["bonus"] = np.zeros(4)
+    pts = component_points(inputs, comp)[:, 0]
+    # GK: 2 + CS 4 + saves 2 + pen save 5; DEF: 2 + goal 6 - GC 1 - red 3 + DC 2;
+    # MID: 2 + 5 + 3 + CS 1 + DC 2; FWD: 2 + 8 - yellow 1.
+    assert list(pts) == [13, 6, 13, 9]
+
+
+def test_sample_component_points_shape_and_minutes():
+    inputs = _inputs()
+    pts, played = sample_component_points([], 5, 20000, rng=np.random.default_rng(3), inputs=inputs,
+                                          return_played=True)
+    assert pts.shape == (4, 20000)
+    assert played.mean() == pytest.approx(0.9, abs=0.01)
+    assert (pts[~played] == 0).all()
+    comp = sample_components(inputs, 20000, np.random.default_rng(3))
+    assert (comp["goals"][~comp["played"]] == 0).all()
+    assert (comp["dc"] <= comp["sixty"]).all()
+    # Forward with 0.45 xG/90 in a 1.6 xG home fixture scores most.
+    assert pts[3].mean() > pts[1].mean()
+
+
+def test_same_fixture_shares_goals_conceded():
+    # Slots 0, 2, 4, 6 are the home side of one fixture, 1, 3, 5, 7 the away side.
+    comp = sample_components(_inputs(8), 20000, np.random.default_rng(5))
+    conceded = comp["conceded"]
+    assert (conceded[::2] == conceded[0]).all()
+    assert (conceded[1::2] == conceded[1]).all()
+    assert conceded[0].mean() == pytest.approx(1.1, abs=0.05)
+    assert conceded[1].mean() == pytest.approx(1.6, abs=0.05)
+
+
+def test_fifteen_players_hundred_thousand_sims_is_fast():
+    inputs = _inputs(15)
+    sample_component_points([], 5, 1000, rng=np.random.default_rng(0), inputs=inputs)
+    started = time.perf_counter()
+    pts = sample_component_points([], 5, 100000, rng=np.random.default_rng(0), inputs=inputs)
+    assert pts.shape == (15, 100000)
+    assert time.perf_counter() - started < 1.0
+
+
+def _conn(with_saves):
+    conn = sqlite3.connect(":memory:")
+    saves = ", saves INTEGER" if with_saves else ""
+    conn.executescript(
+        f"""
+        CREATE TABLE teams (id INTEGER PRIMARY KEY, strength_attack_home INTEGER, strength_attack_away INTEGER,
+                            strength_defence_home INTEGER, strength_defence_away INTEGER);
+        CREATE TABLE fixtures (id INTEGER PRIMARY KEY, event INTEGER, team_h INTEGER, team_a INTEGER,
+                               difficulty_home INTEGER, difficulty_away INTEGER, finished INTEGER);
+        CREATE TABLE players (id INTEGER PRIMARY KEY, team_id INTEGER, element_type INTEGER, status TEXT,
+                              chance_of_playing_next_round INTEGER, saves_per_90 REAL);
+        CREATE TABLE player_history (player_id INTEGER, gameweek INTEGER, minutes INTEGER,
+                                     expected_goals REAL, expected_assists REAL, bonus_points INTEGER,
+                                     yellow_cards INTEGER, red_cards INTEGER, penalties_saved INTEGER,
+                                     penalties_missed INTEGER, defensive_contribution INTEGER{saves});
+        """
+    )
+    conn.executemany("INSERT INTO teams VALUES (?,?,?,?,?)", [(1, 1200, 1200, 1200, 1200), (2, 1200, 1200, 1200, 1200)])
+    conn.executemany("INSERT INTO fixtures VALUES (?,?,?,?,?,?,?)", [(1, 1, 1, 2, 3, 3, 1), (2, 2, 2, 1, 3, 3, 0)])
+    conn.executemany("INSERT INTO players VALUES (?,?,?,?,?,?)", [(1, 1, 1, "a", None, 2.5), (2, 1, 2, "a", None, 0.0)])
+    extra = (6,) if with_saves else ()
+    conn.execute(f"INSERT INTO player_history VALUES (1, 1, 90, 0, 0, 1, 0, 0, 1, 0, 0{', ?' if with_saves else ''})", extra)
+    conn.execute(f"INSERT INTO player_history VALUES (2, 1, 90, 0.1, 0, 0, 1, 0, 0, 0, 11{', 0' if with_saves else ''})")
+    return conn
+
+
+def test_load_component_inputs_rates_and_saves_fallback():
+    col = RATE_COLUMNS.index("saves")
+    with_saves = load_component_inputs([1, 2], 2, conn=_conn(True))
+    without = load_component_inputs([1, 2], 2, conn=_conn(False))
+    # 6 saves in 90 minutes, shrunk toward the GK prior.
+    assert 2.8 < with_saves["rates"][0, col] < 6.0
+    assert without["rates"][0, col] == pytest.approx(2.5)
+    # Defender hit the 10 CBIT threshold in his only 60+ appearance.
+    assert with_saves["dc_prob"][1] > 0.35
+    assert with_saves["rates"][1, RATE_COLUMNS.index("yellow_cards")] > 0.14
@@ -0,0 +1,105 @@
+import sqlite3
+
+import numpy as np
+
+from models.covariance import (
+    ELSEWHERE,
+    OPPONENT,
+    TEAMMATE,
+    cached_covariance,
+    correlation_factor,
+    correlation_matrix,
+    estimate_covariance,
+    reset_covariance_cache,
+)
+from models.sampling import sample_player_matrix
+
+N_TEAMS = 4
+PER_TEAM = 6
+FWD_ROWS = (4, 5)
+
+
+def _conn(n_gws=30, seed=0):
+    """Two fixtures per GW; forwards of a club share a strong common factor."""
+    rng = np.random.default_rng(seed)
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE players (id INTEGER PRIMARY KEY, team_id INTEGER, element_type INTEGER);
+        CREATE TABLE fixtures (id INTEGER PRIMARY KEY, event INTEGER, team_h INTEGER, team_a INTEGER);
+        CREATE TABLE player_history (player_id INTEGER, gameweek INTEGER, fixture INTEGER, home INTEGER,
+                                     minutes INTEGER, total_points INTEGER);
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+        """
+    )
+    positions = [1, 2, 2, 3, 4, 4]
+    players = [(t * PER_TEAM + i + 1, t + 1, positions[i]) for t in range(N_TEAMS) for i in range(PER_TEAM)]
+    conn.executemany("INSERT INTO players VALUES (?,?,?)", players)
+
+    rows, fid = [], 1
+    for gw in range(1, n_gws + 2):
+        pairs = [(1, 2), (3, 4)] if gw % 2 else [(1, 3), (2, 4)]
+        for h, a in pairs:
+            conn.execute("INSERT INTO fixtures VALUES (?,?,?,?)", (fid, gw, h, a))
+            if gw <= n_gws:
+                for team, home in ((h, 1), (a, 0)):
+                    common = rng.normal()
+                    for i in range(PER_TEAM):
+                        pid = (team - 1) * PER_TEAM + i + 1
+                        noise = 0.8 * common + 0.6 * rng.normal() if i in FWD_ROWS else rng.normal()
+                        rows.append((pid, gw, fid, home, 90, int(round(5 + 3 * noise))))
+            fid += 1
+    conn.executemany("INSERT INTO player_history VALUES (?,?,?,?,?,?)", rows)
+    conn.execute("INSERT INTO meta VALUES ('data_version', 'v1')")
+    return conn
+
+
+def test_estimate_finds_teammate_stacks():
+    conn = _conn()
+    cov = estimate_covariance(31, conn=conn)
+    assert len(cov.index) == N_TEAMS * PER_TEAM
+    fwd = 3
+    assert cov.class_corr[TEAMMATE, fwd, fwd] > 0.3
+    assert abs(cov.class_corr[ELSEWHERE, fwd, fwd]) < 0.15
+    assert abs(cov.class_corr[OPPONENT, fwd, fwd]) < 0.15
+
+    # GW31: team 1 v 2. The two team-1 forwards correlate, a team-3 forward does not.
+    ids = [5, 6, 11, 17]
+    corr = correlation_matrix(ids, 31, cov=cov, conn=conn)
+    assert corr[0, 1] > 0.4
+    assert abs(corr[0, 3]) < 0.2
+    assert np.all(np.linalg.eigvalsh(corr) > 0)
+    np.testing.assert_allclose(np.diag(corr), 1.0)
+
+
+def test_factor_reproduces_correlation_in_samples():
+    conn = _conn()
+    ids = list(range(1, N_TEAMS * PER_TEAM + 1))
+    corr = correlation_matrix(ids, 31, conn=conn)
+
+    loadings, idio = correlation_factor(corr)
+    assert not idio.any()
+    np.testing.assert_allclose(loadings @ loadings.T, corr, atol=1e-5)
+
+    low, low_idio = correlation_factor(corr, rank=6)
+    assert low.shape == (len(ids), 6)
+    np.testing.assert_allclose(np.diag(low @ low.T) + low_idio ** 2, 1.0, atol=1e-9)
+
+    means = np.full(len(ids), 20.0)
+    stds = np.full(len(ids), 3.0)
+    samples = sample_player_matrix(
+        means, stds, ["MID"] * len(ids), 40000, np.random.default_rng(0), factor=(loadings, idio)
+    )
+    assert samples.shape == (len(ids), 40000)
+    np.testing.assert_allclose(samples.mean(axis=1), 20.0, atol=0.1)
+    np.testing.assert_allclose(np.corrcoef(samples), corr, atol=0.03)
+
+
+def test_covariance_cache_follows_data_version():
+    reset_covariance_cache()
+    conn = _conn()
+    first = cached_covariance(31, conn=conn)
+    assert cached_covariance(31, conn=conn) is first
+    conn.execute("UPDATE meta SET value = 'v2'")
+    assert cached_covariance(31, conn=conn) is not first
+    reset_covariance_cache()
@@ -0,0 +1,124 @@
+import sqlite3
+
+from db.entries import (
+    load_entry_gw_block,
+    load_league_entry_ids,
+    load_team_stats,
+    save_league_entries,
+    save_team_stats,
+)
+from db.sqlite import init_entry_tables
+
+
+def _conn():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    cur = conn.cursor()
+    cur.execute("CREATE TABLE teams (id INTEGER PRIMARY KEY, short_name TEXT)")
+    cur.execute(
+        "CREATE TABLE players (id INTEGER PRIMARY KEY, first_name TEXT, second_name TEXT, "
+        "team_id INTEGER, element_type INTEGER)"
+    )
+    cur.execute("INSERT INTO teams VALUES (1, 'ARS')")
+    cur.executemany(
+        "INSERT INTO players VALUES (?,?,?,?,?)",
+        [(pid, "P", str(pid), 1, 1 if pid in (1, 12) else 3) for pid in range(1, 16)],
+    )
+    init_entry_tables(cur)
+    return conn
+
+
+def _pick(pid, slot, captain=False):
+    return {
+        "id": pid,
+        "name": f"P {pid}",
+        "team": "ARS",
+        "pos": "GK" if pid in (1, 12) else "MID",
+        "total_points": 4 * (2 if captain else 1),
+        "goals_scored": 0,
+        "assists": 1,
+        "clean_sheets": 0,
+        "bonus_points": 0,
+        "multiplier": 2 if captain else (1 if slot <= 11 else 0),
+        "is_captain": captain,
+        "is_vice": False,
+        "slot": slot,
+    }
+
+
+def _team_json(entry_id=7, gws=(1, 2, 3)):
+    return {
+        "entry_id": entry_id,
+        "team_name": "Team",
+        "manager": "A B",
+        "total_points": 150,
+        "current_overall_rank": 1000,
+        "chips": {"2": "BB"},
+        "gw_data": [
+            {
+                "gw": gw,
+                "points": 50,
+                "overall_rank": 1000 + gw,
+                "gw_rank": 500,
+                "transfers": 0,
+                "transfer_cost": 0,
+                "value": 100.0,
+                "bank": 0.5 * gw,
+                "chip": "BB" if gw == 2 else None,
+                "team": {
+                    "starting": [_pick(pid, pid, captain=pid == 5) for pid in range(1, 12)],
+                    "bench": [_pick(pid, pid) for pid in range(12, 16)],
+                    "captain_id": 5,
+                    "vice_id": None,
+                    "starting_total": 48,
+                    "bench_total": 16,
+                },
+            }
+            for gw in gws
+        ],
+    }
+
+
+def test_team_stats_round_trip():
+    conn = _conn()
+    team_json = _team_json()
+    save_team_stats(team_json, conn=conn)
+
+    assert load_team_stats(7, conn=conn) == team_json
+    assert load_team_stats(8, conn=conn) is None
+
+
+def test_save_replaces_previous_rows():
+    conn = _conn()
+    save_team_stats(_team_json(gws=(1, 2, 3)), conn=conn)
+    save_team_stats(_team_json(gws=(1, 2)), conn=conn)
+
+    loaded = load_team_stats(7, conn=conn)
+    assert [g["gw"] for g in loaded["gw_data"]] == [1, 2]
+    cnt = conn.execute("SELECT COUNT(*) FROM entry_picks WHERE entry_id = 7").fetchone()[0]
+    assert cnt == 30
+
+
+def test_gw_block_uses_last_gw_before_target():
+    conn = _conn()
+    save_team_stats(_team_json(), conn=conn)
+
+    block = load_entry_gw_block(7, before_gw=3, conn=conn)
+    assert block["gw"] == 2
+    assert block["bank"] == 1.0
+    assert len(block["team"]["starting"]) == 11
+    assert len(block["team"]["bench"]) == 4
+
+    assert load_entry_gw_block(7, conn=conn)["gw"] == 3
+    assert load_entry_gw_block(7, before_gw=1, conn=conn) is None
+
+
+def test_league_entries():
+    conn = _conn()
+    save_league_entries(
+        99,
+        "classic",
+        [{"entry_id": 3, "rank": 2, "total": 10}, {"entry_id": 7, "rank": 1, "total": 12}],
+        conn=conn,
+    )
+    assert load_league_entry_ids(99, conn=conn) == [7, 3]
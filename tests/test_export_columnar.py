@@ -0,0 +1,119 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from db.sqlite import get_data_version, set_data_version
+from pipeline.export_columnar import (
+    INT_NULL,
+    columnar_is_current,
+    export_columnar,
+    load_columnar,
+    load_manifest,
+)
+
+
+def _conn():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute(
+        "CREATE TABLE player_history (id INTEGER PRIMARY KEY AUTOINCREMENT, player_id INTEGER, "
+        "gameweek INTEGER, total_points INTEGER, expected_goals REAL, home BOOLEAN, kickoff_time TEXT)"
+    )
+    conn.executemany(
+        "INSERT INTO player_history (player_id, gameweek, total_points, expected_goals, home, kickoff_time) "
+        "VALUES (?,?,?,?,?,?)",
+        [
+            (2, 1, 6, 0.4, 1, "2025-08-16T14:00:00Z"),
+            (1, 2, None, None, 0, None),
+            (1, 1, 2, 0.1, 1, "2025-08-16T14:00:00Z"),
+        ],
+    )
+    set_data_version("2025-08-20T10:00:00+00:00", conn=conn)
+    return conn
+
+
+def test_export_and_mmap_roundtrip(tmp_path):
+    conn = _conn()
+    manifest = export_columnar(tmp_path, conn=conn)
+
+    # Tables that do not exist are skipped, not created.
+    assert list(manifest["tables"]) == ["player_history"]
+    meta = manifest["tables"]["player_history"]
+    assert meta["rows"] == 3
+    assert meta["columns"]["total_points"]["dtype"] == "<i8"
+    assert meta["columns"]["expected_goals"]["dtype"] == "<f8"
+    assert meta["columns"]["kickoff_time"]["dtype"].startswith("<U")
+    assert load_manifest(tmp_path)["data_version"] == "2025-08-20T10:00:00+00:00"
+
+    cols = load_columnar("player_history", out_dir=tmp_path)
+    assert isinstance(cols["player_id"], np.memmap)
+    # Sorted by player_id, gameweek.
+    assert cols["player_id"].tolist() == [1, 1, 2]
+    assert cols["gameweek"].tolist() == [1, 2, 1]
+    assert cols["total_points"].tolist() == [2, INT_NULL, 6]
+    assert np.isnan(cols["expected_goals"][1])
+    assert cols["kickoff_time"][1] == ""
+    assert cols["home"].tolist() == [1, 0, 1]
+
+
+def test_column_subset_and_errors(tmp_path):
+    conn = _conn()
+    export_columnar(tmp_path, conn=conn)
+
+    cols = load_columnar("player_history", columns=["gameweek"], out_dir=tmp_path)
+    assert list(cols) == ["gameweek"]
+    with pytest.raises(KeyError):
+        load_columnar("player_fixtures", out_dir=tmp_path)
+    with pytest.raises(KeyError):
+        load_columnar("player_history", columns=["nope"], out_dir=tmp_path)
+
+
+def test_data_version_staleness(tmp_path):
+    conn = _conn()
+    assert not columnar_is_current(tmp_path, conn=conn)
+    export_columnar(tmp_path, conn=conn)
+    assert columnar_is_current(tmp_path, conn=conn)
+
+    set_data_version("2025-08-27T10:00:00+00:00", conn=conn)
+    assert get_data_version(conn=conn) == "2025-08-27T10:00:00+00:00"
+    assert not columnar_is_current(tmp_path, conn=conn)
+
+    # Re-export writes a new table directory and removes the old one.
+    old_dir = load_manifest(tmp_path)["tables"]["player_history"]["dir"]
+    conn.execute("DELETE FROM player_history WHERE player_id = 2")
+    manifest = export_columnar(tmp_path, conn=conn)
+    assert manifest["tables"]["player_history"]["rows"] == 2
+    assert manifest["tables"]["player_history"]["dir"] != old_dir
+    assert not (tmp_path / old_dir).exists()
+    assert load_columnar("player_history", out_dir=tmp_path)["player_id"].tolist() == [1, 1]
+
+
+def test_subset_export_merges_into_manifest(tmp_path):
+    conn = _conn()
+    conn.execute("CREATE TABLE player_projections (player_id INTEGER, gameweek INTEGER, mean REAL)")
+    conn.executemany("INSERT INTO player_projections VALUES (?,?,?)", [(2, 21, 4.5), (1, 21, 3.0)])
+    export_columnar(tmp_path, conn=conn)
+    history_dir = load_manifest(tmp_path)["tables"]["player_history"]["dir"]
+
+    set_data_version("2025-08-27T10:00:00+00:00", conn=conn)
+    conn.execute("UPDATE player_projections SET mean = mean + 1")
+    manifest = export_columnar(tmp_path, tables=["player_projections"], conn=conn)
+
+    # The untouched table keeps its files, and the mixed export is not current.
+    assert sorted(manifest["tables"]) == ["player_history", "player_projections"]
+    assert manifest["tables"]["player_history"]["dir"] == history_dir
+    assert manifest["data_version"] is None
+    assert not columnar_is_current(tmp_path, conn=conn)
+    assert load_columnar("player_history", out_dir=tmp_path)["player_id"].tolist() == [1, 1, 2]
+    assert load_columnar("player_projections", out_dir=tmp_path)["mean"].tolist() == [4.0, 5.5]
+
+    export_columnar(tmp_path, tables=["player_history"], conn=conn)
+    assert columnar_is_current(tmp_path, conn=conn)
+
+    # A subset cannot switch the format of the rest of the export.
+    path = tmp_path / "manifest.json"
+    path.write_text(path.read_text().replace('"format": "npy"', '"format": "arrow"'))
+    with pytest.raises(ValueError):
+        export_columnar(tmp_path, tables=["player_history"], conn=conn)
@@ -0,0 +1,63 @@
+import time
+
+import numpy as np
+
+from predictions.h2h_sim import simulate_h2h, simulate_h2h_fixtures
+from predictions.league_sim import build_entry_weights
+
+
+def _squad(entry_id, starting, captain=None, vice=None):
+    return {"entry_id": entry_id, "starting": list(starting), "bench": [], "captain_id": captain, "vice_id": vice}
+
+
+def _params(squads, mean=4.0, std=2.0, overrides=None):
+    ids = build_entry_weights(squads)["player_ids"]
+    means = np.array([(overrides or {}).get(pid, mean) for pid in ids])
+    return means, np.full(len(ids), std), ["MID"] * len(ids)
+
+
+def test_identical_squads_always_draw():
+    a = _squad(1, range(11), captain=0, vice=1)
+    b = _squad(2, range(11), captain=0, vice=1)
+    out = simulate_h2h(a, b, *_params([a, b]), n_sims=5000, seed=0)
+    assert out["p_draw"] == 1.0
+    assert out["margin_mean"] == 0.0
+    assert out["swing_players"] == []
+
+
+def test_shared_players_cancel_and_differentials_swing():
+    a = _squad(1, list(range(10)) + [10], captain=0)
+    b = _squad(2, list(range(10)) + [11], captain=0)
+    means, stds, positions = _params([a, b], overrides={10: 6.0, 11: 3.0})
+    out = simulate_h2h(a, b, means, stds, positions, n_sims=20000, seed=1)
+
+    assert abs(out["p_win"] + out["p_draw"] + out["p_loss"] - 1.0) < 1e-9
+    assert out["p_win"] > out["p_loss"]
+    assert {r["player_id"] for r in out["swing_players"]} == {10, 11}
+    by_id = {r["player_id"]: r for r in out["swing_players"]}
+    assert by_id[10]["side"] == "A" and by_id[11]["side"] == "B"
+    assert abs(sum(r["expected"] for r in out["swing_players"]) - out["margin_mean"]) < 1e-3
+    assert abs(sum(out["margin_hist"].values()) - 1.0) < 1e-9
+
+
+def test_captain_difference_is_attributed_to_captain():
+    a = _squad(1, range(11), captain=0)
+    b = _squad(2, range(11), captain=1)
+    out = simulate_h2h(a, b, *_params([a, b]), n_sims=5000, seed=2)
+    assert {r["player_id"] for r in out["swing_players"]} == {0, 1}
+
+
+def test_fixtures_for_whole_league_gw():
+    rng = np.random.default_rng(0)
+    squads = [_squad(e, [int(x) for x in rng.choice(300, 11, replace=False)]) for e in range(20)]
+    for s in squads:
+        s["captain_id"] = s["starting"][0]
+    fixtures = [(2 * i, 2 * i + 1) for i in range(10)]
+    means, stds, positions = _params(squads)
+
+    started = time.perf_counter()
+    out = simulate_h2h_fixtures(squads, fixtures, means, stds, positions, n_sims=50000, seed=0)
+    assert time.perf_counter() - started < 10.0
+    assert len(out) == 10
+    for r in out:
+        assert abs(r["p_win"] + r["p_draw"] + r["p_loss"] - 1.0) < 1e-9
@@ -0,0 +1,46 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Budget for `import ai` + building the parser (interpreter startup excluded).
+AI_IMPORT_BUDGET_S = 0.2
+
+HEAVY_MODULES = ("numpy", "pandas", "matplotlib", "openai", "dotenv", "rich")
+
+
+def _run(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def _loaded_heavy(code: str) -> list:
+    probe = f"{code}\nimport sys, json\nprint(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))"
+    return json.loads(_run(probe).stdout.strip().splitlines()[-1])
+
+
+def test_ai_cli_parser_imports_no_heavy_dependencies():
+    assert _loaded_heavy("import ai; ai.build_parser()") == []
+
+
+def test_ai_cli_import_time_budget():
+    proc = _run("import ai; ai.build_parser()")
+    # -X importtime: "import time: self [us] | cumulative | name"
+    cumulative_us = 0
+    for line in proc.stderr.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == "ai":
+            cumulative_us = int(parts[1])
+    assert 0 < cumulative_us < AI_IMPORT_BUDGET_S * 1e6
+
+
+def test_team_stats_does_not_import_plotting_stack():
+    loaded = _loaded_heavy("import utils.team_stats")
+    assert "matplotlib" not in loaded and "pandas" not in loaded
@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+
+from predictions.league_sim import build_entry_weights, entry_scores, simulate_league
+
+
+def _squad(entry_id, starting, bench=(), captain=None, vice=None, chip=None):
+    return {
+        "entry_id": entry_id,
+        "starting": list(starting),
+        "bench": list(bench),
+        "captain_id": captain,
+        "vice_id": vice,
+        "chip": chip,
+    }
+
+
+def test_weights_use_union_of_players():
+    squads = [_squad(1, [10, 11], [12], captain=10), _squad(2, [11, 13], [10], captain=13, chip="BB")]
+    mapping = build_entry_weights(squads)
+    assert mapping["player_ids"] == [10, 11, 12, 13]
+    assert mapping["weights"].tolist() == [[1, 1, 0, 0], [1, 1, 0, 1]]
+    assert mapping["cap_idx"].tolist() == [0, 3]
+
+
+def test_entry_scores_captain_and_vice():
+    squads = [
+        _squad(1, [10, 11], captain=10, vice=11),
+        _squad(2, [10, 11], captain=10, vice=11, chip="TC"),
+    ]
+    mapping = build_entry_weights(squads)
+    samples = np.array([[5.0, 0.0], [2.0, 3.0]], dtype=np.float32)  # player 10 blanks in sim 2
+    scores = entry_scores(samples, mapping)
+    assert scores[0].tolist() == [12.0, 6.0]  # 5+2+5, then vice doubles: 0+3+3
+    assert scores[1].tolist() == [17.0, 9.0]
+
+
+def test_position_probabilities():
+    n_players = 12
+    strong = _squad(1, range(0, 11), captain=0)
+    weak = _squad(2, list(range(0, 10)) + [11], captain=1)
+    means = np.full(n_players, 4.0)
+    means[10] = 8.0  # only entry 1 owns the better 11th player
+    means[11] = 1.0
+    stds = np.full(n_players, 2.0)
+    positions = ["MID"] * n_players
+
+    out = simulate_league([strong, weak], means, stds, positions, n_sims=20000, seed=3)
+    probs = out["position_probs"]
+    assert np.allclose(probs.sum(axis=0), 1.0)
+    assert np.allclose(probs.sum(axis=1), 1.0)
+    assert probs[0, 0] > 0.9
+    assert out["expected_position"][0] < out["expected_position"][1]
+
+    # A big enough head start flips it.
+    out = simulate_league([strong, weak], means, stds, positions, base_totals=[0, 100], n_sims=5000, seed=3)
+    assert out["position_probs"][1, 0] == 1.0
+
+
+def test_identical_squads_share_samples():
+    squads = [_squad(1, range(11), captain=0), _squad(2, range(11), captain=0)]
+    out = simulate_league(squads, np.full(11, 4.0), np.full(11, 2.0), ["DEF"] * 11, n_sims=5000, seed=1)
+    # Same draws -> equal totals in every sim; the stable sort keeps entry order.
+    assert out["position_probs"][0, 0] == 1.0
+    assert out["expected_points"][0] == out["expected_points"][1]
+
+
+def test_fifty_entries_hundred_thousand_sims():
+    rng = np.random.default_rng(0)
+    squads = [
+        _squad(e, [int(x) for x in rng.choice(200, 11, replace=False)], captain=None)
+        for e in range(50)
+    ]
+    for s in squads:
+        s["captain_id"] = s["starting"][0]
+    n = len(build_entry_weights(squads)["player_ids"])
+    started = time.perf_counter()
+    out = simulate_league(squads, np.full(n, 4.0), np.full(n, 3.0), ["MID"] * n, n_sims=100000, seed=0)
+    assert time.perf_counter() - started < 10.0
+    assert np.allclose(out["position_probs"].sum(axis=1), 1.0)
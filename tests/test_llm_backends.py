@@ -0,0 +1,43 @@
+import json
+
+from tests.test_ai_transfer_helpers import _base_state, _pool
+from utils.ai_predictor import ask_llm
+from utils.ai_service_helpers import merge_transfer_explanation, sanitize_llm_transfer_output
+from utils.llm_backends import ReplayBackend, StubBackend, prompt_key, set_llm_backend
+from utils.transfer_search import plan_to_suggestion, search_transfers
+
+
+def test_stub_transfer_explanation_merges_and_passes_validation():
+    state = _base_state()
+    plan = search_transfers(state, _pool(), top_k=1)[0]
+    suggestion = plan_to_suggestion(plan, 25)
+    set_llm_backend(StubBackend())
+    try:
+        rsp = ask_llm("prompt", kind="transfer_explain", context={"gw": 25, "plan": plan, "suggestion": suggestion})
+    finally:
+        set_llm_backend(None)
+
+    assert rsp["error"] is None
+    merged = merge_transfer_explanation(suggestion, rsp["json"])
+    assert [(t["out_id"], t["in_id"]) for t in merged["suggested_transfers"]] == [(1, 101)]
+    assert merged["suggested_transfers"][0]["reason"] == "Stub: projection gain 0.90."
+    assert sanitize_llm_transfer_output(merged, state, _pool())["error"] is None
+
+
+def test_stub_prefers_fixture_file(tmp_path):
+    (tmp_path / "captaincy.json").write_text(json.dumps({"gameweek": 7, "notes": "fixture"}), encoding="utf-8")
+
+    rsp = StubBackend(fixtures_dir=tmp_path).complete("prompt", kind="captaincy", context={})
+
+    assert rsp["json"] == {"gameweek": 7, "notes": "fixture"}
+
+
+def test_replay_backend_hit_and_miss(tmp_path):
+    (tmp_path / f"{prompt_key('cached prompt')}.json").write_text(
+        json.dumps({"kind": "h2h", "raw": '{"who_is_favored": "A"}'}),
+        encoding="utf-8",
+    )
+    backend = ReplayBackend(tmp_path)
+
+    assert backend.complete("cached prompt")["json"] == {"who_is_favored": "A"}
+    assert "Replay cache miss" in backend.complete("other prompt")["error"]
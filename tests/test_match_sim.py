@@ -0,0 +1,140 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from models.match_sim import (
+    event_points,
+    fixture_goal_rates,
+    load_match_inputs,
+    sample_match_points,
+    simulate_match_events,
+)
+
+
+def _inputs():
+    # Fixture 0: team 1 (home) v team 2. Slots: GK + 2 DEF + FWD of team 1, FWD of team 2.
+    return {
+        "gw": 5,
+        "player_ids": [1, 2, 3, 4, 5],
+        "positions": ["GK", "DEF", "DEF", "FWD", "FWD"],
+        "fixtures": [{"fixture_id": 1, "team_h": 1, "team_a": 2, "lam_h": 1.6, "lam_a": 1.2}],
+        "slot_player": np.array([0, 1, 2, 3, 4]),
+        "slot_fixture": np.array([0, 0, 0, 0, 0]),
+        "slot_home": np.array([True, True, True, True, False]),
+        "goal_share": np.array([0.0, 0.0, 0.0, 0.4, 0.4]),
+        "assist_share": np.array([0.0, 0.0, 0.0, 0.2, 0.2]),
+        "p_play": np.ones(5),
+        "p60": np.ones(5),
+        "bonus": np.zeros(5),
+    }
+
+
+def test_one_scoreline_per_fixture_drives_every_player():
+    inputs = _inputs()
+    events = simulate_match_events(inputs, 5000, np.random.default_rng(0))
+    pts = event_points(inputs, events)
+
+    # Same defence, same clean sheets and goals conceded.
+    np.testing.assert_array_equal(events["conceded"][0], events["conceded"][1])
+    np.testing.assert_array_equal(pts[1], pts[2])
+    # Team 1 concedes exactly what team 2 scores; goals never exceed the team's.
+    np.testing.assert_array_equal(events["conceded"][0], events["away_goals"][0])
+    assert (events["goals"][3] <= events["home_goals"][0]).all()
+    assert (events["goals"][4] <= events["away_goals"][0]).all()
+    assert events["home_goals"].mean() == pytest.approx(1.6, abs=0.1)
+    # The away striker scoring means the home defence did not keep a clean sheet.
+    scored = events["goals"][4] > 0
+    assert (pts[1][scored] < 6).all()
+    assert np.corrcoef(events["goals"][4], pts[1])[0, 1] < -0.3
+
+
+def test_minutes_gate_points():
+    inputs = _inputs()
+    inputs["p_play"] = np.array([0.0, 1.0, 0.5, 1.0, 1.0])
+    inputs["p60"] = np.array([0.0, 0.0, 0.5, 1.0, 1.0])
+    events = simulate_match_events(inputs, 4000, np.random.default_rng(1))
+    pts = event_points(inputs, events)
+    assert (pts[0] == 0).all()
+    # Under 60 minutes: appearance point only (no clean sheet for a defender).
+    assert (pts[1] == 1).all()
+    assert events["played"][2].mean() == pytest.approx(0.5, abs=0.05)
+    assert (events["sixty"][2] <= events["played"][2]).all()
+
+
+def test_rarely_used_squad_players_do_not_dilute_regulars():
+    inputs = _inputs()
+    # Ten fringe forwards of team 1 who rarely play: shares sum to 1.5 on paper.
+    n = 10
+    for key, extra in (("slot_player", 3), ("slot_fixture", 0), ("slot_home", True), ("goal_share", 0.15),
+                       ("assist_share", 0.1), ("p_play", 0.1), ("p60", 0.1), ("bonus", 0.0)):
+        inputs[key] = np.append(inputs[key], np.full(n, extra))
+    events = simulate_match_events(inputs, 20000, np.random.default_rng(2))
+    # The regular striker keeps his 0.4 share of 1.6 home goals.
+    assert events["goals"][3].mean() == pytest.approx(0.4 * 1.6, abs=0.04)
+    assert (events["goals"][5:][~events["played"][5:]] == 0).all()
+
+
+def test_sample_match_points_adds_double_gameweeks_and_is_seeded():
+    inputs = _inputs()
+    # Player 4 (FWD, team 1) also plays a second fixture; player 5 has no slot (blank).
+    inputs["fixtures"].append({"fixture_id": 2, "team_h": 3, "team_a": 1, "lam_h": 1.0, "lam_a": 1.0})
+    for key, extra in (("slot_player", 3), ("slot_fixture", 1), ("slot_home", False),
+                       ("goal_share", 0.4), ("assist_share", 0.2), ("p_play", 1.0), ("p60", 1.0), ("bonus", 0.0)):
+        inputs[key] = np.append(inputs[key][:4], extra)
+
+    a = sample_match_points([], 5, 3000, rng=np.random.default_rng(7), inputs=inputs)
+    b = sample_match_points([], 5, 3000, rng=np.random.default_rng(7), inputs=inputs)
+    np.testing.assert_array_equal(a, b)
+    assert a.shape == (5, 3000)
+    assert (a[4] == 0).all()
+    assert (a[3] >= 4).all()  # two full appearances
+
+
+def _conn():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE teams (id INTEGER PRIMARY KEY, strength_attack_home INTEGER, strength_attack_away INTEGER,
+                            strength_defence_home INTEGER, strength_defence_away INTEGER);
+        CREATE TABLE fixtures (id INTEGER PRIMARY KEY, event INTEGER, team_h INTEGER, team_a INTEGER,
+                               difficulty_home INTEGER, difficulty_away INTEGER, finished INTEGER);
+        CREATE TABLE players (id INTEGER PRIMARY KEY, team_id INTEGER, element_type INTEGER, status TEXT,
+                              chance_of_playing_next_round INTEGER);
+        CREATE TABLE player_history (player_id INTEGER, gameweek INTEGER, minutes INTEGER,
+                                     expected_goals REAL, expected_assists REAL, bonus_points INTEGER);
+        """
+    )
+    conn.executemany("INSERT INTO teams VALUES (?,?,?,?,?)", [(1, 1350, 1350, 1300, 1300), (2, 1050, 1050, 1050, 1050)])
+    conn.executemany(
+        "INSERT INTO fixtures VALUES (?,?,?,?,?,?,?)",
+        [(1, 1, 1, 2, 2, 4, 1), (2, 2, 2, 1, 4, 2, 1), (3, 3, 1, 2, 2, 4, 0)],
+    )
+    conn.executemany(
+        "INSERT INTO players VALUES (?,?,?,?,?)",
+        [(10, 1, 4, "a", None), (11, 1, 2, "d", 50), (12, 2, 3, "i", 0)],
+    )
+    conn.executemany(
+        "INSERT INTO player_history VALUES (?,?,?,?,?,?)",
+        [(10, 1, 90, 0.9, 0.1, 3), (10, 2, 90, 0.7, 0.2, 1), (11, 1, 90, 0.1, 0.1, 0), (11, 2, 20, 0.0, 0.0, 0),
+         (12, 1, 90, 0.3, 0.3, 0), (12, 2, 90, 0.2, 0.2, 0)],
+    )
+    return conn
+
+
+def test_load_match_inputs_from_db():
+    conn = _conn()
+    rates = fixture_goal_rates(3, conn=conn)
+    assert len(rates) == 1
+    assert rates[0]["lam_h"] > 2 * rates[0]["lam_a"]  # strong home side
+
+    inputs = load_match_inputs([10, 11, 12, 99], 3, conn=conn)
+    assert list(inputs["slot_player"]) == [0, 1, 2]  # unknown player 99 gets no slot
+    assert list(inputs["slot_home"]) == [True, True, False]
+    # Striker with most of his team's xG gets the biggest goal share.
+    assert inputs["goal_share"][0] > inputs["goal_share"][1]
+    assert inputs["bonus"][0] == pytest.approx(2.0)
+    # Doubtful (50%) defender: 2 of 2 appearances, 1 of 2 over 60; injured player never plays.
+    assert inputs["p_play"][1] == pytest.approx(0.5)
+    assert inputs["p60"][1] == pytest.approx(0.25)
+    assert inputs["p_play"][2] == 0.0
@@ -0,0 +1,74 @@
+from functools import partial
+
+import numpy as np
+
+from models.monte_carlo import MonteCarlo
+from models.parallel import merge_sums, parallel_samples, run_parallel, spawn_seeds, split_sims
+from predictions.league_sim import simulate_league
+
+
+def _sum_worker(n, seed, offset, scale):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal(n) * scale
+    return {"n": n, "sum": x.sum(), "offsets": np.array([offset])}
+
+
+def _draw(k, rng, rows):
+    return rng.standard_normal((rows, k))
+
+
+def test_split_and_seed_streams():
+    assert split_sims(10, 3) == [4, 3, 3]
+    assert sum(split_sims(100001, 4)) == 100001
+    a, b = spawn_seeds(7, 2)
+    assert np.random.default_rng(a).random() != np.random.default_rng(b).random()
+    assert spawn_seeds(7, 2)[1].entropy == b.entropy and spawn_seeds(7, 2)[1].spawn_key == b.spawn_key
+
+
+def test_run_parallel_is_reproducible_and_mergeable():
+    first = merge_sums(run_parallel(_sum_worker, 10000, seed=1, n_workers=3, args=(2.0,)))
+    again = merge_sums(run_parallel(_sum_worker, 10000, seed=1, n_workers=3, args=(2.0,)))
+    assert first["n"] == 10000
+    assert first["sum"] == again["sum"]
+    # Shares of 3334 / 3333 / 3333 start at 0, 3334 and 6667 (merged by addition).
+    assert first["offsets"].tolist() == [3334 + 6667]
+
+    # Inline (one worker) runs the same code path on the first child stream.
+    inline = run_parallel(_sum_worker, 500, seed=1, n_workers=1, args=(2.0,))[0]
+    expected = np.random.default_rng(spawn_seeds(1, 1)[0]).standard_normal(500).sum() * 2.0
+    assert np.isclose(inline["sum"], expected)
+
+
+def test_parallel_samples_fill_shared_block():
+    draw = partial(_draw, rows=3)
+    out = parallel_samples(draw, 3, 9001, seed=5, n_workers=2)
+    assert out.shape == (3, 9001) and out.dtype == np.float32
+    np.testing.assert_array_equal(out, parallel_samples(draw, 3, 9001, seed=5, n_workers=2))
+    # Worker 2's columns start where worker 1's end.
+    child = spawn_seeds(5, 2)[1]
+    np.testing.assert_allclose(out[:, 4501:], _draw(4500, np.random.default_rng(child), 3), rtol=1e-6)
+
+    mc = MonteCarlo(n_sims=4000, random_seed=3, n_workers=2)
+    a = mc.simulate(5.0, 2.0).samples
+    assert len(a) == 4000 and a.min() >= 0
+    np.testing.assert_array_equal(a, MonteCarlo(n_sims=4000, random_seed=3, n_workers=2).simulate(5.0, 2.0).samples)
+
+
+def test_parallel_league_matches_itself_and_the_serial_answer():
+    squads = [
+        {"entry_id": e, "starting": list(range(e, e + 11)), "bench": [], "captain_id": e, "vice_id": None,
+         "chip": None}
+        for e in range(3)
+    ]
+    n_players = 13
+    means = np.linspace(3, 6, n_players)
+    stds = np.full(n_players, 2.0)
+    positions = ["MID"] * n_players
+
+    runs = [simulate_league(squads, means, stds, positions, n_sims=6000, seed=11, n_workers=2) for _ in range(2)]
+    np.testing.assert_array_equal(runs[0]["position_probs"], runs[1]["position_probs"])
+    np.testing.assert_array_equal(runs[0]["expected_points"], runs[1]["expected_points"])
+
+    serial = simulate_league(squads, means, stds, positions, n_sims=6000, seed=11)
+    np.testing.assert_allclose(runs[0]["position_probs"], serial["position_probs"], atol=0.03)
+    np.testing.assert_allclose(runs[0]["position_probs"].sum(axis=1), 1.0)
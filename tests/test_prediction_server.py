@@ -0,0 +1,88 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import utils.prediction_server as ps
+
+
+@pytest.fixture
+def server(monkeypatch):
+    version = {"value": "v1"}
+    calls = []
+
+    def fake_predict(pid, gw):
+        calls.append((pid, gw))
+        return float(pid) / 10.0, 1.0
+
+    monkeypatch.setattr(ps, "get_data_version", lambda: version["value"])
+    monkeypatch.setattr(ps, "predict_player_points", fake_predict)
+    monkeypatch.setattr(ps, "get_player_meta", lambda pid: {"id": pid, "name": f"P{pid}", "team": "ARS", "pos": "MID"})
+
+    service = ps.PredictionService(check_interval=0.0)
+    httpd = ps.make_server(service, port=0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield service, httpd.server_address[1], version, calls
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _post(port, path, body=None):
+    req = urllib.request.Request(
+        f"http://127.0.0.1:{port}{path}",
+        data=json.dumps(body or {}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=5) as rsp:
+            return rsp.status, json.loads(rsp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_projections_are_cached_and_shared_across_requests(server):
+    _, port, _, calls = server
+    status, out = _post(port, "/predict/player", {"player_ids": [30, 20], "gw": 5})
+    assert status == 200
+    assert out["data_version"] == "v1"
+    assert [p["mean"] for p in out["players"]] == [3.0, 2.0]
+
+    status, out = _post(port, "/captaincy", {"player_ids": [20, 30, 10], "gw": 5})
+    assert status == 200
+    assert [r["player_id"] for r in out["ranking"]] == [30, 20, 10]
+    assert sorted(calls) == [(10, 5), (20, 5), (30, 5)]
+
+
+def test_concurrent_requests_compute_each_key_once(server):
+    _, port, _, calls = server
+    threads = [
+        threading.Thread(target=_post, args=(port, "/predict/player", {"player_id": 7, "gw": 3}))
+        for _ in range(16)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [(7, 3)]
+
+
+def test_reload_on_data_version_change(server):
+    service, port, version, calls = server
+    _post(port, "/predict/player", {"player_id": 7, "gw": 3})
+    version["value"] = "v2"
+    _post(port, "/health")
+    service.wait_reloaded(5)
+    status, out = _post(port, "/predict/player", {"player_id": 7, "gw": 3})
+    assert out["data_version"] == "v2"
+    assert calls == [(7, 3), (7, 3)]
+
+
+def test_errors(server):
+    _, port, _, _ = server
+    assert _post(port, "/predict/player", {"player_id": 7})[0] == 400
+    assert _post(port, "/nope")[0] == 404
+    status, out = _post(port, "/health")
+    assert status == 200 and out["ok"]
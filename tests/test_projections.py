@@ -0,0 +1,131 @@
+import sqlite3
+
+import numpy as np
+
+from db.sqlite import get_connection
+from models.player_model import _get_max_history_gw, predict_player_points
+from models.projections import (
+    ProjectionMatrix,
+    compute_projections,
+    projection_bounds,
+    projection_matrix,
+    reset_projection_cache,
+    top_projected,
+    update_player_projections,
+)
+from predictions.predict_players import top_players_by_prediction_range
+
+
+def test_projection_matrix_matches_per_player_predictions(db_available):
+    # Straddle the last played GW: past GWs use their own history cut-off.
+    last = _get_max_history_gw()
+    reset_projection_cache()
+    proj = projection_matrix(last - 1, last + 2)
+    assert proj.gws == [last - 1, last, last + 1, last + 2]
+    assert proj.mean.shape == proj.std.shape == proj.fixtures.shape == (len(proj.player_ids), 4)
+    assert projection_matrix(last - 1, last + 2) is proj
+
+    for pid in proj.player_ids[::40]:
+        row = proj.index[int(pid)]
+        for j, gw in enumerate(proj.gws):
+            mean, std = predict_player_points(int(pid), gw)
+            assert np.isclose(proj.mean[row, j], mean)
+            assert np.isclose(proj.std[row, j], std)
+    assert ((proj.fixtures == 0) <= (proj.mean == 0)).all()
+
+
+def test_horizon_sums_with_discount():
+    proj = ProjectionMatrix(
+        player_ids=np.array([7, 9]),
+        gws=[1, 2, 3],
+        mean=np.array([[4.0, 4.0, 4.0], [0.0, 6.0, 0.0]]),
+        std=np.array([[1.0, 1.0, 1.0], [0.0, 2.0, 0.0]]),
+        fixtures=np.array([[1, 1, 1], [0, 2, 0]]),
+        index={7: 0, 9: 1},
+    )
+    total, std = proj.horizon()
+    np.testing.assert_allclose(total, [12.0, 6.0])
+    np.testing.assert_allclose(std, [np.sqrt(3.0), 2.0])
+
+    total, std = proj.horizon(discount=0.5)
+    np.testing.assert_allclose(total, [4.0 + 2.0 + 1.0, 3.0])
+    np.testing.assert_allclose(std, [np.sqrt(1.0 + 0.25 + 0.0625), 1.0])
+    assert proj.rows([9, 7]).tolist() == [1, 0]
+
+
+def _brute_force_top(exact, ids, top_n):
+    totals, _ = exact.horizon()
+    return sorted(ids, key=lambda pid: (-totals[exact.index[pid]], pid))[:top_n]
+
+
+def test_bounds_cover_projections(db_available):
+    last = _get_max_history_gw()
+    for gws in (list(range(last - 1, last + 4)), list(range(last + 1, last + 6))):
+        exact = compute_projections(gws)
+        ids = [int(pid) for pid in exact.player_ids]
+        for discount in (1.0, 0.8):
+            totals, _ = exact.horizon(discount)
+            assert (projection_bounds(ids, gws, discount=discount) >= totals).all()
+
+
+def test_pruned_ranking_skips_most_players(db_available):
+    last = _get_max_history_gw()
+    gws = list(range(last + 1, last + 4))
+    exact = compute_projections(gws)
+    ids = [int(pid) for pid in exact.player_ids]
+    expected = _brute_force_top(exact, ids, 10)
+
+    reset_projection_cache()
+    cold = top_projected(ids, gws[0], gws[-1], top_n=10)
+    assert [r["id"] for r in cold["ranked"]] == expected
+    assert 10 <= cold["n_exact"] <= len(ids) // 2
+    assert np.allclose(cold["ranked"][0]["per_gw"], exact.mean[exact.index[expected[0]]])
+
+
+def test_ranking_falls_back_to_the_cached_matrix(db_available):
+    # Straddling the last played GW, the bounds of past GWs rest on each
+    # player's best game and prune too little: the whole matrix is cheaper.
+    last = _get_max_history_gw()
+    gws = list(range(last - 4, last + 6))
+    exact = compute_projections(gws)
+    ids = [int(pid) for pid in exact.player_ids]
+    expected = _brute_force_top(exact, ids, 10)
+
+    reset_projection_cache()
+    cold = top_projected(ids, gws[0], gws[-1], top_n=10)
+    assert [r["id"] for r in cold["ranked"]] == expected
+    assert cold["n_exact"] > len(ids)
+
+    # The matrix is now cached and ranked as is.
+    warm = top_projected(ids, gws[0], gws[-1], top_n=10)
+    assert warm["n_exact"] == 0
+    assert [r["id"] for r in warm["ranked"]] == expected
+
+
+def test_update_player_projections_stores_the_matrix(db_available):
+    last = _get_max_history_gw()
+    src = get_connection()
+    conn = sqlite3.connect(":memory:")
+    src.backup(conn)
+    src.close()
+    conn.row_factory = sqlite3.Row
+    proj = update_player_projections(conn=conn, gw_from=last + 1, gw_to=last + 3)
+    rows = conn.execute("SELECT player_id, gameweek, mean, fixtures FROM player_projections").fetchall()
+    conn.close()
+    assert len(rows) == len(proj.player_ids) * 3
+    for r in rows[::50]:
+        row = proj.index[r["player_id"]]
+        j = proj.gws.index(r["gameweek"])
+        assert np.isclose(r["mean"], proj.mean[row, j])
+        assert r["fixtures"] == proj.fixtures[row, j]
+
+
+def test_dashboard_filters_in_sql(db_available):
+    last = _get_max_history_gw()
+    rows = top_players_by_prediction_range(last + 1, last + 3, top_n=5, positions=["MID"], max_price=7.0)
+    assert rows and all(r["pos"] == "MID" for r in rows)
+    conn = get_connection()
+    prices = [conn.execute("SELECT now_cost FROM players WHERE id = ?", (r["id"],)).fetchone()[0] for r in rows]
+    conn.close()
+    assert max(prices) <= 7.0
+    assert [r["predicted_total"] for r in rows] == sorted((r["predicted_total"] for r in rows), reverse=True)
@@ -0,0 +1,61 @@
+import pytest
+
+from pipeline.raw_archive import (
+    RawPackReader,
+    RawPackWriter,
+    list_runs,
+    load_raw,
+    open_run,
+    player_key,
+    run_id_from_time,
+)
+
+
+def _summary(pid):
+    return {"history": [{"element": pid, "round": gw, "total_points": gw % 7} for gw in range(1, 30)], "fixtures": []}
+
+
+def test_pack_roundtrip_and_random_access(tmp_path):
+    with RawPackWriter("20250820T100000Z", archive_dir=tmp_path, codec="gzip") as pack:
+        pack.add("bootstrap_static", {"elements": [{"id": 1}]})
+        for pid in range(1, 51):
+            pack.add(player_key(pid), _summary(pid))
+
+    reader = RawPackReader(tmp_path / "20250820T100000Z.pack")
+    assert reader.codec == "gzip"
+    assert len(reader.keys()) == 51
+    assert reader.get(player_key(37)) == _summary(37)
+    assert reader.get("bootstrap_static")["elements"][0]["id"] == 1
+
+    summaries = dict(reader.iter_player_summaries())
+    assert sorted(summaries) == list(range(1, 51))
+    assert summaries[5] == _summary(5)
+    with pytest.raises(KeyError):
+        reader.get(player_key(999))
+
+
+def test_runs_are_kept_and_never_overwritten(tmp_path):
+    for run, pts in (("20250820T100000Z", 1), ("20250827T100000Z", 2)):
+        with RawPackWriter(run, archive_dir=tmp_path, codec="gzip") as pack:
+            pack.add("fixtures", [{"id": 1, "pts": pts}])
+
+    assert list_runs(tmp_path) == ["20250820T100000Z", "20250827T100000Z"]
+    assert load_raw("fixtures", archive_dir=tmp_path)[0]["pts"] == 2
+    assert load_raw("fixtures", run_id="20250820T100000Z", archive_dir=tmp_path)[0]["pts"] == 1
+    with pytest.raises(FileExistsError):
+        RawPackWriter("20250820T100000Z", archive_dir=tmp_path)
+
+
+def test_failed_run_leaves_no_pack(tmp_path):
+    with pytest.raises(RuntimeError):
+        with RawPackWriter("20250820T100000Z", archive_dir=tmp_path, codec="gzip") as pack:
+            pack.add("fixtures", [])
+            raise RuntimeError("fetch failed")
+    assert list_runs(tmp_path) == []
+    assert list(tmp_path.iterdir()) == []
+    with pytest.raises(FileNotFoundError):
+        open_run(archive_dir=tmp_path)
+
+
+def test_run_id_from_time():
+    assert run_id_from_time("2025-08-20T10:00:05.123456+00:00") == "20250820T100005Z"
@@ -0,0 +1,85 @@
+import sqlite3
+
+from db.snapshots import (
+    compact_snapshots,
+    prune_snapshots,
+    snapshot_as_of,
+    state_as_of,
+    state_before_deadline,
+    to_snapshot_time,
+)
+
+T1 = "2025-08-10T10:00:00+00:00"
+T2 = "2025-08-14T10:00:00+00:00"
+T3 = "2025-08-20T10:00:00+00:00"
+T4 = "2025-09-20T10:00:00+00:00"
+
+
+def _conn():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, deadline_time TEXT)")
+    conn.execute(
+        "CREATE TABLE player_gw_snapshot (snapshot_time TEXT NOT NULL, player_id INTEGER NOT NULL, "
+        "status TEXT, chance_of_playing_next_round INTEGER, chance_of_playing_this_round INTEGER, "
+        "now_cost REAL, form REAL, news TEXT, news_added TEXT, PRIMARY KEY (snapshot_time, player_id))"
+    )
+    conn.executemany("INSERT INTO events VALUES (?, ?)", [(1, "2025-08-15T17:30:00Z"), (2, "2025-08-22T17:30:00Z")])
+    return conn
+
+
+def _snap(conn, t, rows):
+    conn.executemany(
+        "INSERT INTO player_gw_snapshot VALUES (?,?,?,?,?,?,?,?,?)",
+        [(t, pid, status, cop, cop, cost, form, "", None) for pid, status, cop, cost, form in rows],
+    )
+
+
+def test_as_of_and_compaction():
+    conn = _conn()
+    _snap(conn, T1, [(1, "a", None, 5.5, 1.0), (2, "a", None, 7.0, 2.0)])
+    _snap(conn, T2, [(1, "d", 50, 5.5, 1.5), (2, "a", None, 7.0, 3.0)])
+    _snap(conn, T3, [(1, "a", None, 5.6, 2.0)])  # player 2 left the game
+
+    assert snapshot_as_of("2025-08-09T00:00:00Z", conn=conn) == {}
+    snap = snapshot_as_of("2025-08-15T17:30:00Z", conn=conn)
+    assert snap[1]["status"] == "d" and snap[1]["form"] == 1.5
+
+    stats = compact_snapshots(conn=conn)
+    assert stats == {"snapshots": 3, "opened": 4, "closed": 3}
+    # Unchanged player 2 (only form moved) kept one interval until he vanished.
+    rows = conn.execute("SELECT player_id, valid_from, valid_to FROM player_snapshot_intervals ORDER BY 1, 2").fetchall()
+    assert [tuple(r) for r in rows] == [(1, T1, T2), (1, T2, T3), (1, T3, None), (2, T1, T3)]
+
+    state = state_before_deadline(1, conn=conn)
+    assert state[1]["status"] == "d" and state[1]["chance_of_playing_next_round"] == 50
+    assert state[2]["now_cost"] == 7.0
+    assert set(state_as_of(T3, conn=conn)) == {1}
+    assert state_as_of(T3, conn=conn)[1]["now_cost"] == 5.6
+
+    # Incremental: nothing new to fold.
+    assert compact_snapshots(conn=conn)["snapshots"] == 0
+
+
+def test_prune_keeps_deadline_snapshots_and_state():
+    conn = _conn()
+    _snap(conn, T1, [(1, "a", None, 5.5, 1.0)])
+    _snap(conn, T2, [(1, "d", 50, 5.5, 1.0)])
+    _snap(conn, T3, [(1, "d", 50, 5.5, 1.0)])
+    _snap(conn, T4, [(1, "a", None, 5.7, 1.0)])
+    compact_snapshots(conn=conn)
+
+    deleted = prune_snapshots(7, conn=conn)
+    # T2 / T3 are the last snapshots before the GW1 / GW2 deadlines, T4 is recent.
+    assert deleted == 1
+    times = [r[0] for r in conn.execute("SELECT snapshot_time FROM player_gw_snapshot ORDER BY 1")]
+    assert times == [T2, T3, T4]
+    assert state_as_of(T1, conn=conn)[1]["status"] == "a"
+    assert state_as_of(T3, conn=conn)[1]["status"] == "d"
+
+
+def test_to_snapshot_time_orders_like_snapshot_time():
+    assert to_snapshot_time("2025-08-15T17:30:00Z") == "2025-08-15T17:30:00+00:00"
+    assert to_snapshot_time("2025-08-15T19:30:00+02:00") == "2025-08-15T17:30:00+00:00"
+    assert to_snapshot_time("2025-08-15T17:30:00Z") < "2025-08-15T17:30:00.250000+00:00"
@@ -0,0 +1,121 @@
+import sqlite3
+import time
+
+import numpy as np
+import pytest
+
+from db.sqlite import init_team_ratings_table
+from models.match_sim import fixture_goal_rates
+from models.team_ratings import (
+    fit_team_ratings,
+    gradient,
+    load_ratings,
+    log_likelihood,
+    update_team_ratings,
+)
+
+N_TEAMS = 10
+TRUE_ATTACK = np.linspace(-0.4, 0.4, N_TEAMS)
+TRUE_DEFENCE = np.linspace(-0.3, 0.3, N_TEAMS)
+
+
+def _season(rounds=4, seed=0):
+    """Round robins (each pair home and away per round), one GW per match day."""
+    rng = np.random.default_rng(seed)
+    rows, fid, gw = [], 1, 1
+    for _ in range(rounds):
+        for offset in range(1, N_TEAMS):
+            for h in range(N_TEAMS):
+                a = (h + offset) % N_TEAMS
+                lam_h = np.exp(0.2 + 0.25 + TRUE_ATTACK[h] - TRUE_DEFENCE[a])
+                lam_a = np.exp(0.2 + TRUE_ATTACK[a] - TRUE_DEFENCE[h])
+                rows.append((fid, gw, h + 1, a + 1, int(rng.poisson(lam_h)), int(rng.poisson(lam_a)), 1))
+                fid += 1
+            gw += 1
+    return rows
+
+
+def _conn(rows):
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE teams (id INTEGER PRIMARY KEY, strength_attack_home INTEGER, strength_attack_away INTEGER,
+                            strength_defence_home INTEGER, strength_defence_away INTEGER);
+        CREATE TABLE fixtures (id INTEGER PRIMARY KEY, event INTEGER, team_h INTEGER, team_a INTEGER,
+                               team_h_score INTEGER, team_a_score INTEGER, finished INTEGER,
+                               difficulty_home INTEGER, difficulty_away INTEGER);
+        """
+    )
+    conn.executemany("INSERT INTO teams VALUES (?, 1200, 1200, 1200, 1200)", [(t,) for t in range(1, N_TEAMS + 1)])
+    conn.executemany("INSERT INTO fixtures VALUES (?,?,?,?,?,?,?,3,3)", rows)
+    return conn
+
+
+def _data(seed=1):
+    rng = np.random.default_rng(seed)
+    n_matches = 80
+    return {
+        "home_idx": rng.integers(0, N_TEAMS, n_matches),
+        "away_idx": rng.integers(0, N_TEAMS, n_matches),
+        "home_goals": rng.poisson(1.3, n_matches).astype(float),
+        "away_goals": rng.poisson(1.1, n_matches).astype(float),
+        "weights": rng.uniform(0.5, 1.0, n_matches),
+    }
+
+
+def test_gradient_matches_finite_differences():
+    data = _data()
+    rng = np.random.default_rng(2)
+    theta = rng.normal(0, 0.2, 2 * N_TEAMS + 3)
+    theta[-1] = 0.05
+    grad = gradient(theta, data, N_TEAMS)
+    eps = 1e-6
+    for i in range(len(theta)):
+        up, down = theta.copy(), theta.copy()
+        up[i] += eps
+        down[i] -= eps
+        numeric = (log_likelihood(up, data, N_TEAMS) - log_likelihood(down, data, N_TEAMS)) / (2 * eps)
+        assert grad[i] == pytest.approx(numeric, rel=1e-4, abs=1e-5)
+
+
+def test_fit_recovers_team_strengths_quickly():
+    conn = _conn(_season())
+    started = time.perf_counter()
+    ratings = fit_team_ratings(37, conn=conn)
+    assert time.perf_counter() - started < 1.0
+    assert ratings.n_matches == 4 * N_TEAMS * (N_TEAMS - 1)
+    assert np.corrcoef(ratings.attack, TRUE_ATTACK)[0, 1] > 0.8
+    assert np.corrcoef(ratings.defence, TRUE_DEFENCE)[0, 1] > 0.8
+    assert ratings.home > 0
+    assert -0.2 <= ratings.rho <= 0.2
+
+    # Warm start from the optimum converges at once.
+    again = fit_team_ratings(37, conn=conn, previous=ratings)
+    assert again.iterations <= 2
+    np.testing.assert_allclose(again.attack, ratings.attack, atol=1e-3)
+
+    # Strong home side v weak visitor: more goals for, lower difficulty.
+    xg_h, xg_a = ratings.expected_goals(N_TEAMS, 1)
+    assert xg_h > 2 * xg_a
+    assert ratings.difficulty(N_TEAMS, 1, True) < 3 < ratings.difficulty(1, N_TEAMS, False)
+
+
+def test_update_is_incremental_and_feeds_the_match_simulator():
+    rows = _season(rounds=2)
+    conn = _conn(rows)
+    init_team_ratings_table(conn.cursor())
+    fitted = update_team_ratings(conn=conn, through_gw=10)
+    assert [r.gw for r in fitted] == list(range(1, 11))
+    assert fitted[0].n_matches == 0 and fitted[-1].n_matches == 9 * N_TEAMS
+
+    # Next run refits the last stored GW and continues from there.
+    fitted = update_team_ratings(conn=conn)
+    assert fitted[0].gw == 10 and fitted[-1].gw == 19
+    assert load_ratings(19, conn=conn).n_matches == 18 * N_TEAMS
+    assert load_ratings(50, conn=conn).gw == 19
+    assert load_ratings(0, conn=conn) is None
+
+    # Ratings replace the (flat) FPL strengths once they rest on enough results.
+    conn.execute("INSERT INTO fixtures VALUES (9999, 19, ?, 1, NULL, NULL, 0, 3, 3)", (N_TEAMS,))
+    rates = [f for f in fixture_goal_rates(19, conn=conn) if f["fixture_id"] == 9999][0]
+    assert rates["lam_h"] > 2 * rates["lam_a"]
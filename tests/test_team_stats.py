@@ -0,0 +1,21 @@
+import utils.team_stats as team_stats
+
+
+def test_collect_picks_caches_only_finished_gameweeks(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_picks(entry_id, gw):
+        calls.append(gw)
+        return {"picks": [{"element": gw, "position": 1}]}
+
+    monkeypatch.setattr(team_stats, "api_picks", fake_picks)
+    outdir = str(tmp_path)
+
+    first = team_stats.collect_picks(1, [1, 2, 3], outdir, finished={1, 2}, workers=3)
+    assert sorted(calls) == [1, 2, 3]
+    assert first[3]["picks"][0]["element"] == 3
+
+    calls.clear()
+    second = team_stats.collect_picks(1, [1, 2, 3], outdir, finished={1, 2}, workers=3)
+    assert calls == [3]
+    assert second == first
@@ -0,0 +1,107 @@
+import time
+
+from tests.test_ai_transfer_helpers import _base_state, _pool
+from utils.ai_service_helpers import sanitize_llm_transfer_output
+from utils.transfer_search import best_xi_points, plan_to_suggestion, search_transfers
+
+POSITIONS = ["GK"] * 2 + ["DEF"] * 5 + ["MID"] * 5 + ["FWD"] * 3
+CLUBS = ["ARS", "LIV", "CHE", "MCI", "TOT", "NEW", "AVL", "BHA"]
+
+
+def _full_state(bank=1.0):
+    squad = []
+    club_counts = {}
+    for i, pos in enumerate(POSITIONS):
+        team = CLUBS[i % len(CLUBS)]
+        club_counts[team] = club_counts.get(team, 0) + 1
+        squad.append({
+            "id": i + 1,
+            "name": f"S{i + 1}",
+            "team": team,
+            "pos": pos,
+            "price": 5.0,
+            "status": "a",
+            "expected_minutes": 90,
+            "fixture_adjusted_points": 3.0 + (i % 4) * 0.5,
+        })
+    return {"free_transfers": 1, "allowed_extra": 2, "bank": bank, "club_counts": club_counts, "squad": squad}
+
+
+def _big_pool(n=120):
+    pool = []
+    for i in range(n):
+        pool.append({
+            "id": 1000 + i,
+            "name": f"P{i}",
+            "team": f"T{i % 20}",
+            "pos": ["GK", "DEF", "MID", "FWD"][i % 4],
+            "price": 4.5 + (i % 7) * 0.5,
+            "status": "a",
+            "fixture_adjusted_points": 2.0 + (i % 11) * 0.5,
+        })
+    return pool
+
+
+def test_best_xi_respects_formation_and_captain():
+    players = [("GK", 5.0), ("GK", 9.0)] + [("DEF", 1.0)] * 5 + [("MID", 2.0)] * 5 + [("FWD", 10.0)] * 3
+    # GK 9 + 3 DEF + 2 MID + 3 FWD minimums, then the best 2 remaining (MID 2.0 x2)
+    expected_xi = 9.0 + 3 * 1.0 + 2 * 2.0 + 3 * 10.0 + 2 * 2.0
+    assert best_xi_points(players, captain=False) == expected_xi
+    assert best_xi_points(players) == expected_xi + 10.0
+
+
+def test_search_matches_validator_rules():
+    plans = search_transfers(_base_state(), _pool())
+    assert plans
+    best = plans[0]
+    assert [(t["out_id"], t["in_id"]) for t in best["transfers"]] == [(1, 101)]
+    assert best["hit_cost"] == 0
+
+    suggestion = plan_to_suggestion(best, 25)
+    assert sanitize_llm_transfer_output(suggestion, _base_state(), _pool())["error"] is None
+
+
+def test_search_respects_club_limit():
+    state = _base_state()
+    state["club_counts"]["MCI"] = 3
+    plans = search_transfers(state, _pool())
+    assert all(t["in_id"] != 101 for plan in plans for t in plan["transfers"])
+
+
+def test_search_orders_sales_before_purchases():
+    state = _base_state()
+    state["bank"] = 0.0
+    state["free_transfers"] = 2
+    pool = [
+        # Needs 0.5 more than player 1's sale price ...
+        {"id": 201, "name": "X", "team": "MCI", "pos": "MID", "price": 7.5, "fixture_adjusted_points": 9.0},
+        # ... which this downgrade frees up.
+        {"id": 202, "name": "Y", "team": "TOT", "pos": "FWD", "price": 7.0, "fixture_adjusted_points": 6.0},
+    ]
+    plans = search_transfers(state, pool)
+    best = plans[0]
+    assert [t["in_id"] for t in best["transfers"]] == [202, 201]
+    assert sanitize_llm_transfer_output(plan_to_suggestion(best, 25), state, pool)["error"] is None
+
+
+def test_search_returns_nothing_without_positive_gain():
+    state = _base_state()
+    state["allowed_extra"] = 0
+    pool = [p for p in _pool() if p["id"] == 103]
+    assert search_transfers(state, pool) == []
+    assert plan_to_suggestion(None, 25)["suggested_transfers"] == []
+
+
+def test_search_full_squad_is_fast():
+    state = _full_state()
+    pool = _big_pool()
+    started = time.perf_counter()
+    plans = search_transfers(state, pool, top_k=5)
+    elapsed = time.perf_counter() - started
+
+    assert plans
+    assert elapsed < 1.0
+    assert plans == sorted(plans, key=lambda p: -p["net_gain"])
+    for plan in plans:
+        suggestion = plan_to_suggestion(plan, 25)
+        assert sanitize_llm_transfer_output(suggestion, state, pool)["error"] is None
@@ -0,0 +1,262 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.ai_data_builder import build_candidate_pool, build_fdr_map_for_all_teams
+from utils.ai_service import captaincy_advice, transfer_advice
+
+BATCH_COMMANDS = ("captaincy", "transfers")
+
+DEFAULT_WORKERS = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+
+# ask_llm reports network/API failures with this prefix; only those are retried.
+# Validation errors and missing team_stats.json are not going to fix themselves.
+RETRYABLE_ERROR_PREFIXES = ("LLM request error",)
+
+
+# -------------------------------------------------
+# INPUT
+# -------------------------------------------------
+
+
+def load_entry_ids(path: str | Path) -> List[int]:
+    """
+    Read entry IDs from a text file: one ID per line.
+    Blank lines and lines starting with '#' are ignored, duplicates are dropped.
+    """
+    ids: List[int] = []
+    seen = set()
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        entry_id = int(line.split(",")[0].strip())
+        if entry_id in seen:
+            continue
+        seen.add(entry_id)
+        ids.append(entry_id)
+    return ids
+
+
+# -------------------------------------------------
+# SHARED DATA (BUILT ONCE PER BATCH)
+# -------------------------------------------------
+
+
+def build_shared_context(gw: int, candidate_pool_size: int = 120) -> Dict[str, Any]:
+    """
+    Build the data every entry in a batch has in common:
+    - FDR map for all teams (next 5 GWs from target GW)
+    - global candidate pool
+    - projections cache (player_id -> predicted points for GW),
+      pre-filled from the pool and extended by squad players on demand
+    """
+    fdr_map = build_fdr_map_for_all_teams(gw_start=gw, next_n=5)
+    projections: Dict[int, float] = {}
+    pool_full = build_candidate_pool(
+        limit=candidate_pool_size,
+        gw=gw,
+        projections=projections,
+        fdr_map=fdr_map,
+    )
+    return {
+        "gw": gw,
+        "fdr_map": fdr_map,
+        "pool_full": pool_full,
+        "projections": projections,
+    }
+
+
+# -------------------------------------------------
+# RETRY / BACKOFF
+# -------------------------------------------------
+
+
+def _result_error(result: Any) -> Optional[str]:
+    """The result's error, or its explanation error (transfer search kept, LLM call failed)."""
+    if not isinstance(result, dict):
+        return None
+    if result.get("error"):
+        return result["error"]
+    if result.get("explain_error"):
+        return f"Explanation failed: {result['explain_error']}"
+    return None
+
+
+def _is_retryable(result: Dict[str, Any]) -> bool:
+    if not isinstance(result, dict):
+        return False
+    errors = (result.get("error"), result.get("explain_error"))
+    return any(isinstance(e, str) and e.startswith(RETRYABLE_ERROR_PREFIXES) for e in errors)
+
+
+def call_with_retry(
+    fn: Callable[[], Dict[str, Any]],
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Dict[str, Any]:
+    """
+    Call fn() and retry transient LLM failures with exponential backoff + jitter.
+    Returns {"result": <last result>, "attempts": int}.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        result = fn()
+        if not _is_retryable(result) or attempt > retries:
+            return {"result": result, "attempts": attempt}
+        delay = backoff * (2 ** (attempt - 1))
+        sleep(delay + random.uniform(0, delay * 0.25))
+
+
+# -------------------------------------------------
+# PER-ENTRY RUN
+# -------------------------------------------------
+
+
+def run_entry(
+    entry_id: int,
+    gw: int,
+    commands: List[str],
+    shared: Dict[str, Any],
+    free_transfers: int = 1,
+    allowed_extra: int = 0,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+) -> Dict[str, Any]:
+    """
+    Run the requested advice commands for one entry.
+    Never raises: per-command exceptions are recorded in the output record.
+    """
+    started = time.perf_counter()
+    results: Dict[str, Any] = {}
+
+    for command in commands:
+        cmd_started = time.perf_counter()
+        try:
+            if command == "captaincy":
+                fn = lambda: captaincy_advice(entry_id=entry_id, gw=gw)
+            elif command == "transfers":
+                fn = lambda: transfer_advice(
+                    entry_id=entry_id,
+                    gw=gw,
+                    free_transfers=free_transfers,
+                    allowed_extra=allowed_extra,
+                    pool_full=shared["pool_full"],
+                    projections=shared["projections"],
+                    fdr_map=shared["fdr_map"],
+                )
+            else:
+                raise ValueError(f"Unknown batch command: {command}")
+
+            out = call_with_retry(fn, retries=retries, backoff=backoff)
+            result = out["result"]
+            results[command] = {
+                "result": result,
+                "error": _result_error(result),
+                "attempts": out["attempts"],
+                "elapsed_s": round(time.perf_counter() - cmd_started, 3),
+            }
+        except Exception as e:
+            results[command] = {
+                "result": None,
+                "error": f"{type(e).__name__}: {e}",
+                "attempts": 1,
+                "elapsed_s": round(time.perf_counter() - cmd_started, 3),
+            }
+
+    return {
+        "entry_id": entry_id,
+        "gw": gw,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+        "ok": all(r["error"] is None for r in results.values()),
+        "results": results,
+    }
+
+
+# -------------------------------------------------
+# BATCH RUN
+# -------------------------------------------------
+
+
+def run_batch(
+    entry_ids: List[int],
+    gw: int,
+    out_path: str | Path,
+    commands: Optional[List[str]] = None,
+    workers: int = DEFAULT_WORKERS,
+    candidate_pool_size: int = 120,
+    free_transfers: int = 1,
+    allowed_extra: int = 0,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+) -> Dict[str, Any]:
+    """
+    Run advice for many entries:
+    - shared data (FDR map, candidate pool, projections) is built once,
+    - per-entry work runs on a bounded thread pool (LLM calls are I/O bound),
+    - each finished entry is appended to out_path as one JSON line.
+
+    Returns a small summary dict with counts and timings.
+    """
+    commands = list(commands or BATCH_COMMANDS)
+    for command in commands:
+        if command not in BATCH_COMMANDS:
+            raise ValueError(f"Unknown batch command: {command}. Use one of {BATCH_COMMANDS}.")
+
+    started = time.perf_counter()
+    shared: Dict[str, Any] = {"pool_full": None, "projections": None, "fdr_map": None}
+    if "transfers" in commands:
+        shared = build_shared_context(gw, candidate_pool_size=candidate_pool_size)
+    shared_s = time.perf_counter() - started
+
+    print(
+        f"[AI] Batch GW{gw}: {len(entry_ids)} entries, commands={commands}, "
+        f"workers={workers}, shared data built in {shared_s:.2f}s."
+    )
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    write_lock = threading.Lock()
+    n_ok = 0
+
+    with open(out_path, "w", encoding="utf-8") as f, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [
+            pool.submit(
+                run_entry,
+                entry_id,
+                gw,
+                commands,
+                shared,
+                free_transfers,
+                allowed_extra,
+                retries,
+                backoff,
+            )
+            for entry_id in entry_ids
+        ]
+        for fut in as_completed(futures):
+            record = fut.result()
+            with write_lock:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+            if record["ok"]:
+                n_ok += 1
+
+    total_s = time.perf_counter() - started
+    return {
+        "gw": gw,
+        "entries": len(entry_ids),
+        "ok": n_ok,
+        "failed": len(entry_ids) - n_ok,
+        "shared_s": round(shared_s, 3),
+        "total_s": round(total_s, 3),
+        "out_path": str(out_path),
+    }
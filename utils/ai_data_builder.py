@@ -2,8 +2,10 @@ import os
 import json
 from typing import Dict, Any, List, Optional
 
+from db.entries import load_entry, load_entry_gw_block, load_team_stats
 from db.sqlite import get_connection
 from models.player_model import predict_player_points
+from models.team_ratings import cached_ratings
 
 
 # -------------------------------------------------
@@ -11,9 +13,28 @@ from models.player_model import predict_player_points
 # -------------------------------------------------
 
 
+def _team_json_path(entry_id: int) -> str:
+    return os.path.join("analysis_reports", str(entry_id), "team_stats.json")
+
+
+def _read_team_json_file(entry_id: int) -> Dict[str, Any]:
+    path = _team_json_path(entry_id)
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"team_stats.json not found for entry {entry_id}. "
+            f"Expected at: {path}. Run utils/team_stats.py "
+            f"(or utils/league_ingest.py for a whole league) first."
+        )
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
 def load_team_json(entry_id: int) -> Dict[str, Any]:
     """
-    Load team_stats.json created by utils/team_stats.py.
+    Load team stats for an entry: from the SQLite entry store
+    (entries / entry_gw / entry_picks) when present, otherwise from
+    team_stats.json created by utils/team_stats.py.
 
     Expected basic structure (example):
 
@@ -46,15 +67,25 @@ def load_team_json(entry_id: int) -> Dict[str, Any]:
       ]
     }
     """
-    path = os.path.join("analysis_reports", str(entry_id), "team_stats.json")
-    if not os.path.exists(path):
-        raise FileNotFoundError(
-            f"team_stats.json not found for entry {entry_id}. "
-            f"Expected at: {path}. Run utils/team_stats.py first."
-        )
+    stored = load_team_stats(entry_id)
+    if stored is not None:
+        return stored
+    return _read_team_json_file(entry_id)
 
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+
+def load_gw_block(entry_id: int, before_gw: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    One gw_data block: the latest GW < before_gw (or the latest GW when
+    before_gw is None). Reads a single GW from the entry store when the
+    entry is stored; falls back to team_stats.json otherwise.
+    """
+    if load_entry(entry_id) is not None:
+        return load_entry_gw_block(entry_id, before_gw)
+
+    gw_data = _read_team_json_file(entry_id).get("gw_data", [])
+    if before_gw is not None:
+        gw_data = [g for g in gw_data if g.get("gw") is not None and g["gw"] < before_gw]
+    return max(gw_data, key=lambda g: g["gw"]) if gw_data else None
 
 
 # -------------------------------------------------
@@ -159,19 +190,16 @@ def build_squad_for_gw(entry_id: int, gw: int) -> List[Dict[str, Any]]:
       predict GW15 -> use GW14 squad/state
       predict GW20 -> use GW19
     """
-    team_json = load_team_json(entry_id)
-
-    available_gws = sorted(g["gw"] for g in team_json["gw_data"])
-    past_gws = [g for g in available_gws if g < gw]
+    gw_block = load_gw_block(entry_id, before_gw=gw)
 
-    if not past_gws:
+    if gw_block is None:
+        available_gws = sorted(g["gw"] for g in load_team_json(entry_id)["gw_data"])
         raise ValueError(
             f"Cannot analyze GW {gw}: no earlier GW exists for entry {entry_id}. "
-            f"Available GWs in team_stats.json: {available_gws}"
+            f"Available GWs in team_stats: {available_gws}"
         )
 
-    use_gw = past_gws[-1]
-    gw_block = next(g for g in team_json["gw_data"] if g["gw"] == use_gw)
+    use_gw = gw_block["gw"]
 
     squad: List[Dict[str, Any]] = []
 
@@ -253,6 +281,16 @@ def get_team_fdr(team_id: int, gw_start: int, next_n: int = 5) -> Dict[str, Any]
                 }
             )
 
+    # Continuous expected goals per fixture when fitted team ratings exist.
+    ratings = cached_ratings(gw_start)
+    if ratings is not None:
+        for opp in opponents:
+            home, away = (team_id, opp["opp"]) if opp["home"] else (opp["opp"], team_id)
+            xg_h, xg_a = ratings.expected_goals(home, away)
+            xg_for, xg_against = (xg_h, xg_a) if opp["home"] else (xg_a, xg_h)
+            opp["xg_for"] = round(xg_for, 2)
+            opp["xg_against"] = round(xg_against, 2)
+
     avg_fdr = sum(fdr_values) / len(fdr_values) if fdr_values else None
 
     return {
@@ -289,6 +327,35 @@ def build_fdr_map_for_all_teams(gw_start: int, next_n: int = 5) -> Dict[str, Any
     return fdr_map
 
 
+# -------------------------------------------------
+# PROJECTIONS (OPTIONALLY CACHED)
+# -------------------------------------------------
+
+
+def get_predicted_points(
+    player_id: int,
+    gw: int,
+    projections: Optional[Dict[int, float]] = None,
+) -> float:
+    """
+    Model mean for player in GW, 0.0 if the model fails.
+
+    When a projections dict is passed it is used as a cache keyed by
+    player id (all entries of a batch share one target GW).
+    """
+    if projections is not None and player_id in projections:
+        return projections[player_id]
+
+    try:
+        value = float(predict_player_points(player_id, gw)[0])
+    except Exception:
+        value = 0.0
+
+    if projections is not None:
+        projections[player_id] = value
+    return value
+
+
 # -------------------------------------------------
 # HELPERS FOR FORM / ROTATION
 # -------------------------------------------------
@@ -344,19 +411,15 @@ def build_team_json(entry_id: int, target_gw: Optional[int] = None) -> Dict[str,
 
     We do NOT dump full gw_data here, to keep token usage reasonable.
     """
-    raw = load_team_json(entry_id)
-
-    gw_data = raw.get("gw_data", [])
-    if not gw_data:
-        raise ValueError("team_stats.json has empty gw_data.")
-
-    if target_gw is None:
-        last_gw_block = max(gw_data, key=lambda g: g["gw"])
-    else:
-        past_gws = [g for g in gw_data if g.get("gw") is not None and g["gw"] < target_gw]
-        last_gw_block = max(past_gws, key=lambda g: g["gw"]) if past_gws else max(
-            gw_data, key=lambda g: g["gw"]
-        )
+    raw = load_entry(entry_id) or _read_team_json_file(entry_id)
+
+    last_gw_block = None
+    if target_gw is not None:
+        last_gw_block = load_gw_block(entry_id, before_gw=target_gw)
+    if last_gw_block is None:
+        last_gw_block = load_gw_block(entry_id)
+    if last_gw_block is None:
+        raise ValueError("team_stats has empty gw_data.")
 
     return {
         "entry_id": raw.get("entry_id", entry_id),
@@ -384,13 +447,24 @@ def build_team_json(entry_id: int, target_gw: Optional[int] = None) -> Dict[str,
 # -------------------------------------------------
 
 
-def build_squad_state(entry_id: int, target_gw: int, free_transfers: int, allowed_extra: int) -> Dict[str, Any]:
+def build_squad_state(
+    entry_id: int,
+    target_gw: int,
+    free_transfers: int,
+    allowed_extra: int,
+    projections: Optional[Dict[int, float]] = None,
+    fdr_map: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
     """
     Build the squad state prior to a target GW.
 
     For GW X we use the squad from GW X-1.
-    Bank + free transfers are taken from the last GW block
-    in team_stats.json (same as used by team_stats logic).
+    Bank + free transfers are taken from the last stored GW block
+    (same as used by team_stats logic).
+
+    projections / fdr_map are optional shared caches (see
+    build_shared_context in utils/ai_batch.py) so batch runs do not
+    re-predict the same players for every entry.
     """
     squad_list = build_squad_for_gw(entry_id, target_gw)
 
@@ -423,16 +497,18 @@ def build_squad_state(entry_id: int, target_gw: int, free_transfers: int, allowe
 
         injured = status == "i"
         suspended = status == "s"
-        try:
-            predicted_points_gw = float(predict_player_points(pid, target_gw)[0])
-        except Exception:
-            predicted_points_gw = 0.0
-
-        fdr_info = get_team_fdr(team_id, gw_start=target_gw, next_n=5) if team_id else {
-            "avg_fdr": None,
-            "fixtures": [],
-            "raw_values": [],
-        }
+        predicted_points_gw = get_predicted_points(pid, target_gw, projections)
+
+        if fdr_map is not None and team in fdr_map:
+            fdr_info = fdr_map[team]
+        elif team_id:
+            fdr_info = get_team_fdr(team_id, gw_start=target_gw, next_n=5)
+        else:
+            fdr_info = {
+                "avg_fdr": None,
+                "fixtures": [],
+                "raw_values": [],
+            }
         avg_fdr = fdr_info.get("avg_fdr")
         if avg_fdr is None:
             fixture_multiplier = 1.0
@@ -465,13 +541,11 @@ def build_squad_state(entry_id: int, target_gw: int, free_transfers: int, allowe
 
     conn.close()
 
-    # Bank + free transfers from team_stats.json
-    team_json_raw = load_team_json(entry_id)
-    gw_data = team_json_raw.get("gw_data", [])
-    if not gw_data:
-        raise ValueError("team_stats.json gw_data is empty when building squad_state.")
+    # Bank + free transfers from the latest stored GW
+    last_gw_block = load_gw_block(entry_id)
+    if last_gw_block is None:
+        raise ValueError("team_stats gw_data is empty when building squad_state.")
 
-    last_gw_block = max(gw_data, key=lambda g: g["gw"])
     bank = last_gw_block.get("bank", 0.0)
 
     return {
@@ -489,7 +563,12 @@ def build_squad_state(entry_id: int, target_gw: int, free_transfers: int, allowe
 # -------------------------------------------------
 
 
-def build_candidate_pool(limit: int = 120, gw: Optional[int] = None) -> List[Dict[str, Any]]:
+def build_candidate_pool(
+    limit: int = 120,
+    gw: Optional[int] = None,
+    projections: Optional[Dict[int, float]] = None,
+    fdr_map: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
     """
     Build the global candidate pool for AI.
 
@@ -500,6 +579,8 @@ def build_candidate_pool(limit: int = 120, gw: Optional[int] = None) -> List[Dic
     - injury / suspension flags based on status
     - rotation risk
     - FDR for next GWs
+
+    projections (filled in place) and fdr_map are optional shared caches.
     """
     conn = get_connection()
     cur = conn.cursor()
@@ -553,13 +634,13 @@ def build_candidate_pool(limit: int = 120, gw: Optional[int] = None) -> List[Dic
         injured = status == "i"
         suspended = status == "s"
 
-        fdr_info = get_team_fdr(r["team_id"], gw_start=gw, next_n=5)
+        if fdr_map is not None and team_short in fdr_map:
+            fdr_info = fdr_map[team_short]
+        else:
+            fdr_info = get_team_fdr(r["team_id"], gw_start=gw, next_n=5)
         avg_fdr = fdr_info.get("avg_fdr")
 
-        try:
-            predicted_points_gw = float(predict_player_points(pid, gw)[0])
-        except Exception:
-            predicted_points_gw = 0.0
+        predicted_points_gw = get_predicted_points(pid, gw, projections)
 
         # Blend short-term model output with upcoming fixture run.
         # Easier run (avg_fdr < 3) increases expected value.
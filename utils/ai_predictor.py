@@ -1,43 +1,25 @@
-import os
 import json
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional
 
-from dotenv import load_dotenv
-from openai import OpenAI
-
-# -------------------------------------------------
-# OpenAI client setup
-# -------------------------------------------------
-
-load_dotenv()
-client: Optional[OpenAI] = None
-
-
-def _get_openai_client() -> Tuple[Optional[OpenAI], Optional[str]]:
-    global client
-    if client is not None:
-        return client, None
-
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return None, "Missing OPENAI_API_KEY in .env file"
-
-    try:
-        client = OpenAI(api_key=api_key)
-    except Exception as e:
-        return None, f"OpenAI client init error: {e}"
-
-    return client, None
+from utils.ai_prompt_compaction import format_compact_pool
+from utils.llm_backends import get_llm_backend
 
 
 # -------------------------------------------------
 # LOW-LEVEL LLM WRAPPER
 # -------------------------------------------------
 
-def ask_llm(prompt: str) -> Dict[str, Any]:
+def ask_llm(
+    prompt: str,
+    kind: Optional[str] = None,
+    context: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
     """
-    Sends a prompt to the LLM and expects a pure JSON object back.
-    Uses OpenAI's response_format to enforce JSON and then parses it.
+    Sends a prompt to the active LLM backend and expects a pure JSON object back.
+    The default backend is OpenAI (response_format enforces JSON); offline
+    stub/replay backends are selected with FPL_LLM_BACKEND or set_llm_backend
+    (see utils/llm_backends.py). kind/context let offline backends answer
+    from structured data instead of the prompt text.
     Returns a dict:
       {
         "raw": original_text,
@@ -45,36 +27,7 @@ def ask_llm(prompt: str) -> Dict[str, Any]:
         "error": error_message_or_None
       }
     """
-    client_obj, client_error = _get_openai_client()
-    if client_error:
-        return {"raw": None, "json": None, "error": client_error}
-
-    try:
-        response = client_obj.chat.completions.create(
-            model="gpt-5-mini",
-            response_format={"type": "json_object"},
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an expert Fantasy Premier League (FPL) analyst. "
-                        "You MUST respond with a single valid JSON object only, "
-                        "with no surrounding markdown or explanation."
-                    ),
-                },
-                {"role": "user", "content": prompt},
-            ],
-        )
-    except Exception as e:
-        return {"raw": None, "json": None, "error": f"LLM request error: {e}"}
-
-    raw = (response.choices[0].message.content or "").strip()
-
-    try:
-        parsed = json.loads(raw)
-        return {"raw": raw, "json": parsed, "error": None}
-    except json.JSONDecodeError as e:
-        return {"raw": raw, "json": None, "error": f"JSON decode error: {e}"}
+    return get_llm_backend().complete(prompt, kind=kind, context=context)
 
 
 # -------------------------------------------------
@@ -181,13 +134,14 @@ def build_h2h_prompt(
     team_a: Dict[str, Any],
     team_b: Dict[str, Any],
     gw: int,
-    mc_baseline: Optional[Dict[str, float]] = None,
+    mc_baseline: Optional[Dict[str, Any]] = None,
 ) -> str:
     """
     Prompt for AI H2H prediction for a specific gameweek.
     Optional mc_baseline is a dict like:
-      {"team_a_expected": float, "team_b_expected": float}
-    coming from your numeric Monte Carlo model.
+      {"team_a_expected": float, "team_b_expected": float,
+       "p_team_a_win": float, "p_draw": float, "p_team_b_win": float, ...}
+    coming from the numeric Monte Carlo model (montecarlo_service.h2h_baseline).
     """
     baseline_txt = json.dumps(mc_baseline) if mc_baseline is not None else "null"
 
@@ -196,7 +150,8 @@ def build_h2h_prompt(
         f"Target gameweek: {gw}.\n\n"
         "You will receive JSON for TEAM A and TEAM B, each containing season history "
         "plus per-GW details (points, ranks, transfers, chips, starting XI).\n"
-        "You will also receive an OPTIONAL Monte Carlo baseline with expected points for "
+        "You will also receive an OPTIONAL Monte Carlo baseline with expected points, "
+        "win/draw/loss probabilities and the players that swing the match for "
         "this GW from a numeric model. It may be null.\n\n"
         "RULES:\n"
         "- Use ONLY the JSON and the numeric baseline if present.\n"
@@ -281,84 +236,63 @@ def advise_captaincy(
     context_team: Dict[str, Any],
 ) -> Dict[str, Any]:
     prompt = build_captaincy_prompt(gw, squad_players, context_team)
-    return ask_llm(prompt)
+    return ask_llm(prompt, kind="captaincy", context={"gw": gw, "squad": squad_players})
 
 
 # -------------------------------------------------
 # 6) AI TRANSFER RECOMMENDER
 # -------------------------------------------------
 
-def build_transfer_prompt(
+def _pool_block(
+    candidate_pool: List[Dict[str, Any]],
+    compact_pool: Optional[Dict[str, Any]],
+) -> str:
+    if compact_pool is not None:
+        return format_compact_pool(compact_pool)
+    return json.dumps(candidate_pool)
+
+
+def build_transfer_explain_prompt(
     gw: int,
     current_team: Dict[str, Any],
     squad_state: Dict[str, Any],
+    plan: Dict[str, Any],
+    alternatives: List[Dict[str, Any]],
     candidate_pool: List[Dict[str, Any]],
+    compact_pool: Optional[Dict[str, Any]] = None,
 ) -> str:
     """
-    Build prompt for transfer advice with flexible transfer limits.
+    Build prompt asking the LLM to explain an already validated transfer plan
+    (from utils/transfer_search.py). The LLM must not change the transfers.
     """
-
-    free_tf = squad_state.get("free_transfers", 1)
-    allowed_extra = squad_state.get("allowed_extra", 0)
-
     return (
         "You are an advanced FPL transfer analyst.\n\n"
         f"Target gameweek: {gw}.\n\n"
 
-        "You will receive:\n"
-        "1) TEAM JSON\n"
-        "2) SQUAD STATE\n"
-        "3) CANDIDATE POOL\n\n"
-
-        "FPL RULES:\n"
-        "- Budget: incoming_player.price <= outgoing_player.price + squad_state.bank\n"
-        "- Strict position matching (GK→GK, DEF→DEF, MID→MID, FWD→FWD)\n"
-        "- Max 3 players per club after transfers.\n"
-        "- Never buy a player already owned.\n\n"
-
-        "TRANSFER COUNT LOGIC:\n"
-        f"- The manager currently has {free_tf} free transfers.\n"
-        "- Free transfers are free of charge.\n"
-        f"- You may propose UP TO {allowed_extra} additional transfers beyond the free ones.\n"
-        "- Each additional transfer costs exactly -4 points.\n"
-        f"- Maximum hit allowed = {allowed_extra * 4}.\n"
-        f"- Total transfers allowed = {free_tf + allowed_extra}.\n"
-        "- You must NOT exceed these limits.\n\n"
-
-        "WHEN TO SELL:\n"
-        "- poor recent form, low minutes, rotation risk\n"
-        "- suspension or injury\n"
-        "- poor upcoming fixtures (high FDR)\n\n"
-
-        "WHEN TO BUY:\n"
-        "- strong projected points for target GW (`predicted_points_gw`)\n"
-        "- strong fixture-adjusted value (`fixture_adjusted_points`)\n"
-        "- favorable next fixtures (`fdr_next5.avg_fdr` lower is better)\n"
-        "- reliable minutes\n"
-        "- nailed starter\n"
-        "- good fixture run (low FDR)\n\n"
-
-        "SELECTION PRIORITY (IMPORTANT):\n"
-        "- Prioritise transfers that improve the likely STARTING XI for this GW.\n"
-        "- Base decisions on projected points + fixture run, not only recent form.\n"
-        "- Use `squad_state.squad[].is_starting` and minutes/rotation flags to identify starters.\n"
-        "- Avoid bench-to-bench luxury moves unless there is no meaningful starting XI improvement.\n"
-        "- If selling a bench player, the incoming player should be likely to play meaningful minutes.\n\n"
+        "A deterministic optimiser has already chosen the transfers below. They are valid "
+        "(budget, positions, 3-per-club) and maximise projected starting XI points minus hits.\n"
+        "Your job is ONLY to explain them. Do NOT add, remove or change transfers.\n\n"
+
+        "For each transfer, explain in 1-2 sentences why it helps (form, minutes, fixtures, "
+        "projection). In the rationale, summarise the plan and, if useful, why the listed "
+        "alternatives were ranked lower.\n\n"
 
         "OUTPUT FORMAT (STRICT JSON):\n"
         "{\n"
-        "  gameweek: number,\n"
-        "  suggested_transfers: [{out_id,out_name,in_id,in_name,reason}],\n"
-        "  hit_cost: number,\n"
+        "  suggested_transfers: [{out_id,in_id,reason}],\n"
         "  rationale: string\n"
         "}\n\n"
 
+        "CHOSEN PLAN JSON:\n"
+        f"{json.dumps(plan)}\n\n"
+        "ALTERNATIVE PLANS JSON:\n"
+        f"{json.dumps(alternatives)}\n\n"
         "TEAM JSON:\n"
         f"{json.dumps(current_team)}\n\n"
         "SQUAD STATE JSON:\n"
         f"{json.dumps(squad_state)}\n\n"
         "CANDIDATE POOL JSON:\n"
-        f"{json.dumps(candidate_pool)}"
+        f"{_pool_block(candidate_pool, compact_pool)}"
     )
 
 
@@ -370,6 +304,7 @@ def build_freehit_prompt(
     gw: int,
     fh_state: Dict[str, Any],
     candidate_pool: List[Dict[str, Any]],
+    compact_pool: Optional[Dict[str, Any]] = None,
 ) -> str:
     """
     Build prompt for Free Hit squad construction.
@@ -378,6 +313,7 @@ def build_freehit_prompt(
       - max_from_club: int (usually 3)
       - requirements: dict like {"GK":2,"DEF":5,"MID":5,"FWD":3}
     candidate_pool is a rich list of players with stats.
+    compact_pool (optional) replaces the JSON dump with a columnar table.
     """
     return (
         "You are an elite FPL strategist.\n\n"
@@ -403,5 +339,5 @@ def build_freehit_prompt(
         "FH STATE JSON:\n"
         f"{json.dumps(fh_state)}\n\n"
         "CANDIDATE POOL JSON:\n"
-        f"{json.dumps(candidate_pool)}"
+        f"{_pool_block(candidate_pool, compact_pool)}"
     )
@@ -0,0 +1,207 @@
+import json
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:  # Optional: exact counts for OpenAI models when tiktoken is installed.
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # pragma: no cover - depends on environment
+    _ENCODING = None
+
+
+# -------------------------------------------------
+# COLUMN SPECS
+# -------------------------------------------------
+#
+# Each column: (short_key, source, description).
+# source is a top-level key, a dotted path ("fdr_next5.avg_fdr") or a
+# callable taking the player dict. Only fields the prompts actually
+# reference are listed; everything else (recent_history, fixture lists,
+# duplicated injury flags, ...) is dropped.
+
+Column = Tuple[str, Any, str]
+
+
+def _fdr_run(player: Dict[str, Any]) -> Optional[str]:
+    values = (player.get("fdr_next5") or {}).get("raw_values") or []
+    if not values:
+        return None
+    return "".join(str(int(v)) for v in values if v is not None)
+
+
+TRANSFER_POOL_COLUMNS: List[Column] = [
+    ("id", "id", "player id (use as in_id)"),
+    ("nm", "name", "player name"),
+    ("tm", "team", "club short name"),
+    ("pos", "pos", "position"),
+    ("pr", "price", "price in millions"),
+    ("st", "status", "FPL status (a=available, d=doubtful)"),
+    ("cop", "chance_of_playing_next_round", "chance of playing next round, %"),
+    ("xp", "predicted_points_gw", "predicted_points_gw: model projection for target GW"),
+    ("fxp", "fixture_adjusted_points", "fixture_adjusted_points: projection adjusted for fixture run"),
+    ("fdr", "fdr_next5.avg_fdr", "fdr_next5.avg_fdr: average difficulty of next 5 fixtures, lower is better"),
+    ("min", "expected_minutes", "expected minutes"),
+    ("f3", "form_last3", "average points over last 3 GWs"),
+    ("rot", "rotation_risk", "rotation risk: low/medium/high/unknown"),
+]
+
+FREEHIT_POOL_COLUMNS: List[Column] = [
+    ("id", "id", "player id"),
+    ("nm", "name", "player name"),
+    ("tm", "team", "club short name"),
+    ("pos", "pos", "position"),
+    ("pr", "price", "price in millions"),
+    ("st", "status", "FPL status (a=available, d=doubtful)"),
+    ("xp", "predicted_points_gw", "model projection for target GW"),
+    ("f3", "form_last3", "average points over last 3 GWs (form)"),
+    ("min", "expected_minutes", "expected minutes"),
+    ("rot", "rotation_risk", "rotation risk: low/medium/high/unknown"),
+    ("fdr", "fdr_next5.avg_fdr", "average difficulty of next 5 fixtures, lower is better"),
+    ("run", _fdr_run, "difficulty of each of the next fixtures, e.g. '23425'"),
+]
+
+FLOAT_DIGITS = 1
+
+
+# -------------------------------------------------
+# TOKEN COUNTING
+# -------------------------------------------------
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count for text. Uses tiktoken when available, otherwise the
+    usual ~4 characters per token approximation for JSON-ish text.
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return int(math.ceil(len(text) / 4.0))
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+# -------------------------------------------------
+# ENCODING
+# -------------------------------------------------
+
+
+def _get_value(player: Dict[str, Any], source: Any) -> Any:
+    if callable(source):
+        value = source(player)
+    else:
+        value = player
+        for part in str(source).split("."):
+            if not isinstance(value, dict):
+                value = None
+                break
+            value = value.get(part)
+
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float):
+        rounded = round(value, FLOAT_DIGITS)
+        return int(rounded) if rounded.is_integer() else rounded
+    return value
+
+
+def _rank_score(player: Dict[str, Any]) -> float:
+    for key in ("fixture_adjusted_points", "predicted_points_gw", "form_last3"):
+        value = player.get(key)
+        if value is not None:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                continue
+    return 0.0
+
+
+def compact_candidate_pool(
+    candidate_pool: List[Dict[str, Any]],
+    columns: List[Column],
+    token_budget: Optional[int] = None,
+    min_per_pos: Optional[Dict[str, int]] = None,
+    rank_key: Callable[[Dict[str, Any]], float] = _rank_score,
+) -> Dict[str, Any]:
+    """
+    Encode candidate_pool as a columnar table and prune it to token_budget.
+
+    Returns:
+      {
+        "table": {"cols": [...], "rows": [[...], ...]},
+        "legend": {short_key: description},
+        "pool": [...],             # kept player dicts (use for validation)
+        "dropped_ids": [...],
+        "players_before": int, "players_after": int,
+        "tokens_before": int,      # json.dumps(candidate_pool) as sent before
+        "tokens_after": int,       # compact table as sent now
+      }
+
+    Pruning removes the lowest-ranked players first (by fixture-adjusted
+    projection) but never takes a position below min_per_pos.
+    """
+    keys = [c[0] for c in columns]
+    rows = [[_get_value(p, c[1]) for c in columns] for p in candidate_pool]
+
+    tokens_before = estimate_tokens(json.dumps(candidate_pool))
+    header_tokens = estimate_tokens(_dumps({"cols": keys, "rows": []}))
+    row_tokens = [estimate_tokens(_dumps(r)) + 1 for r in rows]
+
+    keep = [True] * len(rows)
+    if token_budget is not None and token_budget > 0:
+        total = header_tokens + sum(row_tokens)
+        pos_counts: Dict[Any, int] = {}
+        for p in candidate_pool:
+            pos_counts[p.get("pos")] = pos_counts.get(p.get("pos"), 0) + 1
+        floors = min_per_pos or {}
+
+        # Lowest-ranked first; stable on original order for equal scores.
+        order = sorted(range(len(rows)), key=lambda i: (rank_key(candidate_pool[i]), -i))
+        for i in order:
+            if total <= token_budget:
+                break
+            pos = candidate_pool[i].get("pos")
+            if pos_counts.get(pos, 0) <= floors.get(pos, 0):
+                continue
+            keep[i] = False
+            pos_counts[pos] -= 1
+            total -= row_tokens[i]
+
+    kept_rows = [r for r, k in zip(rows, keep) if k]
+    kept_pool = [p for p, k in zip(candidate_pool, keep) if k]
+    table = {"cols": keys, "rows": kept_rows}
+
+    return {
+        "table": table,
+        "legend": {c[0]: c[2] for c in columns},
+        "pool": kept_pool,
+        "dropped_ids": [p.get("id") for p, k in zip(candidate_pool, keep) if not k],
+        "players_before": len(candidate_pool),
+        "players_after": len(kept_pool),
+        "tokens_before": tokens_before,
+        "tokens_after": estimate_tokens(_dumps(table)),
+    }
+
+
+def format_compact_pool(compact: Dict[str, Any]) -> str:
+    """
+    Render a compact pool for a prompt: column legend followed by the table JSON.
+    """
+    legend = "\n".join(f"- {k}: {desc}" for k, desc in compact["legend"].items())
+    return (
+        "Columnar table: 'cols' lists the keys, each row in 'rows' is one player "
+        "with values in the same order (null = unknown).\n"
+        f"{legend}\n"
+        f"{_dumps(compact['table'])}"
+    )
+
+
+def compaction_report(compact: Dict[str, Any]) -> str:
+    return (
+        f"{compact['players_before']} -> {compact['players_after']} players, "
+        f"~{compact['tokens_before']} -> ~{compact['tokens_after']} tokens"
+    )
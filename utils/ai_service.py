@@ -1,5 +1,6 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
+from config import PROMPT_POOL_TOKEN_BUDGET
 from utils.ai_data_builder import (
     build_squad_for_gw,
     build_team_json,
@@ -9,10 +10,17 @@ from utils.ai_data_builder import (
 )
 from utils.ai_predictor import (
     build_captaincy_prompt,
-    build_transfer_prompt,
+    build_transfer_explain_prompt,
     build_freehit_prompt,
 )
-from utils.ai_service_helpers import sanitize_llm_transfer_output
+from utils.ai_prompt_compaction import (
+    TRANSFER_POOL_COLUMNS,
+    FREEHIT_POOL_COLUMNS,
+    compact_candidate_pool,
+    compaction_report,
+)
+from utils.ai_service_helpers import merge_transfer_explanation, sanitize_llm_transfer_output
+from utils.transfer_search import plan_to_suggestion, search_transfers
 from utils.ai_predictor import build_h2h_prompt, ask_llm
 from utils.ai_data_builder import load_team_json
 
@@ -35,7 +43,7 @@ def captaincy_advice(entry_id: int, gw: int) -> Dict[str, Any]:
     print(f"[AI] Captaincy analysis for GW{gw}, using squad from GW{use_gw}.")
 
     prompt = build_captaincy_prompt(gw, squad, team_ctx)
-    rsp = ask_llm(prompt)
+    rsp = ask_llm(prompt, kind="captaincy", context={"gw": gw, "squad": squad})
 
     if rsp["error"]:
         return {
@@ -57,67 +65,99 @@ def transfer_advice(
     candidate_pool_size: int = 120,
     free_transfers: int = 1,
     allowed_extra: int = 0,
+    pool_full: Optional[List[Dict[str, Any]]] = None,
+    projections: Optional[Dict[int, float]] = None,
+    fdr_map: Optional[Dict[str, Any]] = None,
+    token_budget: Optional[int] = None,
+    explain: bool = True,
+    top_k: int = 3,
 ) -> Dict[str, Any]:
     """
     High-level service for transfer recommendations.
 
+    pool_full / projections / fdr_map may be passed in when the caller
+    already built them (batch mode); otherwise they are built here.
+    token_budget caps the candidate pool block of the prompt
+    (default: config.PROMPT_POOL_TOKEN_BUDGET, 0 disables pruning).
+
     Steps:
     - Build team context
     - Build squad_state for GW-1
     - Build global candidate pool
     - Reduce candidate pool (status, 3-per-club, etc.)
-    - Build transfer prompt
-    - Ask LLM
-    - Validate output (position, budget, 3-per-club)
+    - Search 1-3 transfer plans deterministically (utils/transfer_search.py)
+    - Optionally ask the LLM to explain the best plan (explain=False skips it)
+
+    Returns {"json": <transfer JSON>, "error": None, "plans": [top_k plans]}.
+    The transfers always come from the search; an LLM failure only loses
+    the explanation (reported under "explain_error").
     """
     team_ctx = build_team_json(entry_id, target_gw=gw)
-    squad_state = build_squad_state(entry_id, gw, free_transfers, allowed_extra)
-    pool_full = build_candidate_pool(limit=candidate_pool_size, gw=gw)
+    squad_state = build_squad_state(
+        entry_id,
+        gw,
+        free_transfers,
+        allowed_extra,
+        projections=projections,
+        fdr_map=fdr_map,
+    )
+    if pool_full is None:
+        pool_full = build_candidate_pool(
+            limit=candidate_pool_size,
+            gw=gw,
+            projections=projections,
+            fdr_map=fdr_map,
+        )
     pool_reduced = reduce_candidate_pool_for_transfers(squad_state, pool_full)
 
     print(
         f"[AI] Transfer advice for GW{gw}, "
-        f"using last completed squad & bank from team_stats.json."
+        f"using last completed squad & bank from team_stats."
     )
 
-    base_prompt = build_transfer_prompt(gw, team_ctx, squad_state, pool_reduced)
-    prompt = base_prompt
-
-    max_attempts = 3
-    for attempt in range(1, max_attempts + 1):
-        rsp = ask_llm(prompt)
-
-        if rsp["error"]:
-            return {
-                "error": rsp["error"],
-                "raw": rsp["raw"],
-            }
-
-        sanitized = sanitize_llm_transfer_output(
-            rsp["json"],
-            squad_state,
-            pool_reduced,
-        )
-
-        if not sanitized.get("error"):
-            return sanitized
-
-        if attempt == max_attempts:
-            return sanitized
-
-        prompt = (
-            f"{base_prompt}\n\n"
-            "IMPORTANT: Your previous proposal was invalid.\n"
-            f"Validation error: {sanitized['error']}\n\n"
-            "Regenerate a new proposal from scratch.\n"
-            "Focus on improving the likely starting XI first; avoid bench-only luxury moves.\n"
-            "Return only valid JSON in the required format."
-        )
+    plans = search_transfers(squad_state, pool_reduced, top_k=top_k)
+    best = plans[0] if plans else None
+    suggestion = plan_to_suggestion(best, gw)
+    print(f"[AI] Transfer search: {len(plans)} valid plan(s) with positive net gain.")
+
+    # Search output must pass the same checks LLM output used to.
+    if best is not None:
+        checked = sanitize_llm_transfer_output(suggestion, squad_state, pool_reduced)
+        if checked.get("error"):
+            return checked
+
+    result: Dict[str, Any] = {"json": suggestion, "error": None, "plans": plans}
+    if not explain or best is None:
+        return result
+
+    compact = compact_candidate_pool(
+        pool_reduced,
+        TRANSFER_POOL_COLUMNS,
+        token_budget=PROMPT_POOL_TOKEN_BUDGET if token_budget is None else token_budget,
+        min_per_pos={"GK": 3, "DEF": 5, "MID": 5, "FWD": 3},
+    )
+    print(f"[AI] Candidate pool compacted: {compaction_report(compact)}.")
+
+    prompt = build_transfer_explain_prompt(
+        gw,
+        team_ctx,
+        squad_state,
+        best,
+        plans[1:],
+        compact["pool"],
+        compact_pool=compact,
+    )
+    rsp = ask_llm(
+        prompt,
+        kind="transfer_explain",
+        context={"gw": gw, "plan": best, "alternatives": plans[1:], "suggestion": suggestion},
+    )
+    if rsp["error"]:
+        result["explain_error"] = rsp["error"]
+        return result
 
-    return {
-        "error": "Could not generate a valid transfer suggestion.",
-        "raw": None,
-    }
+    result["json"] = merge_transfer_explanation(suggestion, rsp["json"])
+    return result
 
 
 # -------------------------------------------------
@@ -127,10 +167,13 @@ def freehit_advice(
     gw: int,
     candidate_pool_size: int = 150,
     budget: float = 100.0,
+    token_budget: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
     High-level service for Free Hit squad generation.
     Global — does NOT depend on a specific team.
+    token_budget caps the candidate pool block of the prompt
+    (default: config.PROMPT_POOL_TOKEN_BUDGET, 0 disables pruning).
     """
 
     # Build raw candidate pool
@@ -154,13 +197,27 @@ def freehit_advice(
         }
     }
 
+    # Keep at least 2x the positional requirement so a valid squad still exists.
+    compact = compact_candidate_pool(
+        pool_filtered,
+        FREEHIT_POOL_COLUMNS,
+        token_budget=PROMPT_POOL_TOKEN_BUDGET if token_budget is None else token_budget,
+        min_per_pos={pos: 2 * n for pos, n in fh_state["requirements"].items()},
+    )
+    pool_filtered = compact["pool"]
+
     print(
         f"[AI] Free Hit team generation for GW{gw} with budget {budget}, "
         f"using {len(pool_filtered)} candidates."
     )
+    print(f"[AI] Candidate pool compacted: {compaction_report(compact)}.")
 
-    prompt = build_freehit_prompt(gw, fh_state, pool_filtered)
-    rsp = ask_llm(prompt)
+    prompt = build_freehit_prompt(gw, fh_state, pool_filtered, compact_pool=compact)
+    rsp = ask_llm(
+        prompt,
+        kind="freehit",
+        context={"gw": gw, "fh_state": fh_state, "candidate_pool": pool_filtered},
+    )
 
     if rsp["error"]:
         return {
@@ -178,7 +235,7 @@ def h2h_prediction(
     entry_a: int,
     entry_b: int,
     gw: int,
-    mc_baseline: Optional[Dict[str, float]] = None
+    mc_baseline: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """
     High-level H2H predictor.
@@ -203,7 +260,11 @@ def h2h_prediction(
         mc_baseline=mc_baseline
     )
 
-    rsp = ask_llm(prompt)
+    rsp = ask_llm(
+        prompt,
+        kind="h2h",
+        context={"gw": gw, "team_a": latest_a, "team_b": latest_b, "mc_baseline": mc_baseline},
+    )
 
     if rsp["error"]:
         return {
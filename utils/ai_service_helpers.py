@@ -1,10 +1,7 @@
 from copy import deepcopy
 from typing import Dict, Any, List
 
-from utils.ai_transfer_validator import (
-    validate_transfer_suggestion,
-    apply_transfer_suggestion,
-)
+from utils.ai_transfer_validator import SquadState, index_pool
 
 
 def _coerce_float(value: Any) -> float | None:
@@ -39,13 +36,6 @@ def _get_projection_score(player: Dict[str, Any]) -> float | None:
     )
 
 
-def _find_player(players: List[Dict[str, Any]], player_id: Any) -> Dict[str, Any] | None:
-    for p in players:
-        if p.get("id") == player_id:
-            return p
-    return None
-
-
 def sanitize_llm_transfer_output(
     llm_json: Dict[str, Any],
     squad_state: Dict[str, Any],
@@ -129,7 +119,9 @@ def sanitize_llm_transfer_output(
             "raw": llm_json,
         }
 
-    state = deepcopy(squad_state)
+    # Indexed copy: the caller's squad_state is never modified.
+    state = SquadState.from_dict(squad_state)
+    pool = index_pool(candidate_pool)
     for idx, suggestion in enumerate(suggestions, start=1):
         if not isinstance(suggestion, dict):
             return {
@@ -137,20 +129,17 @@ def sanitize_llm_transfer_output(
                 "raw": llm_json,
             }
 
-        ok, reason = validate_transfer_suggestion(state, suggestion, candidate_pool)
+        out_id = suggestion.get("out_id")
+        in_id = suggestion.get("in_id")
+        ok, reason = state.check(out_id, in_id, pool)
         if not ok:
             return {
                 "error": f"Invalid transfer #{idx}: {reason}",
                 "raw": llm_json,
             }
 
-        out_player = _find_player(state["squad"], suggestion.get("out_id"))
-        in_player = _find_player(candidate_pool, suggestion.get("in_id"))
-        if out_player is None or in_player is None:
-            return {
-                "error": f"Invalid transfer #{idx}: could not resolve players for projection check.",
-                "raw": llm_json,
-            }
+        out_player = state.players[out_id]
+        in_player = pool[in_id]
 
         if not _is_forced_sell(out_player):
             out_score = _get_projection_score(out_player)
@@ -164,14 +153,39 @@ def sanitize_llm_transfer_output(
                     "raw": llm_json,
                 }
 
-        applied, apply_reason = apply_transfer_suggestion(state, suggestion, candidate_pool)
-        if not applied:
-            return {
-                "error": f"Could not apply transfer #{idx}: {apply_reason}",
-                "raw": llm_json,
-            }
+        state.apply(out_id, in_player)
 
     return {
         "json": llm_json,
         "error": None,
     }
+
+
+def merge_transfer_explanation(
+    suggestion: Dict[str, Any],
+    llm_json: Dict[str, Any] | None,
+) -> Dict[str, Any]:
+    """
+    Copy reason / rationale text from an LLM explanation onto a search-based
+    suggestion. Transfers themselves are never taken from the LLM: reasons
+    are matched on (out_id, in_id) and anything else is ignored.
+    """
+    merged = deepcopy(suggestion)
+    if not isinstance(llm_json, dict):
+        return merged
+
+    reasons = {}
+    for t in llm_json.get("suggested_transfers") or []:
+        if isinstance(t, dict) and isinstance(t.get("reason"), str):
+            reasons[(t.get("out_id"), t.get("in_id"))] = t["reason"]
+
+    for t in merged["suggested_transfers"]:
+        reason = reasons.get((t["out_id"], t["in_id"]))
+        if reason:
+            t["reason"] = reason
+
+    rationale = llm_json.get("rationale")
+    if isinstance(rationale, str) and rationale.strip():
+        merged["rationale"] = f"{merged['rationale']} {rationale.strip()}"
+
+    return merged
@@ -1,4 +1,250 @@
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+MAX_PER_CLUB = 3
+
+
+def _incoming_record(in_player: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Squad entry for a player bought from the candidate pool.
+    """
+    return {
+        "id": in_player.get("id"),
+        "name": in_player.get("name"),
+        "team": in_player.get("team"),
+        "pos": in_player.get("pos"),
+        "price": in_player.get("price"),
+        "status": in_player.get("status"),
+        "chance_of_playing_next_round": in_player.get("chance_of_playing_next_round"),
+        "injury": in_player.get("injury", in_player.get("status") == "i"),
+        "suspended": in_player.get("suspended", in_player.get("status") == "s"),
+        "rotation_risk": in_player.get("rotation_risk", "unknown"),
+        "expected_minutes": in_player.get("expected_minutes", 0),
+        "recent_form": in_player.get("recent_form", in_player.get("form_last3", 0.0)),
+    }
+
+
+PoolLike = Union[List[Dict[str, Any]], Dict[int, Dict[str, Any]]]
+
+
+def index_pool(candidate_pool: PoolLike) -> Dict[int, Dict[str, Any]]:
+    """
+    id -> player index for a candidate pool (passed through if already indexed).
+    """
+    if isinstance(candidate_pool, dict):
+        return candidate_pool
+    return {p["id"]: p for p in candidate_pool}
+
+
+# -------------------------------------------------
+# INDEXED SQUAD STATE
+# -------------------------------------------------
+
+
+class SquadState:
+    """
+    Indexed squad for validating and applying transfers.
+
+    - players: id -> squad player dict
+    - slots:   id -> position in the squad list (order is kept on apply)
+    - club_counts: list of counts, indexed through club_index (team -> int)
+    - by_pos:  position -> set of owned ids
+
+    apply() records an undo entry, so search code can walk transfer
+    sequences with apply/undo instead of copying the squad.
+    """
+
+    def __init__(
+        self,
+        squad: List[Dict[str, Any]],
+        bank: float = 0.0,
+        club_counts: Optional[Dict[Any, int]] = None,
+        free_transfers: int = 1,
+        allowed_extra: int = 0,
+    ):
+        self.squad: List[Dict[str, Any]] = list(squad)
+        self.bank = float(bank or 0.0)
+        self.free_transfers = int(free_transfers)
+        self.allowed_extra = int(allowed_extra)
+
+        self.players: Dict[int, Dict[str, Any]] = {}
+        self.slots: Dict[int, int] = {}
+        self.by_pos: Dict[Any, set] = {}
+        for i, p in enumerate(self.squad):
+            self.players[p["id"]] = p
+            self.slots[p["id"]] = i
+            self.by_pos.setdefault(p.get("pos"), set()).add(p["id"])
+
+        self.club_index: Dict[Any, int] = {}
+        self.club_counts: List[int] = []
+        if club_counts is None:
+            for p in self.squad:
+                self.club_counts[self._club(p.get("team"))] += 1
+        else:
+            for team, count in club_counts.items():
+                self.club_counts[self._club(team)] = int(count)
+
+        self._undo: List[Tuple[Any, ...]] = []
+
+    @classmethod
+    def from_dict(cls, squad_state: Dict[str, Any]) -> "SquadState":
+        """
+        Build from the squad_state dict produced by build_squad_state.
+        """
+        return cls(
+            squad_state["squad"],
+            bank=squad_state.get("bank", 0.0),
+            club_counts=squad_state.get("club_counts"),
+            free_transfers=squad_state.get("free_transfers", 1),
+            allowed_extra=squad_state.get(
+                "allowed_extra", squad_state.get("allowed_extra_transfers", 0)
+            ),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "free_transfers": self.free_transfers,
+            "allowed_extra": self.allowed_extra,
+            "bank": self.bank,
+            "squad": list(self.squad),
+            "club_counts": {
+                team: self.club_counts[i] for team, i in self.club_index.items() if self.club_counts[i]
+            },
+        }
+
+    def _club(self, team: Any) -> int:
+        idx = self.club_index.get(team)
+        if idx is None:
+            idx = len(self.club_counts)
+            self.club_index[team] = idx
+            self.club_counts.append(0)
+        return idx
+
+    def club_count(self, team: Any) -> int:
+        idx = self.club_index.get(team)
+        return self.club_counts[idx] if idx is not None else 0
+
+    def owns(self, player_id: Any) -> bool:
+        return player_id in self.players
+
+    # ---------------------------
+    # Validation
+    # ---------------------------
+
+    def check(self, out_id: Any, in_id: Any, pool: Dict[int, Dict[str, Any]]) -> Tuple[bool, str]:
+        """
+        Same rules and messages as validate_transfer_suggestion, with O(1) lookups.
+        """
+        if out_id is None or in_id is None:
+            return False, "out_id or in_id is missing."
+        if out_id == in_id:
+            return False, "out_id and in_id cannot be the same player."
+
+        out_player = self.players.get(out_id)
+        if out_player is None:
+            return False, f"Outgoing player {out_id} is not in squad."
+
+        in_player = pool.get(in_id)
+        if in_player is None:
+            return False, f"Incoming player {in_id} not found in candidate pool."
+
+        # Position check
+        if out_player.get("pos") != in_player.get("pos"):
+            return False, "Positions must match (GK→GK, DEF→DEF, MID→MID, FWD→FWD)."
+
+        # Already owned check
+        if in_id in self.players:
+            return False, "Cannot buy a player that is already owned."
+
+        # 3-per-club rule (same club: count unchanged)
+        in_team = in_player.get("team")
+        new_count = self.club_count(in_team)
+        if in_team != out_player.get("team"):
+            new_count += 1
+        if new_count > MAX_PER_CLUB:
+            return False, f"Transfer breaks 3-per-club rule for {in_team}."
+
+        # Budget check
+        out_price = out_player.get("price")
+        in_price = in_player.get("price")
+        if out_price is None or in_price is None:
+            return False, "Missing price information for players."
+        try:
+            out_price = float(out_price)
+            in_price = float(in_price)
+        except (TypeError, ValueError):
+            return False, "Invalid numeric values for player prices."
+
+        if in_price > out_price + self.bank + 1e-6:
+            return False, (
+                f"Not enough budget: {in_price} > {out_price} + bank({self.bank})."
+            )
+
+        return True, "OK"
+
+    # ---------------------------
+    # Apply / undo
+    # ---------------------------
+
+    def apply(self, out_id: Any, in_player: Dict[str, Any]) -> None:
+        """
+        Swap out_id for in_player (no validation; call check() first).
+        """
+        out_player = self.players.pop(out_id)
+        slot = self.slots.pop(out_id)
+        record = _incoming_record(in_player)
+        in_id = record["id"]
+
+        prev_bank = self.bank
+        self.bank = prev_bank + float(out_player.get("price") or 0.0) - float(in_player.get("price") or 0.0)
+
+        # Players without a club (team None) are not counted, as in the dict API.
+        out_team = out_player.get("team")
+        out_idx = self._club(out_team) if out_team is not None else None
+        in_idx = self._club(record["team"]) if record["team"] is not None else None
+        prev_counts = (
+            self.club_counts[out_idx] if out_idx is not None else 0,
+            self.club_counts[in_idx] if in_idx is not None else 0,
+        )
+        if out_idx is not None:
+            self.club_counts[out_idx] = max(0, self.club_counts[out_idx] - 1)
+        if in_idx is not None:
+            self.club_counts[in_idx] += 1
+
+        self.by_pos[out_player.get("pos")].discard(out_id)
+        self.by_pos.setdefault(record["pos"], set()).add(in_id)
+
+        self.squad[slot] = record
+        self.players[in_id] = record
+        self.slots[in_id] = slot
+
+        self._undo.append((out_player, slot, in_id, prev_bank, out_idx, in_idx, prev_counts))
+
+    def undo(self) -> None:
+        """
+        Revert the last apply().
+        """
+        out_player, slot, in_id, prev_bank, out_idx, in_idx, prev_counts = self._undo.pop()
+        record = self.players.pop(in_id)
+        del self.slots[in_id]
+        self.by_pos[record["pos"]].discard(in_id)
+
+        out_id = out_player["id"]
+        self.squad[slot] = out_player
+        self.players[out_id] = out_player
+        self.slots[out_id] = slot
+        self.by_pos.setdefault(out_player.get("pos"), set()).add(out_id)
+
+        self.bank = prev_bank
+        # Restore in reverse order: out and in may share an index.
+        if in_idx is not None:
+            self.club_counts[in_idx] = prev_counts[1]
+        if out_idx is not None:
+            self.club_counts[out_idx] = prev_counts[0]
+
+
+# -------------------------------------------------
+# DICT API (squad_state dicts from build_squad_state)
+# -------------------------------------------------
 
 
 def _find_in_squad(squad_state: Dict[str, Any], player_id: int) -> Dict[str, Any] | None:
@@ -11,20 +257,17 @@ def _find_in_squad(squad_state: Dict[str, Any], player_id: int) -> Dict[str, Any
     return None
 
 
-def _find_in_pool(candidate_pool: List[Dict[str, Any]], player_id: int) -> Dict[str, Any] | None:
+def _find_in_pool(candidate_pool: PoolLike, player_id: int) -> Dict[str, Any] | None:
     """
     Find a player dict in candidate pool by ID.
     """
-    for p in candidate_pool:
-        if p["id"] == player_id:
-            return p
-    return None
+    return index_pool(candidate_pool).get(player_id)
 
 
 def validate_transfer_suggestion(
-    squad_state: Dict[str, Any],
+    squad_state: Union[Dict[str, Any], SquadState],
     suggestion: Dict[str, Any],
-    candidate_pool: List[Dict[str, Any]],
+    candidate_pool: PoolLike,
 ) -> Tuple[bool, str]:
     """
     Validate a single transfer suggestion from the LLM.
@@ -36,77 +279,19 @@ def validate_transfer_suggestion(
     - cannot buy player already owned
     - respect 3-per-club rule after transfer
     - respect budget: out_price + bank >= in_price
-    """
-    out_id = suggestion.get("out_id")
-    in_id = suggestion.get("in_id")
-
-    if out_id is None or in_id is None:
-        return False, "out_id or in_id is missing."
-    if out_id == in_id:
-        return False, "out_id and in_id cannot be the same player."
-
-    out_player = _find_in_squad(squad_state, out_id)
-    if out_player is None:
-        return False, f"Outgoing player {out_id} is not in squad."
-
-    in_player = _find_in_pool(candidate_pool, in_id)
-    if in_player is None:
-        return False, f"Incoming player {in_id} not found in candidate pool."
-
-    # Position check
-    if out_player.get("pos") != in_player.get("pos"):
-        return False, "Positions must match (GK→GK, DEF→DEF, MID→MID, FWD→FWD)."
-
-    # Already owned check
-    owned_ids = {p["id"] for p in squad_state["squad"]}
-    if in_id in owned_ids:
-        return False, "Cannot buy a player that is already owned."
-
-    # 3-per-club rule
-    club_counts = dict(squad_state.get("club_counts", {}))
-    out_team = out_player.get("team")
-    in_team = in_player.get("team")
-
-    new_count = club_counts.get(in_team, 0)
-    if in_team == out_team:
-        # same club: count unchanged
-        pass
-    else:
-        # remove one from out_team, add one to in_team
-        if out_team is not None:
-            club_counts[out_team] = max(0, club_counts.get(out_team, 0) - 1)
-        club_counts[in_team] = club_counts.get(in_team, 0) + 1
-        new_count = club_counts[in_team]
-
-    if new_count > 3:
-        return False, f"Transfer breaks 3-per-club rule for {in_team}."
-
-    # Budget check
-    bank = float(squad_state.get("bank", 0.0))
-
-    out_price = out_player.get("price")
-    in_price = in_player.get("price")
-
-    if out_price is None or in_price is None:
-        return False, "Missing price information for players."
-    try:
-        out_price = float(out_price)
-        in_price = float(in_price)
-    except (TypeError, ValueError):
-        return False, "Invalid numeric values for player prices."
 
-    if in_price > out_price + bank + 1e-6:
-        return False, (
-            f"Not enough budget: {in_price} > {out_price} + bank({bank})."
-        )
-
-    return True, "OK"
+    squad_state may be a dict or a SquadState; candidate_pool a list or an
+    id -> player dict (index_pool). Pass indexed forms when validating many
+    suggestions against the same squad.
+    """
+    state = squad_state if isinstance(squad_state, SquadState) else SquadState.from_dict(squad_state)
+    return state.check(suggestion.get("out_id"), suggestion.get("in_id"), index_pool(candidate_pool))
 
 
 def apply_transfer_suggestion(
-    squad_state: Dict[str, Any],
+    squad_state: Union[Dict[str, Any], SquadState],
     suggestion: Dict[str, Any],
-    candidate_pool: List[Dict[str, Any]],
+    candidate_pool: PoolLike,
 ) -> Tuple[bool, str]:
     """
     Apply a previously validated transfer to squad_state in-place.
@@ -114,6 +299,15 @@ def apply_transfer_suggestion(
     """
     out_id = suggestion.get("out_id")
     in_id = suggestion.get("in_id")
+    in_player = _find_in_pool(candidate_pool, in_id)
+
+    if isinstance(squad_state, SquadState):
+        if not squad_state.owns(out_id):
+            return False, f"Outgoing player {out_id} is not in squad."
+        if in_player is None:
+            return False, f"Incoming player {in_id} not found in candidate pool."
+        squad_state.apply(out_id, in_player)
+        return True, "OK"
 
     out_idx = None
     for i, p in enumerate(squad_state["squad"]):
@@ -124,7 +318,6 @@ def apply_transfer_suggestion(
         return False, f"Outgoing player {out_id} is not in squad."
 
     out_player = squad_state["squad"][out_idx]
-    in_player = _find_in_pool(candidate_pool, in_id)
     if in_player is None:
         return False, f"Incoming player {in_id} not found in candidate pool."
 
@@ -140,18 +333,5 @@ def apply_transfer_suggestion(
     if in_team is not None:
         club_counts[in_team] = club_counts.get(in_team, 0) + 1
 
-    squad_state["squad"][out_idx] = {
-        "id": in_player.get("id"),
-        "name": in_player.get("name"),
-        "team": in_player.get("team"),
-        "pos": in_player.get("pos"),
-        "price": in_player.get("price"),
-        "status": in_player.get("status"),
-        "chance_of_playing_next_round": in_player.get("chance_of_playing_next_round"),
-        "injury": in_player.get("injury", in_player.get("status") == "i"),
-        "suspended": in_player.get("suspended", in_player.get("status") == "s"),
-        "rotation_risk": in_player.get("rotation_risk", "unknown"),
-        "expected_minutes": in_player.get("expected_minutes", 0),
-        "recent_form": in_player.get("recent_form", in_player.get("form_last3", 0.0)),
-    }
+    squad_state["squad"][out_idx] = _incoming_record(in_player)
     return True, "OK"
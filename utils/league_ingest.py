@@ -0,0 +1,160 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from db.entries import save_league_entries, save_team_stats
+from db.sqlite import get_connection
+from utils.team_stats import _get_json, collect_team_stats
+
+LEAGUE_TYPES = ("classic", "h2h")
+
+DEFAULT_ENTRY_WORKERS = 4
+# Picks requests per entry; entries already run concurrently, so keep this low.
+DEFAULT_PICKS_WORKERS_PER_ENTRY = 2
+
+
+# ---------------------------
+# API helpers
+# ---------------------------
+
+def api_league_standings(league_id: int, league_type: str, page: int) -> dict:
+    if league_type not in LEAGUE_TYPES:
+        raise ValueError(f"Unknown league type: {league_type}. Use one of {LEAGUE_TYPES}.")
+    return _get_json(
+        f"https://fantasy.premierleague.com/api/leagues-{league_type}/{league_id}/standings/"
+        f"?page_standings={page}"
+    )
+
+
+def fetch_league_members(
+    league_id: int,
+    league_type: str = "classic",
+    max_entries: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Walk all standings pages of a league.
+    Returns [{"entry_id", "rank", "total", "entry_name", "player_name"}, ...].
+    """
+    members: List[Dict[str, Any]] = []
+    page = 1
+    while True:
+        data = api_league_standings(league_id, league_type, page)
+        standings = data.get("standings") or {}
+        for r in standings.get("results", []):
+            members.append({
+                "entry_id": int(r["entry"]),
+                "rank": r.get("rank"),
+                "total": r.get("total"),
+                "entry_name": r.get("entry_name"),
+                "player_name": r.get("player_name"),
+            })
+            if max_entries is not None and len(members) >= max_entries:
+                return members
+        if not standings.get("has_next"):
+            return members
+        page += 1
+
+
+# ---------------------------
+# Ingestion
+# ---------------------------
+
+def ingest_entries(
+    entry_ids: List[int],
+    workers: int = DEFAULT_ENTRY_WORKERS,
+    picks_workers: int = DEFAULT_PICKS_WORKERS_PER_ENTRY,
+) -> Dict[str, Any]:
+    """
+    Collect team stats for many entries concurrently and store them in
+    entries / entry_gw / entry_picks.
+
+    Network + per-entry reads run on worker threads (each with its own
+    connection); all writes go through one connection on the calling thread.
+    Failed entries are reported, not raised.
+    """
+    started = time.perf_counter()
+    failed: Dict[int, str] = {}
+    n_ok = 0
+
+    def _collect(entry_id: int) -> dict:
+        conn = get_connection()
+        try:
+            team_json, _, _ = collect_team_stats(entry_id, workers=picks_workers, conn=conn)
+            return team_json
+        finally:
+            conn.close()
+
+    conn = get_connection()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(_collect, entry_id): entry_id for entry_id in entry_ids}
+        for fut in as_completed(futures):
+            entry_id = futures[fut]
+            try:
+                save_team_stats(fut.result(), conn=conn)
+                conn.commit()
+                n_ok += 1
+            except Exception as e:
+                failed[entry_id] = f"{type(e).__name__}: {e}"
+                print(f"[league_ingest] Entry {entry_id} failed: {failed[entry_id]}")
+    conn.close()
+
+    return {
+        "entries": len(entry_ids),
+        "ok": n_ok,
+        "failed": failed,
+        "total_s": round(time.perf_counter() - started, 3),
+    }
+
+
+def ingest_league(
+    league_id: int,
+    league_type: str = "classic",
+    max_entries: Optional[int] = None,
+    workers: int = DEFAULT_ENTRY_WORKERS,
+    picks_workers: int = DEFAULT_PICKS_WORKERS_PER_ENTRY,
+) -> Dict[str, Any]:
+    print(f"[league_ingest] Fetching {league_type} league {league_id} standings ...")
+    members = fetch_league_members(league_id, league_type, max_entries=max_entries)
+    save_league_entries(league_id, league_type, members)
+    print(f"[league_ingest] {len(members)} entries, ingesting with {workers} worker(s) ...")
+
+    summary = ingest_entries(
+        [m["entry_id"] for m in members],
+        workers=workers,
+        picks_workers=picks_workers,
+    )
+    summary["league_id"] = league_id
+    summary["league_type"] = league_type
+    return summary
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest all entries of a classic or H2H league into SQLite.")
+    parser.add_argument("--league", type=int, required=True, help="League ID")
+    parser.add_argument("--type", choices=LEAGUE_TYPES, default="classic", help="League type")
+    parser.add_argument("--max-entries", type=int, default=None, help="Only ingest the top N entries")
+    parser.add_argument("--workers", type=int, default=DEFAULT_ENTRY_WORKERS, help="Entries fetched concurrently")
+    parser.add_argument(
+        "--picks-workers",
+        type=int,
+        default=DEFAULT_PICKS_WORKERS_PER_ENTRY,
+        help="Concurrent picks requests per entry",
+    )
+    args = parser.parse_args()
+
+    summary = ingest_league(
+        args.league,
+        league_type=args.type,
+        max_entries=args.max_entries,
+        workers=args.workers,
+        picks_workers=args.picks_workers,
+    )
+    print(
+        f"[league_ingest] Done: {summary['ok']}/{summary['entries']} entries stored "
+        f"in {summary['total_s']:.1f}s ({len(summary['failed'])} failed)."
+    )
@@ -0,0 +1,363 @@
+import hashlib
+import json
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.ai_data_builder import average_last_n
+
+SYSTEM_PROMPT = (
+    "You are an expert Fantasy Premier League (FPL) analyst. "
+    "You MUST respond with a single valid JSON object only, "
+    "with no surrounding markdown or explanation."
+)
+
+DEFAULT_MODEL = "gpt-5-mini"
+
+# Environment switches (read by backend_from_env).
+ENV_BACKEND = "FPL_LLM_BACKEND"          # openai | stub | replay
+ENV_FIXTURES_DIR = "FPL_LLM_FIXTURES_DIR"  # stub: <kind>.json fixtures
+ENV_REPLAY_DIR = "FPL_LLM_REPLAY_DIR"      # replay: cached responses
+ENV_RECORD_DIR = "FPL_LLM_RECORD_DIR"      # openai: write responses for replay
+
+
+def prompt_key(prompt: str) -> str:
+    """Stable cache key for a prompt."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:24]
+
+
+def _parse_raw(raw: str) -> Dict[str, Any]:
+    raw = (raw or "").strip()
+    try:
+        return {"raw": raw, "json": json.loads(raw), "error": None}
+    except json.JSONDecodeError as e:
+        return {"raw": raw, "json": None, "error": f"JSON decode error: {e}"}
+
+
+# -------------------------------------------------
+# BACKEND INTERFACE
+# -------------------------------------------------
+
+
+class LLMBackend(ABC):
+    """
+    Backend behind ask_llm.
+
+    complete() returns the same dict as ask_llm:
+      {"raw": str | None, "json": dict | None, "error": str | None}
+
+    kind is the request type ("captaincy", "transfer_explain", "freehit", "h2h", ...)
+    and context the structured data the prompt was built from. The OpenAI
+    backend ignores both; offline backends use them to answer without a model.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def complete(
+        self,
+        prompt: str,
+        kind: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        ...
+
+
+class OpenAIBackend(LLMBackend):
+    """
+    Live OpenAI chat completion with JSON response_format.
+    If record_dir is set, every response is written as <prompt_key>.json
+    so it can be served later by ReplayBackend.
+    """
+
+    name = "openai"
+
+    def __init__(self, model: str = DEFAULT_MODEL, record_dir: Optional[str | Path] = None):
+        self.model = model
+        self.record_dir = Path(record_dir) if record_dir else None
+        self._client = None
+
+    def _get_client(self):
+        if self._client is not None:
+            return self._client, None
+
+        from dotenv import load_dotenv
+        from openai import OpenAI
+
+        load_dotenv()
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            return None, "Missing OPENAI_API_KEY in .env file"
+
+        try:
+            self._client = OpenAI(api_key=api_key)
+        except Exception as e:
+            return None, f"OpenAI client init error: {e}"
+
+        return self._client, None
+
+    def complete(self, prompt, kind=None, context=None):
+        client_obj, client_error = self._get_client()
+        if client_error:
+            return {"raw": None, "json": None, "error": client_error}
+
+        try:
+            response = client_obj.chat.completions.create(
+                model=self.model,
+                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+            )
+        except Exception as e:
+            return {"raw": None, "json": None, "error": f"LLM request error: {e}"}
+
+        raw = (response.choices[0].message.content or "").strip()
+        if self.record_dir is not None:
+            self.record_dir.mkdir(parents=True, exist_ok=True)
+            (self.record_dir / f"{prompt_key(prompt)}.json").write_text(
+                json.dumps({"kind": kind, "model": self.model, "raw": raw}, ensure_ascii=False),
+                encoding="utf-8",
+            )
+        return _parse_raw(raw)
+
+
+class ReplayBackend(LLMBackend):
+    """
+    Serves responses recorded by OpenAIBackend(record_dir=...).
+    A prompt that was never recorded is an error, not a live call.
+    """
+
+    name = "replay"
+
+    def __init__(self, cache_dir: str | Path):
+        self.cache_dir = Path(cache_dir)
+
+    def complete(self, prompt, kind=None, context=None):
+        key = prompt_key(prompt)
+        path = self.cache_dir / f"{key}.json"
+        if not path.exists():
+            return {
+                "raw": None,
+                "json": None,
+                "error": f"Replay cache miss for prompt {key} ({kind or 'unknown'}) in {self.cache_dir}",
+            }
+        record = json.loads(path.read_text(encoding="utf-8"))
+        return _parse_raw(record.get("raw", ""))
+
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic offline backend.
+
+    For each request kind it returns, in order of preference:
+    1) fixtures_dir/<kind>.json if present (recorded/hand-written fixture),
+    2) the output of the registered responder for that kind, computed from
+       the structured context (simple optimizers below).
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        fixtures_dir: Optional[str | Path] = None,
+        responders: Optional[Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]] = None,
+    ):
+        self.fixtures_dir = Path(fixtures_dir) if fixtures_dir else None
+        self.responders = dict(DEFAULT_STUB_RESPONDERS)
+        if responders:
+            self.responders.update(responders)
+
+    def complete(self, prompt, kind=None, context=None):
+        if self.fixtures_dir is not None and kind:
+            path = self.fixtures_dir / f"{kind}.json"
+            if path.exists():
+                return _parse_raw(path.read_text(encoding="utf-8"))
+
+        responder = self.responders.get(kind or "")
+        if responder is None:
+            return {"raw": None, "json": None, "error": f"Stub backend has no responder for '{kind}'."}
+
+        try:
+            payload = responder(context or {})
+        except Exception as e:
+            return {"raw": None, "json": None, "error": f"Stub responder error: {e}"}
+
+        raw = json.dumps(payload, ensure_ascii=False)
+        return {"raw": raw, "json": payload, "error": None}
+
+
+# -------------------------------------------------
+# STUB RESPONDERS
+# -------------------------------------------------
+
+
+def _projection(player: Dict[str, Any]) -> float:
+    for key in ("fixture_adjusted_points", "predicted_points_gw"):
+        if player.get(key) is not None:
+            return float(player[key])
+    return float(player.get("form_last3") or player.get("recent_form") or 0.0)
+
+
+def stub_captaincy(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Captain = best recent scorer among starters who played last GW."""
+    squad = context.get("squad", [])
+    starters = [p for p in squad if p.get("is_starting")] or squad
+
+    def score(p):
+        hist = p.get("gw_history") or []
+        played = 1.0 if hist and (hist[-1].get("minutes") or 0) > 0 else 0.0
+        return (played, average_last_n(hist, 6), -p["id"])
+
+    ranked = sorted(starters, key=score, reverse=True)
+    pick = lambda p: {"id": p["id"], "name": p.get("name"), "reason": "Stub: best recent form with minutes."}
+    return {
+        "gameweek": context.get("gw"),
+        "suggested_captain": pick(ranked[0]) if ranked else None,
+        "suggested_vice_captain": pick(ranked[1]) if len(ranked) > 1 else None,
+        "other_viable_options": [pick(p) for p in ranked[2:4]],
+        "notes": "Deterministic stub response.",
+    }
+
+
+def stub_transfer_explain(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Echo the plan's transfers with a fixed reason."""
+    plan = context.get("plan") or {"transfers": []}
+    return {
+        "suggested_transfers": [
+            {
+                "out_id": t["out_id"],
+                "in_id": t["in_id"],
+                "reason": f"Stub: projection gain {t.get('projection_gain', 0.0):.2f}.",
+            }
+            for t in plan["transfers"]
+        ],
+        "rationale": "Deterministic stub response.",
+    }
+
+
+def stub_freehit(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Greedy 15-man squad by projection within budget and club limits."""
+    fh_state = context.get("fh_state") or {}
+    pool = sorted(context.get("candidate_pool") or [], key=lambda p: (-_projection(p), p["id"]))
+    need = dict(fh_state.get("requirements") or {"GK": 2, "DEF": 5, "MID": 5, "FWD": 3})
+    max_club = int(fh_state.get("max_from_club", 3))
+    budget_left = float(fh_state.get("budget", 100.0))
+
+    cheapest = {
+        pos: sorted(float(p.get("price") or 0.0) for p in pool if p.get("pos") == pos)
+        for pos in need
+    }
+
+    def reserve(need_now):
+        return sum(sum(cheapest[pos][:n]) for pos, n in need_now.items())
+
+    picked: List[Dict[str, Any]] = []
+    clubs: Dict[Any, int] = {}
+    for p in pool:
+        pos = p.get("pos")
+        price = float(p.get("price") or 0.0)
+        if need.get(pos, 0) <= 0 or clubs.get(p.get("team"), 0) >= max_club:
+            continue
+        need[pos] -= 1
+        if price + reserve(need) > budget_left + 1e-6:
+            need[pos] += 1
+            continue
+        picked.append(p)
+        clubs[p.get("team")] = clubs.get(p.get("team"), 0) + 1
+        budget_left -= price
+
+    ranked = sorted(picked, key=lambda p: -_projection(p))
+    return {
+        "gameweek": context.get("gw"),
+        "budget_used": round(float(fh_state.get("budget", 100.0)) - budget_left, 1),
+        "players": [
+            {
+                "id": p["id"],
+                "name": p.get("name"),
+                "team": p.get("team"),
+                "position": p.get("pos"),
+                "price": p.get("price"),
+                "reason": "Stub: greedy by projection.",
+            }
+            for p in picked
+        ],
+        "captain_id": ranked[0]["id"] if ranked else None,
+        "vice_id": ranked[1]["id"] if len(ranked) > 1 else None,
+        "summary": "Deterministic stub response.",
+    }
+
+
+def stub_h2h(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Echo the Monte Carlo baseline when present, otherwise an even match."""
+    baseline = context.get("mc_baseline") or {}
+    a = baseline.get("team_a_expected")
+    b = baseline.get("team_b_expected")
+    favored = "Even"
+    if a is not None and b is not None and abs(a - b) >= 1.0:
+        favored = "A" if a > b else "B"
+    win_probs = {"team_a": 45.0, "team_b": 45.0, "draw": 10.0}
+    if "p_team_a_win" in baseline:
+        win_probs = {
+            "team_a": round(100 * baseline["p_team_a_win"], 1),
+            "team_b": round(100 * baseline["p_team_b_win"], 1),
+            "draw": round(100 * baseline["p_draw"], 1),
+        }
+    return {
+        "gameweek": context.get("gw"),
+        "team_a_expected_points": a,
+        "team_b_expected_points": b,
+        "win_probabilities": win_probs,
+        "key_factors": ["Deterministic stub response."],
+        "who_is_favored": favored,
+        "confidence": "low",
+        "based_on_monte_carlo": bool(baseline),
+    }
+
+
+DEFAULT_STUB_RESPONDERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "captaincy": stub_captaincy,
+    "transfer_explain": stub_transfer_explain,
+    "freehit": stub_freehit,
+    "h2h": stub_h2h,
+}
+
+
+# -------------------------------------------------
+# ACTIVE BACKEND
+# -------------------------------------------------
+
+_BACKEND: Optional[LLMBackend] = None
+
+
+def backend_from_name(name: str, directory: Optional[str] = None) -> LLMBackend:
+    name = (name or "openai").lower()
+    if name == "openai":
+        return OpenAIBackend(record_dir=directory or os.getenv(ENV_RECORD_DIR))
+    if name == "stub":
+        return StubBackend(fixtures_dir=directory or os.getenv(ENV_FIXTURES_DIR))
+    if name == "replay":
+        cache_dir = directory or os.getenv(ENV_REPLAY_DIR)
+        if not cache_dir:
+            raise ValueError(f"Replay backend needs a directory ({ENV_REPLAY_DIR}).")
+        return ReplayBackend(cache_dir)
+    raise ValueError(f"Unknown LLM backend: {name}. Use openai, stub or replay.")
+
+
+def backend_from_env() -> LLMBackend:
+    return backend_from_name(os.getenv(ENV_BACKEND, "openai"))
+
+
+def get_llm_backend() -> LLMBackend:
+    global _BACKEND
+    if _BACKEND is None:
+        _BACKEND = backend_from_env()
+    return _BACKEND
+
+
+def set_llm_backend(backend: Optional[LLMBackend]) -> None:
+    """Install a backend for all ask_llm calls (None = re-read environment)."""
+    global _BACKEND
+    _BACKEND = backend
@@ -83,3 +83,26 @@ def calc_expected_points(entry_id: int, gw: int) -> float:
     dist = mc.simulate(mean=total_mean, std=total_std)
 
     return dist.expected
+
+
+def h2h_baseline(entry_a: int, entry_b: int, gw: int, n_sims: int = 20000) -> dict:
+    """
+    H2H baseline for prompts from the shared-sample simulator
+    (predictions/h2h_sim.py): both squads are simulated from the same
+    player draws, so common players cancel exactly.
+    """
+    from predictions.h2h_sim import h2h_from_store
+
+    sim = h2h_from_store(entry_a, entry_b, gw, n_sims=n_sims)
+    return {
+        "team_a_expected": round(sim["expected_a"], 2),
+        "team_b_expected": round(sim["expected_b"], 2),
+        "p_team_a_win": round(sim["p_win"], 4),
+        "p_draw": round(sim["p_draw"], 4),
+        "p_team_b_win": round(sim["p_loss"], 4),
+        "margin_quantiles": {k: round(v, 1) for k, v in sim["margin_quantiles"].items()},
+        "swing_players": [
+            {k: (round(v, 2) if isinstance(v, float) else v) for k, v in r.items()}
+            for r in sim["swing_players"][:6]
+        ],
+    }
@@ -0,0 +1,372 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from config import MC_TOLERANCE
+from db.sqlite import get_data_version
+from models.asof_features import reset_asof_store
+from models.player_model import predict_player_points, reset_model_caches
+from utils.ai_data_builder import (
+    build_candidate_pool,
+    build_fdr_map_for_all_teams,
+    get_player_meta,
+    load_gw_block,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# How often (seconds) requests may look at the data_version stamp in fpl.db.
+VERSION_CHECK_INTERVAL = 5.0
+
+DEFAULT_POOL_SIZE = 120
+
+
+class BadRequest(ValueError):
+    pass
+
+
+# -------------------------------------------------
+# WARM STATE (ONE PER DATA VERSION)
+# -------------------------------------------------
+
+
+class WarmState:
+    """
+    Everything cached for one data_version: projections, FDR maps and
+    candidate pools. Never mutated after a reload; a new data version gets
+    a new WarmState and in-flight requests finish on the old one.
+
+    Values are computed once per key: concurrent requests for the same key
+    wait on a per-key lock instead of computing it again (the dashboard
+    asks for the same GW pool many times at deadline time).
+    """
+
+    def __init__(self, data_version: Optional[str]):
+        self.data_version = data_version
+        self.created_at = time.time()
+        self._values: Dict[Hashable, Any] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._guard = threading.Lock()
+        # gw -> {player_id: mean}, shared with build_candidate_pool / transfer_advice.
+        self.means: Dict[int, Dict[int, float]] = {}
+
+    def once(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        if key in self._values:
+            return self._values[key]
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._values:
+                self._values[key] = build()
+        return self._values[key]
+
+    def means_for(self, gw: int) -> Dict[int, float]:
+        with self._guard:
+            return self.means.setdefault(gw, {})
+
+    def projection(self, player_id: int, gw: int) -> Tuple[float, float]:
+        def build():
+            mean, std = predict_player_points(player_id, gw)
+            self.means_for(gw)[player_id] = float(mean)
+            return float(mean), float(std)
+
+        return self.once(("projection", player_id, gw), build)
+
+    def fdr_map(self, gw: int) -> Dict[str, Any]:
+        return self.once(("fdr", gw), lambda: build_fdr_map_for_all_teams(gw_start=gw, next_n=5))
+
+    def candidate_pool(self, gw: int, limit: int) -> List[Dict[str, Any]]:
+        return self.once(
+            ("pool", gw, limit),
+            lambda: build_candidate_pool(limit=limit, gw=gw, projections=self.means_for(gw), fdr_map=self.fdr_map(gw)),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        kinds: Dict[str, int] = {}
+        for key in list(self._values):
+            kinds[key[0]] = kinds.get(key[0], 0) + 1
+        return kinds
+
+
+# -------------------------------------------------
+# SERVICE
+# -------------------------------------------------
+
+
+class PredictionService:
+    """
+    Request handlers on top of a WarmState that follows fpl.db's data_version.
+
+    When the stamp changes (pipeline/update.py ran), a new WarmState is built
+    in a background thread, warmed for warm_gws, and swapped in with one
+    assignment; until then requests are served from the previous state.
+    """
+
+    def __init__(
+        self,
+        warm_gws: Sequence[int] = (),
+        pool_size: int = DEFAULT_POOL_SIZE,
+        check_interval: float = VERSION_CHECK_INTERVAL,
+    ):
+        self.warm_gws = list(warm_gws)
+        self.pool_size = pool_size
+        self.check_interval = check_interval
+        self._state = self._build_state(get_data_version())
+        self._last_check = time.monotonic()
+        self._reload_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+
+    # -- state management --
+
+    def _build_state(self, version: Optional[str]) -> WarmState:
+        reset_model_caches()
+        reset_asof_store()
+        state = WarmState(version)
+        for gw in self.warm_gws:
+            state.candidate_pool(gw, self.pool_size)
+        return state
+
+    def _reload(self, version: Optional[str]) -> None:
+        try:
+            self._state = self._build_state(version)
+            print(f"[server] Reloaded for data_version {version}.")
+        finally:
+            self._reload_thread = None
+
+    def state(self) -> WarmState:
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            version = get_data_version()
+            if version != self._state.data_version:
+                with self._reload_lock:
+                    if self._reload_thread is None:
+                        self._reload_thread = threading.Thread(target=self._reload, args=(version,), daemon=True)
+                        self._reload_thread.start()
+        return self._state
+
+    def wait_reloaded(self, timeout: Optional[float] = None) -> None:
+        thread = self._reload_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    # -- handlers --
+
+    def health(self, _: Dict[str, Any]) -> Dict[str, Any]:
+        state = self.state()
+        return {
+            "ok": True,
+            "data_version": state.data_version,
+            "state_age_s": round(time.time() - state.created_at, 1),
+            "cached": state.stats(),
+            "reloading": self._reload_thread is not None,
+        }
+
+    def predict_player(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        gw = _int(body, "gw")
+        ids = body.get("player_ids") or [body.get("player_id")]
+        state = self.state()
+        rows = []
+        for pid in ids:
+            if pid is None:
+                raise BadRequest("player_id or player_ids is required")
+            mean, std = state.projection(int(pid), gw)
+            rows.append({"player_id": int(pid), "mean": mean, "std": std})
+        return {"gw": gw, "data_version": state.data_version, "players": rows}
+
+    def predict_team(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        from predictions.predict_team import predict_team
+
+        gw = _int(body, "gw")
+        starting = [int(x) for x in body.get("starting") or []]
+        if not starting:
+            raise BadRequest("starting is required")
+        state = self.state()
+        dist = predict_team(
+            starting=starting,
+            gw=gw,
+            mode=body.get("mode", "advanced"),
+            bench=[int(x) for x in body.get("bench") or []] or None,
+            captain_id=body.get("captain_id"),
+            vice_captain_id=body.get("vice_id"),
+            triple_captain=bool(body.get("triple_captain")),
+            bench_boost=bool(body.get("bench_boost")),
+            n_sims=body.get("n_sims"),
+            engine=body.get("engine", "normal"),
+            tol=body.get("tol"),
+        )
+        return {"gw": gw, "data_version": state.data_version, **dist.summary()}
+
+    def captaincy(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Captain ranking by projected mean (player_ids, or entry_id's last XI before gw).
+        With "simulate": true, each row also gets P(highest score) from rank_captains.
+        """
+        gw = _int(body, "gw")
+        ids = body.get("player_ids")
+        if not ids:
+            if body.get("entry_id") is None:
+                raise BadRequest("player_ids or entry_id is required")
+            block = load_gw_block(int(body["entry_id"]), before_gw=gw)
+            if block is None:
+                raise BadRequest(f"No squad before GW{gw} for entry {body['entry_id']}")
+            ids = [p["id"] for p in block["team"]["starting"]]
+        state = self.state()
+        ranked = []
+        for pid in ids:
+            mean, std = state.projection(int(pid), gw)
+            meta = state.once(("meta", int(pid)), lambda pid=pid: get_player_meta(int(pid)))
+            ranked.append({"player_id": int(pid), "name": meta["name"], "team": meta["team"], "mean": mean, "std": std})
+        ranked.sort(key=lambda r: (-r["mean"], -r["std"], r["player_id"]))
+        out = {"gw": gw, "data_version": state.data_version, "ranking": ranked}
+        if body.get("simulate"):
+            from predictions.team_advanced import rank_captains
+
+            sim = rank_captains(
+                [r["player_id"] for r in ranked], gw,
+                engine=body.get("engine", "normal"), tol=float(body.get("tol") or MC_TOLERANCE),
+            )
+            p_best = {r["player_id"]: r["p_best"] for r in sim["ranking"]}
+            for r in ranked:
+                r["p_best"] = p_best[r["player_id"]]
+            out.update(n_sims=sim["n_sims"], converged=sim["converged"])
+        return out
+
+    def pool(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        gw = _int(body, "gw")
+        limit = int(body.get("limit") or self.pool_size)
+        state = self.state()
+        return {"gw": gw, "data_version": state.data_version, "pool": state.candidate_pool(gw, limit)}
+
+    def transfers(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Deterministic transfer search (no LLM) on the warm pool / projections."""
+        from utils.ai_service import transfer_advice
+
+        gw = _int(body, "gw")
+        limit = int(body.get("pool") or self.pool_size)
+        state = self.state()
+        result = transfer_advice(
+            entry_id=_int(body, "entry_id"),
+            gw=gw,
+            free_transfers=int(body.get("free_transfers", 1)),
+            allowed_extra=int(body.get("allowed_extra", 0)),
+            pool_full=state.candidate_pool(gw, limit),
+            projections=state.means_for(gw),
+            fdr_map=state.fdr_map(gw),
+            explain=False,
+            top_k=int(body.get("top_k", 3)),
+        )
+        return {"gw": gw, "data_version": state.data_version, **result}
+
+    def routes(self) -> Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]:
+        return {
+            "/health": self.health,
+            "/predict/player": self.predict_player,
+            "/predict/team": self.predict_team,
+            "/captaincy": self.captaincy,
+            "/pool": self.pool,
+            "/transfers": self.transfers,
+        }
+
+
+def _int(body: Dict[str, Any], key: str) -> int:
+    if body.get(key) is None:
+        raise BadRequest(f"{key} is required")
+    try:
+        return int(body[key])
+    except (TypeError, ValueError):
+        raise BadRequest(f"{key} must be an integer")
+
+
+# -------------------------------------------------
+# HTTP
+# -------------------------------------------------
+
+
+def make_handler(service: PredictionService):
+    routes = service.routes()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, payload: Dict[str, Any]) -> None:
+            data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _dispatch(self, body: Dict[str, Any]) -> None:
+            path = self.path.split("?", 1)[0]
+            handler = routes.get(path)
+            if handler is None:
+                self._send(404, {"error": f"Unknown endpoint {path}"})
+                return
+            try:
+                self._send(200, handler(body))
+            except BadRequest as e:
+                self._send(400, {"error": str(e)})
+            except Exception as e:
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def do_GET(self) -> None:
+            self._dispatch({})
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._send(400, {"error": "Body must be JSON"})
+                return
+            if not isinstance(body, dict):
+                self._send(400, {"error": "Body must be a JSON object"})
+                return
+            self._dispatch(body)
+
+        def log_message(self, fmt: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def make_server(
+    service: PredictionService,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    return server
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local prediction service (JSON over HTTP).")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--warm-gw", type=int, action="append", default=[], help="Pre-build pool/FDR for this GW")
+    parser.add_argument("--pool", type=int, default=DEFAULT_POOL_SIZE, help="Default candidate pool size")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    service = PredictionService(warm_gws=args.warm_gw, pool_size=args.pool)
+    server = make_server(service, args.host, args.port)
+    print(
+        f"[server] Listening on http://{args.host}:{server.server_address[1]} "
+        f"(data_version {service.state().data_version}, warm in {time.perf_counter() - started:.1f}s)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,25 +1,27 @@
 import argparse
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
 
 import numpy as np
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
-import matplotlib
-matplotlib.use("Agg")  # headless backend za PNG
-import matplotlib.pyplot as plt
-import pandas as pd
-
+from db.entries import save_team_stats
 from db.sqlite import get_connection
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 # ---------------------------
 # API helpers
 # ---------------------------
 
 DEFAULT_TIMEOUT = 20
+DEFAULT_PICKS_WORKERS = 8
 
 
 def _requests_session(retries: int = 3) -> requests.Session:
@@ -96,92 +98,178 @@ POS_MAP = {
 }
 
 
-def fetch_player_meta(conn, player_id: int):
+def fetch_players_meta_bulk(conn, player_ids) -> dict[int, dict]:
     """
-    Fetch basic player info (name, team short, position string) from SQLite.
+    Basic player info (name, team short, position string) for all player IDs
+    in one query. Unknown IDs get a "#<id>" placeholder.
     """
+    ids = sorted(set(int(pid) for pid in player_ids))
+    out = {pid: {"id": pid, "name": f"#{pid}", "team": None, "pos": None} for pid in ids}
+    if not ids:
+        return out
+
     cur = conn.cursor()
+    placeholders = ",".join("?" * len(ids))
     cur.execute(
-        """
+        f"""
         SELECT p.id,
                p.first_name,
                p.second_name,
-               p.team_id,
                p.element_type,
                t.short_name
         FROM players p
         LEFT JOIN teams t ON p.team_id = t.id
-        WHERE p.id = ?
+        WHERE p.id IN ({placeholders})
         """,
-        (player_id,),
+        ids,
     )
-    row = cur.fetchone()
-    if row is None:
-        return {
-            "id": player_id,
-            "name": f"#{player_id}",
-            "team": None,
-            "pos": None,
+    for row in cur.fetchall():
+        out[row["id"]] = {
+            "id": row["id"],
+            "name": (row["first_name"] + " " + row["second_name"]).strip(),
+            "team": row["short_name"],
+            "pos": POS_MAP.get(row["element_type"], None),
         }
-
-    pid = row["id"]
-    full_name = (row["first_name"] + " " + row["second_name"]).strip()
-    team_short = row["short_name"]
-    pos = POS_MAP.get(row["element_type"], None)
-
-    return {
-        "id": pid,
-        "name": full_name,
-        "team": team_short,
-        "pos": pos,
-    }
+    return out
 
 
-def fetch_player_gw_stats(conn, player_id: int, gw: int):
+def fetch_players_gw_stats_bulk(conn, player_ids) -> dict[tuple[int, int], dict]:
     """
-    Fetch per-GW stats for player from player_history.
-    We keep it minimal: total_points + goals + assists + clean_sheets + bonus.
+    Per-GW stats (total_points, goals, assists, clean_sheets, bonus) from
+    player_history for all (player, GW) pairs in one query.
+    Returns {(player_id, gw): stats}. DGW rows are summed per GW.
+    Missing pairs should be treated as zeros (see _zero_gw_stats).
     """
+    ids = sorted(set(int(pid) for pid in player_ids))
+    if not ids:
+        return {}
+
     cur = conn.cursor()
+    placeholders = ",".join("?" * len(ids))
     cur.execute(
-        """
-        SELECT total_points,
-               goals_scored,
-               assists,
-               clean_sheets,
-               bonus_points
+        f"""
+        SELECT player_id,
+               gameweek,
+               SUM(total_points)  AS total_points,
+               SUM(goals_scored)  AS goals_scored,
+               SUM(assists)       AS assists,
+               SUM(clean_sheets)  AS clean_sheets,
+               SUM(bonus_points)  AS bonus_points
         FROM player_history
-        WHERE player_id = ? AND gameweek = ?
+        WHERE player_id IN ({placeholders})
+        GROUP BY player_id, gameweek
         """,
-        (player_id, gw),
+        ids,
     )
-    row = cur.fetchone()
-    if row is None:
-        return {
-            "total_points": 0,
-            "goals_scored": 0,
-            "assists": 0,
-            "clean_sheets": 0,
-            "bonus_points": 0,
+    return {
+        (row["player_id"], row["gameweek"]): {
+            "total_points": row["total_points"],
+            "goals_scored": row["goals_scored"],
+            "assists": row["assists"],
+            "clean_sheets": row["clean_sheets"],
+            "bonus_points": row["bonus_points"],
         }
+        for row in cur.fetchall()
+    }
+
 
+def _zero_gw_stats() -> dict:
     return {
-        "total_points": row["total_points"],
-        "goals_scored": row["goals_scored"],
-        "assists": row["assists"],
-        "clean_sheets": row["clean_sheets"],
-        "bonus_points": row["bonus_points"],
+        "total_points": 0,
+        "goals_scored": 0,
+        "assists": 0,
+        "clean_sheets": 0,
+        "bonus_points": 0,
     }
 
 
+def finished_gameweeks(conn) -> set[int]:
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT id FROM events WHERE finished = 1")
+    except Exception:
+        return set()
+    return {int(r["id"]) for r in cur.fetchall()}
+
+
+# ---------------------------
+# Picks (concurrent + on-disk cache)
+# ---------------------------
+
+def _picks_cache_path(outdir: str, gw: int) -> str:
+    return os.path.join(outdir, "picks", f"gw{gw}.json")
+
+
+def load_cached_picks(outdir: str, gw: int) -> dict | None:
+    path = _picks_cache_path(outdir, gw)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def save_cached_picks(outdir: str, gw: int, picks_json: dict) -> None:
+    path = _picks_cache_path(outdir, gw)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(picks_json, f)
+    os.replace(tmp, path)
+
+
+def collect_picks(
+    entry_id: int,
+    gws: list[int],
+    outdir: str,
+    finished: set[int],
+    workers: int = DEFAULT_PICKS_WORKERS,
+) -> dict[int, dict]:
+    """
+    Return {gw: picks_json} for all gws.
+
+    Picks of finished GWs never change, so they are cached under
+    <outdir>/picks/gw<N>.json and only fetched once. Everything else
+    (current / unfinished GW) is fetched concurrently.
+    """
+    result: dict[int, dict] = {}
+    to_fetch: list[int] = []
+    for gw in gws:
+        cached = load_cached_picks(outdir, gw) if gw in finished else None
+        if cached is not None:
+            result[gw] = cached
+        else:
+            to_fetch.append(gw)
+
+    if to_fetch:
+        print(f"[team_stats] Fetching picks for {len(to_fetch)} GW(s), {len(result)} from cache ...")
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(to_fetch)))) as pool:
+            fetched = dict(zip(to_fetch, pool.map(lambda gw: api_picks(entry_id, gw), to_fetch)))
+        for gw, picks_json in fetched.items():
+            result[gw] = picks_json
+            if gw in finished:
+                save_cached_picks(outdir, gw, picks_json)
+    else:
+        print(f"[team_stats] All {len(result)} GW picks loaded from cache.")
+
+    return result
+
+
 # ---------------------------
 # Rank plot
 # ---------------------------
 
-def rank_plot(df: pd.DataFrame, chips: dict[int, str], outdir: str, entry_id: int) -> None:
+def rank_plot(df: "pd.DataFrame", chips: dict[int, str], outdir: str, entry_id: int) -> None:
     """
     Renders rank_progression.png using df["event"] and df["overall_rank"].
     """
+    # matplotlib is only imported when a plot is actually drawn.
+    import matplotlib
+    matplotlib.use("Agg")  # headless backend za PNG
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(14, 6))
     plt.plot(df["event"], df["overall_rank"], marker="o", linewidth=3, color="#1DA1F2")
     plt.gca().invert_yaxis()
@@ -224,32 +312,57 @@ def rank_plot(df: pd.DataFrame, chips: dict[int, str], outdir: str, entry_id: in
 # Main analysis
 # ---------------------------
 
-def analyze(entry_id: int) -> None:
+def entry_outdir(entry_id: int) -> str:
+    return os.path.join("analysis_reports", str(entry_id))
+
+
+def collect_team_stats(
+    entry_id: int,
+    workers: int = DEFAULT_PICKS_WORKERS,
+    conn=None,
+) -> tuple[dict, "pd.DataFrame", dict[int, str]]:
+    """
+    Fetch entry, history and picks and build the team_stats structure.
+    Returns (team_json, history DataFrame, chips). Writes nothing except
+    the picks cache; see analyze() / utils/league_ingest.py for storage.
+    """
     print(f"[team_stats] Fetching entry {entry_id} ...")
     entry_info = api_entry(entry_id)
     history_json = api_history(entry_id)
 
     chips = extract_chips(history_json)
 
-    df = pd.DataFrame(history_json["current"]).sort_values("event")
+    import pandas as pd
 
-    df["overall_rank"] = df["overall_rank"]
+    df = pd.DataFrame(history_json["current"]).sort_values("event")
 
-    outdir = os.path.join("analysis_reports", str(entry_id))
+    outdir = entry_outdir(entry_id)
     os.makedirs(outdir, exist_ok=True)
 
-    conn = get_connection()
-    conn.row_factory = conn.row_factory
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
 
     gw_data = []
 
     print("[team_stats] Collecting GW data from picks + SQLite ...")
 
+    gws = [int(gw) for gw in df["event"]]
+    picks_by_gw = collect_picks(
+        entry_id,
+        gws,
+        outdir,
+        finished=finished_gameweeks(conn),
+        workers=workers,
+    )
+    all_ids = {p["element"] for pj in picks_by_gw.values() for p in pj.get("picks", [])}
+    meta_by_id = fetch_players_meta_bulk(conn, all_ids)
+    stats_by_key = fetch_players_gw_stats_bulk(conn, all_ids)
+
     for _, row in df.iterrows():
         gw = int(row["event"])
 
-        picks_json = api_picks(entry_id, gw)
-        picks = picks_json.get("picks", [])
+        picks = picks_by_gw[gw].get("picks", [])
 
         captain_id = None
         vice_id = None
@@ -272,8 +385,8 @@ def analyze(entry_id: int) -> None:
             if is_vice:
                 vice_id = player_id
 
-            meta = fetch_player_meta(conn, player_id)
-            stats = fetch_player_gw_stats(conn, player_id, gw)
+            meta = meta_by_id[player_id]
+            stats = stats_by_key.get((player_id, gw)) or _zero_gw_stats()
 
             total_points = stats["total_points"] * multiplier
 
@@ -333,17 +446,30 @@ def analyze(entry_id: int) -> None:
         "gw_data": gw_data,
     }
 
+    if own_conn:
+        conn.close()
+
+    return to_py(out_json), df, chips
+
+
+def analyze(entry_id: int, workers: int = DEFAULT_PICKS_WORKERS, plot: bool = True) -> None:
+    out_json, df, chips = collect_team_stats(entry_id, workers=workers)
+    outdir = entry_outdir(entry_id)
+
     json_path = os.path.join(outdir, "team_stats.json")
     with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(to_py(out_json), f, indent=2)
+        json.dump(out_json, f, indent=2)
 
     print(f"[team_stats] Saved JSON: {json_path}")
 
+    save_team_stats(out_json)
+    print(f"[team_stats] Saved entry {entry_id} to SQLite (entries / entry_gw / entry_picks).")
+
     # rank PNG
-    rank_plot(df, chips, outdir, entry_id)
-    print(f"[team_stats] Saved rank graph: {os.path.join(outdir, 'rank_progression.png')}")
+    if plot:
+        rank_plot(df, chips, outdir, entry_id)
+        print(f"[team_stats] Saved rank graph: {os.path.join(outdir, 'rank_progression.png')}")
 
-    conn.close()
     print("[team_stats] Done.")
 
 
@@ -369,5 +495,7 @@ def to_py(obj):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--entry", type=int, required=True, help="FPL entry ID")
+    parser.add_argument("--workers", type=int, default=DEFAULT_PICKS_WORKERS, help="Concurrent picks requests")
+    parser.add_argument("--no-plot", action="store_true", help="Skip rank_progression.png (no matplotlib import)")
     args = parser.parse_args()
-    analyze(args.entry)
+    analyze(args.entry, workers=args.workers, plot=not args.no_plot)
@@ -0,0 +1,286 @@
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from utils.ai_service_helpers import _get_projection_score, _is_forced_sell
+from utils.ai_transfer_validator import MAX_PER_CLUB, SquadState, index_pool
+
+HIT_COST = 4
+MAX_SEARCH_TRANSFERS = 3
+
+# Same margin as sanitize_llm_transfer_output: a healthy player is only sold
+# for a strictly better projection.
+MIN_IMPROVEMENT = 0.05
+
+# Search width: best single moves kept per outgoing player, and overall
+# singles combined into 2-/3-transfer plans.
+DEFAULT_PER_OUT = 6
+DEFAULT_SINGLES_LIMIT = 40
+
+# Formation bounds for the starting XI: (min, max) per position.
+XI_BOUNDS = {"GK": (1, 1), "DEF": (3, 5), "MID": (2, 5), "FWD": (1, 3)}
+
+
+def _score(player: Dict[str, Any]) -> float:
+    score = _get_projection_score(player)
+    return float(score) if score is not None else 0.0
+
+
+# -------------------------------------------------
+# XI EVALUATION
+# -------------------------------------------------
+
+
+def best_xi_points(players: Sequence[Tuple[str, float]], captain: bool = True) -> float:
+    """
+    Projected points of the best valid XI from (pos, score) pairs:
+    formation minimums first, then the best remaining outfield players.
+    With captain=True the top XI score counts twice.
+    """
+    by_pos: Dict[str, List[float]] = {pos: [] for pos in XI_BOUNDS}
+    for pos, score in players:
+        if pos in by_pos:
+            by_pos[pos].append(score)
+
+    xi: List[float] = []
+    rest: List[float] = []
+    for pos, (lo, hi) in XI_BOUNDS.items():
+        scores = sorted(by_pos[pos], reverse=True)
+        xi.extend(scores[:lo])
+        rest.extend(scores[lo:hi])
+
+    rest.sort(reverse=True)
+    xi.extend(rest[: max(0, 11 - len(xi))])
+
+    total = sum(xi)
+    if captain and xi:
+        total += max(xi)
+    return total
+
+
+# -------------------------------------------------
+# SEARCH
+# -------------------------------------------------
+
+
+def _hit_cost(n_transfers: int, free_transfers: int) -> int:
+    return max(0, n_transfers - free_transfers) * HIT_COST
+
+
+def _valid_order(
+    state: SquadState,
+    moves: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]],
+    pool: Dict[int, Dict[str, Any]],
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Find an order in which every move passes the validator
+    (bank and club counts are checked after each transfer, so order matters).
+    Walks orders depth-first with SquadState.apply/undo; state is left unchanged.
+    Returns the ordered suggestions or None.
+    """
+    if not moves:
+        return []
+    for i, (out_p, in_p) in enumerate(moves):
+        ok, _ = state.check(out_p["id"], in_p["id"], pool)
+        if not ok:
+            continue
+        state.apply(out_p["id"], in_p)
+        rest = _valid_order(state, list(moves[:i]) + list(moves[i + 1:]), pool)
+        state.undo()
+        if rest is not None:
+            return [{"out_id": out_p["id"], "in_id": in_p["id"]}] + rest
+    return None
+
+
+def search_transfers(
+    squad_state: Dict[str, Any],
+    candidate_pool: List[Dict[str, Any]],
+    max_transfers: Optional[int] = None,
+    top_k: int = 5,
+    per_out: int = DEFAULT_PER_OUT,
+    singles_limit: int = DEFAULT_SINGLES_LIMIT,
+) -> List[Dict[str, Any]]:
+    """
+    Deterministic search over 1..max_transfers transfers from candidate_pool.
+
+    Rules are those of validate_transfer_suggestion / sanitize_llm_transfer_output:
+    matching positions, no duplicates, max 3 per club, bank never negative,
+    and a healthy player is only sold for a better projection.
+
+    Plans are ranked by net gain = projected XI gain (best formation,
+    captain counted twice) minus hit cost. Only plans with positive net
+    gain are returned, best first, at most top_k.
+
+    Pruning: per outgoing player the per_out best incoming players are kept,
+    then the singles_limit best singles are combined into 2- and 3-transfer
+    plans. Combinations are checked on final bank / club counts against an
+    indexed SquadState; only the returned plans go through the full
+    validator (apply/undo over transfer orders).
+    """
+    free_tf = int(squad_state.get("free_transfers", 1))
+    allowed_extra = int(
+        squad_state.get("allowed_extra", squad_state.get("allowed_extra_transfers", 0))
+    )
+    if max_transfers is None:
+        max_transfers = free_tf + allowed_extra
+    max_transfers = max(0, min(max_transfers, MAX_SEARCH_TRANSFERS))
+    if max_transfers == 0:
+        return []
+
+    state = SquadState.from_dict(squad_state)
+    pool_index = index_pool(candidate_pool)
+    squad = state.squad
+    bank = state.bank
+
+    squad_scores = {p["id"]: (p.get("pos"), _score(p)) for p in squad}
+    base_xi = best_xi_points(list(squad_scores.values()))
+
+    pool_by_pos: Dict[str, List[Dict[str, Any]]] = {}
+    for p in candidate_pool:
+        if state.owns(p["id"]) or p.get("price") is None:
+            continue
+        pool_by_pos.setdefault(p.get("pos"), []).append(p)
+    for players in pool_by_pos.values():
+        players.sort(key=lambda p: (-_score(p), p["id"]))
+
+    # Money other sales could free up: bounds how expensive a single
+    # incoming player may be when it is part of a multi-transfer plan.
+    release = sorted(
+        (
+            float(p["price"]) - min(float(c["price"]) for c in pool_by_pos.get(p.get("pos"), [p]))
+            for p in squad
+            if p.get("price") is not None
+        ),
+        reverse=True,
+    )
+    max_release = sum(r for r in release[: max_transfers - 1] if r > 0)
+
+    # 1) candidate single moves
+    singles: List[Tuple[float, float, Dict[str, Any], Dict[str, Any]]] = []
+    for out_p in squad:
+        if out_p.get("price") is None:
+            continue
+        out_price = float(out_p["price"])
+        out_score = _score(out_p)
+        forced = _is_forced_sell(out_p)
+        kept = 0
+        for in_p in pool_by_pos.get(out_p.get("pos"), []):
+            in_score = _score(in_p)
+            if not forced and in_score <= out_score + MIN_IMPROVEMENT:
+                break  # pool is sorted by score, nothing better follows
+            if float(in_p["price"]) > out_price + bank + max_release + 1e-6:
+                continue
+            scores = dict(squad_scores)
+            del scores[out_p["id"]]
+            scores[in_p["id"]] = (in_p.get("pos"), in_score)
+            xi_gain = best_xi_points(list(scores.values())) - base_xi
+            singles.append((xi_gain, in_score - out_score, out_p, in_p))
+            kept += 1
+            if kept >= per_out:
+                break
+
+    singles.sort(key=lambda s: (-s[0], -s[1], s[2]["id"], s[3]["id"]))
+    singles = singles[:singles_limit]
+
+    # 2) combinations (distinct out and in players), checked on final state
+    plans: List[Tuple[float, float, Tuple[Any, ...]]] = []
+    for n in range(1, max_transfers + 1):
+        hit = _hit_cost(n, free_tf)
+        for combo in combinations(singles, n):
+            outs = {s[2]["id"] for s in combo}
+            ins = {s[3]["id"] for s in combo}
+            if len(outs) < n or len(ins) < n:
+                continue
+
+            bank_after = bank + sum(float(s[2]["price"]) - float(s[3]["price"]) for s in combo)
+            if bank_after < -1e-6:
+                continue
+
+            delta: Dict[Any, int] = {}
+            for _, _, out_p, in_p in combo:
+                delta[out_p.get("team")] = delta.get(out_p.get("team"), 0) - 1
+                delta[in_p.get("team")] = delta.get(in_p.get("team"), 0) + 1
+            if any(
+                state.club_count(team) + d > MAX_PER_CLUB
+                for team, d in delta.items()
+                if d > 0 and team is not None
+            ):
+                continue
+
+            scores = dict(squad_scores)
+            for _, _, out_p, in_p in combo:
+                del scores[out_p["id"]]
+                scores[in_p["id"]] = (in_p.get("pos"), _score(in_p))
+            xi_gain = best_xi_points(list(scores.values())) - base_xi
+            net_gain = xi_gain - hit
+            if net_gain <= 0:
+                continue
+            plans.append((net_gain, xi_gain, combo))
+
+    plans.sort(key=lambda t: (-t[0], len(t[2]), -t[1]))
+
+    # 3) full validation + output for the best plans only
+    out: List[Dict[str, Any]] = []
+    for net_gain, xi_gain, combo in plans:
+        moves = [(s[2], s[3]) for s in combo]
+        ordered = _valid_order(state, moves, pool_index)
+        if ordered is None:
+            continue
+        by_out = {s[2]["id"]: s for s in combo}
+        transfers = []
+        for suggestion in ordered:
+            _, raw_gain, out_p, in_p = by_out[suggestion["out_id"]]
+            transfers.append({
+                "out_id": out_p["id"],
+                "out_name": out_p.get("name"),
+                "in_id": in_p["id"],
+                "in_name": in_p.get("name"),
+                "projection_gain": round(raw_gain, 2),
+            })
+        out.append({
+            "transfers": transfers,
+            "n_transfers": len(transfers),
+            "hit_cost": _hit_cost(len(transfers), free_tf),
+            "xi_before": round(base_xi, 2),
+            "xi_after": round(base_xi + xi_gain, 2),
+            "xi_gain": round(xi_gain, 2),
+            "net_gain": round(net_gain, 2),
+            "bank_after": round(bank + sum(float(o["price"]) - float(i["price"]) for o, i in moves), 2),
+        })
+        if len(out) >= top_k:
+            break
+
+    return out
+
+
+def plan_to_suggestion(plan: Optional[Dict[str, Any]], gw: Any) -> Dict[str, Any]:
+    """
+    Turn a search plan into the transfer JSON format the rest of the
+    pipeline expects (suggested_transfers / hit_cost / rationale).
+    None means no plan improves the XI: roll the transfer.
+    """
+    if plan is None:
+        return {
+            "gameweek": gw,
+            "suggested_transfers": [],
+            "hit_cost": 0,
+            "rationale": "No valid transfer improves the projected starting XI; roll the transfer.",
+        }
+
+    return {
+        "gameweek": gw,
+        "suggested_transfers": [
+            {
+                "out_id": t["out_id"],
+                "out_name": t["out_name"],
+                "in_id": t["in_id"],
+                "in_name": t["in_name"],
+                "reason": f"Projection +{t['projection_gain']:.2f} pts.",
+            }
+            for t in plan["transfers"]
+        ],
+        "hit_cost": plan["hit_cost"],
+        "rationale": (
+            f"Projected XI {plan['xi_before']:.1f} -> {plan['xi_after']:.1f} "
+            f"(+{plan['xi_gain']:.2f}), net of hits +{plan['net_gain']:.2f}."
+        ),
+    }